@@ -518,11 +518,22 @@ class FindContours(qt.QMainWindow):
         nbPoints = 0
 
         # iso contours
-        ipolygon = 0
-        for ivalue, value in enumerate(values):
+        if hasattr(self.__algo, "find_contours_levels"):
+            # Compute all the levels at once
             startTime = time.time()
-            polygons = self.__algo.find_contours(value)
+            polygonsPerValue = self.__algo.find_contours_levels(values)
             nbTime += (time.time() - startTime)
+        else:
+            polygonsPerValue = None
+
+        ipolygon = 0
+        for ivalue, value in enumerate(values):
+            if polygonsPerValue is not None:
+                polygons = polygonsPerValue[ivalue]
+            else:
+                startTime = time.time()
+                polygons = self.__algo.find_contours(value)
+                nbTime += (time.time() - startTime)
             nbPolygons += len(polygons)
             for polygon in polygons:
                 if len(polygon) == 0:
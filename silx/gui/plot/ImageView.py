@@ -46,10 +46,14 @@ __date__ = "26/04/2018"
 
 
 import logging
+import weakref
+
 import numpy
 
 import silx
+from silx.third_party.concurrent_futures import ThreadPoolExecutor
 from .. import qt
+from ..utils.concurrent import submitToQtMainThread
 
 from . import items, PlotWindow, PlotWidget, actions
 from ..colors import Colormap
@@ -61,6 +65,78 @@ from .Profile import ProfileToolBar
 _logger = logging.getLogger(__name__)
 
 
+# Side histograms #############################################################
+
+_executor = None
+"""Executor building summed-area tables in a worker thread"""
+
+
+def _getExecutor():
+    """Returns the executor used to build summed-area tables (lazy-loading)"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1)
+    return _executor
+
+
+def _summedAreaTable(data):
+    """Build the summed-area table of a 2D array.
+
+    The table has one more row and column than data, such that
+    ``table[y, x] == numpy.sum(data[:y, :x])``.
+
+    :param numpy.ndarray data: 2D array
+    :return: (data, table) with table set to None if data contains
+        non-finite values or is not of numerical type.
+        In this case, projections must be computed directly from data.
+    :rtype: 2-tuple
+    """
+    kind = data.dtype.kind
+    if kind in 'fc':
+        if not numpy.all(numpy.isfinite(data)):
+            return data, None  # Keep numpy.sum handling of inf and NaN
+        dtype = numpy.float64 if kind == 'f' else numpy.complex128
+    elif kind in 'biu':
+        dtype = numpy.sum(data[:1, :1]).dtype
+    else:
+        return data, None
+
+    height, width = data.shape
+    table = numpy.zeros((height + 1, width + 1), dtype=dtype)
+    numpy.cumsum(data, axis=0, dtype=dtype, out=table[1:, 1:])
+    numpy.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+    return data, table
+
+
+def _sumProjections(data, table, xMin, xMax, yMin, yMax):
+    """Returns the sums along columns and rows of a sub-rectangle of data.
+
+    :param numpy.ndarray data: 2D array
+    :param table: Summed-area table of data or None to sum data directly
+    :param int xMin: First column of the sub-rectangle
+    :param int xMax: Column after the last one of the sub-rectangle
+    :param int yMin: First row of the sub-rectangle
+    :param int yMax: Row after the last one of the sub-rectangle
+    :return: (sum over rows for each column, sum over columns for each row)
+    :rtype: 2-tuple of numpy.ndarray
+    """
+    if table is None:
+        visibleData = data[yMin:yMax, xMin:xMax]
+        return numpy.sum(visibleData, axis=0), numpy.sum(visibleData, axis=1)
+
+    height, width = data.shape
+    xMax = min(xMax, width)
+    yMax = min(yMax, height)
+
+    # Computed in O(width + height) from table corners
+    dtype = numpy.sum(data[:1, :1]).dtype
+    histoH = numpy.diff(table[yMax, xMin:xMax + 1] -
+                        table[yMin, xMin:xMax + 1]).astype(dtype)
+    histoV = numpy.diff(table[yMin:yMax + 1, xMax] -
+                        table[yMin:yMax + 1, xMin]).astype(dtype)
+    return histoH, histoV
+
+
 # RadarView ###################################################################
 
 class RadarView(qt.QGraphicsView):
@@ -284,6 +360,8 @@ class ImageView(PlotWindow):
     def __init__(self, parent=None, backend=None):
         self._imageLegend = '__ImageView__image' + str(id(self))
         self._cache = None  # Store currently visible data information
+        self._summedAreaTable = None  # (data, table) of active image
+        self._summedAreaTableFuture = None  # Pending table build
         self._updatingLimits = False
 
         super(ImageView, self).__init__(parent=parent, backend=backend,
@@ -364,9 +442,81 @@ class ImageView(PlotWindow):
         centralWidget.setLayout(layout)
         self.setCentralWidget(centralWidget)
 
+    _SUMMED_AREA_TABLE_SYNC_SIZE = 1024 * 1024
+    """Image size up to which summed-area table is built in the main thread.
+
+    Larger images get their table built in a worker thread.
+    """
+
     def _dirtyCache(self):
         self._cache = None
 
+    def _resetSummedAreaTable(self):
+        """Discard summed-area table and cancel pending build"""
+        self._summedAreaTable = None
+        if self._summedAreaTableFuture is not None:
+            self._summedAreaTableFuture.cancel()
+            self._summedAreaTableFuture = None
+
+    def _getSummedAreaTable(self, data):
+        """Returns the summed-area table of data if available.
+
+        If data is small, the table is built synchronously,
+        otherwise its build is started in a worker thread and
+        histograms are updated once it is done.
+
+        :param numpy.ndarray data: The image data
+        :return: (data, table) or None if the table is not yet available
+        """
+        if (self._summedAreaTable is not None and
+                self._summedAreaTable[0] is data):
+            return self._summedAreaTable
+
+        self._resetSummedAreaTable()
+
+        if data.size <= self._SUMMED_AREA_TABLE_SYNC_SIZE:
+            self._summedAreaTable = _summedAreaTable(data)
+            return self._summedAreaTable
+
+        future = _getExecutor().submit(_summedAreaTable, data)
+        self._summedAreaTableFuture = future
+
+        ref = weakref.ref(self)
+
+        def callback(future):
+            # Called from the worker thread
+            submitToQtMainThread(ImageView._summedAreaTableDone, ref, future)
+
+        future.add_done_callback(callback)
+        return None
+
+    @staticmethod
+    def _summedAreaTableDone(ref, future):
+        """Handle summed-area table build completion in main thread.
+
+        :param weakref.ref ref: Reference to the ImageView
+        :param concurrent.futures.Future future: The completed build
+        """
+        self = ref()
+        if (self is None or future.cancelled() or
+                future is not self._summedAreaTableFuture):
+            return  # Stale request
+
+        self._summedAreaTableFuture = None
+        try:
+            self._summedAreaTable = future.result()
+        except Exception:
+            _logger.error('Error while building summed-area table',
+                          exc_info=True)
+            activeImage = self.getActiveImage()
+            if activeImage is None:
+                return
+            # Fallback to direct computation
+            self._summedAreaTable = activeImage.getData(copy=False), None
+
+        self._dirtyCache()
+        self._updateHistograms()
+
     def _updateHistograms(self):
         """Update histograms content using current active image."""
         activeImage = self.getActiveImage()
@@ -398,7 +548,12 @@ class ImageView(PlotWindow):
                 subsetYMin = 0 if yMin < 0 else yMin
                 subsetYMax = (height if yMax >= height else yMax) + 1
 
-                if (self._cache is None or
+                # If not yet available, histograms are updated
+                # once the summed-area table is built
+                summedAreaTable = self._getSummedAreaTable(data)
+
+                if summedAreaTable is not None and (
+                        self._cache is None or
                         subsetXMin != self._cache['dataXMin'] or
                         subsetXMax != self._cache['dataXMax'] or
                         subsetYMin != self._cache['dataYMin'] or
@@ -406,10 +561,9 @@ class ImageView(PlotWindow):
                     # The visible area of data has changed, update histograms
 
                     # Rebuild histograms for visible area
-                    visibleData = data[subsetYMin:subsetYMax,
-                                       subsetXMin:subsetXMax]
-                    histoHVisibleData = numpy.sum(visibleData, axis=0)
-                    histoVVisibleData = numpy.sum(visibleData, axis=1)
+                    histoHVisibleData, histoVVisibleData = _sumProjections(
+                        data, summedAreaTable[1],
+                        subsetXMin, subsetXMax, subsetYMin, subsetYMax)
 
                     self._cache = {
                         'dataXMin': subsetXMin,
@@ -607,6 +761,7 @@ class ImageView(PlotWindow):
         Resets side histograms cache
         """
         self._dirtyCache()
+        self._resetSummedAreaTable()
         self._updateHistograms()
 
     def getHistogram(self, axis):
@@ -618,6 +773,9 @@ class ImageView(PlotWindow):
         - 'extent': (start, end) row or column index.
           end index is not included in the histogram.
 
+        For large images, histograms are computed asynchronously and
+        None is returned until they are available.
+
         :param str axis: 'x' for horizontal, 'y' for vertical
         :return: The histogram and its extent as a dict or None.
         :rtype: dict
@@ -758,6 +916,7 @@ class ImageView(PlotWindow):
         :param bool reset: Whether to reset zoom and ROI (default) or not.
         """
         self._dirtyCache()
+        self._resetSummedAreaTable()
 
         assert len(origin) == 2
         assert len(scale) == 2
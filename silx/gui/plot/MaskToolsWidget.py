@@ -133,13 +133,14 @@ class ImageMask(BaseMask):
         :param bool mask: True to mask (default), False to unmask.
         """
         assert 0 < level < 256
-        selection = self._mask[max(0, row):row + height + 1,
-                               max(0, col):col + width + 1]
+        region = (slice(max(0, row), row + height + 1),
+                  slice(max(0, col), col + width + 1))
+        selection = self._mask[region]
         if mask:
             selection[:, :] = level
         else:
             selection[selection == level] = 0
-        self._notify()
+        self._notify(region)
 
     def updatePolygon(self, level, vertices, mask=True):
         """Mask/Unmask a polygon of the given mask level.
@@ -149,12 +150,7 @@ class ImageMask(BaseMask):
         :param bool mask: True to mask (default), False to unmask.
         """
         fill = shapes.polygon_fill_mask(vertices, self._mask.shape)
-        if mask:
-            self._mask[fill != 0] = level
-        else:
-            self._mask[numpy.logical_and(fill != 0,
-                                         self._mask == level)] = 0
-        self._notify()
+        self.updateStencil(level, fill != 0, mask)
 
     def updatePoints(self, level, rows, cols, mask=True):
         """Mask/Unmask points with given coordinates.
@@ -172,12 +168,18 @@ class ImageMask(BaseMask):
                               cols < self._mask.shape[1]))
         rows, cols = rows[valid], cols[valid]
 
+        if rows.size == 0:
+            region = slice(0, 0), slice(0, 0)
+        else:
+            region = (slice(rows.min(), rows.max() + 1),
+                      slice(cols.min(), cols.max() + 1))
+
         if mask:
             self._mask[rows, cols] = level
         else:
             inMask = self._mask[rows, cols] == level
             self._mask[rows[inMask], cols[inMask]] = 0
-        self._notify()
+        self._notify(region)
 
     def updateDisk(self, level, crow, ccol, radius, mask=True):
         """Mask/Unmask a disk of the given mask level.
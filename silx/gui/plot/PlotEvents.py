@@ -157,6 +157,22 @@ def prepareCurveSignal(button, label, type_, xData, yData,
             'ypixel': yPixel}
 
 
+def prepareMultiCurveSignal(button, label, type_, index, xData, yData,
+                            x, y, xPixel, yPixel):
+    """See Plot documentation for content of events"""
+    return {'event': 'multiCurveClicked',
+            'button': button,
+            'label': label,
+            'type': type_,
+            'index': index,
+            'xdata': xData,
+            'ydata': yData,
+            'x': x,
+            'y': y,
+            'xpixel': xPixel,
+            'ypixel': yPixel}
+
+
 def prepareLimitsChangedSignal(sourceObj, xRange, yRange, y2Range):
     """See Plot documentation for content of events"""
     return {'event': 'limitsChanged',
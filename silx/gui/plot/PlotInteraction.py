@@ -40,7 +40,8 @@ from .Interaction import (ClickOrDrag, LEFT_BTN, RIGHT_BTN,
                           State, StateMachine)
 from .PlotEvents import (prepareCurveSignal, prepareDrawingSignal,
                          prepareHoverSignal, prepareImageSignal,
-                         prepareMarkerSignal, prepareMouseSignal)
+                         prepareMarkerSignal, prepareMouseSignal,
+                         prepareMultiCurveSignal)
 
 from .backends.BackendBase import (CURSOR_POINTING, CURSOR_SIZE_HOR,
                                    CURSOR_SIZE_VER, CURSOR_SIZE_ALL)
@@ -1076,6 +1077,28 @@ class ItemsInteraction(ClickOrDrag, _PlotInteraction):
                                                    x, y)
                     return eventDict
 
+                elif picked[0] == 'multicurve':
+                    curves = picked[1]
+                    index, indices = picked[2]
+
+                    dataPos = self.plot.pixelToData(x, y)
+                    assert dataPos is not None
+
+                    xData = curves.getXData(copy=False)
+                    if xData.ndim == 2:
+                        xData = xData[index]
+                    yData = curves.getYData(copy=False)[index]
+
+                    eventDict = prepareMultiCurveSignal('left',
+                                                        curves.getLegend(),
+                                                        'multicurve',
+                                                        index,
+                                                        xData[indices],
+                                                        yData[indices],
+                                                        dataPos[0], dataPos[1],
+                                                        x, y)
+                    return eventDict
+
                 elif picked[0] == 'image':
                     image = picked[1]
 
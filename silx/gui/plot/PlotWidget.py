@@ -155,7 +155,8 @@ class PlotWidget(qt.QMainWindow):
 
     - action: The change of the plot: 'add' or 'remove'
     - kind: The kind of primitive changed:
-      'curve', 'image', 'scatter', 'histogram', 'item' or 'marker'
+      'curve', 'multicurve', 'image', 'scatter', 'histogram', 'item'
+      or 'marker'
     - legend: The legend of the primitive changed.
     """
 
@@ -246,6 +247,7 @@ class PlotWidget(qt.QMainWindow):
         self._contentToUpdate = []  # Used as an OrderedSet
 
         self._dataRange = None
+        self._itemsBounds = None  # Cache of items bounds used by data range
 
         # line types
         self._styleList = ['-', '--', '-.', ':']
@@ -352,36 +354,128 @@ class PlotWidget(qt.QMainWindow):
         """
         Notifies this PlotWidget instance that the range has changed
         and will have to be recomputed.
+
+        This discards the bounds cached for all items: it is meant for
+        changes affecting all items (e.g., axis scale).
+        Use :meth:`_itemBoundsChanged` for changes of a single item.
         """
         self._dataRange = None
+        self._itemsBounds = None
+
+    def _getItemDataRangeBounds(self, item):
+        """Returns the bounds of an item to take into account in data range.
+
+        :param Item item: The item
+        :return: (xmin, xmax, ymin, ymax, isYRight) or None if the item
+            does not contribute to the data range.
+        """
+        if (not isinstance(item, items.DATA_ITEMS) or
+                not item.isVisible() or
+                self._content.get(self._itemKey(item)) is not item):
+            return None
+        bounds = item.getBounds()
+        if bounds is None:
+            return None
+        isYRight = (isinstance(item, items.YAxisMixIn) and
+                    item.getYAxis() == 'right')
+        return tuple(bounds) + (isYRight,)
+
+    @staticmethod
+    def _mergeRange(range_, vmin, vmax):
+        """Extend a (min, max) range with values, ignoring NaNs.
+
+        :param range_: (min, max) or None
+        :param float vmin: Minimum value to merge
+        :param float vmax: Maximum value to merge
+        :return: The extended range or None
+        """
+        if range_ is None:
+            range_ = float('nan'), float('nan')
+        rmin, rmax = range_
+        if not numpy.isnan(vmin) and not vmin >= rmin:
+            rmin = vmin
+        if not numpy.isnan(vmax) and not vmax <= rmax:
+            rmax = vmax
+        if numpy.isnan(rmin) and numpy.isnan(rmax):
+            return None
+        return rmin, rmax
+
+    @staticmethod
+    def _isOnRangeEdge(range_, vmin, vmax):
+        """Returns True if vmin or vmax is an extremum of range.
+
+        :param range_: (min, max) or None
+        :param float vmin:
+        :param float vmax:
+        :rtype: bool
+        """
+        return range_ is not None and (vmin <= range_[0] or
+                                       vmax >= range_[1])
+
+    def _itemBoundsChanged(self, item):
+        """Update data range after a change of an item bounds.
+
+        This is called when an item is added, removed, shown, hidden or
+        when its data changed.
+        The data range is updated incrementally from the cached bounds of
+        the item:
+        it is only recomputed (from the cached bounds of all items) when
+        the previous bounds of the item were on the edge of the data range.
+
+        :param Item item: The item which bounds have changed
+        """
+        if self._itemsBounds is None:
+            return  # Full update is pending
+
+        previous = self._itemsBounds.pop(item, None)
+        bounds = self._getItemDataRangeBounds(item)
+        if bounds is not None:
+            self._itemsBounds[item] = bounds
+
+        dataRange = self._dataRange
+        if dataRange is None:
+            return  # Lazy update is pending
+
+        if previous is not None:
+            xMin, xMax, yMin, yMax, isYRight = previous
+            yRange = dataRange.yright if isYRight else dataRange.y
+            if (self._isOnRangeEdge(dataRange.x, xMin, xMax) or
+                    self._isOnRangeEdge(yRange, yMin, yMax)):
+                # Previous bounds might have been the extremum
+                self._dataRange = None
+                return
+
+        if bounds is not None:
+            xMin, xMax, yMin, yMax, isYRight = bounds
+            xRange = self._mergeRange(dataRange.x, xMin, xMax)
+            if isYRight:
+                self._dataRange = dataRange._replace(
+                    x=xRange,
+                    yright=self._mergeRange(dataRange.yright, yMin, yMax))
+            else:
+                self._dataRange = dataRange._replace(
+                    x=xRange,
+                    y=self._mergeRange(dataRange.y, yMin, yMax))
 
     def _updateDataRange(self):
         """
         Recomputes the range of the data displayed on this PlotWidget.
         """
-        xMin = yMinLeft = yMinRight = float('nan')
-        xMax = yMaxLeft = yMaxRight = float('nan')
-
-        for item in self._content.values():
-            if item.isVisible():
-                bounds = item.getBounds()
+        if self._itemsBounds is None:
+            self._itemsBounds = {}
+            for item in self._content.values():
+                bounds = self._getItemDataRangeBounds(item)
                 if bounds is not None:
-                    xMin = numpy.nanmin([xMin, bounds[0]])
-                    xMax = numpy.nanmax([xMax, bounds[1]])
-                    # Take care of right axis
-                    if (isinstance(item, items.YAxisMixIn) and
-                            item.getYAxis() == 'right'):
-                        yMinRight = numpy.nanmin([yMinRight, bounds[2]])
-                        yMaxRight = numpy.nanmax([yMaxRight, bounds[3]])
-                    else:
-                        yMinLeft = numpy.nanmin([yMinLeft, bounds[2]])
-                        yMaxLeft = numpy.nanmax([yMaxLeft, bounds[3]])
-
-        def lGetRange(x, y):
-            return None if numpy.isnan(x) and numpy.isnan(y) else (x, y)
-        xRange = lGetRange(xMin, xMax)
-        yLeftRange = lGetRange(yMinLeft, yMaxLeft)
-        yRightRange = lGetRange(yMinRight, yMaxRight)
+                    self._itemsBounds[item] = bounds
+
+        xRange = yLeftRange = yRightRange = None
+        for xMin, xMax, yMin, yMax, isYRight in self._itemsBounds.values():
+            xRange = self._mergeRange(xRange, xMin, xMax)
+            # Take care of right axis
+            if isYRight:
+                yRightRange = self._mergeRange(yRightRange, yMin, yMax)
+            else:
+                yLeftRange = self._mergeRange(yLeftRange, yMin, yMax)
 
         self._dataRange = _PlotDataRange(x=xRange,
                                          y=yLeftRange,
@@ -412,6 +506,8 @@ class PlotWidget(qt.QMainWindow):
         """
         if isinstance(item, items.Curve):
             kind = 'curve'
+        elif isinstance(item, items.MultiCurve):
+            kind = 'multicurve'
         elif isinstance(item, items.ImageBase):
             kind = 'image'
         elif isinstance(item, items.Scatter):
@@ -443,7 +539,7 @@ class PlotWidget(qt.QMainWindow):
         if item.isVisible():
             self._itemRequiresUpdate(item)
         if isinstance(item, items.DATA_ITEMS):
-            self._invalidateDataRange()  # TODO handle this automatically
+            self._itemBoundsChanged(item)
 
         self._notifyContentChanged(item)
 
@@ -473,8 +569,8 @@ class PlotWidget(qt.QMainWindow):
             self._contentToUpdate.remove(item)
         if item.isVisible():
             self._setDirtyPlot(overlayOnly=item.isOverlay())
-        if item.getBounds() is not None:
-            self._invalidateDataRange()
+        if isinstance(item, items.DATA_ITEMS):
+            self._itemBoundsChanged(item)
         item._removeBackendRenderer(self._backend)
         item._setPlot(None)
 
@@ -804,6 +900,90 @@ class PlotWidget(qt.QMainWindow):
 
         return legend
 
+    def addMultiCurve(self, x, y, legend=None, info=None,
+                      color=None, linewidth=None, linestyle=None,
+                      yaxis=None, z=None, selectable=None,
+                      resetzoom=True, copy=True):
+        """Add a set of curves sharing the same style as a single item.
+
+        This is more efficient than calling :meth:`addCurve` for each curve
+        when displaying many curves with the same number of points.
+
+        Multi-curves are uniquely identified by their legend.
+        When parameters are not provided, if a multi-curve with the same
+        legend is displayed in the plot, its parameters are used.
+
+        :param numpy.ndarray x:
+            The data corresponding to the x coordinates, either shared by all
+            curves (nbPoints,) or for each curve (nbCurves, nbPoints).
+        :param numpy.ndarray y:
+            The data corresponding to the y coordinates (nbCurves, nbPoints)
+        :param str legend: The legend to be associated to the curves (or None)
+        :param info: User-defined information associated to the curves
+        :param color: Color of all the curves or array of RGBA colors,
+                      one for each curve.
+        :type color: str ("#RRGGBB") or (nbCurves, 4) array or
+                     one of the predefined color names defined in colors.py
+        :param float linewidth: The width of the curves in pixels (Default: 1).
+        :param str linestyle: Type of line::
+
+            - ' ' no line
+            - '-' solid line
+            - '--' dashed line
+            - '-.' dash-dot line
+            - ':' dotted line
+
+        :param str yaxis: The Y axis the curves are attached to in:
+                          'left' (the default), 'right'
+        :param int z: Layer on which to draw the curves (default: 1)
+        :param bool selectable: Indicate if the curves can be selected.
+                                (Default: True)
+        :param bool resetzoom: True (the default) to reset the zoom.
+        :param bool copy: True make a copy of the data (default),
+                          False to use provided arrays.
+        :returns: The key string identify the multi-curve
+        """
+        legend = 'Unnamed multi-curve 1.1' if legend is None else str(legend)
+
+        # Create/Update multi-curve object
+        curves = self.getMultiCurve(legend)
+        mustBeAdded = curves is None
+        if curves is None:
+            # No previous multi-curve, create a default one
+            curves = items.MultiCurve()
+            curves._setLegend(legend)
+            default_color, default_linestyle = self._getColorAndStyle()
+            curves.setColor(default_color)
+            curves.setLineStyle(default_linestyle)
+
+        # Override previous/default values with provided ones
+        curves.setInfo(info)
+        if color is not None:
+            curves.setColor(color)
+        if linewidth is not None:
+            curves.setLineWidth(linewidth)
+        if linestyle is not None:
+            curves.setLineStyle(linestyle)
+        if yaxis is not None:
+            curves.setYAxis(yaxis)
+        if z is not None:
+            curves.setZValue(z)
+        if selectable is not None:
+            curves._setSelectable(selectable)
+
+        # Set multi-curve data
+        curves.setData(x, y, copy=copy)
+
+        if mustBeAdded:
+            self._add(curves)
+        else:
+            self._notifyContentChanged(curves)
+
+        if resetzoom:
+            self.resetZoom()
+
+        return legend
+
     def addImage(self, data, legend=None, info=None,
                  replace=False, replot=None,
                  xScale=None, yScale=None, z=None,
@@ -1371,7 +1551,8 @@ class PlotWidget(qt.QMainWindow):
 
     # Remove
 
-    ITEM_KINDS = 'curve', 'image', 'scatter', 'item', 'marker', 'histogram'
+    ITEM_KINDS = ('curve', 'image', 'scatter', 'item', 'marker', 'histogram',
+                  'multicurve')
     """List of supported kind of items in the plot."""
 
     _ACTIVE_ITEM_KINDS = 'curve', 'scatter', 'image'
@@ -1854,6 +2035,19 @@ class PlotWidget(qt.QMainWindow):
         """
         return self._getItem(kind='histogram', legend=legend)
 
+    def getMultiCurve(self, legend=None):
+        """Get the object describing a specific multi-curve.
+
+        It returns None in case no matching multi-curve is found.
+
+        :param str legend:
+            The legend identifying the multi-curve.
+            If not provided or None (the default), the latest updated
+            multi-curve is returned if there are multi-curves in the plot.
+        :return: None or :class:`.items.MultiCurve` object
+        """
+        return self._getItem(kind='multicurve', legend=legend)
+
     def _getItems(self, kind=ITEM_KINDS, just_legend=False, withhidden=False):
         """Retrieve all items of a kind in the plot
 
@@ -2743,9 +2937,9 @@ class PlotWidget(qt.QMainWindow):
             def test(i):
                 return True
 
-        allItems = self._backend.pickItems(x, y, kinds=('curve', 'image'))
-        allItems = [item for item in allItems
-                    if item['kind'] in ['curve', 'image']]
+        kinds = 'curve', 'multicurve', 'image'
+        allItems = self._backend.pickItems(x, y, kinds=kinds)
+        allItems = [item for item in allItems if item['kind'] in kinds]
 
         for item in reversed(allItems):
             kind, legend = item['kind'], item['legend']
@@ -2754,6 +2948,11 @@ class PlotWidget(qt.QMainWindow):
                 if curve is not None and test(curve):
                     return kind, curve, item['indices']
 
+            elif kind == 'multicurve':
+                curves = self.getMultiCurve(legend)
+                if curves is not None and test(curves):
+                    return kind, curves, (item['curve'], item['indices'])
+
             elif kind == 'image':
                 image = self.getImage(legend)
                 if image is not None and test(image):
@@ -35,7 +35,7 @@ import weakref
 
 import numpy
 
-from silx.image.bilinear import BilinearImage
+from silx.image.bilinear import profile_line_stack
 
 from .. import icons
 from .. import qt
@@ -266,15 +266,11 @@ def createProfile(roiInfo, currentData, origin, scale, lineWidth):
                     startPt[1] == endPt[1] and startPt[0] > endPt[0])):
                 startPt, endPt = endPt, startPt
 
-            profile = []
-            for slice_idx in range(currentData3D.shape[0]):
-                bilinear = BilinearImage(currentData3D[slice_idx, :, :])
-
-                profile.append(bilinear.profile_line(
-                    (startPt[0] - 0.5, startPt[1] - 0.5),
-                    (endPt[0] - 0.5, endPt[1] - 0.5),
-                    roiWidth))
-            profile = numpy.array(profile)
+            profile = profile_line_stack(
+                currentData3D,
+                (startPt[0] - 0.5, startPt[1] - 0.5),
+                (endPt[0] - 0.5, endPt[1] - 0.5),
+                roiWidth)
 
             # Extend ROI with half a pixel on each end, and
             # Convert back to plot coords (x, y)
@@ -93,9 +93,20 @@ class ScatterMask(BaseMask):
 
         :param int level: Mask level to update.
         :param indices: Sequence or 1D array of indices of points to be
-            updated
+            updated, or 1D boolean array of the points to update
         :param bool mask: True to mask (default), False to unmask.
         """
+        indices = numpy.array(indices, copy=False)
+        if indices.dtype == numpy.bool_:
+            indices = numpy.nonzero(indices)[0]
+        else:
+            indices = indices.astype(numpy.intp, copy=False)
+        if indices.size == 0:
+            region = (slice(0, 0),)
+        else:
+            positive = numpy.mod(indices, max(1, len(self._mask)))
+            region = (slice(positive.min(), positive.max() + 1),)
+
         if mask:
             self._mask[indices] = level
         else:
@@ -103,7 +114,7 @@ class ScatterMask(BaseMask):
             indices_stencil = numpy.zeros_like(self._mask, dtype=numpy.bool)
             indices_stencil[indices] = True
             self._mask[numpy.logical_and(self._mask == level, indices_stencil)] = 0
-        self._notify()
+        self._notify(region)
 
     # update shapes
     def updatePolygon(self, level, vertices, mask=True):
@@ -116,11 +127,8 @@ class ScatterMask(BaseMask):
         polygon = shapes.Polygon(vertices)
         x, y = self._getXY()
 
-        # TODO: this could be optimized if necessary
-        indices_in_polygon = [idx for idx in range(len(x)) if
-                              polygon.is_inside(y[idx], x[idx])]
-
-        self.updatePoints(level, indices_in_polygon, mask)
+        stencil = polygon.contains_points(y, x)
+        self.updateStencil(level, stencil, mask)
 
     def updateRectangle(self, level, y, x, height, width, mask=True):
         """Mask/Unmask data inside a rectangle
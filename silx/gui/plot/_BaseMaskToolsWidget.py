@@ -32,6 +32,7 @@ __license__ = "MIT"
 __date__ = "24/04/2018"
 
 import os
+import zlib
 
 import numpy
 
@@ -42,6 +43,112 @@ from silx.gui.colors import rgba
 from .actions.mode import PanModeAction
 
 
+def _boundingBox(stencil):
+    """Returns the bounding box of the True elements of a boolean array.
+
+    :param numpy.ndarray stencil: Boolean array
+    :return: Bounding box as a tuple of slices (one per dimension)
+        or None if stencil has no True element.
+    :rtype: Union[tuple,None]
+    """
+    stencil = numpy.asarray(stencil)
+    bbox = []
+    for axis in range(stencil.ndim):
+        if stencil.ndim == 1:
+            profile = stencil
+        else:
+            otherAxes = tuple(i for i in range(stencil.ndim) if i != axis)
+            profile = numpy.any(stencil, axis=otherAxes)
+        indices = numpy.flatnonzero(profile)
+        if indices.size == 0:
+            return None
+        bbox.append(slice(indices[0], indices[-1] + 1))
+    return tuple(bbox)
+
+
+class _MaskDelta(object):
+    """History step storing the change of a region of the mask.
+
+    The change is stored as the zlib-compressed XOR of the region before
+    and after the change, so that the same operation undoes and redoes it.
+
+    :param tuple region: The changed region of the mask as a tuple of slices
+    :param numpy.ndarray before: Region content before the change
+    :param numpy.ndarray after: Region content after the change
+    """
+
+    def __init__(self, region, before, after):
+        self._region = region
+        self._shape = before.shape
+        self._delta = zlib.compress(
+            numpy.bitwise_xor(before, after).tobytes(), 1)
+
+    def nbytes(self):
+        """Returns the memory used to store this step"""
+        return len(self._delta)
+
+    def _apply(self, mask):
+        delta = numpy.frombuffer(zlib.decompress(self._delta),
+                                 dtype=numpy.uint8).reshape(self._shape)
+        numpy.bitwise_xor(mask[self._region], delta, out=mask[self._region])
+        return mask
+
+    def undo(self, mask):
+        """Revert this change.
+
+        :param numpy.ndarray mask: The mask to update in place
+        :return: The updated mask
+        """
+        return self._apply(mask)
+
+    def redo(self, mask):
+        """Apply again this change.
+
+        :param numpy.ndarray mask: The mask to update in place
+        :return: The updated mask
+        """
+        return self._apply(mask)
+
+
+class _MaskSnapshot(object):
+    """History step storing compressed masks before and after the change.
+
+    This is used when the shape of the mask has changed.
+
+    :param numpy.ndarray before: Mask before the change
+    :param numpy.ndarray after: Mask after the change
+    """
+
+    def __init__(self, before, after):
+        self._before = before.shape, zlib.compress(before.tobytes(), 1)
+        self._after = after.shape, zlib.compress(after.tobytes(), 1)
+
+    def nbytes(self):
+        """Returns the memory used to store this step"""
+        return len(self._before[1]) + len(self._after[1])
+
+    @staticmethod
+    def _decompress(shape, data):
+        mask = numpy.frombuffer(zlib.decompress(data), dtype=numpy.uint8)
+        return numpy.array(mask.reshape(shape), copy=True)
+
+    def undo(self, mask):
+        """Revert this change.
+
+        :param numpy.ndarray mask: The current mask (not used)
+        :return: The mask before the change
+        """
+        return self._decompress(*self._before)
+
+    def redo(self, mask):
+        """Apply again this change.
+
+        :param numpy.ndarray mask: The current mask (not used)
+        :return: The mask after the change
+        """
+        return self._decompress(*self._after)
+
+
 class BaseMask(qt.QObject):
     """Base class for :class:`ImageMask` and :class:`ScatterMask`
 
@@ -75,6 +182,13 @@ class BaseMask(qt.QObject):
         # Store the mask
         self._mask = numpy.array((), dtype=numpy.uint8)
 
+        # Mask as of the last commit, None if history is not initialized
+        self._committedMask = None
+
+        # Bounding box of the changes since last commit as a list of
+        # [start, stop] per dimension or None if no changes
+        self._dirtyRegion = None
+
         # Store the plot item to be masked
         self._dataItem = None
         if dataItem is not None:
@@ -103,8 +217,27 @@ class BaseMask(qt.QObject):
         """
         raise NotImplementedError("To be implemented in subclass")
 
-    def _notify(self):
-        """Notify of mask change."""
+    def _notify(self, region=None):
+        """Notify of mask change.
+
+        :param region: The modified region of the mask as a tuple of slices
+            (one per dimension) or None if the whole mask may have changed.
+        """
+        shape = self._mask.shape
+        if region is None:
+            bbox = [[0, size] for size in shape]
+        else:
+            bbox = [list(s.indices(size)[:2]) for s, size in zip(region, shape)]
+
+        if any(start >= stop for start, stop in bbox):
+            pass  # Empty region
+        elif self._dirtyRegion is None or len(self._dirtyRegion) != len(bbox):
+            self._dirtyRegion = bbox
+        else:
+            for dirty, (start, stop) in zip(self._dirtyRegion, bbox):
+                dirty[0] = min(dirty[0], start)
+                dirty[1] = max(dirty[1], stop)
+
         self.sigChanged.emit()
 
     def getMask(self, copy=True):
@@ -132,51 +265,103 @@ class BaseMask(qt.QObject):
     # History control
     def resetHistory(self):
         """Reset history"""
-        self._history = [numpy.array(self._mask, copy=True)]
+        self._committedMask = numpy.array(self._mask, copy=True)
+        self._dirtyRegion = None
+        self._history = []
         self._redo = []
         self.sigUndoable.emit(False)
         self.sigRedoable.emit(False)
 
+    def _restoreCommittedMask(self):
+        """Discard changes that were not committed"""
+        if self._mask.shape != self._committedMask.shape:
+            self._mask = numpy.array(self._committedMask, copy=True)
+        elif self._dirtyRegion is not None:
+            region = tuple(slice(*bounds) for bounds in self._dirtyRegion)
+            self._mask[region] = self._committedMask[region]
+        self._dirtyRegion = None
+
     def commit(self):
-        """Append the current mask to history if changed"""
-        if (not self._history or self._redo or
-                not numpy.all(numpy.equal(self._mask, self._history[-1]))):
-            if self._redo:
-                self._redo = []  # Reset redo as a new action as been performed
-                self.sigRedoable[bool].emit(False)
-
-            while len(self._history) >= self.historyDepth:
+        """Append the current mask to history if changed
+
+        Only the region modified since the previous commit is compared and
+        history steps only store the compressed changes.
+        """
+        if self._committedMask is None:  # Initialize history
+            self._committedMask = numpy.array(self._mask, copy=True)
+            self._dirtyRegion = None
+            return
+
+        if self._mask.shape != self._committedMask.shape:
+            step = _MaskSnapshot(self._committedMask, self._mask)
+            self._committedMask = numpy.array(self._mask, copy=True)
+
+        else:
+            step = None
+            if self._dirtyRegion is not None:
+                region = tuple(slice(*bounds) for bounds in self._dirtyRegion)
+                changed = _boundingBox(numpy.not_equal(
+                    self._mask[region], self._committedMask[region]))
+                if changed is not None:
+                    # Restrict region to modified elements
+                    region = tuple(
+                        slice(r.start + c.start, r.start + c.stop)
+                        for r, c in zip(region, changed))
+                    step = _MaskDelta(region,
+                                      self._committedMask[region],
+                                      self._mask[region])
+                    self._committedMask[region] = self._mask[region]
+
+        self._dirtyRegion = None
+
+        if self._redo:
+            self._redo = []  # Reset redo as a new action as been performed
+            self.sigRedoable[bool].emit(False)
+
+        if step is not None:
+            while self._history and len(self._history) >= self.historyDepth - 1:
                 self._history.pop(0)
-            self._history.append(numpy.array(self._mask, copy=True))
+            if self.historyDepth > 1:
+                self._history.append(step)
 
-            if len(self._history) == 2:
+            if len(self._history) == 1:
                 self.sigUndoable.emit(True)
 
     def undo(self):
         """Restore previous mask if any"""
-        if len(self._history) > 1:
-            self._redo.append(self._history.pop())
-            self._mask = numpy.array(self._history[-1], copy=True)
+        if self._history:
+            self._restoreCommittedMask()
+
+            step = self._history.pop()
+            self._committedMask = step.undo(self._committedMask)
+            self._mask = numpy.array(self._committedMask, copy=True)
+            self._redo.append(step)
             self._notify()  # Do not store this change in history
+            self._dirtyRegion = None
 
             if len(self._redo) == 1:  # First redo
                 self.sigRedoable.emit(True)
-            if len(self._history) == 1:  # Last value in history
+            if not self._history:  # Last value in history
                 self.sigUndoable.emit(False)
 
     def redo(self):
         """Restore previously undone modification if any"""
         if self._redo:
-            self._mask = self._redo.pop()
-            self._history.append(numpy.array(self._mask, copy=True))
+            self._restoreCommittedMask()
+
+            step = self._redo.pop()
+            self._committedMask = step.redo(self._committedMask)
+            self._mask = numpy.array(self._committedMask, copy=True)
+            self._history.append(step)
             self._notify()
+            self._dirtyRegion = None
 
             if not self._redo:  # No more redo
                 self.sigRedoable.emit(False)
-            if len(self._history) == 2:  # Something to undo
+            if len(self._history) == 1:  # Something to undo
                 self.sigUndoable.emit(True)
 
-                # Whole mask operations
+    # Whole mask operations
 
     def clear(self, level):
         """Set all values of the given mask level to 0.
@@ -239,11 +424,18 @@ class BaseMask(qt.QObject):
         :type stencil: numpy.array of same dimension as the mask
         :param bool mask: True to mask (default), False to unmask.
         """
+        region = _boundingBox(stencil)
+        if region is None:
+            self._notify(region=(slice(0, 0),) * self._mask.ndim)
+            return
+
+        stencil = numpy.asarray(stencil)[region]
+        selection = self._mask[region]
         if mask:
-            self._mask[stencil] = level
+            selection[stencil] = level
         else:
-            self._mask[numpy.logical_and(self._mask == level, stencil)] = 0
-        self._notify()
+            selection[numpy.logical_and(selection == level, stencil)] = 0
+        self._notify(region)
 
     def updateBelowThreshold(self, level, threshold, mask=True):
         """Mask/unmask all points whose values are below a threshold.
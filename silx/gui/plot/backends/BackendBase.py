@@ -145,6 +145,73 @@ class BackendBase(object):
         """
         return legend
 
+    def appendCurveData(self, item, x, y, nbAppended, nbRemoved):
+        """Update the data of a curve which first points were removed and
+        new points appended.
+
+        This allows to only upload the new points.
+
+        :param item: The handle returned by :meth:`addCurve`
+        :param numpy.ndarray x: The data corresponding to the x axis
+        :param numpy.ndarray y: The data corresponding to the y axis
+        :param int nbAppended: Number of points appended at the end of x, y
+        :param int nbRemoved:
+            Number of points removed from the beginning of the curve
+        :returns: True if the update was done,
+                  False if the curve needs to be added again
+        :rtype: bool
+        """
+        return False
+
+    def updateImageData(self, item, data, colormap):
+        """Update the data of a colormapped image added with :meth:`addImage`.
+
+        :param item: The handle returned by :meth:`addImage`
+        :param numpy.ndarray data: The new 2D data of the image
+        :param ~silx.gui.colors.Colormap colormap:
+            The colormap of the image
+        :returns: True if the update was done,
+                  False if the image needs to be added again
+        :rtype: bool
+        """
+        return False
+
+    def addMultiCurve(self, x, y, legend, color, visible,
+                      linewidth, linestyle, yaxis, z, selectable, alpha):
+        """Add a set of 1D curves sharing the same style to the graph.
+
+        :param numpy.ndarray x: The data corresponding to the x axis:
+            either (nbPoints,) shared by all curves or (nbCurves, nbPoints)
+        :param numpy.ndarray y: The data corresponding to the y axis
+                                of shape (nbCurves, nbPoints)
+        :param numpy.ndarray color: RGBA color of each curve (nbCurves, 4)
+        :param numpy.ndarray visible: Visibility of each curve (nbCurves,)
+        :param str legend: The legend to be associated to the curves
+        :param float linewidth: The width of the curves in pixels
+        :param str linestyle: Type of line (See :meth:`addCurve`)
+        :param str yaxis: The Y axis the curves belongs to: 'left', 'right'
+        :param int z: Layer on which to draw the curves
+        :param bool selectable: indicate if the curves can be selected
+        :param float alpha: Curves opacity, as a float in [0., 1.]
+        :returns: The handle used by the backend to univocally access the
+                  curves
+        """
+        return legend
+
+    def updateMultiCurve(self, item, color, visible):
+        """Update colors and visibility of curves added with addMultiCurve.
+
+        This allows to avoid uploading the curves data again.
+
+        :param item: The handle returned by :meth:`addMultiCurve`
+        :param numpy.ndarray color: RGBA color of each curve (nbCurves, 4)
+        :param numpy.ndarray visible: Visibility of each curve (nbCurves,)
+        :returns: True if the update was done,
+                  False if the curves needs to be added again
+        :rtype: bool
+        """
+        return False
+
     def addImage(self, data, legend,
                  origin, scale, z,
                  selectable, draggable,
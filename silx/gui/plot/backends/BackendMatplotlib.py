@@ -358,6 +358,55 @@ class BackendMatplotlib(BackendBase.BackendBase):
 
         return Container(artists)
 
+    def appendCurveData(self, item, x, y, nbAppended, nbRemoved):
+        if len(item) != 1 or not isinstance(item[0], Line2D):
+            return False  # Only support curves without errors and fill
+        item[0].set_data(x, y)
+        return True
+
+    def addMultiCurve(self, x, y, legend, color, visible,
+                      linewidth, linestyle, yaxis, z, selectable, alpha):
+        for parameter in (x, y, legend, color, visible, linewidth, linestyle,
+                          yaxis, z, selectable, alpha):
+            assert parameter is not None
+        assert yaxis in ('left', 'right')
+
+        if yaxis == "right":
+            axes = self.ax2
+            self._enableAxis("right", True)
+        else:
+            axes = self.ax
+
+        # Only visible curves are part of the collection
+        indices = numpy.nonzero(visible)[0]
+        x = numpy.broadcast_to(x, y.shape)[indices]
+        y = y[indices]
+        segments = numpy.stack((x, y), axis=-1)
+
+        if linestyle in ('', ' '):  # No line
+            linestyle, linewidth = '-', 0.
+
+        collection = LineCollection(segments,
+                                    label="__MULTICURVE__" + legend,
+                                    colors=color[indices],
+                                    linewidths=linewidth,
+                                    linestyles=linestyle,
+                                    picker=3 if selectable else None)
+        collection.set_zorder(z)
+        if alpha < 1:
+            collection.set_alpha(alpha)
+        collection._silxCurveIndices = indices  # Used for picking
+
+        axes.add_collection(collection)
+        return collection
+
+    def updateMultiCurve(self, item, color, visible):
+        indices = numpy.nonzero(visible)[0]
+        if not numpy.array_equal(indices, item._silxCurveIndices):
+            return False  # Collection needs to be rebuilt
+        item.set_color(color[indices])
+        return True
+
     def addImage(self, data, legend,
                  origin, scale, z,
                  selectable, draggable,
@@ -990,6 +1039,23 @@ class BackendMatplotlibQt(FigureCanvasQTAgg, BackendMatplotlib):
         elif label.startswith('__IMAGE__'):
             self._picked.append({'kind': 'image', 'legend': label[9:]})
 
+        elif label.startswith('__MULTICURVE__'):
+            # Picked curve is the last drawn one, pick its closest points
+            collection = event.artist
+            segment = collection.get_segments()[event.ind[-1]]
+            points = collection.get_transform().transform(segment)
+            distances = numpy.hypot(points[:, 0] - event.mouseevent.x,
+                                    points[:, 1] - event.mouseevent.y)
+            indices = numpy.nonzero(
+                distances <= collection.get_picker())[0]
+            if len(indices) == 0:  # A line is picked: use nearest point
+                indices = numpy.array([numpy.nanargmin(distances)])
+
+            curveIndex = collection._silxCurveIndices[event.ind[-1]]
+            self._picked.append({'kind': 'multicurve', 'legend': label[14:],
+                                 'curve': int(curveIndex),
+                                 'indices': indices})
+
         else:  # it's a curve, item have no picker for now
             if not isinstance(event.artist, (PathCollection, Line2D)):
                 _logger.info('Unsupported artist, ignored')
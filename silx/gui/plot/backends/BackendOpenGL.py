@@ -44,7 +44,8 @@ from ... import qt
 from ..._glutils import gl
 from ... import _glutils as glu
 from .glutils import (
-    GLPlotCurve2D, GLPlotColormap, GLPlotRGBAImage, GLPlotFrame2D,
+    GLPlotCurve2D, GLPlotMultiCurve2D, GLPlotColormap, GLPlotRGBAImage,
+    GLPlotFrame2D,
     mat4Ortho, mat4Identity,
     LEFT, RIGHT, BOTTOM, TOP,
     Text2D, Shape2D)
@@ -105,7 +106,7 @@ class PlotDataContent(object):
     This class is only meant to work with _OpenGLPlotCanvas.
     """
 
-    _PRIMITIVE_TYPES = 'curve', 'image'
+    _PRIMITIVE_TYPES = 'curve', 'multicurve', 'image'
 
     def __init__(self):
         self._primitives = OrderedDict()  # For images and curves
@@ -116,11 +117,13 @@ class PlotDataContent(object):
         This function generates the key in the dict from the primitive.
 
         :param primitive: The primitive to add.
-        :type primitive: Instance of GLPlotCurve2D, GLPlotColormap,
-                         GLPlotRGBAImage.
+        :type primitive: Instance of GLPlotCurve2D, GLPlotMultiCurve2D,
+                         GLPlotColormap, GLPlotRGBAImage.
         """
         if isinstance(primitive, GLPlotCurve2D):
             primitiveType = 'curve'
+        elif isinstance(primitive, GLPlotMultiCurve2D):
+            primitiveType = 'multicurve'
         elif isinstance(primitive, (GLPlotColormap, GLPlotRGBAImage)):
             primitiveType = 'image'
         else:
@@ -132,7 +135,8 @@ class PlotDataContent(object):
     def get(self, primitiveType, legend):
         """Get the corresponding primitive of given type with given legend.
 
-        :param str primitiveType: Type of primitive ('curve' or 'image').
+        :param str primitiveType:
+            Type of primitive ('curve', 'multicurve' or 'image').
         :param str legend: The legend of the primitive to retrieve.
         :return: The corresponding curve or None if no such curve.
         """
@@ -1009,6 +1013,80 @@ class BackendOpenGL(BackendBase.BackendBase, glu.OpenGLWidget):
 
         return legend, 'curve'
 
+    def appendCurveData(self, item, x, y, nbAppended, nbRemoved):
+        legend, kind = item
+        curve = self._plotContent.get('curve', legend)
+        if curve is None:
+            return False
+        return curve.appendData(x, y, nbAppended, nbRemoved)
+
+    def updateImageData(self, item, data, colormap):
+        legend, kind = item
+        image = self._plotContent.get('image', legend)
+        if (not isinstance(image, GLPlotColormap) or data.ndim != 2 or
+                image.cmapIsLog != (colormap.getNormalization() == 'log')):
+            return False
+
+        # Ensure array is contiguous and eventually convert its type
+        if data.dtype in (numpy.float32, numpy.uint8, numpy.uint16):
+            data = numpy.array(data, copy=False, order='C')
+        else:
+            data = numpy.array(data, dtype=numpy.float32, order='C')
+
+        image.updateData(data)
+        image.cmapRange = colormap.getColormapRange(data=data)
+        return True
+
+    def addMultiCurve(self, x, y, legend, color, visible,
+                      linewidth, linestyle, yaxis, z, selectable, alpha):
+        for parameter in (x, y, legend, color, visible, linewidth, linestyle,
+                          yaxis, z, selectable, alpha):
+            assert parameter is not None
+        assert yaxis in ('left', 'right')
+
+        x = numpy.array(x, dtype=numpy.float32, copy=False, order='C')
+        y = numpy.array(y, dtype=numpy.float32, copy=False, order='C')
+
+        color = numpy.array(color, dtype=numpy.float32, copy=True)
+        if alpha < 1.:  # Apply transparency
+            color[:, 3] *= alpha
+
+        behaviors = set()
+        if selectable:
+            behaviors.add('selectable')
+
+        curves = GLPlotMultiCurve2D(x, y, color, visible,
+                                    lineStyle=linestyle,
+                                    lineWidth=linewidth)
+        curves.info = {
+            'legend': legend,
+            'zOrder': z,
+            'behaviors': behaviors,
+            'yAxis': yaxis,
+            'alpha': alpha,
+        }
+
+        if yaxis == "right":
+            self._plotFrame.isY2Axis = True
+
+        self._plotContent.add(curves)
+
+        return legend, 'multicurve'
+
+    def updateMultiCurve(self, item, color, visible):
+        legend, kind = item
+        curves = self._plotContent.get('multicurve', legend)
+        if curves is None:
+            return False
+
+        color = numpy.array(color, dtype=numpy.float32, copy=True)
+        if curves.info['alpha'] < 1.:  # Apply transparency
+            color[:, 3] *= curves.info['alpha']
+
+        curves.setColors(color)
+        curves.setCurvesVisible(visible)
+        return True
+
     def addImage(self, data, legend,
                  origin, scale, z,
                  selectable, draggable,
@@ -1157,8 +1235,8 @@ class BackendOpenGL(BackendBase.BackendBase, glu.OpenGLWidget):
     def remove(self, item):
         legend, kind = item
 
-        if kind == 'curve':
-            curve = self._plotContent.pop('curve', legend)
+        if kind in ('curve', 'multicurve'):
+            curve = self._plotContent.pop(kind, legend)
             if curve is not None:
                 # Check if some curves remains on the right Y axis
                 y2AxisItems = (item for item in self._plotContent.primitives()
@@ -1222,6 +1300,32 @@ class BackendOpenGL(BackendBase.BackendBase, glu.OpenGLWidget):
             self._plotFrame.size[1] - self._plotFrame.margins.bottom - 1)
         return xPlot, yPlot
 
+    def _getPickArea(self, x, y, offset, yAxis):
+        """Returns the picking area around a position in data coordinates.
+
+        :param float x: X position in pixels
+        :param float y: Y position in pixels
+        :param float offset: Half size of the picking area in pixels
+        :param str yAxis: The Y axis to use: 'left' or 'right'
+        :return: (xPickMin, yPickMin, xPickMax, yPickMax) or None
+        """
+        inAreaPos = self._mouseInPlotArea(x - offset, y - offset)
+        dataPos = self.pixelToData(inAreaPos[0], inAreaPos[1],
+                                   axis=yAxis, check=True)
+        if dataPos is None:
+            return None
+        xPick0, yPick0 = dataPos
+
+        inAreaPos = self._mouseInPlotArea(x + offset, y + offset)
+        dataPos = self.pixelToData(inAreaPos[0], inAreaPos[1],
+                                   axis=yAxis, check=True)
+        if dataPos is None:
+            return None
+        xPick1, yPick1 = dataPos
+
+        return (min(xPick0, xPick1), min(yPick0, yPick1),
+                max(xPick0, xPick1), max(yPick0, yPick1))
+
     def pickItems(self, x, y, kinds):
         picked = []
 
@@ -1261,7 +1365,7 @@ class BackendOpenGL(BackendBase.BackendBase, glu.OpenGLWidget):
                                            legend=marker['legend']))
 
             # Pick image and curves
-            if 'image' in kinds or 'curve' in kinds:
+            if 'image' in kinds or 'curve' in kinds or 'multicurve' in kinds:
                 for item in self._plotContent.zOrderedPrimitives(reverse=True):
                     if ('image' in kinds and
                             isinstance(item, (GLPlotColormap, GLPlotRGBAImage))):
@@ -1277,37 +1381,34 @@ class BackendOpenGL(BackendBase.BackendBase, glu.OpenGLWidget):
                         if item.lineStyle is not None:
                             offset = max(item.lineWidth / 2., offset)
 
-                        yAxis = item.info['yAxis']
-
-                        inAreaPos = self._mouseInPlotArea(x - offset, y - offset)
-                        dataPos = self.pixelToData(inAreaPos[0], inAreaPos[1],
-                                                   axis=yAxis, check=True)
-                        if dataPos is None:
+                        pickArea = self._getPickArea(
+                            x, y, offset, item.info['yAxis'])
+                        if pickArea is None:
                             continue
-                        xPick0, yPick0 = dataPos
 
-                        inAreaPos = self._mouseInPlotArea(x + offset, y + offset)
-                        dataPos = self.pixelToData(inAreaPos[0], inAreaPos[1],
-                                                   axis=yAxis, check=True)
-                        if dataPos is None:
-                            continue
-                        xPick1, yPick1 = dataPos
+                        pickedIndices = item.pick(*pickArea)
+                        if pickedIndices:
+                            picked.append(dict(kind='curve',
+                                               legend=item.info['legend'],
+                                               indices=pickedIndices))
 
-                        if xPick0 < xPick1:
-                            xPickMin, xPickMax = xPick0, xPick1
-                        else:
-                            xPickMin, xPickMax = xPick1, xPick0
+                    elif ('multicurve' in kinds and
+                            isinstance(item, GLPlotMultiCurve2D)):
+                        offset = self._PICK_OFFSET
+                        if item.lineStyle is not None:
+                            offset = max(item.lineWidth / 2., offset)
 
-                        if yPick0 < yPick1:
-                            yPickMin, yPickMax = yPick0, yPick1
-                        else:
-                            yPickMin, yPickMax = yPick1, yPick0
+                        pickArea = self._getPickArea(
+                            x, y, offset, item.info['yAxis'])
+                        if pickArea is None:
+                            continue
 
-                        pickedIndices = item.pick(xPickMin, yPickMin,
-                                                  xPickMax, yPickMax)
-                        if pickedIndices:
-                            picked.append(dict(kind='curve',
+                        result = item.pick(*pickArea)
+                        if result is not None:
+                            curveIndex, pickedIndices = result
+                            picked.append(dict(kind='multicurve',
                                                legend=item.info['legend'],
+                                               curve=curveIndex,
                                                indices=pickedIndices))
 
         return picked
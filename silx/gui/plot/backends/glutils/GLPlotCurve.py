@@ -396,6 +396,13 @@ class _Lines2D(object):
 
     render = _renderNone  # Overridden in style setter
 
+    def _drawArrays(self, colorAttrib):
+        """Issue the draw call once vertex attributes are set
+
+        :param int colorAttrib: Location of the color attribute
+        """
+        gl.glDrawArrays(self._drawMode, 0, self.xVboData.size)
+
     def _renderSolid(self, matrix, isXLog, isYLog):
         if isXLog:
             transform = self._LOG10_X_Y if isYLog else self._LOG10_X
@@ -426,7 +433,7 @@ class _Lines2D(object):
         self.yVboData.setVertexAttrib(yPosAttrib)
 
         gl.glLineWidth(self.width)
-        gl.glDrawArrays(self._drawMode, 0, self.xVboData.size)
+        self._drawArrays(colorAttrib)
 
         gl.glDisable(gl.GL_LINE_SMOOTH)
 
@@ -485,11 +492,30 @@ class _Lines2D(object):
         self.yVboData.setVertexAttrib(yPosAttrib)
 
         gl.glLineWidth(self.width)
-        gl.glDrawArrays(self._drawMode, 0, self.xVboData.size)
+        self._drawArrays(colorAttrib)
 
         gl.glDisable(gl.GL_LINE_SMOOTH)
 
 
+class _MultiLines2D(_Lines2D):
+    """Render multiple line strips stored one after the other in VBOs.
+
+    Strips are drawn by batches sharing the same color: one
+    glMultiDrawArrays call per batch with the color set as a constant
+    vertex attribute, so that no per-vertex color is stored.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(_MultiLines2D, self).__init__(*args, **kwargs)
+        self.batches = []
+        """List of (color, firsts, counts) of strips to draw"""
+
+    def _drawArrays(self, colorAttrib):
+        for color, firsts, counts in self.batches:
+            gl.glVertexAttrib4f(colorAttrib, *color)
+            gl.glMultiDrawArrays(self._drawMode, firsts, counts, len(firsts))
+
+
 def _distancesFromArrays(xData, yData):
     deltas = numpy.dstack((
         numpy.ediff1d(xData, to_begin=numpy.float32(0.)),
@@ -1022,6 +1048,12 @@ class GLPlotCurve2D(object):
         self._isYLog = False
         self.xData, self.yData, self.colorData = xData, yData, colorData
 
+        # Extra number of points to allocate in VBO for appendData
+        self._vboReserve = 0
+        # Index of first point in the VBO and max number of points it stores
+        self._vboStart, self._vboCapacity = 0, 0
+        self._lastDistance = 0.  # Dash distance of the last point
+
         if fillColor is not None:
             self.fill = _Fill2D(color=fillColor)
         else:
@@ -1158,37 +1190,46 @@ class GLPlotCurve2D(object):
 
         if self.xVboData is None:
             xAttrib, yAttrib, cAttrib, dAttrib = None, None, None, None
+            # Space reserved for appended points (only without color array)
+            reserve = self._vboReserve if self.colorData is None else 0
             if self.lineStyle in (DASHED, DASHDOT, DOTTED):
                 dists = _distancesFromArrays(xData, yData)
+                self._lastDistance = dists[-1] if len(dists) else 0.
                 if self.colorData is None:
                     xAttrib, yAttrib, dAttrib = vertexBuffer(
                         (xData, yData, dists),
-                        prefix=(1, 1, 0), suffix=(1, 1, 0))
+                        prefix=(1, 1, 0),
+                        suffix=(1 + reserve, 1 + reserve, reserve))
                 else:
                     xAttrib, yAttrib, cAttrib, dAttrib = vertexBuffer(
                         (xData, yData, colorData, dists),
                         prefix=(1, 1, 0, 0), suffix=(1, 1, 0, 0))
             elif self.colorData is None:
                 xAttrib, yAttrib = vertexBuffer(
-                    (xData, yData), prefix=(1, 1), suffix=(1, 1))
+                    (xData, yData),
+                    prefix=(1, 1), suffix=(1 + reserve, 1 + reserve))
             else:
                 xAttrib, yAttrib, cAttrib = vertexBuffer(
                     (xData, yData, colorData), prefix=(1, 1, 0))
 
+            self._vboAttribs = xAttrib, yAttrib, dAttrib
+            self._vboStart = 0
+            self._vboCapacity = xAttrib.size - 2
+
             # Shrink VBO
             self.xVboData = xAttrib.copy()
-            self.xVboData.size -= 2
+            self.xVboData.size -= 2 + reserve
             self.xVboData.offset += xAttrib.itemsize
 
             self.yVboData = yAttrib.copy()
-            self.yVboData.size -= 2
+            self.yVboData.size -= 2 + reserve
             self.yVboData.offset += yAttrib.itemsize
 
             if cAttrib is not None and colorData.dtype.kind == 'u':
                 cAttrib.normalization = True  # Normalize uint to [0, 1]
             self.colorVboData = cAttrib
             self.useColorVboData = cAttrib is not None
-            self.distVboData = dAttrib
+            self.distVboData = None if dAttrib is None else dAttrib.copy()
 
             if self.fill is not None:
                 xData = xData.reshape(xData.size, 1)
@@ -1235,6 +1276,103 @@ class GLPlotCurve2D(object):
 
         self._errorBars.discard()
 
+    def appendData(self, xData, yData, nbAppended, nbRemoved):
+        """Update curve data by removing first points and appending new ones.
+
+        If the vertex buffer has enough room left, only the appended points
+        are uploaded to it.
+        Otherwise, the vertex buffer is allocated again, with extra room
+        for next calls.
+
+        :param numpy.ndarray xData: The new X coordinates of the curve
+        :param numpy.ndarray yData: The new Y coordinates of the curve
+        :param int nbAppended: Number of points appended at the end
+        :param int nbRemoved: Number of points removed from the beginning
+        :return: True if the update was done, False if this is not supported
+                 for this curve which needs to be created again.
+        :rtype: bool
+        """
+        previousLength = len(self.xData)
+        if (self.fill is not None or self.colorData is not None or
+                self._errorBars._xData is not None or
+                self._isXLog or self._isYLog or
+                len(xData) == 0 or nbRemoved > previousLength or
+                nbAppended > len(xData) or
+                len(xData) != previousLength - nbRemoved + nbAppended):
+            return False
+
+        xData = numpy.array(xData, copy=False, dtype=numpy.float32)
+        yData = numpy.array(yData, copy=False, dtype=numpy.float32)
+        self.xData, self.yData = xData, yData
+
+        # Update bounds
+        xTail = xData[len(xData) - nbAppended:]
+        yTail = yData[len(yData) - nbAppended:]
+        if nbRemoved > 0 or previousLength == 0:
+            xRange = min_max(xData, min_positive=True)
+            yRange = min_max(yData, min_positive=True)
+            self.xMin, self.xMinPos, self.xMax = \
+                xRange.minimum, xRange.min_positive, xRange.maximum
+            self.yMin, self.yMinPos, self.yMax = \
+                yRange.minimum, yRange.min_positive, yRange.maximum
+        elif nbAppended > 0:
+            for data, prefix in ((xTail, 'x'), (yTail, 'y')):
+                result = min_max(data, min_positive=True)
+                vMin = getattr(self, prefix + 'Min')
+                vMinPos = getattr(self, prefix + 'MinPos')
+                vMax = getattr(self, prefix + 'Max')
+                setattr(self, prefix + 'Min', numpy.fmin(vMin, result.minimum))
+                setattr(self, prefix + 'Max', numpy.fmax(vMax, result.maximum))
+                if result.min_positive is not None:
+                    if vMinPos is None:
+                        vMinPos = result.min_positive
+                    else:
+                        vMinPos = min(vMinPos, result.min_positive)
+                    setattr(self, prefix + 'MinPos', vMinPos)
+
+        if self.xVboData is None:
+            return True  # VBO will be created at next rendering
+
+        start = self._vboStart + nbRemoved
+        if start + len(xData) > self._vboCapacity:
+            # Not enough room, allocate VBO with extra room at next rendering
+            self.discard()
+            self._vboReserve = len(xData)
+            return True
+
+        xAttrib, yAttrib, dAttrib = self._vboAttribs
+        stop = start + len(xData)
+        tailStart = stop - nbAppended
+
+        if nbAppended > 0:
+            # Prefix of 1 element for x and y
+            xAttrib.vbo.update(
+                xTail, xAttrib.offset + (1 + tailStart) * xAttrib.itemsize)
+            yAttrib.vbo.update(
+                yTail, yAttrib.offset + (1 + tailStart) * yAttrib.itemsize)
+
+            if dAttrib is not None:
+                if len(xData) > nbAppended:  # Continue from last point
+                    dists = _distancesFromArrays(
+                        xData[-nbAppended - 1:], yData[-nbAppended - 1:])[1:]
+                    dists += self._lastDistance
+                else:
+                    dists = _distancesFromArrays(xTail, yTail)
+                dists = numpy.array(dists, copy=False, dtype=numpy.float32)
+                self._lastDistance = dists[-1]
+                dAttrib.vbo.update(
+                    dists, dAttrib.offset + tailStart * dAttrib.itemsize)
+
+        self._vboStart = start
+        for vboData, attrib, prefix in ((self.xVboData, xAttrib, 1),
+                                        (self.yVboData, yAttrib, 1),
+                                        (self.distVboData, dAttrib, 0)):
+            if vboData is not None:
+                vboData.offset = (attrib.offset +
+                                  (prefix + start) * attrib.itemsize)
+                vboData.size = len(xData)
+        return True
+
     def pick(self, xPickMin, yPickMin, xPickMax, yPickMax):
         """Perform picking on the curve according to its rendering.
 
@@ -1315,3 +1453,211 @@ class GLPlotCurve2D(object):
                                     (self.yData <= yPickMax))[0].tolist()
 
         return indices
+
+
+class GLPlotMultiCurve2D(object):
+    """Set of curves with the same number of points and the same style.
+
+    All curves are stored in a single vertex buffer.
+    Consecutive visible curves with the same color are drawn at once and
+    colors are not stored in the vertex buffer.
+    Points with non-finite coordinates are not displayed.
+
+    :param numpy.ndarray xData:
+        X coordinates (nbPoints,) shared by all curves or (nbCurves, nbPoints)
+    :param numpy.ndarray yData: Y coordinates (nbCurves, nbPoints)
+    :param numpy.ndarray colors: RGBA colors in [0, 1] (nbCurves, 4)
+    :param numpy.ndarray visible: Visibility of each curve (nbCurves,)
+    """
+
+    def __init__(self, xData, yData, colors, visible,
+                 lineStyle=None, lineWidth=None, lineDashPeriod=None):
+        self.yData = numpy.array(yData, copy=False, dtype=numpy.float32)
+        assert self.yData.ndim == 2
+        self.xData = numpy.array(
+            numpy.broadcast_to(xData, self.yData.shape),
+            copy=False, dtype=numpy.float32, order='C')
+
+        # Compute bounds
+        result = min_max(self.xData, min_positive=True, finite=True)
+        self.xMin = result.minimum
+        self.xMinPos = result.min_positive
+        self.xMax = result.maximum
+
+        result = min_max(self.yData, min_positive=True, finite=True)
+        self.yMin = result.minimum
+        self.yMinPos = result.min_positive
+        self.yMax = result.maximum
+
+        kwargs = {'style': lineStyle, 'drawMode': gl.GL_LINE_STRIP}
+        if lineWidth is not None:
+            kwargs['width'] = lineWidth
+        if lineDashPeriod is not None:
+            kwargs['dashPeriod'] = lineDashPeriod
+        self.lines = _MultiLines2D(**kwargs)
+
+        self._colors = None
+        self._visible = None
+        self.setColors(colors)
+        self.setCurvesVisible(visible)
+
+    lineStyle = _proxyProperty(('lines', 'style'))
+
+    lineWidth = _proxyProperty(('lines', 'width'))
+
+    lineDashPeriod = _proxyProperty(('lines', 'dashPeriod'))
+
+    @classmethod
+    def init(cls):
+        _MultiLines2D.init()
+
+    def _updateBatches(self):
+        """Group consecutive visible curves sharing the same color.
+
+        Curves are kept in order so that the last one is drawn on top.
+        """
+        if self._colors is None or self._visible is None:
+            return
+
+        nbPoints = self.yData.shape[1]
+        indices = numpy.nonzero(self._visible)[0]
+        colors = numpy.clip(self._colors[indices], 0., 1.)
+
+        changes = numpy.nonzero(
+            numpy.any(colors[1:] != colors[:-1], axis=1))[0] + 1
+        starts = numpy.concatenate(((0,), changes))
+        ends = numpy.concatenate((changes, (len(indices),)))
+
+        batches = []
+        if len(indices) > 0:
+            for start, end in zip(starts, ends):
+                firsts = (indices[start:end] * nbPoints).astype(numpy.int32)
+                counts = numpy.full((end - start,), nbPoints,
+                                    dtype=numpy.int32)
+                batches.append((tuple(colors[start]), firsts, counts))
+        self.lines.batches = batches
+
+    def setColors(self, colors):
+        """Set the color of each curve.
+
+        This does not update the vertex buffer.
+
+        :param numpy.ndarray colors: RGBA colors in [0, 1] (nbCurves, 4)
+        """
+        colors = numpy.array(colors, copy=False, dtype=numpy.float32)
+        assert colors.shape == (self.yData.shape[0], 4)
+        self._colors = colors
+        self._updateBatches()
+
+    def setCurvesVisible(self, visible):
+        """Set the visibility of each curve.
+
+        :param numpy.ndarray visible: Visibility of each curve (nbCurves,)
+        """
+        visible = numpy.array(visible, copy=True, dtype=numpy.bool_)
+        assert visible.shape == (self.yData.shape[0],)
+        self._visible = visible
+        self._updateBatches()
+
+    def prepare(self):
+        if self.lines.xVboData is None:
+            xData = self.xData.ravel()
+            yData = self.yData.ravel()
+
+            if self.lineStyle in (DASHED, DASHDOT, DOTTED):
+                # Distances restart from 0 for each curve
+                deltas = numpy.zeros((2,) + self.yData.shape,
+                                     dtype=numpy.float32)
+                deltas[0, :, 1:] = numpy.diff(self.xData, axis=1)
+                deltas[1, :, 1:] = numpy.diff(self.yData, axis=1)
+                deltas = numpy.nan_to_num(deltas)
+                dists = numpy.cumsum(
+                    numpy.sqrt(numpy.sum(deltas ** 2, axis=0)), axis=1)
+                xAttrib, yAttrib, dAttrib = vertexBuffer(
+                    (xData, yData, dists.ravel()))
+            else:
+                xAttrib, yAttrib = vertexBuffer((xData, yData))
+                dAttrib = None
+
+            self.lines.xVboData = xAttrib
+            self.lines.yVboData = yAttrib
+            self.lines.distVboData = dAttrib
+
+    def render(self, matrix, isXLog, isYLog):
+        self.prepare()
+        self.lines.render(matrix, isXLog, isYLog)
+
+    def discard(self):
+        if self.lines.xVboData is not None:
+            self.lines.xVboData.vbo.discard()
+
+        self.lines.xVboData = None
+        self.lines.yVboData = None
+        self.lines.distVboData = None
+
+    def pick(self, xPickMin, yPickMin, xPickMax, yPickMax):
+        """Perform picking on the curves according to their rendering.
+
+        The picking area is [xPickMin, xPickMax], [yPickMin, yPickMax].
+
+        Only the last drawn picked curve is returned.
+        As for :meth:`GLPlotCurve2D.pick`, when a segment between 2 points
+        with indices i, i+1 is picked, only index i is added to the result.
+
+        :return: The index of the picked curve and the indices of its
+                 picked data or None if no curve is picked
+        :rtype: None or (int, numpy.ndarray)
+        """
+        if (self.lineStyle is None or
+                not numpy.any(self._visible) or
+                self.xMin > xPickMax or xPickMin > self.xMax or
+                self.yMin > yPickMax or yPickMin > self.yMax):
+            return None
+
+        curveIndices = numpy.nonzero(self._visible)[0]
+        xData = self.xData[curveIndices]
+        yData = self.yData[curveIndices]
+
+        # Cohen-Sutherland codes, with all bits set for non-finite points
+        with numpy.errstate(invalid='ignore'):
+            codes = (((yData > yPickMax) << 3) |
+                     ((yData < yPickMin) << 2) |
+                     ((xData > xPickMax) << 1) |
+                     (xData < xPickMin))
+        finite = numpy.logical_and(numpy.isfinite(xData),
+                                   numpy.isfinite(yData))
+        codes[numpy.logical_not(finite)] = 0xf
+
+        picked = codes == 0
+
+        # Segments that might cross the area with no end point inside it
+        candidates = numpy.nonzero((codes[:, :-1] != 0) &
+                                   (codes[:, 1:] != 0) &
+                                   ((codes[:, :-1] & codes[:, 1:]) == 0))
+        if len(candidates[0]) > 0:
+            curves, starts = candidates
+            x0, y0 = xData[curves, starts], yData[curves, starts]
+            x1, y1 = xData[curves, starts + 1], yData[curves, starts + 1]
+
+            # Liang-Barsky segment clipping
+            dx, dy = x1 - x0, y1 - y0
+            tMin = numpy.zeros(x0.shape, dtype=numpy.float64)
+            tMax = numpy.ones(x0.shape, dtype=numpy.float64)
+            intersects = numpy.ones(x0.shape, dtype=numpy.bool_)
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                for p, q in ((-dx, x0 - xPickMin), (dx, xPickMax - x0),
+                             (-dy, y0 - yPickMin), (dy, yPickMax - y0)):
+                    intersects &= numpy.logical_or(p != 0, q >= 0)
+                    ratio = q / p
+                    tMin = numpy.where(p < 0, numpy.maximum(tMin, ratio), tMin)
+                    tMax = numpy.where(p > 0, numpy.minimum(tMax, ratio), tMax)
+            intersects &= tMin <= tMax
+            picked[curves[intersects], starts[intersects]] = True
+
+        pickedCurves = numpy.nonzero(numpy.any(picked, axis=1))[0]
+        if len(pickedCurves) == 0:
+            return None
+
+        # Last drawn curve is on top
+        index = pickedCurves[-1]
+        return int(curveIndices[index]), numpy.nonzero(picked[index])[0]
@@ -314,7 +314,7 @@ class GLPlotColormap(_GLPlotData2D):
                                   format_=gl.GL_RED,
                                   texUnit=self._DATA_TEX_UNIT)
         elif self._textureIsDirty:
-            self._textureIsDirty = True
+            self._textureIsDirty = False
             self._texture.updateAll(format_=gl.GL_RED, data=self.data)
 
     def _setCMap(self, prog):
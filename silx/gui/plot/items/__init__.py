@@ -37,6 +37,7 @@ from .core import (Item, LabelsMixIn, DraggableMixIn, ColormapMixIn,  # noqa
                    AlphaMixIn, LineMixIn, ItemChangedType)  # noqa
 from .complex import ImageComplexData  # noqa
 from .curve import Curve  # noqa
+from .multicurve import MultiCurve  # noqa
 from .histogram import Histogram  # noqa
 from .image import ImageBase, ImageData, ImageRgba, MaskImageData  # noqa
 from .shape import Shape  # noqa
@@ -44,6 +45,7 @@ from .scatter import Scatter  # noqa
 from .marker import Marker, XMarker, YMarker  # noqa
 from .axis import Axis, XAxis, YAxis, YRightAxis
 
-DATA_ITEMS = ImageComplexData, Curve, Histogram, ImageBase, Scatter
+DATA_ITEMS = (ImageComplexData, Curve, MultiCurve, Histogram, ImageBase,
+              Scatter)
 """Classes of items representing data and to consider to compute data bounds.
 """
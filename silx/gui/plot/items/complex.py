@@ -273,11 +273,10 @@ class ImageComplexData(ImageBase, ColormapMixIn):
         self._data = data
         self._dataByModesCache = {}
 
-        # TODO hackish data range implementation
         if self.isVisible():
             plot = self.getPlot()
             if plot is not None:
-                plot._invalidateDataRange()
+                plot._itemBoundsChanged(self)
 
         self._updated(ItemChangedType.DATA)
 
@@ -112,6 +112,9 @@ class ItemChangedType(enum.Enum):
     when an image origin changed.
     """
 
+    CURVE_VISIBILITY = 'curveVisibilityChanged'
+    """Visibility of some curves of a multi-curve item changed flag."""
+
     OVERLAY = 'overlayChanged'
     """Item's overlay state changed flag."""
 
@@ -198,6 +201,9 @@ class Item(qt.QObject):
         visible = bool(visible)
         if visible != self._visible:
             self._visible = visible
+            plot = self.getPlot()
+            if plot is not None:
+                plot._itemBoundsChanged(self)
             # When visibility has changed, always mark as dirty
             self._updated(ItemChangedType.VISIBLE,
                           checkVisibility=False)
@@ -664,6 +670,9 @@ class YAxisMixIn(ItemMixInBase):
         assert yaxis in ('left', 'right')
         if yaxis != self._yaxis:
             self._yaxis = yaxis
+            plot = self.getPlot()
+            if plot is not None:
+                plot._itemBoundsChanged(self)
             self._updated(ItemChangedType.YAXIS)
 
 
@@ -724,6 +733,62 @@ class AlphaMixIn(ItemMixInBase):
             self._updated(ItemChangedType.ALPHA)
 
 
+class _AppendBuffer(object):
+    """Preallocated array storing data appended along its first dimension.
+
+    Stored data is only moved when the end of the array is reached,
+    which makes appending amortized O(1) per element.
+
+    :param int minCapacity: Minimum number of elements to allocate
+    """
+
+    def __init__(self, minCapacity=1024):
+        self._minCapacity = minCapacity
+        self._buffer = None
+        self._start, self._stop = 0, 0
+        self.view = None
+        """View on the stored data or None if no data was stored"""
+
+    def append(self, current, data, nbRemoved=0, maxLength=None):
+        """Discard first elements of current data and append new data.
+
+        :param numpy.ndarray current:
+            The data currently in use. If it is not :attr:`view`,
+            it is copied to a new buffer.
+        :param numpy.ndarray data: Data to append
+        :param int nbRemoved: Number of elements to discard from current
+        :param maxLength: Maximum number of elements to store or None
+        :return: View on the stored data
+        :rtype: numpy.ndarray
+        """
+        length = len(current) - nbRemoved + len(data)
+        dtype = numpy.result_type(current, data)
+
+        if (current is not self.view or dtype != self._buffer.dtype or
+                length > len(self._buffer)):
+            # Allocate a new buffer
+            capacity = max(2 * length, self._minCapacity)
+            if maxLength is not None:
+                capacity = max(length, min(capacity, 2 * maxLength))
+            self._buffer = numpy.empty(
+                (capacity,) + data.shape[1:], dtype=dtype)
+            self._start, self._stop = 0, len(current) - nbRemoved
+            self._buffer[:self._stop] = current[nbRemoved:]
+
+        else:
+            self._start += nbRemoved
+            if self._stop + len(data) > len(self._buffer):
+                # End of buffer is reached: move data to the beginning
+                size = self._stop - self._start
+                self._buffer[:size] = self._buffer[self._start:self._stop]
+                self._start, self._stop = 0, size
+
+        self._buffer[self._stop:self._stop + len(data)] = data
+        self._stop += len(data)
+        self.view = self._buffer[self._start:self._stop]
+        return self.view
+
+
 class Points(Item, SymbolMixIn, AlphaMixIn):
     """Base class for :class:`Curve` and :class:`Scatter`"""
     # note: _logFilterData must be overloaded if you overload
@@ -997,9 +1062,8 @@ class Points(Item, SymbolMixIn, AlphaMixIn):
         self._filteredCache = {}  # Reset cached filtered data
         self._clippedCache = {}  # Reset cached clipped bool array
 
-        # TODO hackish data range implementation
         if self.isVisible():
             plot = self.getPlot()
             if plot is not None:
-                plot._invalidateDataRange()
+                plot._itemBoundsChanged(self)
         self._updated(ItemChangedType.DATA)
@@ -35,7 +35,7 @@ import numpy
 
 from ... import colors
 from .core import (Points, LabelsMixIn, ColorMixIn, YAxisMixIn,
-                   FillMixIn, LineMixIn, ItemChangedType)
+                   FillMixIn, LineMixIn, ItemChangedType, _AppendBuffer)
 
 
 _logger = logging.getLogger(__name__)
@@ -70,6 +70,33 @@ class Curve(Points, ColorMixIn, YAxisMixIn, FillMixIn, LabelsMixIn, LineMixIn):
         self._highlightColor = self._DEFAULT_HIGHLIGHT_COLOR
         self._highlighted = False
 
+        self._maxLength = None
+        self._appendBuffers = _AppendBuffer(), _AppendBuffer()
+
+        # (nbAppended, nbRemoved) points since last update if only
+        # appendData was called, None otherwise
+        self._pendingAppend = None
+
+    def _updated(self, event=None, checkVisibility=True):
+        self._pendingAppend = None
+        super(Curve, self)._updated(event, checkVisibility)
+
+    def _update(self, backend):
+        """Update the backend renderer, uploading only appended points
+        if possible."""
+        if (self._dirty and self._pendingAppend is not None and
+                self._backendRenderer is not None and self.isVisible()):
+            x, y, _, _ = self.getData(copy=False, displayed=True)
+            nbAppended, nbRemoved = self._pendingAppend
+            if backend.appendCurveData(self._backendRenderer, x, y,
+                                       nbAppended, nbRemoved):
+                self._dirty = False
+                self._pendingAppend = None
+                return
+
+        super(Curve, self)._update(backend)
+        self._pendingAppend = None
+
     def _addBackendRenderer(self, backend):
         """Update backend renderer"""
         # Filter-out values <= 0
@@ -126,19 +153,102 @@ class Curve(Points, ColorMixIn, YAxisMixIn, FillMixIn, LabelsMixIn, LineMixIn):
         else:
             raise IndexError("Index out of range: %s", str(item))
 
-    def setVisible(self, visible):
-        """Set visibility of item.
+    def getMaxLength(self):
+        """Returns the maximum number of points kept by :meth:`appendData`.
+
+        :return: The maximum length or None if there is no limit
+        :rtype: Union[int, None]
+        """
+        return self._maxLength
+
+    def setMaxLength(self, length):
+        """Set the maximum number of points kept by :meth:`appendData`.
+
+        The limit is applied at the next call to :meth:`appendData`.
+
+        :param length: The maximum length or None (default) for no limit
+        :type length: Union[int, None]
+        """
+        if length is not None:
+            length = int(length)
+            assert length > 0
+        self._maxLength = length
+
+    def appendData(self, x, y):
+        """Append points at the end of the curve.
+
+        Points are stored in a preallocated buffer so that existing points
+        are not copied on each call, and the backend only updates appended
+        points when possible.
+        If a maximum length is set (see :meth:`setMaxLength`),
+        the oldest points are discarded.
 
-        :param bool visible: True to display it, False otherwise
+        Curves with per-point errors or colors are not supported.
+
+        :param numpy.ndarray x: The x coordinates of the points to append
+        :param numpy.ndarray y: The y coordinates of the points to append
+        :raises ValueError: If the curve has per-point errors or colors
         """
-        visible = bool(visible)
-        # TODO hackish data range implementation
-        if self.isVisible() != visible:
+        x = numpy.array(x, copy=False, ndmin=1)
+        y = numpy.array(y, copy=False, ndmin=1)
+        assert x.ndim == y.ndim == 1
+        assert len(x) == len(y)
+
+        if (isinstance(self._xerror, numpy.ndarray) or
+                isinstance(self._yerror, numpy.ndarray)):
+            raise ValueError('appendData does not support per-point errors')
+        if isinstance(self.getColor(), numpy.ndarray):
+            raise ValueError('appendData does not support per-point colors')
+
+        xData = self.getXData(copy=False)
+        yData = self.getYData(copy=False)
+
+        maxLength = self.getMaxLength()
+        if maxLength is not None:
+            x, y = x[-maxLength:], y[-maxLength:]
+            nbRemoved = max(0, len(xData) + len(x) - maxLength)
+        else:
+            nbRemoved = 0
+        nbAppended = len(x)
+
+        # Update bounds if they are not changed by removed points
+        bounds = self._boundsCache.get((False, False))
+        if bounds is not None and nbRemoved > 0:
+            removedX = xData[:nbRemoved]
+            removedY = yData[:nbRemoved]
+            if not (numpy.all(removedX > bounds[0]) and
+                    numpy.all(removedX < bounds[1]) and
+                    numpy.all(removedY > bounds[2]) and
+                    numpy.all(removedY < bounds[3])):
+                bounds = None
+        if bounds is not None and nbAppended > 0:
+            bounds = (numpy.fmin(bounds[0], numpy.nanmin(x)),
+                      numpy.fmax(bounds[1], numpy.nanmax(x)),
+                      numpy.fmin(bounds[2], numpy.nanmin(y)),
+                      numpy.fmax(bounds[3], numpy.nanmax(y)))
+
+        xBuffer, yBuffer = self._appendBuffers
+        self._x = xBuffer.append(xData, x, nbRemoved, maxLength)
+        self._y = yBuffer.append(yData, y, nbRemoved, maxLength)
+
+        self._boundsCache = {} if bounds is None else {(False, False): bounds}
+        self._filteredCache = {}  # Reset cached filtered data
+        self._clippedCache = {}  # Reset cached clipped bool array
+
+        if self.isVisible():
             plot = self.getPlot()
             if plot is not None:
-                plot._invalidateDataRange()
+                plot._itemBoundsChanged(self)
 
-        super(Curve, self).setVisible(visible)
+        # Accumulate appended points if only appendData was called
+        if self._dirty:
+            pending = self._pendingAppend
+        else:
+            pending = 0, 0
+        self._updated(ItemChangedType.DATA)
+        if pending is not None:
+            self._pendingAppend = (pending[0] + nbAppended,
+                                   pending[1] + nbRemoved)
 
     def isHighlighted(self):
         """Returns True if curve is highlighted.
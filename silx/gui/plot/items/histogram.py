@@ -124,6 +124,10 @@ class Histogram(Item, AlphaMixIn, ColorMixIn, FillMixIn,
         self._histogram = ()
         self._edges = ()
 
+        # Store bounds depending on axes filtering >0:
+        # key is (isXPositiveFilter, isYPositiveFilter)
+        self._boundsCache = {}
+
     def _addBackendRenderer(self, backend):
         """Update backend renderer"""
         values, edges = self.getData(copy=False)
@@ -170,8 +174,6 @@ class Histogram(Item, AlphaMixIn, ColorMixIn, FillMixIn,
                                 symbolsize=1)
 
     def _getBounds(self):
-        values, edges = self.getData(copy=False)
-
         plot = self.getPlot()
         if plot is not None:
             xPositive = plot.getXAxis()._isLogarithmic()
@@ -180,6 +182,22 @@ class Histogram(Item, AlphaMixIn, ColorMixIn, FillMixIn,
             xPositive = False
             yPositive = False
 
+        if (xPositive, yPositive) not in self._boundsCache:
+            self._boundsCache[(xPositive, yPositive)] = \
+                self._computeBounds(xPositive, yPositive)
+        return self._boundsCache[(xPositive, yPositive)]
+
+    def _computeBounds(self, xPositive, yPositive):
+        """Compute the bounds of the histogram.
+
+        :param bool xPositive: True to ignore bins with edges <= 0.
+        :param bool yPositive: True to ignore bins with values <= 0.
+        :returns: (xmin, xmax, ymin, ymax) or None
+        """
+        values, edges = self.getData(copy=False)
+        if values.size == 0:  # Empty data
+            return None
+
         if xPositive or yPositive:
             values = numpy.array(values, copy=True, dtype=numpy.float)
 
@@ -211,19 +229,6 @@ class Histogram(Item, AlphaMixIn, ColorMixIn, FillMixIn,
                     min(0, numpy.nanmin(values)),
                     max(0, numpy.nanmax(values)))
 
-    def setVisible(self, visible):
-        """Set visibility of item.
-
-        :param bool visible: True to display it, False otherwise
-        """
-        visible = bool(visible)
-        # TODO hackish data range implementation
-        if self.isVisible() != visible:
-            plot = self.getPlot()
-            if plot is not None:
-                plot._invalidateDataRange()
-        super(Histogram, self).setVisible(visible)
-
     def getValueData(self, copy=True):
         """The values of the histogram
 
@@ -291,4 +296,11 @@ class Histogram(Item, AlphaMixIn, ColorMixIn, FillMixIn,
             self._histogram = histogram
             self._edges = edges
 
+        self._boundsCache = {}  # Reset cached bounds
+
+        if self.isVisible():
+            plot = self.getPlot()
+            if plot is not None:
+                plot._itemBoundsChanged(self)
+
         self._updated(ItemChangedType.DATA)
@@ -37,7 +37,7 @@ import logging
 import numpy
 
 from .core import (Item, LabelsMixIn, DraggableMixIn, ColormapMixIn,
-                   AlphaMixIn, ItemChangedType)
+                   AlphaMixIn, ItemChangedType, _AppendBuffer)
 
 
 _logger = logging.getLogger(__name__)
@@ -125,19 +125,6 @@ class ImageBase(Item, LabelsMixIn, DraggableMixIn, AlphaMixIn):
         else:
             raise IndexError("Index out of range: %s" % str(item))
 
-    def setVisible(self, visible):
-        """Set visibility of item.
-
-        :param bool visible: True to display it, False otherwise
-        """
-        visible = bool(visible)
-        # TODO hackish data range implementation
-        if self.isVisible() != visible:
-            plot = self.getPlot()
-            if plot is not None:
-                plot._invalidateDataRange()
-        super(ImageBase, self).setVisible(visible)
-
     def _isPlotLinear(self, plot):
         """Return True if plot only uses linear scale for both of x and y
         axes."""
@@ -206,11 +193,10 @@ class ImageBase(Item, LabelsMixIn, DraggableMixIn, AlphaMixIn):
         if origin != self._origin:
             self._origin = origin
 
-            # TODO hackish data range implementation
             if self.isVisible():
                 plot = self.getPlot()
                 if plot is not None:
-                    plot._invalidateDataRange()
+                    plot._itemBoundsChanged(self)
 
             self._updated(ItemChangedType.POSITION)
 
@@ -235,11 +221,10 @@ class ImageBase(Item, LabelsMixIn, DraggableMixIn, AlphaMixIn):
         if scale != self._scale:
             self._scale = scale
 
-            # TODO hackish data range implementation
             if self.isVisible():
                 plot = self.getPlot()
                 if plot is not None:
-                    plot._invalidateDataRange()
+                    plot._itemBoundsChanged(self)
 
             self._updated(ItemChangedType.SCALE)
 
@@ -253,6 +238,28 @@ class ImageData(ImageBase, ColormapMixIn):
         self._data = numpy.zeros((0, 0), dtype=numpy.float32)
         self._alternativeImage = None
 
+        self._maxLength = None
+        self._appendBuffer = _AppendBuffer(minCapacity=16)
+        self._dataAppended = False  # True if only appendData was called
+
+    def _updated(self, event=None, checkVisibility=True):
+        self._dataAppended = False
+        super(ImageData, self)._updated(event, checkVisibility)
+
+    def _update(self, backend):
+        """Update the backend renderer, only updating data if possible"""
+        if (self._dirty and self._dataAppended and
+                self._backendRenderer is not None and self.isVisible()):
+            if backend.updateImageData(self._backendRenderer,
+                                       self.getData(copy=False),
+                                       self.getColormap()):
+                self._dirty = False
+                self._dataAppended = False
+                return
+
+        super(ImageData, self)._update(backend)
+        self._dataAppended = False
+
     def _addBackendRenderer(self, backend):
         """Update backend renderer"""
         plot = self.getPlot()
@@ -346,13 +353,84 @@ class ImageData(ImageBase, ColormapMixIn):
             assert alternative.shape[:2] == data.shape[:2]
         self._alternativeImage = alternative
 
-        # TODO hackish data range implementation
         if self.isVisible():
             plot = self.getPlot()
             if plot is not None:
-                plot._invalidateDataRange()
+                plot._itemBoundsChanged(self)
+
+        self._updated(ItemChangedType.DATA)
+
+    def getMaxLength(self):
+        """Returns the maximum number of rows kept by :meth:`appendData`.
+
+        :return: The maximum number of rows or None if there is no limit
+        :rtype: Union[int, None]
+        """
+        return self._maxLength
+
+    def setMaxLength(self, length):
+        """Set the maximum number of rows kept by :meth:`appendData`.
+
+        The limit is applied at the next call to :meth:`appendData`.
+
+        :param length: The maximum number of rows or None for no limit
+        :type length: Union[int, None]
+        """
+        if length is not None:
+            length = int(length)
+            assert length > 0
+        self._maxLength = length
+
+    def appendData(self, data):
+        """Append rows at the end of the image, e.g., for spectrograms.
+
+        Rows are stored in a preallocated buffer so that existing rows are
+        not copied on each call.
+        If a maximum number of rows is set (see :meth:`setMaxLength`),
+        the oldest rows are discarded, making the image scroll.
+
+        Images with an alternative RGB(A) image are not supported.
+
+        :param numpy.ndarray data:
+            A row (w,) or rows (h, w) with the same width as the image
+        :raises ValueError: If the image has an alternative image
+        """
+        if self._alternativeImage is not None:
+            raise ValueError(
+                'appendData does not support alternative image')
+
+        data = numpy.array(data, copy=False, ndmin=2)
+        assert data.ndim == 2
+        if data.dtype.kind == 'b':
+            data = numpy.array(data, copy=False, dtype=numpy.int8)
+        elif numpy.iscomplexobj(data):
+            data = numpy.absolute(data)
+
+        current = self.getData(copy=False)
+        if current.size == 0:  # Empty image: use shape of appended data
+            current = numpy.zeros((0, data.shape[1]), dtype=data.dtype)
+        assert data.shape[1] == current.shape[1]
+
+        maxLength = self.getMaxLength()
+        if maxLength is not None:
+            data = data[-maxLength:]
+            nbRemoved = max(0, len(current) + len(data) - maxLength)
+        else:
+            nbRemoved = 0
+
+        previousHeight = len(current)
+        self._data = self._appendBuffer.append(
+            current, data, nbRemoved, maxLength)
+
+        if self.isVisible() and len(self._data) != previousHeight:
+            plot = self.getPlot()
+            if plot is not None:
+                plot._itemBoundsChanged(self)
 
+        # Only data was updated if appendData is the only pending change
+        dataAppended = self._dataAppended if self._dirty else True
         self._updated(ItemChangedType.DATA)
+        self._dataAppended = dataAppended
 
 
 class ImageRgba(ImageBase):
@@ -403,11 +481,10 @@ class ImageRgba(ImageBase):
         assert data.shape[-1] in (3, 4)
         self._data = data
 
-        # TODO hackish data range implementation
         if self.isVisible():
             plot = self.getPlot()
             if plot is not None:
-                plot._invalidateDataRange()
+                plot._itemBoundsChanged(self)
 
         self._updated(ItemChangedType.DATA)
 
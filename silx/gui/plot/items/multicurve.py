@@ -0,0 +1,380 @@
+# coding: utf-8
+# /*##########################################################################
+#
+# Copyright (c) 2018 European Synchrotron Radiation Facility
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# ###########################################################################*/
+"""This module provides the :class:`MultiCurve` item of the :class:`Plot`.
+"""
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/05/2018"
+
+
+import logging
+
+import numpy
+
+from ... import colors
+from .core import (Item, AlphaMixIn, ColorMixIn, LabelsMixIn,
+                   LineMixIn, YAxisMixIn, ItemChangedType)
+
+
+_logger = logging.getLogger(__name__)
+
+
+class MultiCurve(Item, ColorMixIn, YAxisMixIn, AlphaMixIn,
+                 LabelsMixIn, LineMixIn):
+    """Description of a set of curves displayed as a single item.
+
+    The curves share the same number of points and the same line style.
+    Y values are stored in a 2D array of shape (nbCurves, nbPoints) and
+    X values either in a 1D array of nbPoints values shared by all curves
+    or in a 2D array with the same shape as Y.
+
+    Each curve can have its own color (see :meth:`setColor`) and
+    can be shown/hidden independently (see :meth:`setCurveVisible`).
+    """
+
+    _DEFAULT_Z_LAYER = 1
+    """Default overlay layer for curves"""
+
+    _DEFAULT_SELECTABLE = True
+    """Default selectable state for curves"""
+
+    _DEFAULT_LINEWIDTH = 1.
+    """Default line width of the curves"""
+
+    _DEFAULT_LINESTYLE = '-'
+    """Default line style of the curves"""
+
+    _STYLE_CHANGES = ItemChangedType.COLOR, ItemChangedType.CURVE_VISIBILITY
+    """Changes that the backend can apply without uploading data again"""
+
+    def __init__(self):
+        Item.__init__(self)
+        ColorMixIn.__init__(self)
+        YAxisMixIn.__init__(self)
+        AlphaMixIn.__init__(self)
+        LabelsMixIn.__init__(self)
+        LineMixIn.__init__(self)
+
+        self._x = numpy.zeros((0,), dtype=numpy.float32)
+        self._y = numpy.zeros((0, 0), dtype=numpy.float32)
+        self._curvesVisible = numpy.zeros((0,), dtype=numpy.bool_)
+
+        # Store filtered data for x > 0 and/or y > 0
+        self._filteredCache = {}
+
+        # Store per curve bounds depending on axes filtering >0:
+        # key is (isXPositiveFilter, isYPositiveFilter)
+        self._boundsCache = {}
+
+        # True if only colors and curves visibility changed since last update
+        self._styleChangesOnly = False
+
+    def _updated(self, event=None, checkVisibility=True):
+        if event not in self._STYLE_CHANGES:
+            self._styleChangesOnly = False
+        super(MultiCurve, self)._updated(event, checkVisibility)
+
+    def _update(self, backend):
+        """Update the backend renderer, trying to avoid data upload."""
+        if (self._dirty and self._styleChangesOnly and
+                self._backendRenderer is not None and self.isVisible()):
+            if backend.updateMultiCurve(self._backendRenderer,
+                                        color=self.getCurveColors(),
+                                        visible=self.getCurvesVisible(
+                                            copy=False)):
+                self._dirty = False
+                return
+
+        super(MultiCurve, self)._update(backend)
+        self._styleChangesOnly = True
+
+    def _addBackendRenderer(self, backend):
+        """Update backend renderer"""
+        x, y = self.getData(copy=False, displayed=True)
+
+        if y.size == 0:
+            return None  # No data to display, do not add renderer to backend
+
+        return backend.addMultiCurve(x, y, self.getLegend(),
+                                     color=self.getCurveColors(),
+                                     visible=self.getCurvesVisible(copy=False),
+                                     linestyle=self.getLineStyle(),
+                                     linewidth=self.getLineWidth(),
+                                     yaxis=self.getYAxis(),
+                                     z=self.getZValue(),
+                                     selectable=self.isSelectable(),
+                                     alpha=self.getAlpha())
+
+    # Data
+
+    def getCurveCount(self):
+        """Returns the number of curves in this item.
+
+        :rtype: int
+        """
+        return self._y.shape[0]
+
+    def getXData(self, copy=True):
+        """Returns the x coordinates of the curves.
+
+        :param copy: True (Default) to get a copy,
+                     False to use internal representation (do not modify!)
+        :returns: Array of shape (nbPoints,) if x is shared by all curves
+                  or (nbCurves, nbPoints)
+        :rtype: numpy.ndarray
+        """
+        return numpy.array(self._x, copy=copy)
+
+    def getYData(self, copy=True):
+        """Returns the y coordinates of the curves.
+
+        :param copy: True (Default) to get a copy,
+                     False to use internal representation (do not modify!)
+        :returns: Array of shape (nbCurves, nbPoints)
+        :rtype: numpy.ndarray
+        """
+        return numpy.array(self._y, copy=copy)
+
+    def getData(self, copy=True, displayed=False):
+        """Returns the x and y values of the curves.
+
+        :param bool copy: True (Default) to get a copy,
+                         False to use internal representation (do not modify!)
+        :param bool displayed: True to get data as displayed in the plot.
+                               If the plot has log scale, values <= 0 are
+                               replaced by NaN. Default: False
+        :returns: (x, y)
+        :rtype: 2-tuple of numpy.ndarray
+        """
+        if displayed:
+            plot = self.getPlot()
+            if plot is not None:
+                xPositive = plot.getXAxis()._isLogarithmic()
+                yPositive = plot.getYAxis()._isLogarithmic()
+                if xPositive or yPositive:
+                    key = xPositive, yPositive
+                    if key not in self._filteredCache:
+                        self._filteredCache[key] = self._logFilterData(
+                            xPositive, yPositive)
+                    return self._filteredCache[key]
+
+        return self.getXData(copy), self.getYData(copy)
+
+    def _getValidMask(self, xPositive, yPositive):
+        """Returns the mask of points that are displayed.
+
+        :param bool xPositive: True to discard points with x <= 0.
+        :param bool yPositive: True to discard points with y <= 0.
+        :rtype: numpy.ndarray of bool of shape (nbCurves, nbPoints)
+        """
+        x = self.getXData(copy=False)
+        y = self.getYData(copy=False)
+
+        with numpy.errstate(invalid='ignore'):
+            valid = numpy.logical_and(numpy.isfinite(x), numpy.isfinite(y))
+            if xPositive:
+                valid = numpy.logical_and(valid, x > 0)
+            if yPositive:
+                valid = numpy.logical_and(valid, y > 0)
+        return valid
+
+    def _logFilterData(self, xPositive, yPositive):
+        """Replace values with x or y <= 0 on log axes by NaN.
+
+        :param bool xPositive: True to filter arrays according to X coords.
+        :param bool yPositive: True to filter arrays according to Y coords.
+        :return: The filtered arrays or unchanged arrays if not needed
+        :rtype: (x, y)
+        """
+        x = self.getXData(copy=False)
+        y = self.getYData(copy=False)
+
+        clipped = numpy.logical_not(
+            self._getValidMask(xPositive, yPositive))
+        if numpy.any(clipped):
+            # Clip y only, this also removes the points for shared x
+            y = numpy.array(y, copy=True, dtype=numpy.float64)
+            y[clipped] = numpy.nan
+        return x, y
+
+    def setData(self, x, y, copy=True):
+        """Set the data of the curves.
+
+        If the number of curves changes, all curves are made visible.
+
+        :param numpy.ndarray x:
+            The x coordinates either shared by all curves (nbPoints,)
+            or for each curve (nbCurves, nbPoints)
+        :param numpy.ndarray y: The y coordinates (nbCurves, nbPoints)
+        :param bool copy: True make a copy of the data (default),
+                          False to use provided arrays.
+        """
+        x = numpy.array(x, copy=copy)
+        y = numpy.array(y, copy=copy)
+        if y.ndim == 1:  # Single curve
+            y = y.reshape(1, -1)
+        assert y.ndim == 2
+        assert x.ndim in (1, 2)
+        assert x.shape[-1] == y.shape[1]
+        if x.ndim == 2:
+            assert x.shape == y.shape
+
+        if y.shape[0] != self.getCurveCount():
+            self._curvesVisible = numpy.ones((y.shape[0],), dtype=numpy.bool_)
+
+        self._x, self._y = x, y
+
+        self._boundsCache = {}  # Reset cached bounds
+        self._filteredCache = {}  # Reset cached filtered data
+
+        if self.isVisible():
+            plot = self.getPlot()
+            if plot is not None:
+                plot._itemBoundsChanged(self)
+        self._updated(ItemChangedType.DATA)
+
+    # Per curve style
+
+    def getCurveColors(self):
+        """Returns the color of each curve.
+
+        If a single color is set, it is used for all curves.
+        If an array of colors is set, it is repeated if it contains
+        less colors than curves.
+
+        :returns: RGBA colors in [0, 1] of shape (nbCurves, 4)
+        :rtype: numpy.ndarray of float32
+        """
+        count = self.getCurveCount()
+        color = self.getColor()
+        if isinstance(color, numpy.ndarray) and color.ndim == 2:
+            if color.dtype.kind in 'iu':
+                color = color / 255.
+            rgba = numpy.ones((len(color), 4), dtype=numpy.float32)
+            rgba[:, :color.shape[1]] = color[:, :4]
+            if len(rgba) != count:
+                if len(rgba) == 0:
+                    rgba = numpy.zeros((1, 4), dtype=numpy.float32)
+                rgba = numpy.resize(rgba, (count, 4))
+            return rgba
+        else:
+            rgba = numpy.array(colors.rgba(color), dtype=numpy.float32)
+            return numpy.tile(rgba, (count, 1))
+
+    def isCurveVisible(self, index):
+        """Returns True if the curve at index is displayed.
+
+        :param int index: Index of the curve
+        :rtype: bool
+        """
+        return bool(self._curvesVisible[index])
+
+    def setCurveVisible(self, index, visible):
+        """Set the visibility of a curve.
+
+        :param int index: Index of the curve
+        :param bool visible: True to display it, False otherwise
+        """
+        visible = bool(visible)
+        if visible != self._curvesVisible[index]:
+            self._curvesVisible[index] = visible
+            self._curvesVisibilityChanged()
+
+    def getCurvesVisible(self, copy=True):
+        """Returns the visibility of all curves.
+
+        :param bool copy: True (Default) to get a copy,
+                         False to use internal representation (do not modify!)
+        :rtype: numpy.ndarray of bool of shape (nbCurves,)
+        """
+        return numpy.array(self._curvesVisible, copy=copy)
+
+    def setCurvesVisible(self, visible):
+        """Set the visibility of all curves.
+
+        :param visible: A single bool or an array of nbCurves bool
+        """
+        visible = numpy.array(visible, dtype=numpy.bool_)
+        visible = numpy.broadcast_to(visible, self._curvesVisible.shape)
+        if not numpy.array_equal(visible, self._curvesVisible):
+            self._curvesVisible = numpy.array(visible, copy=True)
+            self._curvesVisibilityChanged()
+
+    def _curvesVisibilityChanged(self):
+        """Handle change of visibility of some curves"""
+        if self.isVisible():
+            plot = self.getPlot()
+            if plot is not None:
+                plot._itemBoundsChanged(self)
+        self._updated(ItemChangedType.CURVE_VISIBILITY)
+
+    # Bounds
+
+    def _getCurvesBounds(self, xPositive, yPositive):
+        """Returns the bounds of each curve.
+
+        Curves with no valid data have infinite bounds.
+
+        :param bool xPositive: True to ignore points with x <= 0
+        :param bool yPositive: True to ignore points with y <= 0
+        :returns: xmin, xmax, ymin, ymax arrays of shape (nbCurves,)
+        """
+        if (xPositive, yPositive) not in self._boundsCache:
+            x = self.getXData(copy=False)
+            y = self.getYData(copy=False)
+            valid = self._getValidMask(xPositive, yPositive)
+            x = numpy.broadcast_to(x, y.shape)
+
+            with numpy.errstate(invalid='ignore'):
+                bounds = (numpy.min(numpy.where(valid, x, numpy.inf), axis=1),
+                          numpy.max(numpy.where(valid, x, -numpy.inf), axis=1),
+                          numpy.min(numpy.where(valid, y, numpy.inf), axis=1),
+                          numpy.max(numpy.where(valid, y, -numpy.inf), axis=1))
+            self._boundsCache[(xPositive, yPositive)] = bounds
+
+        return self._boundsCache[(xPositive, yPositive)]
+
+    def _getBounds(self):
+        if self.getYData(copy=False).size == 0:  # Empty data
+            return None
+
+        plot = self.getPlot()
+        if plot is not None:
+            xPositive = plot.getXAxis()._isLogarithmic()
+            yPositive = plot.getYAxis()._isLogarithmic()
+        else:
+            xPositive = False
+            yPositive = False
+
+        xMin, xMax, yMin, yMax = self._getCurvesBounds(xPositive, yPositive)
+        visible = self.getCurvesVisible(copy=False)
+        if not numpy.any(visible):
+            return None
+        bounds = (numpy.min(xMin[visible]), numpy.max(xMax[visible]),
+                  numpy.min(yMin[visible]), numpy.max(yMax[visible]))
+        if not numpy.all(numpy.isfinite(bounds)):
+            return None  # No displayed data
+        return bounds
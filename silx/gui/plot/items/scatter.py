@@ -159,5 +159,5 @@ class Scatter(Points, ColormapMixIn):
 
         # set x, y, xerror, yerror
 
-        # call self._updated + plot._invalidateDataRange()
+        # call self._updated + plot._itemBoundsChanged()
         Points.setData(self, x, y, xerror, yerror, copy)
@@ -87,6 +87,59 @@ class TestImageView(TestCaseQt):
         self.assertEqual(self.plot.getXAxis().getLimits(), (0, 5))
         self.assertEqual(self.plot.getYAxis().getLimits(), (0, 5))
 
+    def _checkHistograms(self, image):
+        """Check side histograms against numpy.sum of visible image"""
+        histoH = self.plot.getHistogram('x')
+        histoV = self.plot.getHistogram('y')
+        self.assertIsNotNone(histoH)
+        self.assertIsNotNone(histoV)
+
+        xMin, xMax = histoH['extent']
+        yMin, yMax = histoV['extent']
+        visible = image[yMin:yMax, xMin:xMax]
+        self.assertTrue(numpy.allclose(
+            histoH['data'], numpy.sum(visible, axis=0)))
+        self.assertTrue(numpy.allclose(
+            histoV['data'], numpy.sum(visible, axis=1)))
+
+    def testHistograms(self):
+        """Test side histograms computed from summed-area table"""
+        image = numpy.arange(10000, dtype=numpy.float32).reshape(100, 100)
+        self.plot.setImage(image)
+        self._checkHistograms(image)
+
+        self.plot.getXAxis().setLimits(10.5, 50.5)
+        self.plot.getYAxis().setLimits(20.5, 30.5)
+        self.qapp.processEvents()
+        histoH = self.plot.getHistogram('x')
+        self.assertEqual(histoH['extent'], (10, 51))
+        self.assertEqual(histoH['data'].dtype, numpy.float32)
+        self._checkHistograms(image)
+
+        # Integer image
+        image = numpy.arange(10000, dtype=numpy.uint16).reshape(100, 100)
+        self.plot.setImage(image)
+        self._checkHistograms(image)
+
+    def testHistogramsAsync(self):
+        """Test side histograms computed in a worker thread"""
+        self.plot._SUMMED_AREA_TABLE_SYNC_SIZE = 0
+
+        image = numpy.random.random(200 * 100).reshape(200, 100)
+        self.plot.setImage(image)
+        self.assertIsNone(self.plot.getHistogram('x'))
+
+        # Change image while table is being built
+        image = numpy.random.random(100 * 100).reshape(100, 100)
+        self.plot.setImage(image)
+
+        for _ in range(50):
+            self.qWait(20)
+            if self.plot.getHistogram('x') is not None:
+                break
+        self.assertEqual(self.plot.getHistogram('y')['extent'], (0, 101))
+        self._checkHistograms(image)
+
     def testColormap(self):
         """Test get|setColormap"""
         image = numpy.arange(100).reshape(10, 10)
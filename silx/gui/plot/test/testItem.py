@@ -106,6 +106,26 @@ class TestSigItemChangedSignal(PlotWidgetTestCase):
         self.assertEqual(listener.arguments(argumentIndex=0),
                          [ItemChangedType.DATA])
 
+    def testMultiCurveChanged(self):
+        """Test sigItemChanged for MultiCurve"""
+        self.plot.addMultiCurve(
+            numpy.arange(10), numpy.ones((3, 10)), legend='test')
+        curves = self.plot.getMultiCurve('test')
+        listener = SignalListener()
+        curves.sigItemChanged.connect(listener)
+
+        curves.setData(numpy.arange(10), numpy.zeros((5, 10)))
+        curves.setColor(numpy.ones((5, 4)))
+        curves.setCurveVisible(2, False)
+        curves.setCurveVisible(2, False)  # Not sending event
+        curves.setCurvesVisible(True)
+
+        self.assertEqual(listener.arguments(argumentIndex=0),
+                         [ItemChangedType.DATA,
+                          ItemChangedType.COLOR,
+                          ItemChangedType.CURVE_VISIBILITY,
+                          ItemChangedType.CURVE_VISIBILITY])
+
     def testImageDataChanged(self):
         """Test sigItemChanged for ImageData"""
         self.plot.addImage(numpy.arange(100).reshape(10, 10), legend='test')
@@ -38,7 +38,7 @@ import numpy
 from silx.gui import qt
 from silx.test.utils import temp_dir
 from silx.utils.testutils import ParametricTestCase
-from silx.gui.test.utils import getQToolButtonFromAction
+from silx.gui.test.utils import getQToolButtonFromAction, TestCaseQt
 from silx.gui.plot import PlotWindow, MaskToolsWidget
 from .utils import PlotWidgetTestCase
 
@@ -280,9 +280,75 @@ class TestMaskToolsWidget(PlotWidgetTestCase, ParametricTestCase):
         self.assertGreater(len(l), 0)
 
 
+class TestImageMask(TestCaseQt):
+    """Test ImageMask update and history"""
+
+    def testHistory(self):
+        """Test undo/redo of mask updates"""
+        mask = MaskToolsWidget.ImageMask()
+        mask.reset((100, 200))
+        mask.commit()
+
+        masks = [mask.getMask()]
+        mask.updateRectangle(1, row=10, col=20, height=5, width=30)
+        mask.commit()
+        masks.append(mask.getMask())
+        mask.updateDisk(2, 50, 150, 10)
+        mask.updateLine(3, 0, 0, 99, 199, 1)
+        mask.commit()
+        masks.append(mask.getMask())
+        mask.updatePolygon(1, numpy.array(((10, 10), (90, 10), (50, 100))),
+                           mask=False)
+        mask.invert(2)
+        mask.commit()
+        masks.append(mask.getMask())
+
+        # Commit without changes does not add a step
+        mask.commit()
+
+        # Uncommitted changes are discarded by undo
+        mask.updateRectangle(4, row=0, col=0, height=100, width=200)
+
+        for expected in reversed(masks[:-1]):
+            mask.undo()
+            self.assertTrue(numpy.array_equal(mask.getMask(), expected))
+        mask.undo()  # No more history
+        self.assertTrue(numpy.array_equal(mask.getMask(), masks[0]))
+
+        for expected in masks[1:]:
+            mask.redo()
+            self.assertTrue(numpy.array_equal(mask.getMask(), expected))
+
+        # Change of shape
+        mask.setMask(numpy.ones((10, 10)))
+        mask.commit()
+        mask.undo()
+        self.assertTrue(numpy.array_equal(mask.getMask(), masks[-1]))
+        mask.redo()
+        self.assertTrue(numpy.array_equal(mask.getMask(),
+                                          numpy.ones((10, 10))))
+
+    def testHistoryDepth(self):
+        """Test history depth limit"""
+        mask = MaskToolsWidget.ImageMask()
+        mask.reset((10, 10))
+        mask.commit()
+        mask.historyDepth = 3
+
+        for level in range(1, 6):
+            mask.updateRectangle(level, row=level, col=0, height=0, width=10)
+            mask.commit()
+        expected = mask.getMask()
+
+        for _ in range(5):
+            mask.undo()
+        expected[4:6] = 0
+        self.assertTrue(numpy.array_equal(mask.getMask(), expected))
+
+
 def suite():
     test_suite = unittest.TestSuite()
-    for TestClass in (TestMaskToolsWidget,):
+    for TestClass in (TestMaskToolsWidget, TestImageMask):
         test_suite.addTest(
             unittest.defaultTestLoader.loadTestsFromTestCase(TestClass))
     return test_suite
@@ -158,6 +158,25 @@ class TestPlotImage(PlotWidgetTestCase, ParametricTestCase):
                             vmax=None)
         self.plot.addImage(DATA_2D, legend="image 1", colormap=colormap)
 
+    def testAppendData(self):
+        """Test ImageData.appendData with a maximum number of rows"""
+        self.plot.addImage(numpy.zeros((2, 10)), legend='image')
+        image = self.plot.getImage('image')
+        image.setMaxLength(5)
+
+        for index in range(4):
+            image.appendData(numpy.ones((2, 10)) * index)
+            self.qapp.processEvents()
+
+        data = image.getData(copy=False)
+        self.assertEqual(data.shape, (5, 10))
+        self.assertTrue(numpy.all(data[0] == 1))
+        self.assertTrue(numpy.all(data[-1] == 3))
+
+        # Only row arrays with the same width are supported
+        with self.assertRaises(AssertionError):
+            image.appendData(numpy.ones((2, 3)))
+
     def testPlotColormapGray(self):
         self.plot.setKeepDataAspectRatio(False)
         self.plot.setGraphTitle('Gray Linear')
@@ -359,6 +378,33 @@ class TestPlotCurve(PlotWidgetTestCase):
                            color='green', linestyle="-", symbol='o')
         self.plot.resetZoom()
 
+    def testAppendData(self):
+        """Test Curve.appendData with a maximum length"""
+        self.plot.addCurve((), (), legend='curve')
+        curve = self.plot.getCurve('curve')
+        curve.setMaxLength(150)
+        curve.appendData(self.xData[:100], self.yData[:100])
+        self.qapp.processEvents()
+        renderer = curve._backendRenderer
+
+        for start in range(100, 1000, 100):
+            curve.appendData(self.xData[start:start + 100],
+                             self.yData[start:start + 100])
+            self.qapp.processEvents()
+
+        # Backend renderer was updated and not created again
+        self.assertIs(curve._backendRenderer, renderer)
+        self.assertTrue(numpy.array_equal(curve.getXData(copy=False),
+                                          self.xData[-150:]))
+        self.assertTrue(numpy.array_equal(curve.getYData(copy=False),
+                                          self.yData[-150:]))
+        self.assertEqual(self.plot.getDataRange().x, (850, 999))
+
+        # Per-point errors are not supported
+        curve.setData((1, 2), (1, 2), xerror=(1, 1))
+        with self.assertRaises(ValueError):
+            curve.appendData((3,), (3,))
+
     def testPlotCurveColors(self):
         color = numpy.array(numpy.random.random(3 * 1000),
                             dtype=numpy.float32).reshape(1000, 3)
@@ -391,6 +437,53 @@ class TestPlotCurve(PlotWidgetTestCase):
                            color=color, symbol='o')
 
 
+class TestPlotMultiCurve(PlotWidgetTestCase):
+    """Basic tests for addMultiCurve."""
+
+    xData = numpy.arange(100)
+    yData = numpy.arange(50).reshape(50, 1) + numpy.sin(xData / 10.)
+
+    def testAddMultiCurve(self):
+        """Test adding multi-curves with shared and per curve x"""
+        self.plot.addMultiCurve(self.xData, self.yData, legend='shared')
+        self.plot.addMultiCurve(
+            numpy.tile(self.xData, (len(self.yData), 1)) + 100,
+            self.yData,
+            legend='per curve',
+            color=numpy.random.random((len(self.yData), 4)),
+            linestyle='--')
+        self.qapp.processEvents()
+
+        curves = self.plot.getMultiCurve('shared')
+        self.assertEqual(curves.getCurveCount(), 50)
+        self.assertEqual(curves.getCurveColors().shape, (50, 4))
+        self.assertEqual(self.plot.getXAxis().getLimits(), (0., 199.))
+
+        # Update colors and visibility only
+        curves.setColor('red')
+        curves.setCurveVisible(10, False)
+        self.qapp.processEvents()
+
+        self.plot.remove('shared', kind='multicurve')
+        self.assertIsNone(self.plot.getMultiCurve('shared'))
+
+    def testPick(self):
+        """Test picking of a multi-curve"""
+        self.plot.addMultiCurve(self.xData, self.yData, legend='curves')
+        self.plot.getMultiCurve('curves').setCurveVisible(49, False)
+        self.qapp.processEvents()
+
+        # Pick last displayed curve at one of its points
+        pos = self.plot.dataToPixel(50, self.yData[48, 50])
+        picked = self.plot._pickImageOrCurve(*pos)
+        self.assertIsNotNone(picked)
+        kind, item, (curveIndex, indices) = picked
+        self.assertEqual(kind, 'multicurve')
+        self.assertEqual(item.getLegend(), 'curves')
+        self.assertEqual(curveIndex, 48)
+        self.assertIn(50, indices)
+
+
 class TestPlotMarker(PlotWidgetTestCase):
     """Basic tests for add*Marker"""
 
@@ -1360,6 +1453,7 @@ def suite():
     test_suite.addTest(loadTests(TestPlotWidget))
     test_suite.addTest(loadTests(TestPlotImage))
     test_suite.addTest(loadTests(TestPlotCurve))
+    test_suite.addTest(loadTests(TestPlotMultiCurve))
     test_suite.addTest(loadTests(TestPlotMarker))
     test_suite.addTest(loadTests(TestPlotItem))
     test_suite.addTest(loadTests(TestPlotAxes))
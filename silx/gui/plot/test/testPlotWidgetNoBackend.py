@@ -379,6 +379,76 @@ class TestPlotRanges(ParametricTestCase):
         self.assertEqual(range2.x, (0, 1))
         self.assertEqual(range2.y, (0, 1))
 
+    def testDataRangeIncrementalUpdate(self):
+        """data range update when adding, removing and changing items"""
+        plot = PlotWidget(backend='none')
+        plot.addCurve((0, 1), (0, 1), legend='a')
+        plot.addCurve((2, 3), (-1, 4), legend='b')
+        self.assertEqual(plot.getDataRange().x, (0, 3))
+        self.assertEqual(plot.getDataRange().y, (-1, 4))
+
+        # Adding an item inside the range
+        plot.addCurve((0.5, 1.5), (0.5, 1.5), legend='c')
+        self.assertEqual(plot.getDataRange().x, (0, 3))
+        self.assertEqual(plot.getDataRange().y, (-1, 4))
+
+        # Adding an item extending the range
+        plot.addCurve((-5, 0), (10, 11), legend='d')
+        self.assertEqual(plot.getDataRange().x, (-5, 3))
+        self.assertEqual(plot.getDataRange().y, (-1, 11))
+
+        # Removing items on the edges
+        plot.remove('d', kind='curve')
+        self.assertEqual(plot.getDataRange().x, (0, 3))
+        self.assertEqual(plot.getDataRange().y, (-1, 4))
+        plot.remove('b', kind='curve')
+        self.assertEqual(plot.getDataRange().x, (0, 1.5))
+        self.assertEqual(plot.getDataRange().y, (0, 1.5))
+
+        # Changing data of an item
+        plot.getCurve('c').setData((10, 20), (30, 40))
+        self.assertEqual(plot.getDataRange().x, (0, 20))
+        self.assertEqual(plot.getDataRange().y, (0, 40))
+
+        # Moving an item to the right axis
+        plot.getCurve('c').setYAxis('right')
+        self.assertEqual(plot.getDataRange().x, (0, 20))
+        self.assertEqual(plot.getDataRange().y, (0, 1))
+        self.assertEqual(plot.getDataRange().yright, (30, 40))
+
+        # Histogram data update
+        plot.addHistogram((1, 2), (-10, -9, -8), legend='h')
+        self.assertEqual(plot.getDataRange().x, (-10, 20))
+        self.assertEqual(plot.getDataRange().y, (0, 2))
+        plot.getHistogram('h').setData((1, 5), (0, 1, 2))
+        self.assertEqual(plot.getDataRange().x, (0, 20))
+        self.assertEqual(plot.getDataRange().y, (0, 5))
+
+        # Compare with full update
+        dataRange = plot.getDataRange()
+        plot._invalidateDataRange()
+        self.assertEqual(plot.getDataRange(), dataRange)
+
+    def testDataRangeMultiCurve(self):
+        """Test data range of MultiCurve with hidden curves and log scale"""
+        plot = PlotWidget(backend='none')
+        plot.addMultiCurve(numpy.arange(5),
+                           ((-1., 1, 2, 3, 4), (10, 11, 12, 13, 14)),
+                           legend='m')
+        curves = plot.getMultiCurve('m')
+        self.assertEqual(plot.getDataRange().x, (0, 4))
+        self.assertEqual(plot.getDataRange().y, (-1, 14))
+
+        curves.setCurveVisible(1, False)
+        self.assertEqual(plot.getDataRange().y, (-1, 4))
+
+        plot.getYAxis()._setLogarithmic(True)
+        self.assertEqual(plot.getDataRange().x, (1, 4))
+        self.assertEqual(plot.getDataRange().y, (1, 4))
+
+        curves.setCurvesVisible(False)
+        self.assertIsNone(plot.getDataRange().y)
+
 
 class TestPlotGetCurveImage(unittest.TestCase):
     """Test of plot getCurve and getImage methods"""
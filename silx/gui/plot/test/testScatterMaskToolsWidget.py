@@ -299,9 +299,36 @@ class TestScatterMaskToolsWidget(PlotWidgetTestCase, ParametricTestCase):
         self.assertGreater(len(l), 0)
 
 
+class TestScatterMask(unittest.TestCase):
+    """Test ScatterMask update"""
+
+    def testUpdatePoints(self):
+        """Test updatePoints with indices and with a boolean array"""
+        mask = ScatterMaskToolsWidget.ScatterMask()
+        mask.reset((10,))
+
+        mask.updatePoints(1, [2, 5, -1])
+        expected = numpy.zeros((10,), dtype=numpy.uint8)
+        expected[[2, 5, 9]] = 1
+        self.assertTrue(numpy.array_equal(mask.getMask(), expected))
+
+        selection = numpy.zeros((10,), dtype=numpy.bool_)
+        selection[6:8] = True
+        mask.updatePoints(2, selection)
+        expected[6:8] = 2
+        self.assertTrue(numpy.array_equal(mask.getMask(), expected))
+
+        mask.updatePoints(1, expected == 1, mask=False)
+        expected[expected == 1] = 0
+        self.assertTrue(numpy.array_equal(mask.getMask(), expected))
+
+        mask.updatePoints(1, [])
+        self.assertTrue(numpy.array_equal(mask.getMask(), expected))
+
+
 def suite():
     test_suite = unittest.TestSuite()
-    for TestClass in (TestScatterMaskToolsWidget,):
+    for TestClass in (TestScatterMaskToolsWidget, TestScatterMask):
         test_suite.addTest(
             unittest.defaultTestLoader.loadTestsFromTestCase(TestClass))
     return test_suite
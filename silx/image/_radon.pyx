@@ -0,0 +1,209 @@
+# coding: utf-8
+# /*##########################################################################
+#
+# Copyright (c) 2018 European Synchrotron Radiation Facility
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# ############################################################################*/
+"""CPU implementation of the tomographic projection and backprojection.
+
+The geometry follows the OpenCL kernels of :mod:`silx.opencl.backprojection`
+and :mod:`silx.opencl.projection` (``backproj_cpu_kernel`` and
+``forward_kernel_cpu``). Loops are parallelized with OpenMP when available.
+"""
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/10/2018"
+
+
+cimport cython
+from cython.parallel import prange
+from libc.math cimport cos, fabs, sin, M_PI
+import numpy
+
+include "../utils/_have_openmp.pxi"
+"""Store in the module if it was compiled with OpenMP"""
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def backprojection(float[:, ::1] sino,
+                   float[::1] cos_angles,
+                   float[::1] sin_angles,
+                   float[::1] axis_positions,
+                   float axis_position,
+                   float[:, ::1] dst):
+    """Backproject a sinogram onto a slice.
+
+    Detector values are linearly interpolated.
+
+    :param sino: Sinogram of shape (num_projs, num_bins)
+    :param cos_angles: Cosine of the projection angles
+    :param sin_angles: Sine of the projection angles
+    :param axis_positions: Axis position for each projection
+    :param float axis_position: Axis position used as slice center
+    :param dst: Slice where to store the result (overwritten)
+    """
+    cdef int num_projs = sino.shape[0]
+    cdef int num_bins = sino.shape[1]
+    cdef int height = dst.shape[0]
+    cdef int width = dst.shape[1]
+    cdef int row, col, proj, xm, xp
+    cdef float pcos, psin, axis, by, h, x, value
+
+    assert cos_angles.shape[0] >= num_projs
+    assert sin_angles.shape[0] >= num_projs
+    assert axis_positions.shape[0] >= num_projs
+
+    for row in prange(height, nogil=True):
+        for col in range(width):
+            dst[row, col] = 0.
+
+        by = row - axis_position
+        for proj in range(num_projs):
+            pcos = cos_angles[proj]
+            psin = sin_angles[proj]
+            axis = axis_positions[proj]
+
+            for col in range(width):
+                # Same operations order as the OpenCL kernel
+                h = axis + (col - axis_position) * pcos - by * psin
+                if h >= 0 and h < num_bins:
+                    # h >= 0, so truncation is floor
+                    x = h if h < num_bins - 1 else num_bins - 1
+                    xm = <int> x
+                    if x == xm:
+                        value = sino[proj, xm]
+                    else:
+                        xp = xm + 1
+                        value = (sino[proj, xm] * (xp - x) +
+                                 sino[proj, xp] * (x - xm))
+                    dst[row, col] = dst[row, col] + value
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def projection(float[:, ::1] padded_slice,
+               float[::1] angles,
+               float axis_position,
+               float offset_x,
+               bint normalize,
+               float[:, ::1] dst):
+    """Compute the projection (Radon transform) of a slice.
+
+    This is a Joseph projector with bilinear interpolation.
+
+    :param padded_slice: Slice surrounded by a border of 1 pixel of zeros
+    :param angles: Projection angles in radians
+    :param float axis_position: Position of the rotation axis
+    :param float offset_x: Offset of the detector bins
+    :param bool normalize: True to multiply the result by pi/(2*num_projs)
+    :param dst: Sinogram where to store the result,
+        of shape (num_projs, num_bins)
+    """
+    cdef int num_projs = dst.shape[0]
+    cdef int num_bins = dst.shape[1]
+    cdef int padded_height = padded_slice.shape[0]
+    cdef int padded_width = padded_slice.shape[1]
+    cdef int dimslice = padded_width - 2
+    cdef int proj, bin_, j, ym, yp, xm, xp
+    cdef int begin_a, begin_b, stride_line_a, stride_line_b
+    cdef int stride_joseph_a, stride_joseph_b
+    cdef float angle, cos_angle, sin_angle, posx, shift, x1, x2, xc, yc
+    cdef float value, res
+
+    assert angles.shape[0] >= num_projs
+
+    for proj in prange(num_projs, nogil=True):
+        angle = angles[proj]
+        cos_angle = cos(angle)
+        sin_angle = sin(angle)
+
+        # Select the main direction of the line integral
+        if fabs(cos_angle) > 0.70710678:
+            if cos_angle > 0:
+                begin_a, begin_b = 0, 0
+                stride_joseph_a, stride_joseph_b = 0, 1
+                stride_line_a, stride_line_b = 1, 0
+            else:
+                cos_angle = -cos_angle
+                sin_angle = -sin_angle
+                begin_a, begin_b = dimslice - 1, dimslice - 1
+                stride_joseph_a, stride_joseph_b = 0, -1
+                stride_line_a, stride_line_b = -1, 0
+        else:
+            if sin_angle > 0:
+                cos_angle, sin_angle = sin_angle, -cos_angle
+                begin_a, begin_b = 0, dimslice - 1
+                stride_joseph_a, stride_joseph_b = 1, 0
+                stride_line_a, stride_line_b = 0, -1
+            else:
+                cos_angle, sin_angle = -sin_angle, cos_angle
+                begin_a, begin_b = dimslice - 1, 0
+                stride_joseph_a, stride_joseph_b = -1, 0
+                stride_line_a, stride_line_b = 0, 1
+
+        shift = sin_angle / cos_angle
+
+        for bin_ in range(num_bins):
+            posx = (axis_position * (1 - shift) +
+                    (bin_ - offset_x - axis_position) / cos_angle)
+            res = 0.
+            for j in range(dimslice):
+                x1 = begin_a + posx * stride_line_a + j * stride_joseph_a + 1
+                x2 = begin_b + posx * stride_line_b + j * stride_joseph_b + 1
+
+                # Bilinear interpolation, coordinates are clipped to >= 0,
+                # so truncation is floor
+                yc = x2 if x2 > 0 else 0
+                if yc > padded_height - 1:
+                    yc = padded_height - 1
+                ym = <int> yc
+                yp = ym + 1 if yc > ym else ym
+
+                xc = x1 if x1 > 0 else 0
+                if xc > padded_width - 1:
+                    xc = padded_width - 1
+                xm = <int> xc
+                xp = xm + 1 if xc > xm else xm
+
+                if ym == yp and xm == xp:
+                    value = padded_slice[ym, xm]
+                elif ym == yp:
+                    value = (padded_slice[ym, xm] * (xp - xc) +
+                             padded_slice[ym, xp] * (xc - xm))
+                elif xm == xp:
+                    value = (padded_slice[ym, xm] * (yp - yc) +
+                             padded_slice[yp, xm] * (yc - ym))
+                else:
+                    value = (padded_slice[ym, xm] * (yp - yc) * (xp - xc) +
+                             padded_slice[yp, xm] * (yc - ym) * (xp - xc) +
+                             padded_slice[ym, xp] * (yp - yc) * (xc - xm) +
+                             padded_slice[yp, xp] * (yc - ym) * (xc - xm))
+                res = res + value
+                posx = posx + shift
+
+            res = res / cos_angle
+            if normalize:
+                res = res * M_PI * 0.5 / num_projs
+            dst[proj, bin_] = res
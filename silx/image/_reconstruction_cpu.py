@@ -0,0 +1,819 @@
+# coding: utf-8
+# /*##########################################################################
+#
+# Copyright (c) 2018 European Synchrotron Radiation Facility
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# ###########################################################################*/
+"""CPU implementation of tomographic (filtered) backprojection, projection
+and iterative reconstruction.
+
+The classes of this module provide the same API as their OpenCL counterparts
+in :mod:`silx.opencl.backprojection`, :mod:`silx.opencl.projection` and
+:mod:`silx.opencl.reconstruction`, but work on :class:`numpy.ndarray`.
+OpenCL-specific constructor arguments are accepted and ignored.
+"""
+
+from __future__ import absolute_import, division
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/10/2018"
+
+import logging
+from collections import namedtuple
+import numpy
+
+from silx.third_party.concurrent_futures import ThreadPoolExecutor
+from . import _radon
+from .tomography import ordered_subsets
+
+
+logger = logging.getLogger(__name__)
+
+
+def _nextpow2(n):
+    """Returns the smallest power of 2 larger or equal to n"""
+    return 1 << int(numpy.ceil(numpy.log2(n)))
+
+
+def _outputArray(dst, shape):
+    """Returns an array suitable to store the result of computations.
+
+    :param dst: Destination array provided by the caller or None
+    :param shape: Expected shape of the result
+    :return: dst if it is a C-contiguous float32 array, a new array otherwise
+    :rtype: numpy.ndarray
+    """
+    if dst is not None:
+        if tuple(dst.shape) != tuple(shape):
+            raise ValueError("Expected destination of shape %s, got %s" %
+                             (str(tuple(shape)), str(dst.shape)))
+        if dst.dtype == numpy.float32 and dst.flags["C_CONTIGUOUS"]:
+            return dst
+    return numpy.empty(shape, dtype=numpy.float32)
+
+
+class Backprojection(object):
+    """A class for performing the (filtered) backprojection on the CPU
+
+    :param sino_shape: shape of the sinogram. The sinogram is in the format
+                       (n_a, n_b) where n_a is the number of angles and
+                       n_b is the number of detector bins.
+    :param slice_shape: Optional, shape of the reconstructed slice. By
+                        default, it is a square slice where the dimension
+                        is the "x dimension" of the sinogram (number of
+                        bins).
+    :param axis_position: Optional, axis position. Default is
+                          `(shape[1]-1)/2.0`.
+    :param angles: Optional, a list of custom angles in radian.
+    :param filter_name: Optional, name of the filter for FBP.
+                        Only the Ram-Lak (ramp) filter is supported,
+                        as in the OpenCL implementation.
+    :param ctx: Not used, for compatibility with OpenCL implementation
+    :param devicetype: Not used, for compatibility with OpenCL implementation
+    :param platformid: Not used, for compatibility with OpenCL implementation
+    :param deviceid: Not used, for compatibility with OpenCL implementation
+    :param profile: Not used, for compatibility with OpenCL implementation
+    """
+
+    def __init__(self, sino_shape, slice_shape=None, axis_position=None,
+                 angles=None, filter_name=None, ctx=None, devicetype="all",
+                 platformid=None, deviceid=None, profile=False):
+        self.shape = sino_shape
+        self.num_bins = numpy.int32(sino_shape[1])
+        self.num_projs = numpy.int32(sino_shape[0])
+        self.angles = angles
+        if slice_shape is None:
+            self.slice_shape = (self.num_bins, self.num_bins)
+        else:
+            self.slice_shape = slice_shape
+        self.filter_name = filter_name if filter_name else "Ram-Lak"
+        if axis_position:
+            self.axis_pos = numpy.float32(axis_position)
+        else:
+            self.axis_pos = numpy.float32((sino_shape[1] - 1.) / 2)
+        self.axis_array = None
+        self.is_cpu = True
+        self.profile = profile
+
+        self.fft_size = _nextpow2(self.num_bins * 2 - 1)
+        self.compute_filter()
+        self.compute_angles()
+
+        # Sinogram used by backprojection when none is provided
+        self._sino = numpy.zeros(self.shape, dtype=numpy.float32)
+
+    def compute_angles(self):
+        """Compute the angles tables"""
+        if self.angles is None:
+            self.angles = numpy.linspace(0, numpy.pi, self.num_projs, False)
+        self._cos = numpy.cos(self.angles).astype(numpy.float32)
+        self._sin = numpy.sin(self.angles).astype(numpy.float32)
+        if self.axis_array:
+            self._axes = numpy.array(self.axis_array, dtype=numpy.float32)
+        else:
+            self._axes = numpy.ones(self.num_projs, dtype=numpy.float32)
+            self._axes *= self.axis_pos
+
+    def compute_filter(self):
+        """Compute the filter for FBP
+
+        :raises ValueError: if the filter is not "Ram-Lak"
+        """
+        if self.filter_name == "Ram-Lak":
+            L = self.fft_size
+            h = numpy.zeros(L, dtype=numpy.float32)
+            L2 = L // 2 + 1
+            h[0] = 1 / 4.
+            j = numpy.linspace(1, L2, L2 // 2, False)
+            h[1:L2:2] = -1. / (numpy.pi ** 2 * j ** 2)
+            h[L2:] = numpy.copy(h[1:L2 - 1][::-1])
+        else:
+            raise ValueError("Filter %s is not available, only Ram-Lak is supported" %
+                             self.filter_name)
+        self.filter = numpy.fft.fft(h).astype(numpy.complex64)
+
+    def backprojection(self, sino=None, dst=None):
+        """Perform the backprojection on an input sinogram
+
+        :param sino: sinogram. If provided, it returns the plain
+                     backprojection.
+        :param dst: destination (numpy.ndarray of float32).
+                    If provided, the result will be written in this array.
+        :return: backprojection of sinogram
+        """
+        if sino is not None:
+            self._sino = numpy.ascontiguousarray(sino, dtype=numpy.float32)
+        res = _outputArray(dst, self.slice_shape)
+        _radon.backprojection(self._sino,
+                              self._cos,
+                              self._sin,
+                              self._axes,
+                              self.axis_pos,
+                              res)
+        if dst is None:
+            return res
+        if res is not dst:
+            dst[:] = res
+        return dst
+
+    def filter_projections(self, sino, rescale=True):
+        """Filter a sinogram for the FBP.
+
+        The filtered sinogram is then used by :meth:`backprojection`.
+
+        :param sino: sinogram to (filter-)backproject
+        :param rescale: if True (default), the sinogram is multiplied with
+                        (pi/n_projs)
+        """
+        if sino.shape[0] != self.num_projs or sino.shape[1] != self.num_bins:
+            raise ValueError("Expected sinogram with (projs, bins) = (%d, %d)" % (self.num_projs, self.num_bins))
+        self._sino = self._filter(sino, rescale)
+
+    def _filter(self, sino, rescale=True):
+        """Returns the filtered sinogram.
+
+        :param sino: sinogram to filter
+        :param rescale: True to multiply the sinogram with (pi/n_projs)
+        :rtype: numpy.ndarray
+        """
+        if rescale:
+            sino = sino * numpy.pi / self.num_projs
+        sino_f = numpy.fft.rfft(sino, self.fft_size, axis=1)
+        sino_f *= self.filter[:sino_f.shape[1]]
+        sino_filtered = numpy.fft.irfft(sino_f, self.fft_size, axis=1)
+        return numpy.ascontiguousarray(sino_filtered[:, :self.num_bins],
+                                       dtype=numpy.float32)
+
+    def filtered_backprojection(self, sino):
+        """
+        Compute the filtered backprojection (FBP) on a sinogram.
+
+        :param sino: sinogram (`numpy.ndarray`) in the format (projections,
+                     bins)
+        """
+        self.filter_projections(sino)
+        return self.backprojection()
+
+    def filtered_backprojection_stack(self, sinos, dst=None):
+        """
+        Compute the filtered backprojection (FBP) of a stack of sinograms.
+
+        The filter and angles are shared by all slices.
+        Reading and filtering of the next sinogram is done in a thread while
+        the current one is backprojected.
+
+        :param sinos: stack of sinograms in the format (slices, projections,
+                      bins) as a `numpy.ndarray` or any array-like supporting
+                      indexing along the first dimension (e.g.,
+                      `h5py.Dataset`)
+        :param dst: Optional array-like of shape (slices,) + slice_shape where
+                    to write the result (e.g., `numpy.ndarray` or
+                    `h5py.Dataset`).
+        :return: dst or a new `numpy.ndarray` if not provided
+        """
+        n_slices = sinos.shape[0]
+        if tuple(sinos.shape[1:]) != (self.num_projs, self.num_bins):
+            raise ValueError("Expected sinograms with (projs, bins) = (%d, %d)" % (self.num_projs, self.num_bins))
+        out_shape = (n_slices,) + tuple(self.slice_shape)
+        if dst is None:
+            dst = numpy.empty(out_shape, dtype=numpy.float32)
+        elif tuple(dst.shape) != out_shape:
+            raise ValueError("Expected destination of shape %s" % str(out_shape))
+
+        if n_slices == 0:
+            return dst
+
+        def read_and_filter(index):
+            return self._filter(numpy.asarray(sinos[index]))
+
+        result = numpy.empty(self.slice_shape, dtype=numpy.float32)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(read_and_filter, 0)
+            for index in range(n_slices):
+                sino_filtered = future.result()
+                if index + 1 < n_slices:
+                    future = executor.submit(read_and_filter, index + 1)
+                # The GIL is released during the backprojection
+                self.backprojection(sino_filtered, dst=result)
+                dst[index] = result
+        return dst
+
+    __call__ = filtered_backprojection
+
+
+class Projection(object):
+    """A class for performing a tomographic projection (Radon Transform)
+    on the CPU
+
+    :param slice_shape: shape of the slice: (num_rows, num_columns).
+    :param angles: Either an integer number of angles, or a list of custom
+                   angles values in radian.
+    :param axis_position: Optional, axis position. Default is
+                          `(shape[1]-1)/2.0`.
+    :param detector_width: Optional, detector width in pixels.
+                           If detector_width > slice_shape[1], the
+                           projection data will be surrounded with zeros.
+                           Using detector_width < slice_shape[1] might
+                           result in a local tomography setup.
+    :param normalize: Optional, normalization. If set, the sinograms are
+                      multiplied by the factor pi/(2*nprojs).
+    :param ctx: Not used, for compatibility with OpenCL implementation
+    :param devicetype: Not used, for compatibility with OpenCL implementation
+    :param platformid: Not used, for compatibility with OpenCL implementation
+    :param deviceid: Not used, for compatibility with OpenCL implementation
+    :param profile: Not used, for compatibility with OpenCL implementation
+    """
+
+    def __init__(self, slice_shape, angles, axis_position=None,
+                 detector_width=None, normalize=False, ctx=None,
+                 devicetype="all", platformid=None, deviceid=None,
+                 profile=False):
+        self.shape = slice_shape
+        self.axis_pos = axis_position
+        self.angles = angles
+        self.dwidth = detector_width
+        self.normalize = normalize
+        self.is_cpu = True
+        self.profile = profile
+
+        # Default values
+        if self.axis_pos is None:
+            self.axis_pos = (self.shape[1] - 1) / 2.
+        if self.dwidth is None:
+            self.dwidth = self.shape[1]
+        if not(numpy.iterable(self.angles)):
+            if self.angles is None:
+                self.nprojs = self.shape[0]
+            else:
+                self.nprojs = self.angles
+            self.angles = numpy.linspace(start=0,
+                                         stop=numpy.pi,
+                                         num=self.nprojs,
+                                         endpoint=False).astype(dtype=numpy.float32)
+        else:
+            self.nprojs = len(self.angles)
+        self.offset_x = -numpy.float32((self.shape[1] - 1) / 2. - self.axis_pos)
+        self.offset_y = -numpy.float32((self.shape[0] - 1) / 2. - self.axis_pos)
+        # Reset axis_pos once offset are computed
+        self.axis_pos0 = numpy.float32((self.shape[1] - 1) / 2.)
+
+        self._angles = numpy.array(self.angles, dtype=numpy.float32)
+        # Slice surrounded by zeros used by the projector
+        self._slice = numpy.zeros((self.shape[0] + 2, self.shape[1] + 2),
+                                  dtype=numpy.float32)
+
+    def transfer_to_slice(self, image):
+        """Set the image to use for next projection.
+
+        :param numpy.ndarray image: Image of shape slice_shape
+        """
+        self._slice[1:-1, 1:-1] = image
+
+    def projection(self, image=None, dst=None):
+        """Perform the projection on an input image
+
+        :param image: Image to project.
+                      If None, the previously projected image is used.
+        :param dst: destination (numpy.ndarray of float32).
+                    If provided, the result will be written in this array.
+        :return: A sinogram
+        """
+        if image is not None:
+            assert image.ndim == 2, "Treat only 2D images"
+            assert image.shape[0] == self.shape[0], "image shape is OK"
+            assert image.shape[1] == self.shape[1], "image shape is OK"
+            self.transfer_to_slice(image)
+
+        res = _outputArray(dst, (self.nprojs, self.dwidth))
+        _radon.projection(self._slice,
+                          self._angles,
+                          self.axis_pos0,
+                          self.offset_x,
+                          bool(self.normalize),
+                          res)
+        if dst is None:
+            return res
+        if res is not dst:
+            dst[:] = res
+        return dst
+
+    __call__ = projection
+
+
+Subset = namedtuple("Subset", ["indices", "projector", "backprojector",
+                               "d_data", "d_sino"])
+"""Projections of an ordered subset with their projector, backprojector,
+sinogram data and temporary sinogram"""
+
+
+class ReconstructionAlgorithm(object):
+    """
+    A parent class for all iterative tomographic reconstruction algorithms
+    running on the CPU
+
+    :param sino_shape: shape of the sinogram. The sinogram is in the format
+                       (n_a, n_b) where n_a is the number of angles and
+                       n_b is the number of detector bins.
+    :param slice_shape: Optional, shape of the reconstructed slice.
+                        By default, it is a square slice where the dimension
+                        is the "x dimension" of the sinogram (number of bins).
+    :param axis_position: Optional, axis position. Default is `(shape[1]-1)/2.0`.
+    :param angles: Optional, a list of custom angles in radian.
+    :param ctx: Not used, for compatibility with OpenCL implementation
+    :param devicetype: Not used, for compatibility with OpenCL implementation
+    :param platformid: Not used, for compatibility with OpenCL implementation
+    :param deviceid: Not used, for compatibility with OpenCL implementation
+    :param profile: Not used, for compatibility with OpenCL implementation
+    :param int n_subsets: Optional, number of ordered subsets of projections
+                          used by each iteration. Default is 1 (no subsets).
+    """
+
+    def __init__(self, sino_shape, slice_shape=None, axis_position=None,
+                 angles=None, ctx=None, devicetype="all", platformid=None,
+                 deviceid=None, profile=False, n_subsets=1):
+        # Create a backprojector
+        self.backprojector = Backprojection(
+            sino_shape,
+            slice_shape=slice_shape,
+            axis_position=axis_position,
+            angles=angles,
+            profile=profile
+        )
+        # Create a projector
+        self.projector = Projection(
+            self.backprojector.slice_shape,
+            self.backprojector.angles,
+            axis_position=axis_position,
+            detector_width=self.backprojector.num_bins,
+            normalize=False,
+            profile=profile
+        )
+        self.sino_shape = sino_shape
+        self.is_cpu = True
+        # Arrays
+        self.d_data = numpy.zeros(sino_shape, dtype=numpy.float32)
+        self.d_sino = numpy.zeros_like(self.d_data)
+        self.d_x = numpy.zeros(self.backprojector.slice_shape,
+                               dtype=numpy.float32)
+        self.d_x_old = numpy.zeros_like(self.d_x)
+        self.d_x_prev = numpy.zeros_like(self.d_x)
+
+        self.convergence = []
+        """Relative update of the slice at each iteration of the last run"""
+
+        # Ordered subsets
+        self.n_subsets = int(n_subsets)
+        if self.n_subsets == 1:
+            self.subsets = [Subset(numpy.arange(sino_shape[0]), self.projector,
+                                   self.backprojector, self.d_data, self.d_sino)]
+        else:
+            self.subsets = []
+            for indices in ordered_subsets(sino_shape[0], self.n_subsets):
+                angles = numpy.asarray(self.backprojector.angles)[indices]
+                subset_shape = (len(indices), sino_shape[1])
+                backprojector = Backprojection(
+                    subset_shape,
+                    slice_shape=self.backprojector.slice_shape,
+                    axis_position=axis_position,
+                    angles=angles,
+                    profile=profile
+                )
+                projector = Projection(
+                    self.backprojector.slice_shape,
+                    angles,
+                    axis_position=axis_position,
+                    detector_width=self.backprojector.num_bins,
+                    normalize=False,
+                    profile=profile
+                )
+                self.subsets.append(Subset(
+                    indices, projector, backprojector,
+                    numpy.zeros(subset_shape, dtype=numpy.float32),
+                    numpy.zeros(subset_shape, dtype=numpy.float32)))
+
+    def proj(self, d_slice, d_sino, projector=None):
+        """
+        Project d_slice to d_sino
+
+        :param projector: Projector of a subset, default: all projections
+        """
+        if projector is None:
+            projector = self.projector
+        projector.projection(d_slice, dst=d_sino)
+
+    def backproj(self, d_sino, d_slice, backprojector=None):
+        """
+        Backproject d_sino to d_slice
+
+        :param backprojector: Backprojector of a subset, default: all projections
+        """
+        if backprojector is None:
+            backprojector = self.backprojector
+        backprojector.backprojection(d_sino, dst=d_slice)
+
+    def set_data(self, data):
+        """
+        Set the sinogram to reconstruct, and its subsets
+        """
+        self.d_data[:] = data
+        if self.n_subsets > 1:
+            for subset in self.subsets:
+                subset.d_data[:] = self.d_data[subset.indices]
+
+    def init_slice(self, x0=None, warm_start=False):
+        """
+        Initialize the slice before iterating.
+
+        :param x0: Optional, initial slice
+        :param bool warm_start: If True and x0 is None, start from the result
+                                of the previous run, e.g., an adjacent slice.
+                                Otherwise, start from zero.
+        """
+        if x0 is not None:
+            self.d_x[:] = x0
+        elif not warm_start:
+            self.d_x[:] = 0
+        self.convergence = []
+
+    def check_convergence(self, tol=None):
+        """
+        Record the relative update of the slice since the last call and
+        returns True if it is below tol.
+
+        The previous slice is read from d_x_prev, which is then updated.
+
+        :param float tol: Optional, tolerance on the relative update
+        :rtype: bool
+        """
+        self.d_x_prev -= self.d_x
+        norm = numpy.linalg.norm(self.d_x)
+        update = numpy.linalg.norm(self.d_x_prev)
+        update = update / norm if norm > 0 else (0. if update == 0 else numpy.inf)
+        self.convergence.append(float(update))
+        self.d_x_prev[:] = self.d_x
+        return tol is not None and update < tol
+
+
+class SIRT(ReconstructionAlgorithm):
+    """
+    A class for the SIRT algorithm running on the CPU
+
+    See :class:`ReconstructionAlgorithm` for parameters.
+    """
+
+    def __init__(self, sino_shape, slice_shape=None, axis_position=None,
+                 angles=None, ctx=None, devicetype="all", platformid=None,
+                 deviceid=None, profile=False, n_subsets=1):
+        ReconstructionAlgorithm.__init__(self, sino_shape, slice_shape=slice_shape,
+                                         axis_position=axis_position, angles=angles,
+                                         profile=profile, n_subsets=n_subsets)
+        self.compute_preconditioners()
+
+    def compute_preconditioners(self):
+        """
+        Create a diagonal preconditioner for the projection and backprojection
+        operator.
+        Each term of the diagonal is the sum of the projector/backprojector
+        along rows [1], i.e the projection/backprojection of an array of ones.
+        With ordered subsets, preconditioners are computed for each subset
+        as in OS-SART.
+
+        [1] Jens Gregor and Thomas Benson,
+            Computational Analysis and Improvement of SIRT,
+            IEEE transactions on medical imaging, vol. 27, no. 7,  2008
+        """
+        self.subset_preconditioners = []
+        slice_ones = numpy.ones(self.backprojector.slice_shape,
+                                dtype=numpy.float32)
+        with numpy.errstate(divide='ignore'):
+            for subset in self.subsets:
+                # r_{i,i} = 1/(sum_j a_{i,j})
+                R = 1. / subset.projector.projection(slice_ones)
+                R[numpy.logical_not(numpy.isfinite(R))] = 1.
+                # c_{j,j} = 1/(sum_i a_{i,j})
+                C = 1. / subset.backprojector.backprojection(numpy.ones_like(subset.d_data))
+                C[numpy.logical_not(numpy.isfinite(C))] = 1.
+                self.subset_preconditioners.append((R, C))
+        if self.n_subsets == 1:
+            self.d_R, self.d_C = self.subset_preconditioners[0]
+
+    def run(self, data, n_it, x0=None, warm_start=False, tol=None):
+        """
+        Run n_it iterations of the SIRT algorithm.
+
+        With ordered subsets (OS-SIRT), each iteration updates the slice
+        once per subset.
+
+        :param data: The sinogram
+        :param int n_it: Maximum number of iterations
+        :param x0: Optional, initial slice
+        :param bool warm_start: If True and x0 is None, start from the result
+                                of the previous run. Default: start from zero.
+        :param float tol: Optional, stop when the relative update of the slice
+                          during an iteration is below tol.
+                          Updates are stored in :attr:`convergence`.
+        :return: The reconstructed slice
+        :rtype: numpy.ndarray
+        """
+        self.set_data(data)
+        self.init_slice(x0, warm_start)
+
+        d_x_old = self.d_x_old
+        d_x = self.d_x
+        self.d_x_prev[:] = d_x
+
+        for k in range(n_it):
+            for subset, (d_R, d_C) in zip(self.subsets, self.subset_preconditioners):
+                d_x_old[:] = d_x
+                d_sino = subset.d_sino
+                # x{k+1} = x{k} - C A^T R (A x{k} - b)
+                self.proj(d_x, d_sino, subset.projector)
+                d_sino -= subset.d_data
+                d_sino *= d_R
+                self.backproj(d_sino, d_x, subset.backprojector)
+                d_x *= -d_C
+                d_x += d_x_old
+            if self.check_convergence(tol):
+                break
+
+        return d_x
+
+    __call__ = run
+
+
+def _gradient(image):
+    """Returns the gradient of an image as the OpenCL LinAlg does.
+
+    :param numpy.ndarray image: 2D image
+    :return: Array of shape image.shape + (2,) with the gradient along
+             rows and columns.
+    """
+    gradient = numpy.zeros(image.shape + (2,), dtype=numpy.float32)
+    gradient[:-1, :, 0] = image[1:] - image[:-1]
+    gradient[:, :-1, 1] = image[:, 1:] - image[:, :-1]
+    return gradient
+
+
+def _divergence(gradient):
+    """Returns the divergence of a gradient as the OpenCL LinAlg does.
+
+    :param numpy.ndarray gradient: Gradient as returned by :func:`_gradient`
+    :rtype: numpy.ndarray
+    """
+    image = gradient[..., 0] + gradient[..., 1]
+    image[1:] -= gradient[:-1, :, 0]
+    image[:, 1:] -= gradient[:, :-1, 1]
+    return image
+
+
+class TV(ReconstructionAlgorithm):
+    """
+    A class for reconstruction with Total Variation regularization using the
+    Chambolle-Pock TV reconstruction algorithm running on the CPU.
+
+    With ordered subsets, the stochastic primal-dual hybrid gradient
+    algorithm [3] is used: each iteration updates the dual variable of
+    every subset in turn.
+
+    See :class:`ReconstructionAlgorithm` for parameters.
+
+    [3] A. Chambolle, M. J. Ehrhardt, P. Richtarik, C.-B. Schonlieb,
+        Stochastic primal-dual hybrid gradient algorithm with arbitrary
+        sampling and imaging applications,
+        SIAM Journal on Optimization, vol. 28, no. 4, 2018
+    """
+
+    def __init__(self, sino_shape, slice_shape=None, axis_position=None,
+                 angles=None, ctx=None, devicetype="all", platformid=None,
+                 deviceid=None, profile=False, n_subsets=1):
+        ReconstructionAlgorithm.__init__(self, sino_shape, slice_shape=slice_shape,
+                                         axis_position=axis_position, angles=angles,
+                                         profile=profile, n_subsets=n_subsets)
+        self.compute_preconditioners()
+
+        # Additional arrays
+        self.d_p = numpy.zeros(self.d_x.shape + (2,), dtype=numpy.float32)
+        self.d_q = numpy.zeros_like(self.d_data)
+        self.d_tmp = numpy.zeros_like(self.d_x)
+        if self.n_subsets > 1:
+            self.subset_q = [numpy.zeros_like(subset.d_data)
+                             for subset in self.subsets]
+            self.d_z = numpy.zeros_like(self.d_x)
+
+        self.theta = 1.0
+
+    def compute_preconditioners(self):
+        """
+        Create a diagonal preconditioner for the projection and backprojection
+        operator.
+        Each term of the diagonal is the sum of the projector/backprojector
+        along rows [2],
+        i.e the projection/backprojection of an array of ones.
+        With ordered subsets, "Sigma" is computed per subset and "Tau" is
+        scaled by the number of subsets [3].
+
+        [2] T. Pock, A. Chambolle,
+            Diagonal preconditioning for first order primal-dual algorithms in
+            convex optimization,
+            International Conference on Computer Vision, 2011
+        """
+        # Compute the diagonal preconditioner "Sigma"
+        slice_ones = numpy.ones(self.backprojector.slice_shape,
+                                dtype=numpy.float32)
+        self.subset_Sigma = []
+        C = None
+        for subset in self.subsets:
+            with numpy.errstate(divide='ignore'):
+                Sigma_k = 1. / subset.projector.projection(slice_ones)
+            Sigma_k[numpy.logical_not(numpy.isfinite(Sigma_k))] = 1.
+            self.subset_Sigma.append((Sigma_k, Sigma_k + 1))
+            C_s = subset.backprojector.backprojection(numpy.ones_like(subset.d_data))
+            C = C_s if C is None else numpy.maximum(C, C_s)
+        self.d_Sigma_k, self.d_Sigma_kp1 = self.subset_Sigma[0]
+        self.Sigma_grad = 1 / 2.0  # For discrete gradient, sum|D_i,j| = 2 along lines or cols
+
+        # Compute the diagonal preconditioner "Tau"
+        self.d_Tau = 1. / (self.n_subsets * C + 2.)
+
+    def run(self, data, n_it, Lambda, pos_constraint=False,
+            x0=None, warm_start=False, tol=None):
+        """
+        Run n_it iterations of the TV-regularized reconstruction,
+        with the regularization parameter Lambda.
+
+        :param data: The sinogram
+        :param int n_it: Maximum number of iterations
+        :param float Lambda: Regularization parameter
+        :param bool pos_constraint: True to enforce positivity of the slice
+        :param x0: Optional, initial slice
+        :param bool warm_start: If True and x0 is None, start from the result
+                                of the previous run. Default: start from zero.
+                                Dual variables are always reset.
+        :param float tol: Optional, stop when the relative update of the slice
+                          during an iteration is below tol.
+                          Updates are stored in :attr:`convergence`.
+        :return: The reconstructed slice
+        :rtype: numpy.ndarray
+        """
+        self.set_data(data)
+        self.init_slice(x0, warm_start)
+        self.d_x_prev[:] = self.d_x
+        self.d_p[:] = 0
+
+        if self.n_subsets > 1:
+            return self._run_subsets(n_it, Lambda, pos_constraint, tol)
+
+        d_x = self.d_x
+        d_x_old = self.d_x_old
+        d_tmp = self.d_tmp
+        d_sino = self.d_sino
+        d_p = self.d_p
+        d_q = self.d_q
+        d_q[:] = 0
+
+        for k in range(0, n_it):
+            # Update primal variables
+            d_x_old[:] = d_x
+            # x = x + Tau*div(p) - Tau*Kadj(q)
+            self.backproj(d_q, d_tmp)
+            d_g = _divergence(d_p)
+            d_g -= d_tmp
+            d_g *= self.d_Tau
+            d_x += d_g
+
+            if pos_constraint:
+                numpy.maximum(d_x, 0., out=d_x)
+
+            # Update dual variables
+            # p = proj_linf(p + Sigma_grad*gradient(x + theta*(x - x_old)), Lambda)
+            d_tmp[:] = d_x
+            d_tmp *= 1 + self.theta
+            d_tmp -= self.theta * d_x_old
+            d_p += self.Sigma_grad * _gradient(d_tmp)
+            numpy.clip(d_p, -Lambda, Lambda, out=d_p)
+
+            # q = (q + Sigma_k*K(x + theta*(x - x_old)) - Sigma_k*data)/(1.0 + Sigma_k)
+            self.proj(d_tmp, d_sino)
+            d_sino -= self.d_data
+            d_sino *= self.d_Sigma_k
+            d_q += d_sino
+            d_q /= self.d_Sigma_kp1
+
+            if self.check_convergence(tol):
+                break
+        return d_x
+
+    def _run_subsets(self, n_it, Lambda, pos_constraint, tol):
+        """Run iterations of the stochastic primal-dual hybrid gradient,
+        visiting subsets in order.
+
+        The gradient dual variable is updated with every subset.
+        z = Kadj(y) is kept up to date and zbar is its extrapolation.
+        """
+        d_x = self.d_x
+        d_tmp = self.d_tmp
+        d_p = self.d_p
+        d_z = self.d_z
+        d_z[:] = 0
+        d_zbar = numpy.zeros_like(d_z)
+        for d_q in self.subset_q:
+            d_q[:] = 0
+
+        for k in range(0, n_it):
+            for subset, d_q, (d_Sigma_k, d_Sigma_kp1) in zip(
+                    self.subsets, self.subset_q, self.subset_Sigma):
+                # x = x - Tau*zbar
+                d_zbar *= self.d_Tau
+                d_x -= d_zbar
+                if pos_constraint:
+                    numpy.maximum(d_x, 0., out=d_x)
+
+                # p = proj_linf(p + Sigma_grad*gradient(x), Lambda)
+                d_p_old = d_p.copy()
+                d_p += self.Sigma_grad * _gradient(d_x)
+                numpy.clip(d_p, -Lambda, Lambda, out=d_p)
+                d_p_old -= d_p
+                d_zg = _divergence(d_p_old)  # -div(p_new - p_old)
+
+                # q_s = (q_s + Sigma_s*(K_s(x) - data_s))/(1.0 + Sigma_s)
+                d_sino = subset.d_sino
+                self.proj(d_x, d_sino, subset.projector)
+                d_sino -= subset.d_data
+                d_sino *= d_Sigma_k
+                d_sino += d_q
+                d_sino /= d_Sigma_kp1
+                # Keep the update of q_s to backproject it
+                d_sino -= d_q
+                d_q += d_sino
+                self.backproj(d_sino, d_tmp, subset.backprojector)
+
+                # z = z + Kadj_s(dq) + dzg, zbar = z + n*Kadj_s(dq) + dzg
+                d_z += d_tmp
+                d_z += d_zg
+                d_zbar[:] = d_z
+                d_zbar += self.n_subsets * d_tmp
+                d_zbar += d_zg
+            if self.check_convergence(tol):
+                break
+        return d_x
+
+    __call__ = run
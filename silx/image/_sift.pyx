@@ -0,0 +1,716 @@
+# coding: utf-8
+# /*##########################################################################
+#
+# Copyright (c) 2018 European Synchrotron Radiation Facility
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# ############################################################################*/
+"""CPU implementation of the SIFT keypoints extraction and matching.
+
+The functions of this module follow the OpenCL kernels of
+:mod:`silx.opencl.sift` (``convolution.cl``, ``image.cl``,
+``orientation_cpu.cl``, ``descriptor_cpu.cl``, ``matching_cpu.cl`` and
+``transform.cl``). Loops are parallelized with OpenMP when available.
+"""
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/10/2018"
+
+
+cimport cython
+from cython.parallel import prange
+from libc.math cimport M_PI
+import numpy
+
+
+cdef extern from "math.h" nogil:
+    float atan2f(float y, float x)
+    float cosf(float x)
+    float expf(float x)
+    float fabsf(float x)
+    float powf(float x, float y)
+    float sinf(float x)
+    float sqrtf(float x)
+
+include "../utils/_have_openmp.pxi"
+"""Store in the module if it was compiled with OpenMP"""
+
+
+cdef int _MAX_ORIENTATIONS = 18
+"""Maximum number of orientations of a keypoint"""
+
+
+cdef inline int _mirror(int index, int size) nogil:
+    """Returns index in [0, size) using symmetric boundary extension"""
+    if index < 0:
+        index = - index - 1
+    elif index >= size:
+        index = 2 * size - index - 1
+    if index < 0:
+        return 0
+    elif index >= size:
+        return size - 1
+    return index
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def gaussian_blur(float[:, ::1] image, float[::1] kernel):
+    """Separable convolution of an image with symmetric boundary extension.
+
+    :param image: 2D image
+    :param kernel: 1D convolution kernel
+    :return: The convolved image
+    :rtype: numpy.ndarray
+    """
+    cdef int height = image.shape[0]
+    cdef int width = image.shape[1]
+    cdef int size = kernel.shape[0]
+    cdef int center = size // 2 if size % 2 else size // 2 - 1
+    cdef float[:, ::1] tmp = numpy.empty((height, width), dtype=numpy.float32)
+    cdef float[:, ::1] dst = numpy.empty((height, width), dtype=numpy.float32)
+    cdef int row, col, index
+    cdef float total
+
+    for row in prange(height, nogil=True):
+        for col in range(width):
+            total = 0.
+            for index in range(size):
+                total = total + (
+                    image[row, _mirror(col - center + index, width)] *
+                    kernel[size - 1 - index])
+            tmp[row, col] = total
+
+    for row in prange(height, nogil=True):
+        for col in range(width):
+            total = 0.
+            for index in range(size):
+                total = total + (
+                    tmp[_mirror(row - center + index, height), col] *
+                    kernel[size - 1 - index])
+            dst[row, col] = total
+
+    return numpy.asarray(dst)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def gradient_orientation(float[:, ::1] image):
+    """Compute the gradient norm and orientation of an image.
+
+    Central differences are used in the interior and first differences at
+    the boundaries.
+
+    :param image: 2D image
+    :return: (gradient norm, gradient orientation in [-pi, pi])
+    :rtype: List[numpy.ndarray]
+    """
+    cdef int height = image.shape[0]
+    cdef int width = image.shape[1]
+    cdef float[:, ::1] grad = numpy.empty((height, width), dtype=numpy.float32)
+    cdef float[:, ::1] ori = numpy.empty((height, width), dtype=numpy.float32)
+    cdef int row, col
+    cdef float xgrad, ygrad
+
+    for row in prange(height, nogil=True):
+        for col in range(width):
+            if col == 0:
+                xgrad = 2. * (image[row, col + 1] - image[row, col])
+            elif col == width - 1:
+                xgrad = 2. * (image[row, col] - image[row, col - 1])
+            else:
+                xgrad = image[row, col + 1] - image[row, col - 1]
+
+            if row == 0:
+                ygrad = 2. * (image[row, col] - image[row + 1, col])
+            elif row == height - 1:
+                ygrad = 2. * (image[row - 1, col] - image[row, col])
+            else:
+                ygrad = image[row - 1, col] - image[row + 1, col]
+
+            grad[row, col] = sqrtf(xgrad * xgrad + ygrad * ygrad)
+            ori[row, col] = atan2f(-ygrad, xgrad)
+
+    return numpy.asarray(grad), numpy.asarray(ori)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef inline bint _is_keypoint(float[:, :, ::1] dogs,
+                              int scale,
+                              int row,
+                              int col,
+                              float peak_thresh,
+                              float edge_thresh) nogil:
+    """Returns True if the DoG is an extremum not lying on an edge"""
+    cdef float val = dogs[scale, row, col]
+    cdef bint ismax, ismin
+    cdef int s, r, c
+    cdef float h00, h11, h01, det, trace
+
+    if fabsf(val) <= 0.8 * peak_thresh:
+        return False
+
+    ismax = val > 0.
+    ismin = not ismax
+    for s in range(scale - 1, scale + 2):
+        for r in range(row - 1, row + 2):
+            for c in range(col - 1, col + 2):
+                if ismax and dogs[s, r, c] > val:
+                    return False
+                if ismin and dogs[s, r, c] < val:
+                    return False
+
+    # Ratio of principal curvatures
+    h00 = dogs[scale, row - 1, col] - 2. * val + dogs[scale, row + 1, col]
+    h11 = dogs[scale, row, col - 1] - 2. * val + dogs[scale, row, col + 1]
+    h01 = ((dogs[scale, row + 1, col + 1] - dogs[scale, row + 1, col - 1]) -
+           (dogs[scale, row - 1, col + 1] - dogs[scale, row - 1, col - 1])) / 4.
+    det = h00 * h11 - h01 * h01
+    trace = h00 + h11
+    return det >= edge_thresh * trace * trace
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def local_extrema(float[:, :, ::1] dogs,
+                  int scale,
+                  int border_dist,
+                  float peak_thresh,
+                  float edge_thresh):
+    """Detect local extrema in scale space.
+
+    :param dogs: Stack of difference of Gaussians
+    :param int scale: Index of the DoG where to look for extrema,
+        must not be the first nor the last one
+    :param int border_dist: Distance to the borders of the image to ignore
+    :param float peak_thresh: Threshold on the DoG amplitude
+    :param float edge_thresh: Threshold on the ratio of principal curvatures
+    :return: (rows, columns) of the extrema
+    :rtype: List[numpy.ndarray]
+    """
+    cdef int height = dogs.shape[1]
+    cdef int width = dogs.shape[2]
+    cdef unsigned char[:, ::1] mask = numpy.zeros(
+        (height, width), dtype=numpy.uint8)
+    cdef int row, col
+
+    assert 0 < scale < dogs.shape[0] - 1
+
+    for row in prange(border_dist, height - border_dist, nogil=True):
+        for col in range(border_dist, width - border_dist):
+            if _is_keypoint(dogs, scale, row, col, peak_thresh, edge_thresh):
+                mask[row, col] = 1
+
+    rows, cols = numpy.nonzero(numpy.asarray(mask))
+    return rows.astype(numpy.int32), cols.astype(numpy.int32)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def interpolate_keypoints(float[:, :, ::1] dogs,
+                          int scale,
+                          int[::1] rows,
+                          int[::1] cols,
+                          float peak_thresh,
+                          float init_sigma,
+                          int nb_scales):
+    """Refine the position of extrema with a quadratic fit.
+
+    :param dogs: Stack of difference of Gaussians
+    :param int scale: Index of the DoG of the extrema
+    :param rows: Rows of the extrema
+    :param cols: Columns of the extrema
+    :param float peak_thresh: Threshold on the interpolated DoG amplitude
+    :param float init_sigma: Blurring width of the first scale
+    :param int nb_scales: Number of scales per octave
+    :return: Array of (value, row, column, sigma) of shape (N, 4),
+        with -1 for keypoints which could not be interpolated
+    :rtype: numpy.ndarray
+    """
+    cdef int height = dogs.shape[1]
+    cdef int width = dogs.shape[2]
+    cdef int nb_keypoints = rows.shape[0]
+    cdef float[:, ::1] result = numpy.empty(
+        (nb_keypoints, 4), dtype=numpy.float32)
+    cdef int index, r, c, newr, newc, moves_remain
+    cdef bint loop
+    cdef float g0, g1, g2, h00, h11, h22, h01, h02, h12
+    cdef float k00, k11, k22, k01, k02, k12, k10, k20, k21
+    cdef float det, peakval, solution0, solution1, solution2
+
+    assert cols.shape[0] == nb_keypoints
+
+    for index in prange(nb_keypoints, nogil=True):
+        newr = rows[index]
+        newc = cols[index]
+        moves_remain = 5
+        loop = True
+        while loop:
+            r = newr
+            c = newc
+            g0 = (dogs[scale + 1, r, c] - dogs[scale - 1, r, c]) / 2.
+            g1 = (dogs[scale, r + 1, c] - dogs[scale, r - 1, c]) / 2.
+            g2 = (dogs[scale, r, c + 1] - dogs[scale, r, c - 1]) / 2.
+
+            h00 = (dogs[scale - 1, r, c] - 2. * dogs[scale, r, c] +
+                   dogs[scale + 1, r, c])
+            h11 = (dogs[scale, r - 1, c] - 2. * dogs[scale, r, c] +
+                   dogs[scale, r + 1, c])
+            h22 = (dogs[scale, r, c - 1] - 2. * dogs[scale, r, c] +
+                   dogs[scale, r, c + 1])
+            h01 = ((dogs[scale + 1, r + 1, c] - dogs[scale + 1, r - 1, c]) -
+                   (dogs[scale - 1, r + 1, c] - dogs[scale - 1, r - 1, c])) / 4.
+            h02 = ((dogs[scale + 1, r, c + 1] - dogs[scale + 1, r, c - 1]) -
+                   (dogs[scale - 1, r, c + 1] - dogs[scale - 1, r, c - 1])) / 4.
+            h12 = ((dogs[scale, r + 1, c + 1] - dogs[scale, r + 1, c - 1]) -
+                   (dogs[scale, r - 1, c + 1] - dogs[scale, r - 1, c - 1])) / 4.
+
+            # Inversion of the symmetric Hessian: det * K = H^-1
+            det = (- h02 * h11 * h02 + h01 * h12 * h02 + h02 * h01 * h12 -
+                   h00 * h12 * h12 - h01 * h01 * h22 + h00 * h11 * h22)
+            k00 = h11 * h22 - h12 * h12
+            k01 = h02 * h12 - h01 * h22
+            k02 = h01 * h12 - h02 * h11
+            k10 = h12 * h02 - h01 * h22
+            k11 = h00 * h22 - h02 * h02
+            k12 = h02 * h01 - h00 * h12
+            k20 = h01 * h12 - h11 * h02
+            k21 = h01 * h02 - h00 * h12
+            k22 = h00 * h11 - h01 * h01
+
+            solution0 = -(g0 * k00 + g1 * k01 + g2 * k02) / det
+            solution1 = -(g0 * k10 + g1 * k11 + g2 * k12) / det
+            solution2 = -(g0 * k20 + g1 * k21 + g2 * k22) / det
+
+            peakval = dogs[scale, r, c] + 0.5 * (
+                solution0 * g0 + solution1 * g1 + solution2 * g2)
+
+            # Move to an adjacent location if the extremum is too far
+            if solution1 > 0.6 and newr < height - 3:
+                newr = newr + 1
+            elif solution1 < -0.6 and newr > 3:
+                newr = newr - 1
+            if solution2 > 0.6 and newc < width - 3:
+                newc = newc + 1
+            elif solution2 < -0.6 and newc > 3:
+                newc = newc - 1
+
+            if moves_remain > 0 and (newr != r or newc != c):
+                moves_remain = moves_remain - 1
+            else:
+                loop = False
+
+        if (fabsf(solution0) <= 1.5 and fabsf(solution1) <= 1.5 and
+                fabsf(solution2) <= 1.5 and fabsf(peakval) >= peak_thresh):
+            result[index, 0] = peakval
+            result[index, 1] = r + solution1
+            result[index, 2] = c + solution2
+            result[index, 3] = init_sigma * powf(
+                2., (scale + solution0) / nb_scales)
+        else:
+            result[index, 0] = -1.
+            result[index, 1] = -1.
+            result[index, 2] = -1.
+            result[index, 3] = -1.
+
+    return numpy.asarray(result)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef int _orientation(float row,
+                      float col,
+                      float scale,
+                      float[:, ::1] grad,
+                      float[:, ::1] ori,
+                      float ori_sigma,
+                      float[:] angles) nogil:
+    """Compute orientations of a keypoint from a histogram of gradients.
+
+    :return: The number of orientations stored in angles, the first one
+        being the main orientation
+    """
+    cdef int height = grad.shape[0]
+    cdef int width = grad.shape[1]
+    cdef float hist[36]
+    cdef int i, j, r, c, bin_, argmax, prev, next_, count
+    cdef float distsq, dif, gval, angle, interp, maxval
+    cdef float hist_prev, hist_curr, hist_next, previous, temp
+    cdef int irow = <int> (row + 0.5)
+    cdef int icol = <int> (col + 0.5)
+    cdef float sigma = ori_sigma * scale
+    cdef int radius = <int> (sigma * 3.)
+    cdef int rmin = max(0, irow - radius)
+    cdef int cmin = max(0, icol - radius)
+    cdef int rmax = min(irow + radius, height - 2)
+    cdef int cmax = min(icol + radius, width - 2)
+
+    for i in range(36):
+        hist[i] = 0.
+
+    for r in range(rmin, rmax + 1):
+        for c in range(cmin, cmax + 1):
+            gval = grad[r, c]
+            dif = r - row
+            distsq = dif * dif
+            dif = c - col
+            distsq = distsq + dif * dif
+            if gval > 0. and distsq < (<float> (radius * radius)) + 0.5:
+                bin_ = <int> (18. * (ori[r, c] + M_PI) / M_PI)
+                if bin_ < 0:
+                    bin_ = bin_ + 36
+                if bin_ > 35:
+                    bin_ = bin_ - 36
+                hist[bin_] = hist[bin_] + expf(
+                    - distsq / (2. * sigma * sigma)) * gval
+
+    # Smoothing 6 times for accurate Gaussian approximation
+    for j in range(6):
+        previous = hist[35]
+        for i in range(36):
+            temp = hist[i]
+            hist[i] = (previous + hist[i] + hist[(i + 1) % 36]) / 3.
+            previous = temp
+
+    maxval = 0.
+    argmax = 0
+    for i in range(36):
+        if maxval < hist[i]:
+            maxval = hist[i]
+            argmax = i
+
+    prev = 35 if argmax == 0 else argmax - 1
+    next_ = 0 if argmax == 35 else argmax + 1
+    hist_prev = hist[prev]
+    hist_next = hist[next_]
+    if maxval < 0.:
+        hist_prev = -hist_prev
+        maxval = -maxval
+        hist_next = -hist_next
+    interp = 0.5 * (hist_prev - hist_next) / (
+        hist_prev - 2. * maxval + hist_next)
+    angle = 2. * (argmax + 0.5 + interp) / 36.
+    angles[0] = (angle - 1.) * M_PI
+    count = 1
+
+    # Other peaks above 80% of the maximum
+    for i in range(36):
+        prev = 35 if i == 0 else i - 1
+        next_ = 0 if i == 35 else i + 1
+        hist_prev = hist[prev]
+        hist_curr = hist[i]
+        hist_next = hist[next_]
+        if (hist_curr > hist_prev and hist_curr > hist_next and
+                hist_curr >= 0.8 * maxval and i != argmax and
+                count < _MAX_ORIENTATIONS):
+            if hist_curr < 0.:
+                hist_prev = -hist_prev
+                hist_curr = -hist_curr
+                hist_next = -hist_next
+            interp = 0.5 * (hist_prev - hist_next) / (
+                hist_prev - 2. * hist_curr + hist_next)
+            angle = (i + 0.5 + interp) / 18.
+            if angle < 0.:
+                angle = angle + 2.
+            elif angle > 2.:
+                angle = angle - 2.
+            angles[count] = (angle - 1.) * M_PI
+            count = count + 1
+    return count
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def orientations(float[:, ::1] keypoints,
+                 float[:, ::1] grad,
+                 float[:, ::1] ori,
+                 float ori_sigma):
+    """Assign orientations to keypoints.
+
+    :param keypoints: Array of (value, row, column, sigma) of shape (N, 4)
+        in the coordinates of the octave
+    :param grad: Gradient norm of the scale of the keypoints
+    :param ori: Gradient orientation of the scale of the keypoints
+    :param float ori_sigma: Width of the orientation window
+        relative to the keypoint sigma
+    :return: (angles, counts): The orientations of each keypoint of
+        shape (N, 18) and the number of orientations of each keypoint,
+        the first orientation being the main one.
+    :rtype: List[numpy.ndarray]
+    """
+    cdef int nb_keypoints = keypoints.shape[0]
+    cdef float[:, ::1] angles = numpy.zeros(
+        (nb_keypoints, _MAX_ORIENTATIONS), dtype=numpy.float32)
+    cdef int[::1] counts = numpy.zeros((nb_keypoints,), dtype=numpy.int32)
+    cdef int index
+
+    for index in prange(nb_keypoints, nogil=True):
+        counts[index] = _orientation(
+            keypoints[index, 1], keypoints[index, 2], keypoints[index, 3],
+            grad, ori, ori_sigma, angles[index])
+
+    return numpy.asarray(angles), numpy.asarray(counts)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void _descriptor(float row,
+                      float col,
+                      float scale,
+                      float angle,
+                      float[:, ::1] grad,
+                      float[:, ::1] orim,
+                      unsigned char[:] descriptor) nogil:
+    """Compute the 128 values SIFT descriptor of a keypoint"""
+    cdef int height = grad.shape[0]
+    cdef int width = grad.shape[1]
+    cdef float desc[128]
+    cdef int i, j, r, c, orr, ri, ci, oi, rindex, cindex, oindex, intval
+    cdef bint changed
+    cdef float rx, cx, mag, ori, oval, rfrac, cfrac, ofrac
+    cdef float rweight, cweight, norm
+    cdef float sine = sinf(angle)
+    cdef float cosine = cosf(angle)
+    cdef float spacing = scale * 3.
+    cdef int irow = <int> (row + 0.5)
+    cdef int icol = <int> (col + 0.5)
+    cdef int iradius = <int> ((1.414 * spacing * 2.5) + 0.5)
+
+    for i in range(128):
+        desc[i] = 0.
+
+    for i in range(-iradius, iradius + 1):
+        for j in range(-iradius, iradius + 1):
+            rx = ((cosine * i - sine * j) - (row - irow)) / spacing + 1.5
+            cx = ((sine * i + cosine * j) - (col - icol)) / spacing + 1.5
+            if not (rx > -1. and rx < 4. and cx > -1. and cx < 4. and
+                    0 <= irow + i < height and 0 <= icol + j < width):
+                continue
+
+            mag = grad[irow + i, icol + j] * expf(
+                - 0.125 * ((rx - 1.5) * (rx - 1.5) + (cx - 1.5) * (cx - 1.5)))
+            ori = orim[irow + i, icol + j] - angle
+            while ori > 2. * M_PI:
+                ori = ori - 2. * M_PI
+            while ori < 0.:
+                ori = ori + 2. * M_PI
+
+            oval = 4. * ori / M_PI
+            ri = <int> (rx if rx >= 0. else rx - 1.)
+            ci = <int> (cx if cx >= 0. else cx - 1.)
+            oi = <int> (oval if oval >= 0. else oval - 1.)
+            rfrac = rx - ri
+            cfrac = cx - ci
+            ofrac = oval - oi
+            if not (ri >= -1 and ri < 4 and oi >= 0 and oi <= 8 and
+                    rfrac >= 0. and rfrac <= 1.):
+                continue
+
+            for r in range(2):
+                rindex = ri + r
+                if rindex < 0 or rindex >= 4:
+                    continue
+                rweight = mag * ((1. - rfrac) if r == 0 else rfrac)
+                for c in range(2):
+                    cindex = ci + c
+                    if cindex < 0 or cindex >= 4:
+                        continue
+                    cweight = rweight * ((1. - cfrac) if c == 0 else cfrac)
+                    for orr in range(2):
+                        oindex = oi + orr
+                        if oindex >= 8:  # Orientation wraps around at PI
+                            oindex = 0
+                        desc[(rindex * 4 + cindex) * 8 + oindex] += (
+                            cweight * ((1. - ofrac) if orr == 0 else ofrac))
+
+    # Normalization
+    norm = 0.
+    for i in range(128):
+        norm = norm + desc[i] * desc[i]
+    if norm > 0.:
+        norm = 1. / sqrtf(norm)
+    for i in range(128):
+        desc[i] = desc[i] * norm
+
+    # Threshold to 0.2 of the norm, for invariance to illumination
+    changed = False
+    norm = 0.
+    for i in range(128):
+        if desc[i] > 0.2:
+            desc[i] = 0.2
+            changed = True
+        norm = norm + desc[i] * desc[i]
+    if changed and norm > 0.:
+        norm = 1. / sqrtf(norm)
+        for i in range(128):
+            desc[i] = desc[i] * norm
+
+    for i in range(128):
+        intval = <int> (512. * desc[i])
+        descriptor[i] = <unsigned char> min(255, intval)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def descriptors(float[:, ::1] keypoints,
+                float[:, ::1] grad,
+                float[:, ::1] ori):
+    """Compute SIFT descriptors of keypoints.
+
+    :param keypoints: Array of (row, column, sigma, angle) of shape (N, 4)
+        in the coordinates of the octave
+    :param grad: Gradient norm of the scale of the keypoints
+    :param ori: Gradient orientation of the scale of the keypoints
+    :return: Descriptors as an array of uint8 of shape (N, 128)
+    :rtype: numpy.ndarray
+    """
+    cdef int nb_keypoints = keypoints.shape[0]
+    cdef unsigned char[:, ::1] result = numpy.zeros(
+        (nb_keypoints, 128), dtype=numpy.uint8)
+    cdef int index
+
+    for index in prange(nb_keypoints, nogil=True):
+        if keypoints[index, 0] > 0. and keypoints[index, 1] > 0.:
+            _descriptor(keypoints[index, 0], keypoints[index, 1],
+                        keypoints[index, 2], keypoints[index, 3],
+                        grad, ori, result[index])
+
+    return numpy.asarray(result)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def match(unsigned char[:, ::1] desc1,
+          unsigned char[:, ::1] desc2,
+          float ratio_th):
+    """Match two sets of descriptors.
+
+    For each descriptor of the first set, the closest descriptor (L1
+    distance) of the second set is a match if the ratio of the distances
+    to the closest and the second closest descriptors is below ratio_th.
+
+    :param desc1: First set of descriptors of shape (N1, 128)
+    :param desc2: Second set of descriptors of shape (N2, 128)
+    :param float ratio_th: Threshold on the ratio of distances
+    :return: Indices of matching descriptors of shape (N, 2)
+    :rtype: numpy.ndarray
+    """
+    cdef int size1 = desc1.shape[0]
+    cdef int size2 = desc2.shape[0]
+    cdef int[::1] closest = numpy.zeros((size1,), dtype=numpy.int32)
+    cdef unsigned char[::1] matching = numpy.zeros((size1,), dtype=numpy.uint8)
+    cdef int i, j, k, dist, current_min
+    cdef float dist1, dist2
+
+    for i in prange(size1, nogil=True):
+        dist1 = 3.4028234663852886e+38
+        dist2 = 3.4028234663852886e+38
+        current_min = 0
+        for j in range(size2):
+            dist = 0
+            for k in range(128):
+                if desc1[i, k] > desc2[j, k]:
+                    dist = dist + desc1[i, k] - desc2[j, k]
+                else:
+                    dist = dist + desc2[j, k] - desc1[i, k]
+            if dist < dist1:
+                dist2 = dist1
+                dist1 = dist
+                current_min = j
+            elif dist < dist2:
+                dist2 = dist
+        closest[i] = current_min
+        if dist2 != 0 and dist1 / dist2 < ratio_th:
+            matching[i] = 1
+
+    indices = numpy.nonzero(numpy.asarray(matching))[0]
+    result = numpy.empty((len(indices), 2), dtype=numpy.int32)
+    result[:, 0] = indices
+    result[:, 1] = numpy.asarray(closest)[indices]
+    return result
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def transform(float[:, ::1] image,
+              float[:, ::1] matrix,
+              float[::1] offset,
+              int output_height,
+              int output_width,
+              float fill):
+    """Apply an affine transformation with bilinear interpolation.
+
+    The input position of output pixel (y, x) is
+    (matrix[0, 0] * y + matrix[0, 1] * x + offset[0],
+    matrix[1, 0] * y + matrix[1, 1] * x + offset[1]).
+
+    :param image: 2D image to transform
+    :param matrix: 2x2 transformation matrix
+    :param offset: Offset (y, x)
+    :param int output_height: Height of the result
+    :param int output_width: Width of the result
+    :param float fill: Value of pixels which fall outside the input
+    :return: The transformed image
+    :rtype: numpy.ndarray
+    """
+    cdef int height = image.shape[0]
+    cdef int width = image.shape[1]
+    cdef float[:, ::1] result = numpy.empty(
+        (output_height, output_width), dtype=numpy.float32)
+    cdef int row, col, tx_prev, tx_next, ty_prev, ty_next
+    cdef float tx, ty, value, image_p, image_x, image_y, image_n
+    cdef float m00 = matrix[0, 0], m01 = matrix[0, 1]
+    cdef float m10 = matrix[1, 0], m11 = matrix[1, 1]
+
+    for row in prange(output_height, nogil=True):
+        for col in range(output_width):
+            tx = m10 * row + m11 * col + offset[1]
+            ty = m00 * row + m01 * col + offset[0]
+
+            value = fill
+            if (0. <= tx and tx < width - 1. and
+                    0. <= ty and ty < height - 1.):
+                tx_prev = <int> tx
+                tx_next = tx_prev + 1
+                ty_prev = <int> ty
+                ty_next = ty_prev + 1
+
+                image_p = image[ty_prev, tx_prev]
+                image_x = image[ty_prev, tx_next]
+                image_y = image[ty_next, tx_prev]
+                image_n = image[ty_next, tx_next]
+
+                value = ((ty_next - ty) * ((tx_next - tx) * image_p +
+                                           (tx - tx_prev) * image_x) +
+                         (ty - ty_prev) * ((tx_next - tx) * image_y +
+                                           (tx - tx_prev) * image_n))
+            result[row, col] = value
+
+    return numpy.asarray(result)
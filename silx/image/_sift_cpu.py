@@ -0,0 +1,508 @@
+# coding: utf-8
+# /*##########################################################################
+#
+# Copyright (c) 2018 European Synchrotron Radiation Facility
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# ###########################################################################*/
+"""CPU implementation of SIFT keypoints extraction, matching and image
+alignment.
+
+The classes of this module provide the same API as their OpenCL counterparts
+in :mod:`silx.opencl.sift`, but work on :class:`numpy.ndarray`.
+OpenCL-specific constructor arguments are accepted and ignored.
+"""
+
+from __future__ import absolute_import, division
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/10/2018"
+
+import logging
+import math
+import threading
+import numpy
+
+from silx.opencl.sift.param import par
+from silx.opencl.sift.utils import kernel_size, matching_correction
+from . import _sift
+
+try:
+    import feature
+except ImportError:
+    feature = None
+
+
+logger = logging.getLogger(__name__)
+
+
+_DTYPE_KP = numpy.dtype([('x', numpy.float32),
+                         ('y', numpy.float32),
+                         ('scale', numpy.float32),
+                         ('angle', numpy.float32),
+                         ('desc', (numpy.uint8, 128))
+                         ])
+
+
+def _gaussian(sigma):
+    """Returns a normalized Gaussian kernel of width sigma
+
+    :param float sigma: Width of the Gaussian
+    :rtype: numpy.ndarray
+    """
+    size = kernel_size(sigma, True)
+    x = numpy.arange(size) - (size - 1.0) / 2.0
+    gaussian = numpy.exp(-(x / sigma) ** 2 / 2.0).astype(numpy.float32)
+    gaussian /= gaussian.sum(dtype=numpy.float32)
+    return gaussian
+
+
+class SiftPlan(object):
+    """This class implements a way to calculate SIFT keypoints on the CPU.
+
+    How to calculate a set of SIFT keypoint on an image::
+
+        siftp = sift.SiftPlan(img.shape, img.dtype)
+        kp = siftp.keypoints(img)
+
+    kp is a record array of keypoints with x, y, scale, angle and a
+    128 bytes descriptor.
+
+    :param shape: shape of the input image
+    :param dtype: data type of the input image
+    :param template: extract shape and dtype from an image
+    :param init_sigma: blurring width, you should have good reasons to modify
+                       the 1.6 default value...
+    """
+
+    sigmaRatio = 2.0 ** (1.0 / par.Scales)
+    dtype_kp = _DTYPE_KP
+
+    def __init__(self, shape=None, dtype=None, template=None,
+                 PIX_PER_KP=None, init_sigma=None,
+                 ctx=None, devicetype="all", platformid=None, deviceid=None,
+                 block_size=None, memory=None, profile=False):
+        if template is not None:
+            self.shape = template.shape
+            self.dtype = template.dtype
+        else:
+            self.shape = shape
+            self.dtype = numpy.dtype(dtype)
+        if len(self.shape) == 3:
+            self.RGB = True
+            self.shape = self.shape[:2]
+        elif len(self.shape) == 2:
+            self.RGB = False
+        else:
+            raise RuntimeError("Unable to process image of shape %s" % (tuple(self.shape,)))
+        self.shape = tuple(self.shape)
+
+        if init_sigma is None:
+            init_sigma = par.InitSigma
+        self._init_sigma = float(init_sigma)
+        self.sem = threading.Semaphore()
+        self.min = None
+        """Minimum of the last processed image, before normalization"""
+
+        self.scales = []  # in XY order
+        self.octave_max = None
+        self._calc_scales()
+
+        self._kernels = {}
+        curSigma = 1.0 if par.DoubleImSize else 0.5
+        if self._init_sigma > curSigma:
+            sigma = math.sqrt(self._init_sigma ** 2 - curSigma ** 2)
+            self._kernels[sigma] = _gaussian(sigma)
+        prevSigma = self._init_sigma
+        for _ in range(par.Scales + 2):
+            increase = prevSigma * math.sqrt(self.sigmaRatio ** 2 - 1.0)
+            self._kernels[increase] = _gaussian(increase)
+            prevSigma *= self.sigmaRatio
+
+    def _calc_scales(self):
+        """
+        Nota scales are in XY order
+        """
+        shape = self.shape[-1::-1]
+        self.scales = [tuple(numpy.int32(i) for i in shape)]
+        min_size = 2 * par.BorderDist + 2
+        while min(shape) > min_size:
+            shape = tuple(numpy.int32(i // 2) for i in shape)
+            self.scales.append(shape)
+        self.scales.pop()
+        self.octave_max = len(self.scales)
+
+    def _preprocess(self, image):
+        """Convert the image to a normalized float32 image.
+
+        :param numpy.ndarray image: 2D image or 3D if RGB
+        :rtype: numpy.ndarray
+        """
+        if self.RGB and image.ndim == 3 and image.dtype == numpy.uint8:
+            data = (0.299 * image[..., 0].astype(numpy.float32) +
+                    0.587 * image[..., 1].astype(numpy.float32) +
+                    0.114 * image[..., 2].astype(numpy.float32))
+            data = data.astype(numpy.float32)
+        else:
+            data = numpy.array(image, dtype=numpy.float32, copy=True)
+
+        self.min = numpy.float32(data.min())
+        maxi = data.max()
+        if maxi > self.min:
+            data -= self.min
+            data *= numpy.float32(255.0 / (maxi - self.min))
+        else:
+            data[:] = 0
+        return numpy.ascontiguousarray(data)
+
+    def keypoints(self, image, mask=None):
+        """Calculates the keypoints of the image
+
+        :param image: ndimage of 2D (or 3D if RGB)
+        :param mask: TODO: implement a mask for sieving out the keypoints
+        :return: vector of keypoint (1D numpy array)
+        """
+        with self.sem:
+            assert image.shape[:2] == self.shape
+            data = self._preprocess(image)
+
+            curSigma = 1.0 if par.DoubleImSize else 0.5
+            if self._init_sigma > curSigma:
+                logger.debug("Bluring image to achieve std: %f", self._init_sigma)
+                sigma = math.sqrt(self._init_sigma ** 2 - curSigma ** 2)
+                data = _sift.gaussian_blur(data, self._kernels[sigma])
+
+            keypoints = []
+            descriptors = []
+            for octave in range(self.octave_max):
+                kp, desc, data = self._one_octave(octave, data)
+                logger.info("in octave %i found %i kp", octave, kp.shape[0])
+                if len(kp):
+                    # sieve out coordinates with NaNs
+                    mask = numpy.logical_not(numpy.isnan(kp.sum(axis=-1)))
+                    keypoints.append(kp[mask])
+                    descriptors.append(desc[mask])
+
+            total_size = sum(kp.shape[0] for kp in keypoints)
+            output = numpy.recarray(shape=(total_size,), dtype=self.dtype_kp)
+            last = 0
+            for kp, desc in zip(keypoints, descriptors):
+                size = kp.shape[0]
+                output[last:last + size].x = kp[:, 0]
+                output[last:last + size].y = kp[:, 1]
+                output[last:last + size].scale = kp[:, 2]
+                output[last:last + size].angle = kp[:, 3]
+                output[last:last + size].desc = desc
+                last += size
+        return output
+
+    __call__ = keypoints
+
+    def _one_octave(self, octave, data):
+        """Does all scales within an octave
+
+        Pixels and keypoints are processed in parallel within each step,
+        octaves and scales are processed in sequence as each one depends
+        on the previous one.
+
+        :param int octave: number of the octave
+        :param numpy.ndarray data: First scale of the octave
+        :return: (keypoints as (x, y, scale, angle), descriptors,
+            first scale of the next octave)
+        """
+        octsize = 2 ** octave
+        prevSigma = self._init_sigma
+        scales = [data]
+        for scale in range(par.Scales + 2):
+            sigma = prevSigma * math.sqrt(self.sigmaRatio ** 2 - 1.0)
+            scales.append(_sift.gaussian_blur(scales[-1], self._kernels[sigma]))
+            prevSigma *= self.sigmaRatio
+        stack = numpy.array(scales)
+        dogs = numpy.ascontiguousarray(stack[:-1] - stack[1:])
+
+        edge_thresh = par.EdgeThresh1 if octsize <= 1 else par.EdgeThresh
+        keypoints = []
+        descriptors = []
+        for scale in range(1, par.Scales + 1):
+            rows, cols = _sift.local_extrema(
+                dogs, scale, par.BorderDist, par.PeakThresh, edge_thresh)
+            if len(rows) == 0:
+                continue
+            raw_kp = _sift.interpolate_keypoints(
+                dogs, scale, rows, cols,
+                par.PeakThresh, self._init_sigma, par.Scales)
+            raw_kp = numpy.ascontiguousarray(raw_kp[raw_kp[:, 1] >= 0])
+            if len(raw_kp) == 0:
+                continue
+
+            grad, ori = _sift.gradient_orientation(scales[scale])
+            angles, counts = _sift.orientations(raw_kp, grad, ori, par.OriSigma)
+
+            # Main orientations first, then extra orientations
+            indices = numpy.concatenate(
+                [numpy.arange(len(raw_kp))] +
+                [numpy.nonzero(counts > i)[0] for i in range(1, angles.shape[1])])
+            angle_indices = numpy.concatenate(
+                [numpy.zeros(len(raw_kp), dtype=numpy.int64)] +
+                [numpy.full(numpy.count_nonzero(counts > i), i, dtype=numpy.int64)
+                 for i in range(1, angles.shape[1])])
+            kp = numpy.empty((len(indices), 4), dtype=numpy.float32)
+            kp[:, 0] = raw_kp[indices, 1]  # row
+            kp[:, 1] = raw_kp[indices, 2]  # col
+            kp[:, 2] = raw_kp[indices, 3]  # sigma
+            kp[:, 3] = angles[indices, angle_indices]
+            descriptors.append(_sift.descriptors(kp, grad, ori))
+
+            # Back to image coordinates in (x, y, scale, angle) order
+            kp[:, 0], kp[:, 1] = kp[:, 1] * octsize, kp[:, 0] * octsize
+            kp[:, 2] *= octsize
+            keypoints.append(kp)
+
+        if octave < self.octave_max - 1:
+            width, height = self.scales[octave + 1]
+            data = numpy.ascontiguousarray(
+                scales[par.Scales][:2 * height:2, :2 * width:2])
+        else:
+            data = None
+
+        if keypoints:
+            return numpy.concatenate(keypoints), numpy.concatenate(descriptors), data
+        else:
+            return (numpy.empty((0, 4), dtype=numpy.float32),
+                    numpy.empty((0, 128), dtype=numpy.uint8),
+                    data)
+
+
+class MatchPlan(object):
+    """Plan to compare sets of SIFT keypoint and find common ones on the CPU.
+
+    .. code-block:: python
+
+        siftp = sift.MatchPlan()
+        commonkp = siftp.match(kp1,kp2)
+
+    where kp1, kp2 are record arrays of keypoints as returned by
+    :meth:`SiftPlan.keypoints`. commonkp is mx2 array of matching keypoints.
+    """
+
+    dtype_kp = _DTYPE_KP
+
+    def __init__(self, size=16384, devicetype="ALL", profile=False, device=None,
+                 block_size=None, roi=None, ctx=None):
+        self.sem = threading.Semaphore()
+        self.roi = None
+        if roi:
+            self.set_roi(roi)
+
+    def match(self, nkp1, nkp2, raw_results=False):
+        """Calculate the matching of 2 keypoint list
+
+        :param nkp1: numpy 1D recarray of keypoints
+        :param nkp2: numpy 1D recarray of keypoints
+        :param raw_results: if true return the 2D array of indexes of
+                            matching keypoints (not the actual keypoints)
+        """
+        assert len(nkp1.shape) == 1
+        assert len(nkp2.shape) == 1
+        with self.sem:
+            desc1 = numpy.ascontiguousarray(nkp1.desc, dtype=numpy.uint8)
+            desc2 = numpy.ascontiguousarray(nkp2.desc, dtype=numpy.uint8)
+            match = _sift.match(desc1, desc2, par.MatchRatio * par.MatchRatio)
+        if raw_results:
+            return match
+        result = numpy.recarray(shape=(len(match), 2), dtype=self.dtype_kp)
+        result[:, 0] = nkp1[match[:, 0]]
+        result[:, 1] = nkp2[match[:, 1]]
+        return result
+
+    __call__ = match
+
+    def set_roi(self, roi):
+        """Defines the region of interest
+
+        :param roi: region of interest as 2D numpy array with non zero where
+                    valid pixels are
+        """
+        with self.sem:
+            self.roi = numpy.ascontiguousarray(roi, numpy.int8)
+
+    def unset_roi(self):
+        """Unset the region of interest
+        """
+        with self.sem:
+            self.roi = None
+
+
+class LinearAlign(object):
+    """Align images on a reference image based on an afine transformation
+    (bi-linear + offset) on the CPU
+
+    :param image: reference image on which other image should be aligned
+    :param mask: masked out region of the image
+    :param extra: extra space around the image, can be an integer,
+                  or a 2 tuple in YX convention
+    :param init_sigma: blurring width, you should have good reasons to modify
+                       the 1.6 default value...
+    """
+
+    def __init__(self, image, mask=None, extra=0, init_sigma=None,
+                 ctx=None, devicetype="all", platformid=None, deviceid=None,
+                 block_size=None, profile=False):
+        self.ref = numpy.ascontiguousarray(image)
+        self.shape = image.shape
+        if len(self.shape) == 3:
+            self.RGB = True
+            self.shape = self.shape[:2]
+        elif len(self.shape) == 2:
+            self.RGB = False
+        else:
+            raise RuntimeError("Unable to process image of shape %s" % (tuple(self.shape,)))
+        if "__len__" not in dir(extra):
+            self.extra = (int(extra), int(extra))
+        else:
+            self.extra = extra[:2]
+        self.outshape = tuple(i + 2 * j for i, j in zip(self.shape, self.extra))
+        self.mask = mask
+        self.sift = SiftPlan(template=image, init_sigma=init_sigma)
+        self.ref_kp = self._mask_keypoints(self.sift.keypoints(image))
+        self.match = MatchPlan()
+        self.sem = threading.Semaphore()
+        self.relative_transfo = None
+
+    def _mask_keypoints(self, keypoints):
+        """Remove keypoints outside the mask if any"""
+        if self.mask is None:
+            return keypoints
+        kpx = numpy.round(keypoints.x).astype(numpy.int32)
+        kpy = numpy.round(keypoints.y).astype(numpy.int32)
+        masked = self.mask[(kpy, kpx)].astype(bool)
+        logger.warning("Reducing keypoint list from %i to %i because of the ROI" % (keypoints.size, masked.sum()))
+        return keypoints[masked]
+
+    def _transform(self, image, matrix, offset):
+        """Apply the affine transformation to a 2D image"""
+        return _sift.transform(numpy.ascontiguousarray(image, dtype=numpy.float32),
+                               numpy.ascontiguousarray(matrix, dtype=numpy.float32),
+                               numpy.ascontiguousarray(offset, dtype=numpy.float32).ravel(),
+                               self.outshape[0], self.outshape[1],
+                               self.sift.min)
+
+    def align(self, img, shift_only=False, return_all=False, double_check=False, relative=False, orsa=False):
+        """
+        Align image on reference image
+
+        :param img: numpy array containing the image to align to reference
+        :param return_all: return in addition ot the image, keypoints, matching keypoints, and transformations as a dict
+        :param relative: update reference keypoints with those from current image to perform relative alignment
+        :return: aligned image, or all informations, or None if no matching keypoints
+        """
+        logger.debug("ref_keypoints: %s" % self.ref_kp.size)
+        if self.RGB:
+            data = numpy.ascontiguousarray(img, numpy.uint8)
+        else:
+            data = numpy.ascontiguousarray(img, numpy.float32)
+        with self.sem:
+            kp = self.sift.keypoints(data)
+            logger.debug("mod image keypoints: %s" % kp.size)
+            raw_matching = self.match.match(self.ref_kp, kp, raw_results=True)
+
+            matching = numpy.recarray(shape=raw_matching.shape, dtype=MatchPlan.dtype_kp)
+            len_match = raw_matching.shape[0]
+            if len_match == 0:
+                logger.warning("No matching keypoints")
+                return None
+            matching[:, 0] = self.ref_kp[raw_matching[:, 0]]
+            matching[:, 1] = kp[raw_matching[:, 1]]
+
+            if orsa:
+                if feature:
+                    matching = feature.sift_orsa(matching, self.shape, 1)
+                else:
+                    logger.warning("feature is not available. No ORSA filtering")
+
+            if (len_match < 3 * 6) or (shift_only):  # 3 points per DOF
+                if shift_only:
+                    logger.debug("Shift Only mode: Common keypoints: %s" % len_match)
+                else:
+                    logger.warning("Shift Only mode: Common keypoints: %s" % len_match)
+                dx = matching[:, 1].x - matching[:, 0].x
+                dy = matching[:, 1].y - matching[:, 0].y
+                matrix = numpy.identity(2, dtype=numpy.float32)
+                offset = numpy.array([+numpy.median(dy), +numpy.median(dx)], numpy.float32)
+            else:
+                logger.debug("Common keypoints: %s" % len_match)
+                matrix, offset = self._linear_transformation(matching)
+
+            if double_check and (len_match >= 3 * 6):
+                logger.warning("Validating keypoints, %s,%s" % (matrix, offset))
+                dx = matching[:, 1].x - matching[:, 0].x
+                dy = matching[:, 1].y - matching[:, 0].y
+                dangle = matching[:, 1].angle - matching[:, 0].angle
+                dscale = numpy.log(matching[:, 1].scale / matching[:, 0].scale)
+                distance = numpy.sqrt(dx * dx + dy * dy)
+                outlayer = numpy.zeros(distance.shape, numpy.int8)
+                outlayer += abs((distance - distance.mean()) / distance.std()) > 4
+                outlayer += abs((dangle - dangle.mean()) / dangle.std()) > 4
+                outlayer += abs((dscale - dscale.mean()) / dscale.std()) > 4
+                outlayersum = outlayer.sum()
+                if outlayersum > 0 and not numpy.isinf(outlayersum):
+                    matrix, offset = self._linear_transformation(
+                        matching[outlayer == 0])
+
+            if relative:  # update stable part to perform a relative alignment
+                self.ref_kp = self._mask_keypoints(kp)
+                transfo = numpy.zeros((3, 3), dtype=numpy.float64)
+                transfo[:2, :2] = matrix
+                transfo[0, 2] = offset[0]
+                transfo[1, 2] = offset[1]
+                transfo[2, 2] = 1
+                if self.relative_transfo is None:
+                    self.relative_transfo = transfo
+                else:
+                    self.relative_transfo = numpy.dot(transfo, self.relative_transfo)
+                matrix = numpy.ascontiguousarray(self.relative_transfo[:2, :2], dtype=numpy.float32)
+                offset = numpy.ascontiguousarray(self.relative_transfo[:2, 2], dtype=numpy.float32)
+
+            if self.RGB:
+                result = numpy.empty(self.outshape + (3,), dtype=numpy.uint8)
+                for channel in range(3):
+                    transformed = self._transform(data[..., channel], matrix, offset)
+                    result[..., channel] = numpy.clip(transformed, 0, 255)
+            else:
+                result = self._transform(data, matrix, offset)
+
+        if return_all:
+            corr = numpy.dot(matrix, numpy.vstack((matching[:, 0].y, matching[:, 0].x))).T + offset.T - numpy.vstack((matching[:, 1].y, matching[:, 1].x)).T
+            rms = numpy.sqrt((corr * corr).sum(axis=-1).mean())
+            return {"result": result, "keypoint": kp, "matching": matching, "offset": offset, "matrix": matrix, "rms": rms}
+        return result
+
+    __call__ = align
+
+    @staticmethod
+    def _linear_transformation(matching):
+        """Returns the (matrix, offset) fitted on matching keypoints"""
+        transform_matrix = matching_correction(matching)
+        offset = numpy.array([transform_matrix[5], transform_matrix[2]], dtype=numpy.float32)
+        matrix = numpy.empty((2, 2), dtype=numpy.float32)
+        matrix[0, 0], matrix[0, 1] = transform_matrix[4], transform_matrix[3]
+        matrix[1, 0], matrix[1, 1] = transform_matrix[1], transform_matrix[0]
+        return matrix, offset
@@ -22,4 +22,28 @@
 #
 # ############################################################################*/
 
-from silx.opencl.backprojection import *
+"""This module provides the (filtered) backprojection :class:`Backprojection`.
+
+The OpenCL implementation from :mod:`silx.opencl.backprojection` is used if an
+OpenCL device is available, otherwise a CPU implementation is used.
+OpenCL platforms are only described when a :class:`Backprojection` is
+created.
+"""
+
+from silx.opencl.common import ocl
+
+
+class Backprojection(object):
+    """(Filtered) backprojection of sinograms.
+
+    This creates an instance of :class:`silx.opencl.backprojection.Backprojection`
+    if an OpenCL device is available, or of its CPU counterpart otherwise.
+    See :class:`silx.opencl.backprojection.Backprojection` for arguments.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        if ocl:
+            from silx.opencl.backprojection import Backprojection as _Class
+        else:
+            from ._reconstruction_cpu import Backprojection as _Class
+        return _Class(*args, **kwargs)
@@ -25,16 +25,187 @@
 
 __authors__ = ["J. Kieffer"]
 __license__ = "MIT"
-__date__ = "15/09/2016"
+__date__ = "18/10/2018"
 __doc__ = "Bilinear interpolator, peak finder, line-profile for images"
 
 import cython
 from cython.view cimport array as cvarray
+from cython.parallel import prange
+import multiprocessing
 import numpy
-from libc.math cimport floor, ceil, sin, cos, sqrt, atan2
+from libc.math cimport floor, ceil, sin, cos, sqrt, atan2, fabs
 import logging
 logger = logging.getLogger(__name__)
 
+include "../utils/_have_openmp.pxi"
+"""Store in the module if it was compiled with OpenMP"""
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef float _interpolate_linear(const float *data, int height, int width,
+                               float x, float y) nogil:
+    """Bilinear interpolation of an image (nearest for outside)
+
+    :param data: Pointer to the C-contiguous image
+    :param int height: Height of the image
+    :param int width: Width of the image
+    :param x (float): column coordinate
+    :param y (float): row coordinate
+    """
+    cdef:
+        float d0 = min(max(y, 0.0), (height - 1.0))
+        float d1 = min(max(x, 0.0), (width - 1.0))
+        int i0, i1, j0, j1
+        float x0, x1, y0, y1, res
+
+    x0 = floor(d0)
+    x1 = ceil(d0)
+    y0 = floor(d1)
+    y1 = ceil(d1)
+    i0 = < int > x0
+    i1 = < int > x1
+    j0 = < int > y0
+    j1 = < int > y1
+    if (i0 == i1) and (j0 == j1):
+        res = data[i0 * width + j0]
+    elif i0 == i1:
+        res = (data[i0 * width + j0] * (y1 - d1)) + (data[i0 * width + j1] * (d1 - y0))
+    elif j0 == j1:
+        res = (data[i0 * width + j0] * (x1 - d0)) + (data[i1 * width + j0] * (d0 - x0))
+    else:
+        res = (data[i0 * width + j0] * (x1 - d0) * (y1 - d1))  \
+            + (data[i1 * width + j0] * (d0 - x0) * (y1 - d1))  \
+            + (data[i0 * width + j1] * (x1 - d0) * (d1 - y0))  \
+            + (data[i1 * width + j1] * (d0 - x0) * (d1 - y0))
+    return res
+
+
+cdef inline float _cubic_weight(float t) nogil:
+    """Keys cubic convolution kernel with a=-0.5"""
+    t = fabs(t)
+    if t <= 1.0:
+        return (1.5 * t - 2.5) * t * t + 1.0
+    elif t < 2.0:
+        return ((-0.5 * t + 2.5) * t - 4.0) * t + 2.0
+    else:
+        return 0.0
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef float _interpolate(const float *data, int height, int width,
+                        int order, float x, float y) nogil:
+    """Interpolation of an image (nearest for outside)
+
+    :param data: Pointer to the C-contiguous image
+    :param int height: Height of the image
+    :param int width: Width of the image
+    :param int order: 0 for nearest, 1 for bilinear, 3 for cubic
+    :param x (float): column coordinate
+    :param y (float): row coordinate
+    """
+    cdef:
+        float d0, d1, w0, res
+        int i0, j0, i, j, m, n
+
+    if order == 1:
+        return _interpolate_linear(data, height, width, x, y)
+
+    d0 = min(max(y, 0.0), (height - 1.0))
+    d1 = min(max(x, 0.0), (width - 1.0))
+    if order == 0:
+        i0 = < int > floor(d0 + 0.5)
+        j0 = < int > floor(d1 + 0.5)
+        return data[min(i0, height - 1) * width + min(j0, width - 1)]
+
+    # Cubic convolution with edge pixels replicated
+    i0 = < int > floor(d0)
+    j0 = < int > floor(d1)
+    res = 0.0
+    for m in range(-1, 3):
+        i = min(max(i0 + m, 0), height - 1)
+        w0 = _cubic_weight(d0 - (i0 + m))
+        if w0 == 0.0:
+            continue
+        for n in range(-1, 3):
+            j = min(max(j0 + n, 0), width - 1)
+            res = res + w0 * _cubic_weight(d1 - (j0 + n)) * data[i * width + j]
+    return res
+
+
+cdef int _profile_length(float src_row, float src_col,
+                         float dst_row, float dst_col) nogil:
+    """Returns the number of points of a line profile"""
+    cdef float d_row = dst_row - src_row
+    cdef float d_col = dst_col - src_col
+    if d_row == 0 and d_col == 0:
+        return 1
+    return <int> ceil(sqrt(d_row * d_row + d_col * d_col) + 1)
+
+
+@cython.cdivision(True)
+cdef void _profile(const float *data, int height, int width, int order,
+                   float src_row, float src_col,
+                   float dst_row, float dst_col,
+                   int linewidth, float *result) nogil:
+    """Compute the intensity profile of an image along a scan line.
+
+    See :meth:`BilinearImage.profile_line`.
+
+    :param result: Buffer where to store the profile.
+        It must have the size returned by :func:`_profile_length`.
+    """
+    cdef:
+        float d_row, d_col, length, col_width, row_width
+        float sum, row, col, new_row, new_col
+        int lengt, i, j, cnt
+
+    d_row = dst_row - src_row
+    d_col = dst_col - src_col
+    if d_row == 0 and d_col == 0:
+        result[0] = _interpolate(data, height, width, order, src_col, src_row)
+        return
+
+    # Offsets to deal with linewidth
+    length = sqrt(d_row * d_row + d_col * d_col)
+    row_width = d_col / length
+    col_width = - d_row / length
+
+    lengt = <int> ceil(length + 1)
+    d_row /= <float> (lengt -1)
+    d_col /= <float> (lengt -1)
+
+    # Offset position to the center of the bottom pixels of the profile
+    src_row -= row_width * (linewidth - 1) / 2.
+    src_col -= col_width * (linewidth - 1) / 2.
+
+    for i in range(lengt):
+        sum = 0
+        cnt = 0
+
+        row = src_row + i * d_row
+        col = src_col + i * d_col
+
+        for j in range(linewidth):
+            new_row = row + j * row_width
+            new_col = col + j * col_width
+            if ((new_col >= 0) and (new_col < width) and
+                    (new_row >= 0) and (new_row < height)):
+                cnt = cnt + 1
+                sum = sum + _interpolate(
+                    data, height, width, order, new_col, new_row)
+        if cnt:
+            result[i] = sum / cnt
+        else:
+            result[i] = 0
+
+
+def _check_order(int order):
+    """Raise ValueError if interpolation order is not supported"""
+    if order not in (0, 1, 3):
+        raise ValueError("Unsupported interpolation order: %d" % order)
+
 
 cdef class BilinearImage:
     """Bilinear interpolator for images ... or any data on a regular grid
@@ -85,32 +256,8 @@ cdef class BilinearImage:
 
         Cython only function due to NOGIL
         """
-        cdef:
-            float d0 = min(max(y, 0.0), (self.height - 1.0))
-            float d1 = min(max(x, 0.0), (self.width - 1.0))
-            int i0, i1, j0, j1
-            float x0, x1, y0, y1, res
-
-        x0 = floor(d0)
-        x1 = ceil(d0)
-        y0 = floor(d1)
-        y1 = ceil(d1)
-        i0 = < int > x0
-        i1 = < int > x1
-        j0 = < int > y0
-        j1 = < int > y1
-        if (i0 == i1) and (j0 == j1):
-            res = self.data[i0, j0]
-        elif i0 == i1:
-            res = (self.data[i0, j0] * (y1 - d1)) + (self.data[i0, j1] * (d1 - y0))
-        elif j0 == j1:
-            res = (self.data[i0, j0] * (x1 - d0)) + (self.data[i1, j0] * (d0 - x0))
-        else:
-            res = (self.data[i0, j0] * (x1 - d0) * (y1 - d1))  \
-                + (self.data[i1, j0] * (d0 - x0) * (y1 - d1))  \
-                + (self.data[i0, j1] * (x1 - d0) * (d1 - y0))  \
-                + (self.data[i1, j1] * (d0 - x0) * (d1 - y0))
-        return res
+        return _interpolate_linear(&self.data[0, 0], self.height, self.width,
+                                   x, y)
 
     @cython.boundscheck(False)
     @cython.wraparound(False)
@@ -247,28 +394,33 @@ cdef class BilinearImage:
         return self.width * current0 + current1
 
     @cython.boundscheck(False)
-    def map_coordinates(self, coordinates):
+    def map_coordinates(self, coordinates, int order=1):
         """Map coordinates of the array on the image
 
         :param coordinates: 2-tuple of array of the same size (row_array, column_array)
+        :param int order: Interpolation order:
+            0 for nearest, 1 for bilinear (default), 3 for cubic
         :return: array of values at given coordinates
         """
         cdef:
             float[:] d0, d1, res
-            size_t size, i
+            Py_ssize_t size, i
+            int height = self.height
+            int width = self.width
+        _check_order(order)
         shape = coordinates[0].shape
         size = coordinates[0].size
         d0 = numpy.ascontiguousarray(coordinates[0].ravel(), dtype=numpy.float32)
         d1 = numpy.ascontiguousarray(coordinates[1].ravel(), dtype=numpy.float32)
         assert size == d1.size
         res = numpy.empty(size, dtype=numpy.float32)
-        with nogil:
-            for i in range(size):
-                res[i] = self.c_funct(d1[i], d0[i])
+        for i in prange(size, nogil=True):
+            res[i] = _interpolate(&self.data[0, 0], height, width, order,
+                                  d1[i], d0[i])
         return numpy.asarray(res).reshape(shape)
 
     @cython.boundscheck(False)
-    def profile_line(self, src, dst, int linewidth=1):
+    def profile_line(self, src, dst, int linewidth=1, int order=1):
         """Return the intensity profile of an image measured along a scan line.
 
         :param src: The start point of the scan line.
@@ -278,6 +430,8 @@ cdef class BilinearImage:
             in contrast to standard numpy indexing.
         :type dst: 2-tuple of numeric scalar
         :param int linewidth: Width of the scanline (unit image pixel).
+        :param int order: Interpolation order:
+            0 for nearest, 1 for bilinear (default), 3 for cubic
         :return: The intensity profile along the scan line.
             The length of the profile is the ceil of the computed length
             of the scan line.
@@ -286,50 +440,132 @@ cdef class BilinearImage:
         Inspired from skimage
         """
         cdef:
-            float src_row, src_col, dst_row, dst_col, d_row, d_col
-            float length, col_width, row_width, sum, row, col, new_row, new_col
-            int lengt, i, j, cnt
+            float src_row, src_col, dst_row, dst_col
             float[::1] result
+        _check_order(order)
         src_row, src_col = src
         dst_row, dst_col = dst
         if (src_row == dst_row) and (src_col == dst_col):
             logger.warning("Source and destination points are the same")
-            return numpy.array([self.c_funct(src_col, src_row)])
-        d_row = dst_row - src_row
-        d_col = dst_col - src_col
-
-        # Offsets to deal with linewidth
-        length = sqrt(d_row * d_row + d_col * d_col)
-        row_width = d_col / length
-        col_width = - d_row / length
-
-        lengt = <int> ceil(length + 1)
-        d_row /= <float> (lengt -1)
-        d_col /= <float> (lengt -1)
 
-        result = numpy.zeros(lengt, dtype=numpy.float32)
-
-        # Offset position to the center of the bottom pixels of the profile
-        src_row -= row_width * (linewidth - 1) / 2.
-        src_col -= col_width * (linewidth - 1) / 2.
+        result = numpy.zeros(
+            _profile_length(src_row, src_col, dst_row, dst_col),
+            dtype=numpy.float32)
 
         with nogil:
-            for i in range(lengt):
-                sum = 0
-                cnt = 0
-
-                row = src_row + i * d_row
-                col = src_col + i * d_col
-
-                for j in range(linewidth):
-                    new_row = row + j * row_width
-                    new_col = col + j * col_width
-                    if ((new_col >= 0) and (new_col < self.width) and
-                            (new_row >= 0) and (new_row < self.height)):
-                        cnt = cnt + 1
-                        sum = sum + self.c_funct(new_col, new_row)
-                if cnt:
-                    result[i] += sum / cnt
+            _profile(&self.data[0, 0], self.height, self.width, order,
+                     src_row, src_col, dst_row, dst_col,
+                     linewidth, &result[0])
 
         # Ensures the result is exported as numpy array and not memory view.
         return numpy.asarray(result)
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    def profile_lines(self, srcs, dsts, linewidths=1, int order=1):
+        """Return the intensity profiles of an image along many scan lines.
+
+        Profiles are computed in parallel.
+        See :meth:`profile_line`.
+
+        :param srcs: The start points of the scan lines as (row, column)
+        :type srcs: Nx2 array of numeric scalar
+        :param dsts: The end points of the scan lines as (row, column)
+        :type dsts: Nx2 array of numeric scalar
+        :param linewidths: Width of the scanlines (unit image pixel)
+        :type linewidths: int or sequence of N int
+        :param int order: Interpolation order:
+            0 for nearest, 1 for bilinear (default), 3 for cubic
+        :return: The intensity profiles along the scan lines
+        :rtype: List of N 1d array
+        """
+        cdef:
+            float[:, ::1] c_srcs, c_dsts
+            int[::1] c_linewidths
+            Py_ssize_t[::1] offsets
+            float[::1] result
+            int nlines, index
+            int height = self.height
+            int width = self.width
+        _check_order(order)
+        c_srcs = numpy.array(srcs, dtype=numpy.float32, ndmin=2, order='C')
+        c_dsts = numpy.array(dsts, dtype=numpy.float32, ndmin=2, order='C')
+        nlines = c_srcs.shape[0]
+        if c_srcs.shape[1] != 2 or c_dsts.shape[1] != 2 or c_dsts.shape[0] != nlines:
+            raise ValueError("srcs and dsts must be arrays of shape (N, 2)")
+        c_linewidths = numpy.ascontiguousarray(
+            numpy.broadcast_to(linewidths, (nlines,)), dtype=numpy.int32)
+
+        offsets = numpy.zeros((nlines + 1,), dtype=numpy.intp)
+        for index in range(nlines):
+            offsets[index + 1] = offsets[index] + _profile_length(
+                c_srcs[index, 0], c_srcs[index, 1],
+                c_dsts[index, 0], c_dsts[index, 1])
+        result = numpy.zeros((offsets[nlines],), dtype=numpy.float32)
+
+        for index in prange(nlines, nogil=True, schedule='dynamic'):
+            _profile(&self.data[0, 0], height, width, order,
+                     c_srcs[index, 0], c_srcs[index, 1],
+                     c_dsts[index, 0], c_dsts[index, 1],
+                     c_linewidths[index], &result[offsets[index]])
+
+        result_array = numpy.asarray(result)
+        return [result_array[offsets[index]:offsets[index + 1]]
+                for index in range(nlines)]
+
+
+_STACK_CHUNK_PIXELS = 1 << 24
+"""Number of pixels of a stack converted to float32 at once (64MB)"""
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def profile_line_stack(stack, src, dst, int linewidth=1, int order=1):
+    """Return the intensity profile along a scan line through a stack of images.
+
+    Frames are converted to float32 by chunks and processed in parallel.
+    See :meth:`BilinearImage.profile_line`.
+
+    :param stack: Stack of images as a 3D array (frames, rows, columns)
+        or any array-like supporting slicing along the first dimension
+        (e.g., h5py.Dataset)
+    :param src: The start point of the scan line.
+    :type src: 2-tuple of numeric scalar
+    :param dst: The end point of the scan line (included).
+    :type dst: 2-tuple of numeric scalar
+    :param int linewidth: Width of the scanline (unit image pixel).
+    :param int order: Interpolation order:
+        0 for nearest, 1 for bilinear (default), 3 for cubic
+    :return: The intensity profiles, one row per frame
+    :rtype: 2d array (frames, profile length)
+    """
+    cdef:
+        float[:, :, ::1] data
+        float[:, ::1] result
+        float src_row, src_col, dst_row, dst_col
+        int nframes, height, width, frame, length, start, chunk_frames
+    _check_order(order)
+    if not hasattr(stack, "shape"):
+        stack = numpy.asarray(stack)
+    if len(stack.shape) != 3:
+        raise ValueError("stack must be 3D, got shape %s" % (stack.shape,))
+    nframes, height, width = stack.shape
+    src_row, src_col = src
+    dst_row, dst_col = dst
+    length = _profile_length(src_row, src_col, dst_row, dst_col)
+    result = numpy.zeros((nframes, length), dtype=numpy.float32)
+
+    if height > 0 and width > 0:
+        # Avoid a float32 copy of the whole stack, and keep all threads busy
+        chunk_frames = max(_STACK_CHUNK_PIXELS // (height * width),
+                           multiprocessing.cpu_count() if _COMPILED_WITH_OPENMP else 1)
+        for start in range(0, nframes, chunk_frames):
+            data = numpy.ascontiguousarray(
+                stack[start:start + chunk_frames], dtype=numpy.float32)
+            for frame in prange(data.shape[0], nogil=True):
+                _profile(&data[frame, 0, 0], height, width, order,
+                         src_row, src_col, dst_row, dst_col,
+                         linewidth, &result[start + frame, 0])
+
+    # Ensures the result is exported as numpy array and not memory view.
+    return numpy.asarray(result)
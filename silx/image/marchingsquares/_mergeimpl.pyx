@@ -27,7 +27,7 @@ Marching squares implementation based on a merge of segements and polygons.
 
 __authors__ = ["Almar Klein", "Jerome Kieffer", "Valentin Valls"]
 __license__ = "MIT"
-__date__ = "23/04/2018"
+__date__ = "18/10/2018"
 
 import numpy
 cimport numpy as cnumpy
@@ -53,6 +53,9 @@ include "../../utils/_have_openmp.pxi"
 
 cdef double EPSILON = numpy.finfo(numpy.float64).eps
 
+cdef int PYRAMID_BLOCK_SIZE = 16
+"""Size in patterns of the blocks at the bottom of the min/max pyramid"""
+
 # Windows compatibility: Cross-platform INFINITY
 from libc.float cimport DBL_MAX
 cdef double INFINITY = DBL_MAX + DBL_MAX
@@ -127,9 +130,17 @@ cdef class _MarchingSquaresAlgorithm(object):
     cdef cnumpy.float32_t *_min_cache
     cdef cnumpy.float32_t *_max_cache
 
+    cdef int _pyramid_depth
+    cdef int *_pyramid_offsets
+    cdef int *_pyramid_dims_x
+    cdef int *_pyramid_dims_y
+    cdef cnumpy.float32_t *_pyramid_min
+    cdef cnumpy.float32_t *_pyramid_max
+
     def __cinit__(self):
         self._use_minmax_cache = False
         self._force_sequencial_reduction = False
+        self._pyramid_depth = 0
 
     @cython.boundscheck(False)
     @cython.wraparound(False)
@@ -186,6 +197,298 @@ cdef class _MarchingSquaresAlgorithm(object):
         libc.stdlib.free(valid_contexts)
         libc.stdlib.free(contexts)
 
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.cdivision(True)
+    cdef void marching_squares_levels(self,
+                                      cnumpy.float64_t *levels,
+                                      int nb_levels,
+                                      TileContext **final_contexts) nogil:
+        """
+        Execute the marching squares for many levels with a single traversal
+        of the image.
+
+        Each tile is processed once, and each 2*2 pixels pattern is only
+        processed for the levels between its minimum and maximum values.
+
+        :param levels: The expected levels, sorted in ascending order
+        :param nb_levels: Number of levels
+        :param final_contexts: Array of `nb_levels` contexts storing the
+            resulting context of each level
+        """
+        cdef:
+            TileContext** contexts
+            int *level_begins
+            int *level_ends
+            int context_dim_x, context_dim_y, context_size
+            int icontext, ilevel, begin, end, x, y
+
+        context_dim_x = self._dim_x // self._group_size + (self._dim_x % self._group_size > 0)
+        context_dim_y = self._dim_y // self._group_size + (self._dim_y % self._group_size > 0)
+        context_size = context_dim_x * context_dim_y
+
+        # Contexts are stored level by level: a 2d-array of contexts per level
+        contexts = <TileContext **>libc.stdlib.malloc(nb_levels * context_size * sizeof(TileContext*))
+        libc.string.memset(contexts, 0, nb_levels * context_size * sizeof(TileContext*))
+        level_begins = <int *>libc.stdlib.malloc(context_size * sizeof(int))
+        level_ends = <int *>libc.stdlib.malloc(context_size * sizeof(int))
+
+        for icontext in range(context_size):
+            x = (icontext % context_dim_x) * self._group_size
+            y = (icontext // context_dim_x) * self._group_size
+            begin = 0
+            end = nb_levels
+            if self._use_minmax_cache:
+                # Only keep levels crossing the tile
+                while begin < nb_levels and levels[begin] < self._min_cache[icontext]:
+                    begin += 1
+                end = begin
+                while end < nb_levels and levels[end] <= self._max_cache[icontext]:
+                    end += 1
+            for ilevel in range(begin, end):
+                contexts[ilevel * context_size + icontext] = self.create_context(
+                    x, y, self._group_size, self._group_size)
+                if contexts[ilevel * context_size + icontext] == NULL:
+                    # Empty tile
+                    end = begin
+                    break
+            level_begins[icontext] = begin
+            level_ends[icontext] = end
+
+        # openmp
+        for icontext in prange(context_size, nogil=True):
+            if level_begins[icontext] < level_ends[icontext]:
+                self.marching_squares_mp_levels(contexts + icontext,
+                                                context_size,
+                                                levels,
+                                                level_begins[icontext],
+                                                level_ends[icontext])
+
+        for ilevel in range(nb_levels):
+            if self._force_sequencial_reduction:
+                self.sequencial_reduction(context_size, contexts + ilevel * context_size)
+            else:
+                self.reduction_2d(context_dim_x, context_dim_y, contexts + ilevel * context_size)
+            final_contexts[ilevel] = self._final_context
+            self._final_context = NULL
+
+        libc.stdlib.free(level_ends)
+        libc.stdlib.free(level_begins)
+        libc.stdlib.free(contexts)
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.cdivision(True)
+    cdef void marching_squares_mp_levels(self,
+                                         TileContext **contexts,
+                                         int stride,
+                                         cnumpy.float64_t *levels,
+                                         int begin,
+                                         int end) nogil:
+        """
+        Entry of the multi-level marching squares algorithm for each threads.
+
+        :param contexts: Contexts of the tile, one per level, separated by
+            `stride` elements
+        :param stride: Distance between contexts of successive levels
+        :param levels: The requested levels, sorted in ascending order
+        :param begin: Index of the first level crossing the tile
+        :param end: Index after the last level crossing the tile
+        """
+        cdef:
+            int ilevel
+            TileContext *context
+
+        context = contexts[begin * stride]
+        if self._pyramid_depth > 0:
+            self.visit_pyramid_levels(contexts, stride, levels, begin, end,
+                                      self._pyramid_depth - 1, 0, 0)
+        else:
+            self.marching_squares_rect_levels(
+                contexts, stride, levels, begin, end,
+                context.pos_x, context.pos_y,
+                context.pos_x + context.dim_x, context.pos_y + context.dim_y)
+
+        for ilevel in range(begin, end):
+            self.after_marching_squares(contexts[ilevel * stride])
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.cdivision(True)
+    cdef void visit_pyramid_levels(self,
+                                   TileContext **contexts,
+                                   int stride,
+                                   cnumpy.float64_t *levels,
+                                   int begin,
+                                   int end,
+                                   int depth,
+                                   int node_x,
+                                   int node_y) nogil:
+        """
+        Process the part of a tile covered by a node of the min/max pyramid
+        for many levels, skipping the sub-nodes not crossed by any level.
+
+        :param contexts: Contexts of the tile, one per level
+        :param stride: Distance between contexts of successive levels
+        :param levels: The requested levels, sorted in ascending order
+        :param begin: Index of the first level to process
+        :param end: Index after the last level to process
+        :param depth: Depth of the node in the pyramid (0 for the leaves)
+        :param node_x: X location of the node in the pyramid level
+        :param node_y: Y location of the node in the pyramid level
+        """
+        cdef:
+            TileContext *context
+            int index, size, x0, y0, x1, y1, child
+            int child_x, child_y
+            cnumpy.float32_t minimum, maximum
+
+        context = contexts[begin * stride]
+        size = PYRAMID_BLOCK_SIZE << depth
+        x0 = max(node_x * size, context.pos_x)
+        y0 = max(node_y * size, context.pos_y)
+        x1 = min(node_x * size + size, context.pos_x + context.dim_x)
+        y1 = min(node_y * size + size, context.pos_y + context.dim_y)
+        if x0 >= x1 or y0 >= y1:
+            # Node outside of the tile
+            return
+
+        index = self._pyramid_offsets[depth] + node_y * self._pyramid_dims_x[depth] + node_x
+        minimum = self._pyramid_min[index]
+        maximum = self._pyramid_max[index]
+        # Restrict levels to the ones crossing the node
+        while begin < end and levels[begin] < minimum:
+            begin += 1
+        while end > begin and levels[end - 1] > maximum:
+            end -= 1
+        if begin >= end:
+            return
+
+        if depth == 0:
+            self.marching_squares_rect_levels(contexts, stride, levels,
+                                              begin, end, x0, y0, x1, y1)
+            return
+
+        for child in range(4):
+            child_x = node_x * 2 + (child & 1)
+            child_y = node_y * 2 + (child >> 1)
+            if (child_x < self._pyramid_dims_x[depth - 1] and
+                    child_y < self._pyramid_dims_y[depth - 1]):
+                self.visit_pyramid_levels(contexts, stride, levels, begin, end,
+                                          depth - 1, child_x, child_y)
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.cdivision(True)
+    cdef void marching_squares_rect_levels(self,
+                                           TileContext **contexts,
+                                           int stride,
+                                           cnumpy.float64_t *levels,
+                                           int begin,
+                                           int end,
+                                           int x0,
+                                           int y0,
+                                           int x1,
+                                           int y1) nogil:
+        """
+        Process a rectangle of patterns of a tile for many levels.
+
+        :param contexts: Contexts of the tile, one per level
+        :param stride: Distance between contexts of successive levels
+        :param levels: The requested levels, sorted in ascending order
+        :param begin: Index of the first level to process
+        :param end: Index after the last level to process
+        :param x0: Left location of the rectangle
+        :param y0: Top location of the rectangle
+        :param x1: Right location of the rectangle (excluded)
+        :param y1: Bottom location of the rectangle (excluded)
+        """
+        cdef:
+            int x, y, i, pattern, ilevel, low, high, middle
+            cnumpy.float64_t tmpf, level
+            cnumpy.float32_t values[4]
+            cnumpy.float64_t minimum, maximum
+            cnumpy.float32_t *image_ptr
+            cnumpy.int8_t *mask_ptr
+
+        image_ptr = self._image_ptr + (y0 * self._dim_x + x0)
+        if self._mask_ptr != NULL:
+            mask_ptr = self._mask_ptr + (y0 * self._dim_x + x0)
+        else:
+            mask_ptr = NULL
+
+        for y in range(y0, y1):
+            for x in range(x0, x1):
+                if mask_ptr != NULL:
+                    if (mask_ptr[0] > 0 or mask_ptr[1] > 0 or
+                            mask_ptr[self._dim_x] > 0 or mask_ptr[self._dim_x + 1] > 0):
+                        image_ptr += 1
+                        mask_ptr += 1
+                        continue
+                    mask_ptr += 1
+
+                values[0] = image_ptr[0]
+                values[1] = image_ptr[1]
+                values[2] = image_ptr[self._dim_x]
+                values[3] = image_ptr[self._dim_x + 1]
+                image_ptr += 1
+
+                # Patterns are only generated for minimum <= level < maximum
+                # NaN are never above a level
+                maximum = -INFINITY
+                minimum = INFINITY
+                for i in range(4):
+                    if values[i] != values[i]:
+                        minimum = -INFINITY
+                    else:
+                        if values[i] > maximum:
+                            maximum = values[i]
+                        if values[i] < minimum:
+                            minimum = values[i]
+
+                # Find the first level >= minimum
+                low = begin
+                high = end
+                while low < high:
+                    middle = (low + high) // 2
+                    if levels[middle] < minimum:
+                        low = middle + 1
+                    else:
+                        high = middle
+
+                ilevel = low
+                while ilevel < end and levels[ilevel] < maximum:
+                    level = levels[ilevel]
+                    pattern = 0
+                    if values[0] > level:
+                        pattern += 1
+                    if values[1] > level:
+                        pattern += 2
+                    if values[2] > level:
+                        pattern += 8
+                    if values[3] > level:
+                        pattern += 4
+
+                    # Resolve ambiguity
+                    if pattern == 5 or pattern == 10:
+                        # Calculate value of cell center (i.e. average of corners)
+                        tmpf = 0.25 * (values[0] + values[1] + values[2] + values[3])
+                        # If below level, swap
+                        if tmpf <= level:
+                            if pattern == 5:
+                                pattern = 10
+                            else:
+                                pattern = 5
+
+                    if pattern != 0 and pattern != 15:
+                        self.insert_pattern(contexts[ilevel * stride], x, y, pattern, level)
+                    ilevel += 1
+
+            # There is a missing pixel at the end of each rows
+            image_ptr += self._dim_x - (x1 - x0)
+            if mask_ptr != NULL:
+                mask_ptr += self._dim_x - (x1 - x0)
+
     @cython.boundscheck(False)
     @cython.wraparound(False)
     @cython.cdivision(True)
@@ -294,20 +597,96 @@ cdef class _MarchingSquaresAlgorithm(object):
         :param context: Context used by the thread to store data
         :param level: The requested level
         """
+        if self._pyramid_depth > 0:
+            self.visit_pyramid(context, level, self._pyramid_depth - 1, 0, 0)
+        else:
+            self.marching_squares_rect(context, level,
+                                       context.pos_x, context.pos_y,
+                                       context.pos_x + context.dim_x,
+                                       context.pos_y + context.dim_y)
+        self.after_marching_squares(context)
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.cdivision(True)
+    cdef void visit_pyramid(self,
+                            TileContext *context,
+                            cnumpy.float64_t level,
+                            int depth,
+                            int node_x,
+                            int node_y) nogil:
+        """
+        Process the part of a tile covered by a node of the min/max pyramid,
+        skipping the sub-nodes not crossed by the level.
+
+        :param context: Context used by the thread to store data
+        :param level: The requested level
+        :param depth: Depth of the node in the pyramid (0 for the leaves)
+        :param node_x: X location of the node in the pyramid level
+        :param node_y: Y location of the node in the pyramid level
+        """
+        cdef:
+            int index, size, x0, y0, x1, y1, child
+            int child_x, child_y
+
+        size = PYRAMID_BLOCK_SIZE << depth
+        x0 = max(node_x * size, context.pos_x)
+        y0 = max(node_y * size, context.pos_y)
+        x1 = min(node_x * size + size, context.pos_x + context.dim_x)
+        y1 = min(node_y * size + size, context.pos_y + context.dim_y)
+        if x0 >= x1 or y0 >= y1:
+            # Node outside of the tile
+            return
+
+        index = self._pyramid_offsets[depth] + node_y * self._pyramid_dims_x[depth] + node_x
+        if level < self._pyramid_min[index] or level > self._pyramid_max[index]:
+            return
+
+        if depth == 0:
+            self.marching_squares_rect(context, level, x0, y0, x1, y1)
+            return
+
+        for child in range(4):
+            child_x = node_x * 2 + (child & 1)
+            child_y = node_y * 2 + (child >> 1)
+            if (child_x < self._pyramid_dims_x[depth - 1] and
+                    child_y < self._pyramid_dims_y[depth - 1]):
+                self.visit_pyramid(context, level, depth - 1, child_x, child_y)
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.cdivision(True)
+    cdef void marching_squares_rect(self,
+                                    TileContext *context,
+                                    cnumpy.float64_t level,
+                                    int x0,
+                                    int y0,
+                                    int x1,
+                                    int y1) nogil:
+        """
+        Process a rectangle of patterns of a tile.
+
+        :param context: Context used by the thread to store data
+        :param level: The requested level
+        :param x0: Left location of the rectangle
+        :param y0: Top location of the rectangle
+        :param x1: Right location of the rectangle (excluded)
+        :param y1: Bottom location of the rectangle (excluded)
+        """
         cdef:
             int x, y, pattern
             cnumpy.float64_t tmpf
             cnumpy.float32_t *image_ptr
             cnumpy.int8_t *mask_ptr
 
-        image_ptr = self._image_ptr + (context.pos_y * self._dim_x + context.pos_x)
+        image_ptr = self._image_ptr + (y0 * self._dim_x + x0)
         if self._mask_ptr != NULL:
-            mask_ptr = self._mask_ptr + (context.pos_y * self._dim_x + context.pos_x)
+            mask_ptr = self._mask_ptr + (y0 * self._dim_x + x0)
         else:
             mask_ptr = NULL
 
-        for y in range(context.pos_y, context.pos_y + context.dim_y):
-            for x in range(context.pos_x, context.pos_x + context.dim_x):
+        for y in range(y0, y1):
+            for x in range(x0, x1):
                 # Calculate index.
                 pattern = 0
                 if image_ptr[0] > level:
@@ -354,11 +733,9 @@ cdef class _MarchingSquaresAlgorithm(object):
                 image_ptr += 1
 
             # There is a missing pixel at the end of each rows
-            image_ptr += self._dim_x - context.dim_x
+            image_ptr += self._dim_x - (x1 - x0)
             if mask_ptr != NULL:
-                mask_ptr += self._dim_x - context.dim_x
-
-        self.after_marching_squares(context)
+                mask_ptr += self._dim_x - (x1 - x0)
 
     @cython.boundscheck(False)
     @cython.wraparound(False)
@@ -443,22 +820,16 @@ cdef class _MarchingSquaresAlgorithm(object):
         libc.string.memset(contexts, 0, context_size * sizeof(TileContext*))
 
         valid_contexts = 0
-        icontext = 0
-        y = 0
-        while y < self._dim_y - 1:
-            x = 0
-            while x < self._dim_x - 1:
-                if self._use_minmax_cache:
-                    if level < self._min_cache[icontext] or level > self._max_cache[icontext]:
-                        icontext += 1
-                        x += self._group_size
-                        continue
-                context = self.create_context(x, y, self._group_size, self._group_size)
+        for icontext in range(context_size):
+            if self._use_minmax_cache:
+                if level < self._min_cache[icontext] or level > self._max_cache[icontext]:
+                    continue
+            x = (icontext % context_dim_x) * self._group_size
+            y = (icontext // context_dim_x) * self._group_size
+            context = self.create_context(x, y, self._group_size, self._group_size)
+            if context != NULL:
                 contexts[icontext] = context
-                icontext += 1
                 valid_contexts += 1
-                x += self._group_size
-            y += self._group_size
 
         # dereference is not working here... then we uses array index but
         # it is not the proper way
@@ -1054,7 +1425,11 @@ cdef class MarchingSquaresMergeImpl(object):
     pre-computed informations. `use_minmax_cache` can enable the computation of
     minimum and maximum pixel levels available on each tile groups. It was
     designed to improve the efficiency of the extraction of many contour levels
-    from the same gradient image.
+    from the same gradient image. This cache also contains a pyramid of
+    minimum and maximum over blocks of 16*16 pixels, which is used to only
+    process the blocks of each tile crossed by the requested level. Once
+    computed, the cost of a request is then mostly related to the size of the
+    contours instead of the size of the image.
 
     Finally the implementation provides an implementation to reach polygons
     (:meth:`find_contours`) or pixels (:meth:`find_pixels`) from the iso-valued
@@ -1118,6 +1493,13 @@ cdef class MarchingSquaresMergeImpl(object):
     cdef cnumpy.float32_t *_min_cache
     cdef cnumpy.float32_t *_max_cache
 
+    cdef int _pyramid_depth
+    cdef int *_pyramid_offsets
+    cdef int *_pyramid_dims_x
+    cdef int *_pyramid_dims_y
+    cdef cnumpy.float32_t *_pyramid_min
+    cdef cnumpy.float32_t *_pyramid_max
+
     cdef _MarchingSquaresContours _contours_algo
     cdef _MarchingSquaresPixels _pixels_algo
 
@@ -1147,6 +1529,12 @@ cdef class MarchingSquaresMergeImpl(object):
         self._use_minmax_cache = use_minmax_cache
         self._min_cache = NULL
         self._max_cache = NULL
+        self._pyramid_depth = 0
+        self._pyramid_offsets = NULL
+        self._pyramid_dims_x = NULL
+        self._pyramid_dims_y = NULL
+        self._pyramid_min = NULL
+        self._pyramid_max = NULL
         with nogil:
             self._dim_y = self._image.shape[0]
             self._dim_x = self._image.shape[1]
@@ -1158,41 +1546,49 @@ cdef class MarchingSquaresMergeImpl(object):
             libc.stdlib.free(self._min_cache)
         if self._max_cache != NULL:
             libc.stdlib.free(self._max_cache)
+        libc.stdlib.free(self._pyramid_offsets)
+        libc.stdlib.free(self._pyramid_dims_x)
+        libc.stdlib.free(self._pyramid_dims_y)
+        libc.stdlib.free(self._pyramid_min)
+        libc.stdlib.free(self._pyramid_max)
 
     @cython.boundscheck(False)
     @cython.wraparound(False)
     @cython.cdivision(True)
-    cdef void _compute_minmax_on_block(self, int block_x, int block_y, int block_index) nogil:
+    cdef void _compute_minmax_on_block(self,
+                                       int pos_x,
+                                       int pos_y,
+                                       int size,
+                                       cnumpy.float32_t *result_minimum,
+                                       cnumpy.float32_t *result_maximum) nogil:
         """
-        Initialize the minmax cache.
-
-        The cache is computed for each tiles of the image. It reuses the OpenMP
-        group size for the size of the tile, which allow to skip a full OpenMP
-        context in case the requested level do not match the cache.
+        Compute the minimum and maximum of a block of the image.
 
         The minmax is compuded with an overlap of 1 pixel, in order to match
         the marching squares algorithm.
 
-        The mask is taking into accound. As result if a tile is fully masked,
-        the minmax cache result for this tile will have infinit values.
+        The mask is taking into accound. As result if a block is fully masked,
+        the minmax result for this block will have infinit values.
+        NaN values are never above a level, so they are accounted as -infinity
+        for the minimum.
 
-        :param block_x: X location of tile in block unit
-        :param block_y: Y location of tile in block unit
-        :param block_index: Index of the tile in the minmax cache structure
+        :param pos_x: X location of the block in pixels
+        :param pos_y: Y location of the block in pixels
+        :param size: Size of the block in patterns
+        :param result_minimum: Resulting minimum
+        :param result_maximum: Resulting maximum
         """
         cdef:
             int x, y
-            int pos_x, end_x, pos_y, end_y
+            int end_x, end_y
             cnumpy.float32_t minimum, maximum, value
             cnumpy.float32_t *image_ptr
             cnumpy.int8_t *mask_ptr
 
-        pos_x = block_x * self._group_size
-        end_x = pos_x + self._group_size + 1
+        end_x = pos_x + size + 1
         if end_x > self._dim_x:
             end_x = self._dim_x
-        pos_y = block_y * self._group_size
-        end_y = pos_y + self._group_size + 1
+        end_y = pos_y + size + 1
         if end_y > self._dim_y:
             end_y = self._dim_y
 
@@ -1212,6 +1608,8 @@ cdef class MarchingSquaresMergeImpl(object):
                         mask_ptr += 1
                         continue
                 value = image_ptr[0]
+                if value != value:
+                    minimum = -INFINITY
                 if value < minimum:
                     minimum = value
                 if value > maximum:
@@ -1223,8 +1621,8 @@ cdef class MarchingSquaresMergeImpl(object):
             if mask_ptr != NULL:
                 mask_ptr += self._dim_x + pos_x - end_x
 
-        self._min_cache[block_index] = minimum
-        self._max_cache[block_index] = maximum
+        result_minimum[0] = minimum
+        result_maximum[0] = maximum
 
     @cython.boundscheck(False)
     @cython.wraparound(False)
@@ -1232,10 +1630,21 @@ cdef class MarchingSquaresMergeImpl(object):
     cdef void _create_minmax_cache(self) nogil:
         """
         Create and initialize minmax cache.
+
+        The cache is computed for each tiles of the image. It reuses the OpenMP
+        group size for the size of the tile, which allow to skip a full OpenMP
+        context in case the requested level do not match the cache.
+
+        A pyramid of min/max is also computed, from blocks of
+        `PYRAMID_BLOCK_SIZE` patterns up to a single block covering the
+        image. It allows to only process the blocks of a tile crossed by the
+        requested level.
         """
         cdef:
             int icontext, context_x, context_y
             int context_dim_x, context_dim_y, context_size
+            int depth, size, index, child_index
+            int x, y, child_x, child_y, dim_x, dim_y
 
         context_dim_x = self._dim_x // self._group_size + (self._dim_x % self._group_size > 0)
         context_dim_y = self._dim_y // self._group_size + (self._dim_y % self._group_size > 0)
@@ -1247,20 +1656,78 @@ cdef class MarchingSquaresMergeImpl(object):
         for icontext in prange(context_size, nogil=True):
             context_x = icontext % context_dim_x
             context_y = icontext // context_dim_x
-            self._compute_minmax_on_block(context_x, context_y, icontext)
-
-    @cython.boundscheck(False)
-    @cython.wraparound(False)
-    @cython.cdivision(True)
-    def find_pixels(self, level):
-        """
-        Compute the pixels from the image over the requested iso contours
-        at this `level`. Pixels are those over the bound of the segments.
-
-        :param float level: Level of the requested iso contours.
-        :returns: An array of y-x coordinates.
-        :rtype: numpy.ndarray
-        """
+            self._compute_minmax_on_block(context_x * self._group_size,
+                                          context_y * self._group_size,
+                                          self._group_size,
+                                          &self._min_cache[icontext],
+                                          &self._max_cache[icontext])
+
+        # Size of the pyramid: patterns are (dim - 1) in each dimension
+        dim_x = (self._dim_x - 1 + PYRAMID_BLOCK_SIZE - 1) // PYRAMID_BLOCK_SIZE
+        dim_y = (self._dim_y - 1 + PYRAMID_BLOCK_SIZE - 1) // PYRAMID_BLOCK_SIZE
+        self._pyramid_depth = 1
+        size = dim_x * dim_y
+        while dim_x > 1 or dim_y > 1:
+            dim_x = (dim_x + 1) // 2
+            dim_y = (dim_y + 1) // 2
+            size += dim_x * dim_y
+            self._pyramid_depth += 1
+
+        self._pyramid_offsets = <int *>libc.stdlib.malloc(self._pyramid_depth * sizeof(int))
+        self._pyramid_dims_x = <int *>libc.stdlib.malloc(self._pyramid_depth * sizeof(int))
+        self._pyramid_dims_y = <int *>libc.stdlib.malloc(self._pyramid_depth * sizeof(int))
+        self._pyramid_min = <cnumpy.float32_t *>libc.stdlib.malloc(size * sizeof(cnumpy.float32_t))
+        self._pyramid_max = <cnumpy.float32_t *>libc.stdlib.malloc(size * sizeof(cnumpy.float32_t))
+
+        self._pyramid_offsets[0] = 0
+        self._pyramid_dims_x[0] = (self._dim_x - 1 + PYRAMID_BLOCK_SIZE - 1) // PYRAMID_BLOCK_SIZE
+        self._pyramid_dims_y[0] = (self._dim_y - 1 + PYRAMID_BLOCK_SIZE - 1) // PYRAMID_BLOCK_SIZE
+        for depth in range(1, self._pyramid_depth):
+            self._pyramid_offsets[depth] = (self._pyramid_offsets[depth - 1] +
+                                            self._pyramid_dims_x[depth - 1] * self._pyramid_dims_y[depth - 1])
+            self._pyramid_dims_x[depth] = (self._pyramid_dims_x[depth - 1] + 1) // 2
+            self._pyramid_dims_y[depth] = (self._pyramid_dims_y[depth - 1] + 1) // 2
+
+        # Bottom of the pyramid from the image
+        dim_x = self._pyramid_dims_x[0]
+        for index in prange(dim_x * self._pyramid_dims_y[0], nogil=True):
+            self._compute_minmax_on_block((index % dim_x) * PYRAMID_BLOCK_SIZE,
+                                          (index // dim_x) * PYRAMID_BLOCK_SIZE,
+                                          PYRAMID_BLOCK_SIZE,
+                                          &self._pyramid_min[index],
+                                          &self._pyramid_max[index])
+
+        # Upper levels from the lower ones
+        for depth in range(1, self._pyramid_depth):
+            for y in range(self._pyramid_dims_y[depth]):
+                for x in range(self._pyramid_dims_x[depth]):
+                    index = self._pyramid_offsets[depth] + y * self._pyramid_dims_x[depth] + x
+                    self._pyramid_min[index] = INFINITY
+                    self._pyramid_max[index] = -INFINITY
+                    for child_y in range(y * 2, min(y * 2 + 2, self._pyramid_dims_y[depth - 1])):
+                        for child_x in range(x * 2, min(x * 2 + 2, self._pyramid_dims_x[depth - 1])):
+                            child_index = (self._pyramid_offsets[depth - 1] +
+                                           child_y * self._pyramid_dims_x[depth - 1] + child_x)
+                            if self._pyramid_min[child_index] < self._pyramid_min[index]:
+                                self._pyramid_min[index] = self._pyramid_min[child_index]
+                            if self._pyramid_max[child_index] > self._pyramid_max[index]:
+                                self._pyramid_max[index] = self._pyramid_max[child_index]
+
+    cdef void _share_minmax_cache(self, _MarchingSquaresAlgorithm algo):
+        """Share the minmax cache with an algorithm"""
+        algo._use_minmax_cache = self._use_minmax_cache
+        if self._use_minmax_cache:
+            algo._min_cache = self._min_cache
+            algo._max_cache = self._max_cache
+            algo._pyramid_depth = self._pyramid_depth
+            algo._pyramid_offsets = self._pyramid_offsets
+            algo._pyramid_dims_x = self._pyramid_dims_x
+            algo._pyramid_dims_y = self._pyramid_dims_y
+            algo._pyramid_min = self._pyramid_min
+            algo._pyramid_max = self._pyramid_max
+
+    cdef _MarchingSquaresPixels _get_pixels_algo(self):
+        """Returns the algorithm used to find pixels, create it if needed"""
         if self._use_minmax_cache and self._min_cache == NULL:
             self._create_minmax_cache()
 
@@ -1271,19 +1738,98 @@ cdef class MarchingSquaresMergeImpl(object):
             algo._dim_x = self._dim_x
             algo._dim_y = self._dim_y
             algo._group_size = self._group_size
-            algo._use_minmax_cache = self._use_minmax_cache
             algo._force_sequencial_reduction = COMPILED_WITH_OPENMP == 0
-            if self._use_minmax_cache:
-                algo._min_cache = self._min_cache
-                algo._max_cache = self._max_cache
+            self._share_minmax_cache(algo)
             self._pixels_algo = algo
-        else:
-            algo = self._pixels_algo
+        return self._pixels_algo
+
+    cdef _MarchingSquaresContours _get_contours_algo(self):
+        """Returns the algorithm used to find contours, create it if needed"""
+        if self._use_minmax_cache and self._min_cache == NULL:
+            self._create_minmax_cache()
 
+        if self._contours_algo is None:
+            algo = _MarchingSquaresContours()
+            algo._image_ptr = self._image_ptr
+            algo._mask_ptr = self._mask_ptr
+            algo._dim_x = self._dim_x
+            algo._dim_y = self._dim_y
+            algo._group_size = self._group_size
+            algo._force_sequencial_reduction = COMPILED_WITH_OPENMP == 0
+            self._share_minmax_cache(algo)
+            self._contours_algo = algo
+        return self._contours_algo
+
+    cdef _find_levels(self, _MarchingSquaresAlgorithm algo, levels):
+        """
+        Run the marching squares for many levels.
+
+        :param algo: The algorithm to use
+        :param levels: Sequence of levels
+        :returns: Tuple (final_contexts, order) with final_contexts being an
+            array of contexts of the sorted levels, and order the index of
+            the sorted levels in the requested levels. final_contexts have
+            to be released with `libc.stdlib.free`.
+        """
+        cdef:
+            cnumpy.float64_t[::1] sorted_levels
+            TileContext **final_contexts
+            int nb_levels
+
+        levels = numpy.array(levels, dtype=numpy.float64, ndmin=1).ravel()
+        order = numpy.argsort(levels, kind='mergesort')
+        sorted_levels = numpy.ascontiguousarray(levels[order])
+        nb_levels = len(levels)
+        final_contexts = <TileContext **>libc.stdlib.malloc(max(nb_levels, 1) * sizeof(TileContext*))
+        if nb_levels > 0:
+            algo.marching_squares_levels(&sorted_levels[0], nb_levels, final_contexts)
+        return <size_t> final_contexts, order
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.cdivision(True)
+    def find_pixels(self, level):
+        """
+        Compute the pixels from the image over the requested iso contours
+        at this `level`. Pixels are those over the bound of the segments.
+
+        :param float level: Level of the requested iso contours.
+        :returns: An array of y-x coordinates.
+        :rtype: numpy.ndarray
+        """
+        algo = self._get_pixels_algo()
         algo.marching_squares(level)
         pixels = algo.extract_pixels()
         return pixels
 
+    def find_pixels_levels(self, levels):
+        """
+        Compute the pixels from the image over the requested iso contours
+        for many levels.
+
+        The image is traversed only once for all the levels.
+        See :meth:`find_pixels`.
+
+        :param levels: Sequence of levels of the requested iso contours.
+        :returns: A list containing for each level an array of y-x coordinates
+        :rtype: List[numpy.ndarray]
+        """
+        cdef:
+            _MarchingSquaresPixels algo
+            TileContext **final_contexts
+            size_t address
+            int i
+
+        algo = self._get_pixels_algo()
+        address, order = self._find_levels(algo, levels)
+        final_contexts = <TileContext **> address
+        result = [None] * len(order)
+        for i in range(len(order)):
+            algo._final_context = final_contexts[i]
+            result[order[i]] = algo.extract_pixels()
+        libc.stdlib.free(final_contexts)
+        return result
+
     @cython.boundscheck(False)
     @cython.wraparound(False)
     @cython.cdivision(True)
@@ -1295,25 +1841,42 @@ cdef class MarchingSquaresMergeImpl(object):
         :returns: A list of array containg y-x coordinates of points
         :rtype: List[numpy.ndarray]
         """
-        if self._use_minmax_cache and self._min_cache == NULL:
-            self._create_minmax_cache()
-
-        if self._contours_algo is None:
-            algo = _MarchingSquaresContours()
-            algo._image_ptr = self._image_ptr
-            algo._mask_ptr = self._mask_ptr
-            algo._dim_x = self._dim_x
-            algo._dim_y = self._dim_y
-            algo._group_size = self._group_size
-            algo._use_minmax_cache = self._use_minmax_cache
-            algo._force_sequencial_reduction = COMPILED_WITH_OPENMP == 0
-            if self._use_minmax_cache:
-                algo._min_cache = self._min_cache
-                algo._max_cache = self._max_cache
-            self._contours_algo = algo
-        else:
-            algo = self._contours_algo
-
+        algo = self._get_contours_algo()
         algo.marching_squares(level)
         polygons = algo.extract_polygons()
         return polygons
+
+    def find_contours_levels(self, levels):
+        """
+        Compute the lists of polygons of the iso contours for many levels.
+
+        The image is traversed only once for all the levels, and each
+        2*2 pixels pattern is only processed for the levels crossing it.
+
+        .. code-block:: python
+
+            ms = MarchingSquaresMergeImpl(image, use_minmax_cache=True)
+            levels = numpy.linspace(image.min(), image.max(), 30)
+            for level, polygons in zip(levels, ms.find_contours_levels(levels)):
+                print(level, len(polygons))
+
+        :param levels: Sequence of levels of the requested iso contours.
+        :returns: A list containing for each level a list of array containg
+            y-x coordinates of points
+        :rtype: List[List[numpy.ndarray]]
+        """
+        cdef:
+            _MarchingSquaresContours algo
+            TileContext **final_contexts
+            size_t address
+            int i
+
+        algo = self._get_contours_algo()
+        address, order = self._find_levels(algo, levels)
+        final_contexts = <TileContext **> address
+        result = [None] * len(order)
+        for i in range(len(order)):
+            algo._final_context = final_contexts[i]
+            result[order[i]] = algo.extract_polygons()
+        libc.stdlib.free(final_contexts)
+        return result
@@ -25,7 +25,7 @@
 
 __authors__ = ["V. Valls"]
 __license__ = "MIT"
-__date__ = "18/04/2018"
+__date__ = "18/10/2018"
 
 import unittest
 import numpy
@@ -263,10 +263,79 @@ class TestMergeImplContours(unittest.TestCase):
         self.assertEqual(len(polygons), 11)
         self.assertEqual(self.count_closed_polygons(polygons), 3)
 
+    def test_image_minmax_pyramid(self):
+        x, y = numpy.ogrid[-numpy.pi:numpy.pi:300j, -numpy.pi:numpy.pi:310j]
+        image = numpy.sin(numpy.exp((numpy.sin(x)**3 + numpy.cos(y)**2)))
+        mask = numpy.zeros(image.shape, dtype=numpy.int8)
+        mask[100:150, 20:40] = 1
+        ms = MarchingSquaresMergeImpl(image, mask, group_size=50)
+        ms_cache = MarchingSquaresMergeImpl(image, mask, group_size=50, use_minmax_cache=True)
+        for level in (-0.5, 0.1, 0.5, 0.9):
+            polygons = ms.find_contours(level)
+            polygons_cache = ms_cache.find_contours(level)
+            self.assertEqual(len(polygons), len(polygons_cache))
+            self.assertEqual(self.count_closed_polygons(polygons),
+                             self.count_closed_polygons(polygons_cache))
+            self.assertEqual(sorted(len(p) for p in polygons),
+                             sorted(len(p) for p in polygons_cache))
+
+            pixels = ms.find_pixels(level)
+            pixels_cache = ms_cache.find_pixels(level)
+            self.assertEqual(set(map(tuple, pixels)),
+                             set(map(tuple, pixels_cache)))
+
+
+class TestMergeImplLevels(unittest.TestCase):
+
+    def assertSamePolygons(self, polygons1, polygons2):
+        self.assertEqual(len(polygons1), len(polygons2))
+        for polygon1, polygon2 in zip(polygons1, polygons2):
+            self.assertTrue(numpy.array_equal(polygon1, polygon2))
+
+    def assertSamePixels(self, pixels1, pixels2):
+        pixels1 = pixels1[numpy.lexsort(pixels1.T)]
+        pixels2 = pixels2[numpy.lexsort(pixels2.T)]
+        self.assertTrue(numpy.array_equal(pixels1, pixels2))
+
+    def setUp(self):
+        x, y = numpy.ogrid[-numpy.pi:numpy.pi:100j, -numpy.pi:numpy.pi:110j]
+        self.image = numpy.sin(numpy.exp((numpy.sin(x)**3 + numpy.cos(y)**2)))
+        self.mask = numpy.zeros(self.image.shape, dtype=numpy.int8)
+        self.mask[20:30, 50:90] = 1
+        # Unsorted levels, with duplicates and outside the data range
+        self.levels = [0.5, -2., 0.1, 0.9, 0.5, -0.3, 2.]
+
+    def test_find_contours_levels(self):
+        for kwargs in ({},
+                       {"group_size": 17},
+                       {"group_size": 17, "use_minmax_cache": True},
+                       {"mask": self.mask, "group_size": 33}):
+            ms = MarchingSquaresMergeImpl(self.image, **kwargs)
+            result = ms.find_contours_levels(self.levels)
+            self.assertEqual(len(result), len(self.levels))
+            for level, polygons in zip(self.levels, result):
+                self.assertSamePolygons(polygons, ms.find_contours(level))
+
+    def test_find_pixels_levels(self):
+        for kwargs in ({},
+                       {"group_size": 17, "use_minmax_cache": True},
+                       {"mask": self.mask, "group_size": 33}):
+            ms = MarchingSquaresMergeImpl(self.image, **kwargs)
+            result = ms.find_pixels_levels(self.levels)
+            self.assertEqual(len(result), len(self.levels))
+            for level, pixels in zip(self.levels, result):
+                self.assertSamePixels(pixels, ms.find_pixels(level))
+
+    def test_no_levels(self):
+        ms = MarchingSquaresMergeImpl(self.image)
+        self.assertEqual(ms.find_contours_levels([]), [])
+        self.assertEqual(ms.find_pixels_levels([]), [])
+
 
 def suite():
     test_suite = unittest.TestSuite()
     loadTests = unittest.defaultTestLoader.loadTestsFromTestCase
     test_suite.addTest(loadTests(TestMergeImplApi))
     test_suite.addTest(loadTests(TestMergeImplContours))
+    test_suite.addTest(loadTests(TestMergeImplLevels))
     return test_suite
@@ -22,4 +22,27 @@
 #
 # ############################################################################*/
 
-from silx.opencl.projection import *
+"""This module provides the tomographic projection :class:`Projection`.
+
+The OpenCL implementation from :mod:`silx.opencl.projection` is used if an
+OpenCL device is available, otherwise a CPU implementation is used.
+OpenCL platforms are only described when a :class:`Projection` is created.
+"""
+
+from silx.opencl.common import ocl
+
+
+class Projection(object):
+    """Tomographic projection of slices.
+
+    This creates an instance of :class:`silx.opencl.projection.Projection`
+    if an OpenCL device is available, or of its CPU counterpart otherwise.
+    See :class:`silx.opencl.projection.Projection` for arguments.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        if ocl:
+            from silx.opencl.projection import Projection as _Class
+        else:
+            from ._reconstruction_cpu import Projection as _Class
+        return _Class(*args, **kwargs)
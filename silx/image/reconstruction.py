@@ -22,4 +22,60 @@
 #
 # ############################################################################*/
 
-from silx.opencl.reconstruction import *
+"""This module provides the iterative reconstruction algorithms
+:class:`SIRT` and :class:`TV`.
+
+The OpenCL implementation from :mod:`silx.opencl.reconstruction` is used if an
+OpenCL device is available, otherwise a CPU implementation is used.
+OpenCL platforms are only described when an algorithm is created.
+"""
+
+from silx.opencl.common import ocl
+
+
+def _implementation(name):
+    """Returns the class implementing an algorithm.
+
+    :param str name: Name of the class
+    """
+    if ocl:
+        from silx.opencl import reconstruction as module
+    else:
+        from . import _reconstruction_cpu as module
+    return getattr(module, name)
+
+
+class ReconstructionAlgorithm(object):
+    """Base class of iterative reconstruction algorithms.
+
+    This creates an instance of
+    :class:`silx.opencl.reconstruction.ReconstructionAlgorithm`
+    if an OpenCL device is available, or of its CPU counterpart otherwise.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        return _implementation("ReconstructionAlgorithm")(*args, **kwargs)
+
+
+class SIRT(object):
+    """Simultaneous Iterative Reconstruction Technique.
+
+    This creates an instance of :class:`silx.opencl.reconstruction.SIRT`
+    if an OpenCL device is available, or of its CPU counterpart otherwise.
+    See :class:`silx.opencl.reconstruction.SIRT` for arguments.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        return _implementation("SIRT")(*args, **kwargs)
+
+
+class TV(object):
+    """Total Variation regularized reconstruction.
+
+    This creates an instance of :class:`silx.opencl.reconstruction.TV`
+    if an OpenCL device is available, or of its CPU counterpart otherwise.
+    See :class:`silx.opencl.reconstruction.TV` for arguments.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        return _implementation("TV")(*args, **kwargs)
@@ -26,18 +26,39 @@ __authors__ = ["J. Kieffer"]
 __license__ = "MIT"
 __date__ = "05/04/2018"
 
+import os
+import numpy
 from numpy.distutils.misc_util import Configuration
 
 
 def configuration(parent_package='', top_path=None):
     config = Configuration('image', parent_package, top_path)
     config.add_subpackage('test')
+    silx_include = os.path.join(top_path, "silx", "utils", "include")
     config.add_extension('bilinear',
                          sources=["bilinear.pyx"],
-                         language='c')
+                         include_dirs=[numpy.get_include(), silx_include],
+                         language='c',
+                         extra_link_args=['-fopenmp'],
+                         extra_compile_args=['-fopenmp'])
     config.add_extension('shapes',
                          sources=["shapes.pyx"],
-                         language='c')
+                         include_dirs=[numpy.get_include(), silx_include],
+                         language='c',
+                         extra_link_args=['-fopenmp'],
+                         extra_compile_args=['-fopenmp'])
+    config.add_extension('_radon',
+                         sources=["_radon.pyx"],
+                         include_dirs=[numpy.get_include(), silx_include],
+                         language='c',
+                         extra_link_args=['-fopenmp'],
+                         extra_compile_args=['-fopenmp'])
+    config.add_extension('_sift',
+                         sources=["_sift.pyx"],
+                         include_dirs=[numpy.get_include(), silx_include],
+                         language='c',
+                         extra_link_args=['-fopenmp'],
+                         extra_compile_args=['-fopenmp'])
     config.add_subpackage('marchingsquares')
     return config
 
@@ -28,8 +28,10 @@
 - :func:`draw_line` function generates coordinates of a line in an image.
 - :func:`polygon_fill_mask` function generates a mask from a set of points
   defining a polygon.
+- :func:`polygons_fill_labels` function generates a label image from many
+  polygons.
 
-The :class:`Polygon` class provides checking if a point is inside a polygon.
+The :class:`Polygon` class provides checking if points are inside a polygon.
 
 The whole module uses the (row, col) (i.e., (y, x))) convention
 for 2D coordinates.
@@ -37,13 +39,103 @@ for 2D coordinates.
 
 __authors__ = ["Jérôme Kieffer", "T. Vincent"]
 __license__ = "MIT"
-__date__ = "03/06/2016"
+__date__ = "18/10/2018"
 __status__ = "dev"
 
 
 cimport cython
+from cython.parallel import prange, parallel
 import numpy
 from libc.math cimport ceil, fabs
+from libc.stdlib cimport abort, calloc, free
+
+include "../utils/_have_openmp.pxi"
+"""Store in the module if it was compiled with OpenMP"""
+
+
+cdef struct _ColumnRange:
+    int start
+    int stop
+
+
+@cython.cdivision(True)
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef _ColumnRange _fill_row(const float *vertices,
+                            int nvert,
+                            int row,
+                            unsigned char *line,
+                            int width) nogil:
+    """Fill the pixels of a row which are inside a polygon.
+
+    For each line of the image, mark intersection of all segments
+    in the line and then run a xor scan to fill inner parts.
+    Adapted from http://alienryderflex.com/polygon_fill/
+
+    :param vertices: Pointer to nvert (row, col) vertices
+    :param int nvert: Number of vertices
+    :param int row: Row to fill
+    :param line: Row buffer of width elements, it MUST be filled with 0
+    :param int width: Width of the row
+    :return: Range of columns [start, stop[ that was written in line,
+        elements outside this range are left to 0.
+    """
+    cdef _ColumnRange col_range
+    cdef int col, index  # Loop indixes
+    cdef float pt1x, pt1y, pt2x, pt2y  # segment end points
+    cdef int xinters, is_inside, current
+    cdef int col_min, col_max
+
+    pt1x = vertices[2 * (nvert - 1) + 1]
+    pt1y = vertices[2 * (nvert - 1)]
+    col_min = width - 1
+    col_max = 0
+    is_inside = 0  # Init with whether first col is inside or not
+
+    for index in range(nvert):
+        pt2x = vertices[2 * index + 1]
+        pt2y = vertices[2 * index]
+
+        if ((pt1y <= row and row < pt2y) or
+                (pt2y <= row and row < pt1y)):
+            # Intersection casted to int so that ]x, x+1] => x
+            xinters = (<int>ceil(pt1x + (row - pt1y) *
+                       (pt2x - pt1x) / (pt2y - pt1y))) - 1
+
+            # Update column range to patch
+            if xinters < col_min:
+                col_min = xinters
+            if xinters > col_max:
+                col_max = xinters
+
+            if xinters < 0:
+                # Add an intersection to init value of xor scan
+                is_inside ^= 1
+            elif xinters < width:
+                # Mark intersection in line
+                line[xinters] ^= 1
+            # else: do not consider intersection on the right
+
+        pt1x, pt1y = pt2x, pt2y
+
+    col_range.start = 0
+    col_range.stop = 0
+    if col_min < col_max:
+        # Clip column range to line
+        if col_min < 0:
+            col_min = 0
+        if col_max > width - 1:
+            col_max = width - 1
+
+        # xor exclusive scan
+        for col in range(col_min, col_max + 1):
+            current = line[col]
+            line[col] = is_inside
+            is_inside = current ^ is_inside
+
+        col_range.start = col_min
+        col_range.stop = col_max + 1
+    return col_range
 
 
 cdef class Polygon(object):
@@ -53,7 +145,7 @@ cdef class Polygon(object):
     :type vertices: Nx2 array of floats of (row, col)
     """
 
-    cdef float[:,:] vertices
+    cdef float[:, ::1] vertices
     cdef int nvert
 
     def __init__(self, vertices):
@@ -100,76 +192,61 @@ cdef class Polygon(object):
             pt1x, pt1y = pt2x, pt2y
         return is_inside
 
-    @cython.cdivision(True)
+    @cython.wraparound(False)
+    @cython.boundscheck(False)
+    def contains_points(self, rows, cols):
+        """Check which points are inside the polygon
+
+        :param rows: Row coordinates of the points
+        :type rows: numpy.ndarray of float
+        :param cols: Column coordinates of the points
+        :type cols: numpy.ndarray of float
+        :return: Array of bool with the broadcasted shape of rows and cols,
+            True where points are inside the polygon
+        :rtype: numpy.ndarray
+        """
+        rows, cols = numpy.broadcast_arrays(rows, cols)
+        shape = rows.shape
+        cdef float[::1] c_rows = numpy.ascontiguousarray(
+            rows, dtype=numpy.float32).reshape(-1)
+        cdef float[::1] c_cols = numpy.ascontiguousarray(
+            cols, dtype=numpy.float32).reshape(-1)
+        cdef int size = c_rows.shape[0]
+        cdef unsigned char[::1] result = numpy.zeros(
+            (size,), dtype=numpy.uint8)
+        cdef int index
+
+        if self.nvert > 0:
+            for index in prange(size, nogil=True):
+                result[index] = self.c_is_inside(c_rows[index], c_cols[index])
+
+        return numpy.asarray(result).view(numpy.bool_).reshape(shape)
+
     @cython.wraparound(False)
     @cython.boundscheck(False)
     def make_mask(self, int height, int width):
         """Create a mask array representing the filled polygon
 
+        Rows are processed in parallel with OpenMP when available.
+
         :param int height: Height of the mask array
         :param int width: Width of the mask array
         :return: 2D array (height, width)
         """
-        cdef unsigned char[:, :] mask = numpy.zeros((height, width),
-                                                    dtype=numpy.uint8)
-        cdef int row_min, row_max, col_min, col_max  # mask subpart to update
-        cdef int row, col, index  # Loop indixes
-        cdef float pt1x, pt1y, pt2x, pt2y  # segment end points
-        cdef int xinters, is_inside, current
+        cdef unsigned char[:, ::1] mask = numpy.zeros((height, width),
+                                                      dtype=numpy.uint8)
+        cdef int row_min, row_max  # mask subpart to update
+        cdef int row  # Loop index
+
+        if self.nvert == 0 or height == 0 or width == 0:
+            return numpy.asarray(mask)
 
         row_min = max(int(min(self.vertices[:, 0])), 0)
         row_max = min(int(max(self.vertices[:, 0])) + 1, height)
 
-        # Can be replaced by prange(row_min, row_max, nogil=True)
-        with nogil:
-            for row in range(row_min, row_max):
-                # For each line of the image, mark intersection of all segments
-                # in the line and then run a xor scan to fill inner parts
-                # Adapted from http://alienryderflex.com/polygon_fill/
-                pt1x = self.vertices[self.nvert-1, 1]
-                pt1y = self.vertices[self.nvert-1, 0]
-                col_min = width - 1
-                col_max = 0
-                is_inside = 0  # Init with whether first col is inside or not
-
-                for index in range(self.nvert):
-                    pt2x = self.vertices[index, 1]
-                    pt2y = self.vertices[index, 0]
-
-                    if ((pt1y <= row and row < pt2y) or
-                            (pt2y <= row and row < pt1y)):
-                        # Intersection casted to int so that ]x, x+1] => x
-                        xinters = (<int>ceil(pt1x + (row - pt1y) *
-                                   (pt2x - pt1x) / (pt2y - pt1y))) - 1
-
-                        # Update column range to patch
-                        if xinters < col_min:
-                            col_min = xinters
-                        if xinters > col_max:
-                            col_max = xinters
-
-                        if xinters < 0:
-                            # Add an intersection to init value of xor scan
-                            is_inside ^= 1
-                        elif xinters < width:
-                            # Mark intersection in mask
-                            mask[row, xinters] ^= 1
-                        # else: do not consider intersection on the right
-
-                    pt1x, pt1y = pt2x, pt2y
-
-                if col_min < col_max:
-                    # Clip column range to mask
-                    if col_min < 0:
-                        col_min = 0
-                    if col_max > width - 1:
-                        col_max = width - 1
-
-                    # xor exclusive scan
-                    for col in range(col_min, col_max + 1):
-                        current = mask[row, col]
-                        mask[row, col] = is_inside
-                        is_inside = current ^ is_inside
+        for row in prange(row_min, row_max, nogil=True):
+            _fill_row(&self.vertices[0, 0], self.nvert,
+                      row, &mask[row, 0], width)
 
         # Ensures the result is exported as numpy array and not memory view.
         return numpy.asarray(mask)
@@ -188,6 +265,79 @@ def polygon_fill_mask(vertices, shape):
     return Polygon(vertices).make_mask(shape[0], shape[1])
 
 
+@cython.wraparound(False)
+@cython.boundscheck(False)
+def polygons_fill_labels(polygons, shape, labels=None):
+    """Return a label image of many filled polygons.
+
+    Polygons are filled in order, so a polygon overwrites the labels of the
+    previous ones where they overlap.
+    Rows are processed in parallel with OpenMP when available.
+
+    :param polygons: Sequence of polygons vertices, each one being a
+        Nx2 strip of segments end points (row, column) or (y, x)
+    :param shape: size of the label image as (height, width)
+    :type shape: 2-tuple of int
+    :param labels: Label of each polygon (default: 1, 2, ..., len(polygons))
+    :type labels: Sequence of int
+    :return: Label image, 0 for pixels outside all polygons
+    :rtype: numpy.ndarray of int32 of dimension shape
+    """
+    cdef int height = shape[0]
+    cdef int width = shape[1]
+    cdef int[:, ::1] result = numpy.zeros((height, width), dtype=numpy.int32)
+    cdef int npolygons = len(polygons)
+    cdef int row, index, col
+    cdef unsigned char *line
+    cdef _ColumnRange col_range
+
+    if labels is None:
+        labels = numpy.arange(1, npolygons + 1)
+    elif len(labels) != npolygons:
+        raise ValueError("labels and polygons must have the same length")
+    cdef int[::1] c_labels = numpy.ascontiguousarray(labels, dtype=numpy.int32)
+
+    # Concatenate all vertices and store offsets and row ranges of polygons
+    arrays = [numpy.array(vertices, dtype=numpy.float32, ndmin=2).reshape(-1, 2)
+              for vertices in polygons]
+    cdef int[::1] offsets = numpy.zeros((npolygons + 1,), dtype=numpy.int32)
+    cdef int[::1] row_mins = numpy.zeros((npolygons,), dtype=numpy.int32)
+    cdef int[::1] row_maxs = numpy.zeros((npolygons,), dtype=numpy.int32)
+    for index, vertices in enumerate(arrays):
+        offsets[index + 1] = offsets[index] + len(vertices)
+        if len(vertices) > 0:
+            row_mins[index] = max(int(vertices[:, 0].min()), 0)
+            row_maxs[index] = min(int(vertices[:, 0].max()) + 1, height)
+
+    if offsets[npolygons] == 0 or height == 0 or width == 0:
+        return numpy.asarray(result)
+
+    cdef float[:, ::1] all_vertices = numpy.ascontiguousarray(
+        numpy.concatenate(arrays), dtype=numpy.float32)
+
+    with nogil, parallel():
+        # Row buffer for each thread
+        line = <unsigned char *> calloc(width, sizeof(unsigned char))
+        if line == NULL:
+            abort()
+
+        for row in prange(height):
+            for index in range(npolygons):
+                if row < row_mins[index] or row >= row_maxs[index]:
+                    continue
+                col_range = _fill_row(&all_vertices[offsets[index], 0],
+                                      offsets[index + 1] - offsets[index],
+                                      row, line, width)
+                for col in range(col_range.start, col_range.stop):
+                    if line[col]:
+                        result[row, col] = c_labels[index]
+                    line[col] = 0
+
+        free(line)
+
+    return numpy.asarray(result)
+
+
 @cython.wraparound(False)
 @cython.boundscheck(False)
 def draw_line(int row0, int col0, int row1, int col1, int width=1):
@@ -21,5 +21,62 @@
 # THE SOFTWARE.
 #
 # ############################################################################*/
+"""This module provides SIFT keypoints extraction, matching and image
+alignment: :class:`SiftPlan`, :class:`MatchPlan` and :class:`LinearAlign`.
 
-from silx.opencl.sift import *
+The OpenCL implementation from :mod:`silx.opencl.sift` is used if an
+OpenCL device is available, otherwise a CPU implementation is used.
+OpenCL platforms are only described when one of those classes is
+instantiated.
+"""
+
+from silx.opencl.common import ocl
+from silx.opencl.sift.param import par  # noqa
+
+
+def _implementation(name):
+    """Returns the class implementing a SIFT processing.
+
+    :param str name: Name of the class
+    """
+    if ocl:
+        from silx.opencl import sift as module
+    else:
+        from . import _sift_cpu as module
+    return getattr(module, name)
+
+
+class SiftPlan(object):
+    """SIFT keypoints extraction.
+
+    This creates an instance of :class:`silx.opencl.sift.plan.SiftPlan`
+    if an OpenCL device is available, or of its CPU counterpart otherwise.
+    See :class:`silx.opencl.sift.plan.SiftPlan` for arguments.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        return _implementation("SiftPlan")(*args, **kwargs)
+
+
+class MatchPlan(object):
+    """SIFT keypoints matching.
+
+    This creates an instance of :class:`silx.opencl.sift.match.MatchPlan`
+    if an OpenCL device is available, or of its CPU counterpart otherwise.
+    See :class:`silx.opencl.sift.match.MatchPlan` for arguments.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        return _implementation("MatchPlan")(*args, **kwargs)
+
+
+class LinearAlign(object):
+    """Linear alignment of images on a reference based on SIFT keypoints.
+
+    This creates an instance of :class:`silx.opencl.sift.alignment.LinearAlign`
+    if an OpenCL device is available, or of its CPU counterpart otherwise.
+    See :class:`silx.opencl.sift.alignment.LinearAlign` for arguments.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        return _implementation("LinearAlign")(*args, **kwargs)
@@ -32,6 +32,8 @@ from . import test_bilinear
 from . import test_shapes
 from . import test_medianfilter
 from . import test_tomography
+from . import test_reconstruction_cpu
+from . import test_sift_cpu
 from ..marchingsquares.test import suite as marchingsquares_suite
 
 
@@ -42,5 +44,7 @@ def suite():
     test_suite.addTest(test_medianfilter.suite())
     test_suite.addTest(test_shapes.suite())
     test_suite.addTest(test_tomography.suite())
+    test_suite.addTest(test_reconstruction_cpu.suite())
+    test_suite.addTest(test_sift_cpu.suite())
     test_suite.addTest(marchingsquares_suite())
     return test_suite
@@ -24,13 +24,15 @@
 
 __authors__ = ["J. Kieffer"]
 __license__ = "MIT"
-__date__ = "02/08/2016"
+__date__ = "18/10/2018"
 
+import multiprocessing
 import unittest
 import numpy
 import logging
 logger = logging.getLogger(__name__)
-from ..bilinear import BilinearImage
+from .. import bilinear
+from ..bilinear import BilinearImage, profile_line_stack
 
 
 class TestBilinear(unittest.TestCase):
@@ -131,6 +133,70 @@ class TestBilinear(unittest.TestCase):
         self.assertLess(abs(res_ver - expected_profile).max(), 1e-5,
                         "correct vertical profile")
 
+    def test_map_order(self):
+        N = 100
+        y, x = numpy.ogrid[:N, :N + 10]
+        img = x + 2 * y
+        b = BilinearImage(img)
+        rows = numpy.array([10.3, 5.5, 50.])
+        cols = numpy.array([20.7, 30.25, 0.])
+
+        res = b.map_coordinates((rows, cols), order=0)
+        self.assertTrue(numpy.array_equal(res, (21 + 2 * 10, 30 + 2 * 6, 100)))
+
+        # Cubic convolution is exact for linear data
+        res = b.map_coordinates((rows, cols), order=3)
+        self.assertLess(abs(res - (cols + 2 * rows)).max(), 1e-4)
+
+        with self.assertRaises(ValueError):
+            b.map_coordinates((rows, cols), order=2)
+
+    def test_profile_lines(self):
+        img = numpy.random.random((50, 60))
+        b = BilinearImage(img)
+        srcs = numpy.random.uniform(-5, 55, (10, 2))
+        dsts = numpy.random.uniform(-5, 55, (10, 2))
+        linewidths = numpy.random.randint(1, 5, 10)
+        for order in (0, 1, 3):
+            profiles = b.profile_lines(srcs, dsts, linewidths, order=order)
+            self.assertEqual(len(profiles), len(srcs))
+            for src, dst, linewidth, profile in zip(
+                    srcs, dsts, linewidths, profiles):
+                expected = b.profile_line(src, dst, linewidth, order=order)
+                self.assertTrue(numpy.array_equal(profile, expected),
+                                "same profile as profile_line")
+
+    def test_profile_line_stack(self):
+        stack = numpy.random.random((5, 50, 60))
+        for order in (0, 1, 3):
+            profiles = profile_line_stack(
+                stack, (3, 4), (40, 50.5), linewidth=3, order=order)
+            self.assertEqual(profiles.shape[0], len(stack))
+            for image, profile in zip(stack, profiles):
+                expected = BilinearImage(image).profile_line(
+                    (3, 4), (40, 50.5), linewidth=3, order=order)
+                self.assertTrue(numpy.array_equal(profile, expected),
+                                "same profile as profile_line")
+
+    def test_profile_line_stack_chunks(self):
+        """Test a stack processed by chunks of frames, without float32 copy"""
+        nframes = 3 * multiprocessing.cpu_count() + 1
+        stack = numpy.random.randint(0, 1000, (nframes, 20, 30)).astype(numpy.uint16)
+        chunk_pixels = bilinear._STACK_CHUNK_PIXELS
+        bilinear._STACK_CHUNK_PIXELS = 2 * 20 * 30
+        try:
+            profiles = profile_line_stack(stack, (3, 4), (15, 25.5), linewidth=2)
+        finally:
+            bilinear._STACK_CHUNK_PIXELS = chunk_pixels
+        self.assertEqual(profiles.shape[0], nframes)
+        for image, profile in zip(stack, profiles):
+            expected = BilinearImage(image).profile_line(
+                (3, 4), (15, 25.5), linewidth=2)
+            self.assertTrue(numpy.array_equal(profile, expected))
+
+        with self.assertRaises(ValueError):
+            profile_line_stack(stack[0], (3, 4), (15, 25.5))
+
 
 def suite():
     testsuite = unittest.TestSuite()
@@ -139,4 +205,8 @@ def suite():
     testsuite.addTest(TestBilinear("test_map"))
     testsuite.addTest(TestBilinear("test_profile_grad"))
     testsuite.addTest(TestBilinear("test_profile_gaus"))
+    testsuite.addTest(TestBilinear("test_map_order"))
+    testsuite.addTest(TestBilinear("test_profile_lines"))
+    testsuite.addTest(TestBilinear("test_profile_line_stack"))
+    testsuite.addTest(TestBilinear("test_profile_line_stack_chunks"))
     return testsuite
@@ -0,0 +1,168 @@
+# coding: utf-8
+# /*##########################################################################
+#
+# Copyright (c) 2018 European Synchrotron Radiation Facility
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# ###########################################################################*/
+"""Tests of the CPU implementation of tomographic reconstruction"""
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/10/2018"
+
+import unittest
+import numpy
+
+from silx.image import _reconstruction_cpu
+from silx.image.phantomgenerator import PhantomGenerator
+
+
+class TestReconstructionCPU(unittest.TestCase):
+    """Tests of CPU projection, backprojection and reconstruction"""
+
+    def setUp(self):
+        self.phantom = PhantomGenerator.get2DPhantomSheppLogan(64)
+        self.phantom = self.phantom.astype(numpy.float32)
+        projector = _reconstruction_cpu.Projection(self.phantom.shape, 90)
+        self.sino = projector.projection(self.phantom)
+
+    def tearDown(self):
+        self.phantom = None
+        self.sino = None
+
+    def testProjection(self):
+        """Test that projection preserves the integral of the slice"""
+        self.assertEqual(self.sino.shape, (90, 64))
+        self.assertTrue(numpy.allclose(self.sino.sum(axis=1),
+                                       self.phantom.sum(),
+                                       rtol=0.01))
+
+        # With a destination array
+        projector = _reconstruction_cpu.Projection(
+            self.phantom.shape, 90, normalize=True)
+        dst = numpy.zeros((90, 64), dtype=numpy.float64)
+        res = projector.projection(self.phantom, dst=dst)
+        self.assertIs(res, dst)
+        self.assertTrue(numpy.allclose(
+            dst, self.sino * numpy.pi / (2 * 90), atol=1e-5))
+
+    def testBackprojection(self):
+        """Test filtered backprojection of a projected slice"""
+        backprojector = _reconstruction_cpu.Backprojection(self.sino.shape)
+        res = backprojector.filtered_backprojection(self.sino)
+        self.assertEqual(res.shape, self.phantom.shape)
+        self.assertLess(numpy.abs(res - self.phantom).mean(), 0.02)
+
+        # Backprojection of a constant sinogram
+        dst = numpy.zeros(self.phantom.shape, dtype=numpy.float32)
+        backprojector.backprojection(numpy.ones_like(self.sino), dst=dst)
+        self.assertEqual(dst[32, 32], 90)
+
+        # Only the Ram-Lak filter is available
+        with self.assertRaises(ValueError):
+            _reconstruction_cpu.Backprojection(
+                self.sino.shape, filter_name="Shepp-Logan")
+
+    def testBackprojectionStack(self):
+        """Test filtered backprojection of a stack of sinograms"""
+        sinos = numpy.array((self.sino, 2 * self.sino, self.sino[:, ::-1]))
+        backprojector = _reconstruction_cpu.Backprojection(
+            self.sino.shape, slice_shape=(60, 50))
+        expected = [backprojector.filtered_backprojection(sino)
+                    for sino in sinos]
+
+        res = backprojector.filtered_backprojection_stack(sinos)
+        self.assertTrue(numpy.allclose(res, expected))
+
+        dst = numpy.zeros((3, 60, 50), dtype=numpy.float64)
+        res = backprojector.filtered_backprojection_stack(sinos, dst=dst)
+        self.assertIs(res, dst)
+        self.assertTrue(numpy.allclose(dst, expected))
+
+        with self.assertRaises(ValueError):
+            backprojector.filtered_backprojection_stack(sinos[:, :10])
+
+    def testSIRT(self):
+        """Test SIRT reconstruction"""
+        sirt = _reconstruction_cpu.SIRT(self.sino.shape)
+        errors = []
+        for nbIterations in (1, 10, 50):
+            res = sirt.run(self.sino, nbIterations)
+            errors.append(numpy.abs(res - self.phantom).mean())
+        self.assertTrue(errors[0] > errors[1] > errors[2])
+
+    def testTV(self):
+        """Test TV reconstruction"""
+        tv = _reconstruction_cpu.TV(self.sino.shape)
+        res = tv.run(self.sino, 50, 1e-2, pos_constraint=True)
+        self.assertTrue(numpy.all(res >= 0))
+        self.assertLess(numpy.abs(res - self.phantom).mean(), 0.02)
+
+    def testSIRTSubsets(self):
+        """Test SIRT reconstruction with ordered subsets"""
+        sirt = _reconstruction_cpu.SIRT(self.sino.shape)
+        os_sirt = _reconstruction_cpu.SIRT(self.sino.shape, n_subsets=4)
+        self.assertEqual(len(os_sirt.subsets), 4)
+        error = numpy.abs(sirt.run(self.sino, 20) - self.phantom).mean()
+        res = os_sirt.run(self.sino, 5)
+        self.assertLessEqual(numpy.abs(res - self.phantom).mean(), error)
+
+        # Warm start continues the previous run
+        expected = numpy.array(os_sirt.run(self.sino, 5))
+        os_sirt.run(self.sino, 2)
+        res = os_sirt.run(self.sino, 3, warm_start=True)
+        self.assertTrue(numpy.allclose(res, expected, atol=1e-6))
+
+        # Initial slice
+        res = os_sirt.run(self.sino, 3, x0=os_sirt.run(self.sino, 2).copy())
+        self.assertTrue(numpy.allclose(res, expected, atol=1e-6))
+
+    def testConvergence(self):
+        """Test stopping iterations on the relative update of the slice"""
+        sirt = _reconstruction_cpu.SIRT(self.sino.shape, n_subsets=4)
+        sirt.run(self.sino, 100, tol=1e-2)
+        self.assertLess(len(sirt.convergence), 100)
+        self.assertLess(sirt.convergence[-1], 1e-2)
+        self.assertTrue(all(update >= 1e-2 for update in sirt.convergence[:-1]))
+
+        sirt.run(self.sino, 10)
+        self.assertEqual(len(sirt.convergence), 10)
+
+    def testTVSubsets(self):
+        """Test TV reconstruction with ordered subsets"""
+        tv = _reconstruction_cpu.TV(self.sino.shape, n_subsets=4)
+        res = tv.run(self.sino, 20, 1e-2, pos_constraint=True)
+        self.assertTrue(numpy.all(res >= 0))
+        self.assertLess(numpy.abs(res - self.phantom).mean(), 0.02)
+
+        res = tv.run(self.sino, 20, 1e-2, pos_constraint=True, tol=1e-3)
+        self.assertLessEqual(len(tv.convergence), 20)
+
+
+def suite():
+    test_suite = unittest.TestSuite()
+    test_suite.addTest(
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestReconstructionCPU))
+    return test_suite
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
@@ -27,7 +27,7 @@
 
 __authors__ = ["T. Vincent"]
 __license__ = "MIT"
-__date__ = "17/01/2018"
+__date__ = "18/10/2018"
 
 
 import logging
@@ -151,6 +151,57 @@ class TestPolygonFill(ParametricTestCase):
                 self.assertTrue(is_equal)
 
 
+class TestPolygon(ParametricTestCase):
+    """Tests of Polygon points check and batch fill"""
+
+    def setUp(self):
+        self.vertices = numpy.array(((0, 0), (10, 5), (2, 9)))
+
+    def test_contains_points(self):
+        """Test contains_points against is_inside"""
+        polygon = shapes.Polygon(self.vertices)
+        rows, cols = numpy.mgrid[-1:12:0.5, -1:11:0.5]
+        ref = [polygon.is_inside(row, col)
+               for row, col in zip(rows.ravel(), cols.ravel())]
+
+        result = polygon.contains_points(rows, cols)
+        self.assertEqual(result.dtype, numpy.bool_)
+        self.assertEqual(result.shape, rows.shape)
+        self.assertTrue(numpy.array_equal(result.ravel(), ref))
+
+        # Broadcasting
+        result = polygon.contains_points(rows[:, 0:1], cols[0])
+        self.assertEqual(result.shape, rows.shape)
+        self.assertTrue(numpy.array_equal(result.ravel(), ref))
+
+    def test_fill_labels(self):
+        """Test polygons_fill_labels against polygon_fill_mask"""
+        shape = 12, 11
+        polygons = [self.vertices,
+                    ((-2, -2), (5, -2), (5, 20), (-2, 20)),
+                    ((8, 3), (11, 3), (9, 15)),
+                    ()]
+        tests = {
+            'default labels': None,
+            'labels': (4, 3, 1, 2),
+        }
+        for test_name, labels in tests.items():
+            with self.subTest(msg=test_name):
+                result = shapes.polygons_fill_labels(
+                    polygons, shape, labels=labels)
+
+                if labels is None:
+                    labels = range(1, len(polygons) + 1)
+                ref = numpy.zeros(shape, dtype=numpy.int32)
+                for vertices, label in zip(polygons[:-1], labels):
+                    mask = shapes.polygon_fill_mask(vertices, shape)
+                    ref[mask != 0] = label
+                self.assertTrue(numpy.array_equal(result, ref))
+
+        with self.assertRaises(ValueError):
+            shapes.polygons_fill_labels(polygons, shape, labels=(1,))
+
+
 class TestDrawLine(ParametricTestCase):
     """basic draw line test"""
 
@@ -322,7 +373,8 @@ class TestCircleFill(ParametricTestCase):
 
 def suite():
     test_suite = unittest.TestSuite()
-    for testClass in (TestPolygonFill, TestDrawLine, TestCircleFill):
+    for testClass in (TestPolygonFill, TestPolygon, TestDrawLine,
+                      TestCircleFill):
         test_suite.addTest(
             unittest.defaultTestLoader.loadTestsFromTestCase(testClass))
     return test_suite
@@ -0,0 +1,115 @@
+# coding: utf-8
+# /*##########################################################################
+#
+# Copyright (c) 2018 European Synchrotron Radiation Facility
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# ###########################################################################*/
+"""Tests of the CPU implementation of SIFT"""
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/10/2018"
+
+import unittest
+import numpy
+
+from silx.image import _sift_cpu
+
+
+class TestSiftCPU(unittest.TestCase):
+    """Tests of CPU keypoints extraction, matching and alignment"""
+
+    def setUp(self):
+        # Image made of random Gaussian blobs
+        state = numpy.random.RandomState(0)
+        y, x = numpy.mgrid[0:256, 0:256]
+        self.image = numpy.zeros((256, 256), dtype=numpy.float32)
+        for _ in range(60):
+            cy, cx = state.uniform(0, 256, 2)
+            sigma = state.uniform(2, 10)
+            amplitude = state.uniform(-1, 1)
+            self.image += amplitude * numpy.exp(
+                -((y - cy) ** 2 + (x - cx) ** 2) / (2 * sigma ** 2))
+        self.shifted = numpy.zeros_like(self.image)
+        self.shifted[5:, 8:] = self.image[:-5, :-8]
+
+    def tearDown(self):
+        self.image = None
+        self.shifted = None
+
+    def testKeypoints(self):
+        """Test keypoints extraction"""
+        plan = _sift_cpu.SiftPlan(template=self.image)
+        keypoints = plan.keypoints(self.image)
+        self.assertEqual(keypoints.dtype, _sift_cpu.SiftPlan.dtype_kp)
+        self.assertGreater(len(keypoints), 20)
+        self.assertTrue(numpy.all(keypoints.x >= 0))
+        self.assertTrue(numpy.all(keypoints.x < 256))
+        self.assertTrue(numpy.all(keypoints.y >= 0))
+        self.assertTrue(numpy.all(keypoints.y < 256))
+        self.assertTrue(numpy.all(keypoints.scale > 0))
+        self.assertTrue(numpy.all(numpy.abs(keypoints.angle) <= numpy.pi))
+
+        # Keypoints are invariant to intensity scaling
+        other = plan.keypoints(self.image * 10 + 3)
+        self.assertEqual(len(other), len(keypoints))
+
+    def testMatch(self):
+        """Test matching keypoints of shifted images"""
+        plan = _sift_cpu.SiftPlan(template=self.image)
+        kp1 = plan.keypoints(self.image)
+        kp2 = plan.keypoints(self.shifted)
+
+        matching = _sift_cpu.MatchPlan().match(kp1, kp2)
+        self.assertGreater(len(matching), 10)
+        self.assertEqual(numpy.median(matching[:, 1].x - matching[:, 0].x), 8)
+        self.assertEqual(numpy.median(matching[:, 1].y - matching[:, 0].y), 5)
+
+        # Compare with the numpy implementation
+        from silx.opencl.sift.match import match_py
+        raw = _sift_cpu.MatchPlan().match(kp1, kp2, raw_results=True)
+        self.assertTrue(numpy.array_equal(
+            raw, match_py(kp1, kp2, raw_results=True)))
+
+    def testAlign(self):
+        """Test alignment of a shifted image"""
+        align = _sift_cpu.LinearAlign(self.image)
+        result = align.align(self.shifted, shift_only=True, return_all=True)
+        self.assertTrue(numpy.allclose(result["offset"], (5, 8)))
+        self.assertTrue(numpy.allclose(
+            result["result"][:-10, :-10], self.image[:-10, :-10]))
+
+        result = align.align(self.shifted, return_all=True)
+        self.assertTrue(numpy.allclose(
+            numpy.ravel(result["offset"]), (5, 8), atol=0.2))
+        self.assertTrue(numpy.allclose(
+            result["matrix"], numpy.identity(2), atol=0.01))
+
+
+def suite():
+    test_suite = unittest.TestSuite()
+    test_suite.addTest(
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestSiftCPU))
+    return test_suite
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='suite')
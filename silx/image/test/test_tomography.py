@@ -28,11 +28,12 @@ Tests that the functions of tomography are valid
 
 __authors__ = ["H. Payno"]
 __license__ = "MIT"
-__date__ = "12/09/2017"
+__date__ = "18/10/2018"
 
 import unittest
 import numpy
 from silx.test.utils import utilstest
+from silx.utils.testutils import ParametricTestCase
 from silx.image import tomography
 
 class TestTomography(unittest.TestCase):
@@ -54,9 +55,101 @@ class TestTomography(unittest.TestCase):
         self.assertTrue(numpy.isclose(centerTrueData, 256, rtol=0.01))
 
 
+class TestCenterOfRotation(ParametricTestCase):
+    """Tests of the CoR estimation using pairs of opposite projections"""
+
+    @staticmethod
+    def sinogram(center, n_angles=360, n_det=256, fullrot=False):
+        """Returns the sinogram of gaussian spots and its angles"""
+        angles = numpy.linspace(0, numpy.pi * (2 if fullrot else 1),
+                                n_angles, endpoint=not fullrot)
+        positions = numpy.arange(n_det)
+        sino = numpy.zeros((n_angles, n_det))
+        for radius, phase, width in ((20, 0.3, 2.), (50, 2., 4.), (5, 4., 1.)):
+            spot = center + radius * numpy.cos(angles + phase)
+            sino += numpy.exp(
+                -(positions - spot[:, numpy.newaxis]) ** 2 / (2 * width ** 2))
+        return sino, angles
+
+    def testProjectionPairs(self):
+        # [0, 180] range: only the first and last projections are opposite
+        angles = numpy.radians(numpy.arange(361) * 0.5)
+        pairs = tomography._projection_pairs(angles)
+        self.assertEqual(pairs.tolist(), [[0, 360]])
+
+        # Full rotation, shuffled and beyond 2*pi
+        angles = numpy.radians(numpy.arange(360) + 0.1)
+        order = numpy.random.RandomState(0).permutation(360)
+        shuffled = angles[order] + 2 * numpy.pi * (order % 2)
+        pairs = tomography._projection_pairs(shuffled)
+        self.assertEqual(len(pairs), 180)
+        self.assertTrue(numpy.all(pairs[:, 0] < pairs[:, 1]))
+        self.assertTrue(numpy.array_equal(
+            numpy.abs(order[pairs[:, 0]] - order[pairs[:, 1]]),
+            numpy.full(180, 180)))
+
+        # Pairs out of the tolerance are dropped
+        angles = numpy.radians([0., 10., 20., 183., 190.])
+        pairs = tomography._projection_pairs(angles, tolerance=numpy.radians(1.))
+        self.assertEqual(pairs.tolist(), [[1, 4]])
+
+    def testCalcCenterPairs(self):
+        for center in (127.5, 120.25, 140.):
+            for fullrot in (False, True):
+                with self.subTest(center=center, fullrot=fullrot):
+                    sino, angles = self.sinogram(center, fullrot=fullrot)
+                    result = tomography.calc_center_pairs(sino, angles)
+                    self.assertAlmostEqual(result, center, delta=0.1)
+
+    def testCalcCenterPairsSearchRange(self):
+        sino, angles = self.sinogram(120.)
+        result = tomography.calc_center_pairs(
+            sino, angles, search_range=(110, 130))
+        self.assertAlmostEqual(result, 120., delta=0.1)
+
+        with self.assertRaises(ValueError):
+            tomography.calc_center_pairs(sino, angles[:10])
+
+    def testCalcCenterRows(self):
+        tilt = 0.05
+        sinos = numpy.array([self.sinogram(120. + tilt * row)[0]
+                             for row in range(16)])
+        angles = self.sinogram(120.)[1]
+
+        result = tomography.calc_center_rows(sinos, angles, max_workers=4)
+        self.assertTrue(numpy.array_equal(result.rows, numpy.arange(16)))
+        self.assertTrue(numpy.allclose(
+            result.centers, 120. + tilt * numpy.arange(16), atol=0.1))
+        self.assertAlmostEqual(result.center, 120. + tilt * 7.5, delta=0.1)
+        self.assertAlmostEqual(result.tilt, numpy.arctan(tilt), delta=0.01)
+
+        result = tomography.calc_center_rows(sinos, angles, rows=[3])
+        self.assertAlmostEqual(result.center, 120. + tilt * 3, delta=0.1)
+        self.assertEqual(result.tilt, 0.)
+
+
+class TestOrderedSubsets(unittest.TestCase):
+    """Tests of the split of projections into ordered subsets"""
+
+    def testOrderedSubsets(self):
+        subsets = tomography.ordered_subsets(10, 4)
+        self.assertEqual([list(subset) for subset in subsets],
+                         [[0, 4, 8], [2, 6], [1, 5, 9], [3, 7]])
+
+        subsets = tomography.ordered_subsets(7, 1)
+        self.assertEqual(len(subsets), 1)
+        self.assertEqual(list(subsets[0]), list(range(7)))
+
+        subsets = tomography.ordered_subsets(100, 6)
+        self.assertEqual(sorted(numpy.concatenate(subsets)), list(range(100)))
+
+        with self.assertRaises(ValueError):
+            tomography.ordered_subsets(10, 11)
+
+
 def suite():
     test_suite = unittest.TestSuite()
-    for testClass in (TestTomography, ):
+    for testClass in (TestTomography, TestCenterOfRotation, TestOrderedSubsets):
         test_suite.addTest(
             unittest.defaultTestLoader.loadTestsFromTestCase(testClass))
     return test_suite
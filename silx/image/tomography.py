@@ -27,12 +27,15 @@ This module contains utilitary functions for tomography
 
 __author__ = ["P. Paleo"]
 __license__ = "MIT"
-__date__ = "12/09/2017"
+__date__ = "18/10/2018"
 
 
+from collections import namedtuple
+import multiprocessing
 import numpy as np
 from math import pi
 from silx.math.fit import leastsq
+from silx.third_party.concurrent_futures import ThreadPoolExecutor
 
 
 def rescale_intensity(img, from_subimg=None, percentiles=None):
@@ -157,3 +160,247 @@ def calc_center_centroid(sino):
                       left_derivative=False,
                       max_iter=100)
     return popt[0]
+
+
+def _projection_pairs(angles, tolerance=None):
+    """
+    Helper function for calc_center_pairs:
+    Returns the indices of the pairs of opposite projections (theta, theta+180)
+
+    :param numpy.ndarray angles: Projection angles in radians
+    :param float tolerance: Maximum angular error of a pair in radians.
+                            Default: half the mean angular step.
+    :return: Array of pairs of projection indices, of shape (n_pairs, 2)
+    """
+    angles = np.asarray(angles, dtype=np.float64)
+    n_a = len(angles)
+    if tolerance is None:
+        if n_a > 1:
+            tolerance = 0.5 * np.abs(np.diff(angles)).mean()
+        else:
+            tolerance = 0.
+    if n_a == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    # Angles are compared modulo 2*pi: look for the closest angle to
+    # theta+180 among the sorted angles, on both sides of its position
+    wrapped = np.mod(angles, 2 * pi)
+    order = np.argsort(wrapped, kind="mergesort")
+    sorted_angles = wrapped[order]
+    opposite = np.mod(angles + pi, 2 * pi)
+    position = np.searchsorted(sorted_angles, opposite)
+    neighbours = np.stack(((position - 1) % n_a, position % n_a), axis=1)
+    error = np.abs(sorted_angles[neighbours] - opposite[:, np.newaxis])
+    error = np.minimum(error, 2 * pi - error)
+    nearest = np.argmin(error, axis=1)
+    closest = order[neighbours[np.arange(n_a), nearest]]
+    valid = error[np.arange(n_a), nearest] <= tolerance
+    first = np.nonzero(valid)[0]
+    pairs = np.stack((first, closest[valid]), axis=1)
+    # Keep each pair only once
+    return pairs[pairs[:, 0] < pairs[:, 1]]
+
+
+def _consistency_scores(sino, pairs):
+    """
+    Helper function for calc_center_pairs:
+    Returns the inconsistency of opposite projections for all centers.
+
+    For a center c, projection p(theta+180, s) should equal p(theta, 2c-s).
+    The mean squared difference over the overlapping detector range is
+    computed for all shifts at once with a batched FFT cross-correlation.
+
+    :param numpy.ndarray sino: Sinogram of shape (n_angles, n_det)
+    :param numpy.ndarray pairs: Pairs of projection indices
+    :return: (scores, overlap) for the centers (n_det - 1 + k) / 2
+             with k in [-(n_det-1), n_det-1]
+    """
+    n_d = sino.shape[1]
+    size = 2 * n_d
+    proj1 = np.asarray(sino[pairs[:, 0]], dtype=np.float64)
+    proj2 = np.asarray(sino[pairs[:, 1]], dtype=np.float64)[:, ::-1]
+
+    # Sum of the cross-correlations of all pairs: sum before inverse FFT
+    proj1_f = np.fft.rfft(proj1, size, axis=1)
+    proj2_f = np.fft.rfft(proj2, size, axis=1)
+    corr = np.fft.irfft((proj1_f * proj2_f.conj()).sum(axis=0), size)
+    # corr[k] = sum_s proj1(s) proj2(s - k), reorder k from -(n_d-1)
+    corr = np.concatenate((corr[-(n_d - 1):], corr[:n_d]))
+
+    # Sum of squares over the overlapping ranges
+    cumsum1 = np.concatenate(((0.,), np.cumsum((proj1 ** 2).sum(axis=0))))
+    cumsum2 = np.concatenate(((0.,), np.cumsum((proj2 ** 2).sum(axis=0))))
+    shifts = np.arange(-(n_d - 1), n_d)
+    start1 = np.maximum(shifts, 0)
+    stop1 = np.minimum(n_d + shifts, n_d)
+    sum1 = cumsum1[stop1] - cumsum1[start1]
+    sum2 = cumsum2[stop1 - shifts] - cumsum2[start1 - shifts]
+
+    overlap = n_d - np.abs(shifts)
+    scores = (sum1 + sum2 - 2 * corr) / (overlap * len(pairs))
+    return scores, overlap
+
+
+def calc_center_pairs(sino, angles=None, search_range=None):
+    """
+    Compute the Center of Rotation (CoR) of a given sinogram.
+
+    All the pairs of opposite projections (theta, theta+180) are used.
+    Candidate centers are scored by the mean squared difference between
+    one projection and the mirrored opposite one, and the best candidate is
+    refined to sub-pixel with a parabolic fit.
+
+    The center is given in pixel coordinates of the detector, i.e.,
+    (n_det - 1) / 2 for a centered rotation axis.
+
+    :param numpy.ndarray sino: Sinogram of shape (n_angles, n_det)
+    :param numpy.ndarray angles: optional. Projection angles in radians.
+                                 Default: [0, 180] range evenly spaced.
+    :param search_range: optional. (min, max) range of centers to test.
+                         Default: centers for which the opposite projections
+                         overlap on at least half the detector.
+    :rtype: float
+    """
+    sino = np.asarray(sino)
+    pairs = _get_pairs(sino.shape[0], angles)
+    return _calc_center_pairs(sino, pairs, search_range)
+
+
+def _get_pairs(n_a, angles=None):
+    """
+    Helper function for calc_center_pairs and calc_center_rows:
+    Returns the pairs of opposite projections, checking the angles.
+
+    :param int n_a: Number of projections
+    :param numpy.ndarray angles: Projection angles in radians or None
+    :return: Array of pairs of projection indices, of shape (n_pairs, 2)
+    """
+    if angles is None:
+        angles = np.linspace(0, pi, n_a, True)
+    elif len(angles) != n_a:
+        raise ValueError("Expected %d angles, got %d" % (n_a, len(angles)))
+
+    pairs = _projection_pairs(angles)
+    if len(pairs) == 0:
+        raise ValueError("No pair of opposite projections found")
+    return pairs
+
+
+def _calc_center_pairs(sino, pairs, search_range=None):
+    """
+    Helper function for calc_center_pairs and calc_center_rows:
+    Returns the CoR of a sinogram from its pairs of opposite projections.
+
+    :param numpy.ndarray sino: Sinogram of shape (n_angles, n_det)
+    :param numpy.ndarray pairs: Pairs of projection indices
+    :param search_range: optional. (min, max) range of centers to test.
+    :rtype: float
+    """
+    n_d = sino.shape[1]
+    scores, overlap = _consistency_scores(sino, pairs)
+    centers = (n_d - 1 + np.arange(-(n_d - 1), n_d)) / 2.
+    if search_range is None:
+        valid = overlap >= n_d / 2.
+    else:
+        valid = np.logical_and(centers >= min(search_range),
+                               centers <= max(search_range))
+    if not np.any(valid):
+        raise ValueError("No candidate center in search range")
+    candidates = np.nonzero(valid)[0]
+    index = candidates[np.argmin(scores[candidates])]
+
+    # Sub-pixel refinement
+    offset = 0.
+    if 0 < index < len(scores) - 1:
+        left, middle, right = scores[index - 1:index + 2]
+        curvature = left - 2 * middle + right
+        if curvature > 0:
+            offset = 0.5 * (left - right) / curvature
+    # Candidate centers are spaced by half a pixel
+    return centers[index] + offset / 2.
+
+
+CenterOfRotation = namedtuple("CenterOfRotation",
+                              ["center", "tilt", "rows", "centers"])
+"""Result of :func:`calc_center_rows`:
+
+- center: CoR at the middle of the processed rows
+- tilt: Tilt angle of the rotation axis in radians, from a linear fit of the
+  per-row centers
+- rows: Indices of the processed rows
+- centers: CoR of each processed row
+"""
+
+
+def calc_center_rows(sinos, angles=None, rows=None, search_range=None,
+                     max_workers=None):
+    """
+    Compute the Center of Rotation (CoR) on many rows of a dataset and
+    the tilt of the rotation axis.
+
+    The CoR of each row is computed with :func:`calc_center_pairs`.
+    Rows are processed in parallel with a pool of threads.
+
+    :param sinos: Stack of sinograms of shape (n_rows, n_angles, n_det)
+                  as a numpy.ndarray or any array-like supporting indexing
+                  along the first dimension (e.g., h5py.Dataset).
+    :param numpy.ndarray angles: optional. Projection angles in radians.
+    :param rows: optional. Indices of the rows to process. Default: all.
+    :param search_range: optional. (min, max) range of centers to test.
+    :param int max_workers: optional. Number of threads. Default: number of
+                            CPUs.
+    :rtype: CenterOfRotation
+    """
+    n_rows = sinos.shape[0]
+    if rows is None:
+        rows = np.arange(n_rows)
+    else:
+        rows = np.array(rows, dtype=np.int64, ndmin=1)
+    if len(rows) == 0:
+        raise ValueError("No row to process")
+
+    # Pairs of opposite projections are the same for all rows
+    pairs = _get_pairs(sinos.shape[1], angles)
+
+    def process(row):
+        return _calc_center_pairs(np.asarray(sinos[row]), pairs,
+                                  search_range=search_range)
+
+    if max_workers is None:
+        max_workers = multiprocessing.cpu_count()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        centers = np.array(list(executor.map(process, rows)))
+
+    middle = 0.5 * (rows.min() + rows.max())
+    if len(rows) > 1 and rows.min() != rows.max():
+        slope, center = np.polyfit(rows - middle, centers, 1)
+        tilt = np.arctan(slope)
+    else:
+        center, tilt = centers.mean(), 0.
+    return CenterOfRotation(center, tilt, rows, centers)
+
+
+def ordered_subsets(n_angles, n_subsets):
+    """
+    Split projections into subsets for ordered subsets reconstruction.
+
+    Subset i contains the projections i, i + n_subsets, i + 2 * n_subsets...
+    so that each subset covers the whole angular range.
+    Subsets are returned in bit-reversed order, so that consecutive subsets
+    are far apart in angle.
+
+    :param int n_angles: Number of projections
+    :param int n_subsets: Number of subsets, between 1 and n_angles
+    :return: List of arrays of projection indices, in processing order
+    """
+    n_angles = int(n_angles)
+    n_subsets = int(n_subsets)
+    if not 1 <= n_subsets <= n_angles:
+        raise ValueError("n_subsets must be between 1 and %d, got %d" %
+                         (n_angles, n_subsets))
+    nbits = max(n_subsets - 1, 0).bit_length()
+
+    def bit_reversed(index):
+        return int(format(index, "0%db" % nbits)[::-1], 2) if nbits else 0
+
+    order = sorted(range(n_subsets), key=bit_reversed)
+    return [np.arange(index, n_angles, n_subsets) for index in order]
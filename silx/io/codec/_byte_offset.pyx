@@ -0,0 +1,356 @@
+# coding: utf-8
+# /*##########################################################################
+#
+# Copyright (c) 2018 European Synchrotron Radiation Facility
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# ############################################################################*/
+"""CPU implementation of the CBF byte offset compression/decompression.
+
+This follows the OpenCL implementation of :mod:`silx.opencl.codec.byte_offset`:
+values are stored as 32 bits integers with 8, 16 and 32 bits differences.
+Frames of a stack, or chunks of a single stream, are decompressed in parallel
+with OpenMP when available.
+"""
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/10/2018"
+
+
+cimport cython
+from cython.parallel import prange
+from libc.stdint cimport int8_t, int16_t, int32_t, uint8_t, uint32_t
+import numpy
+
+include "../../utils/_have_openmp.pxi"
+"""Store in the module if it was compiled with OpenMP"""
+
+
+cdef enum:
+    # Number of bytes at the beginning of a chunk where the possible
+    # alignments of values are checked for synchronisation
+    _SYNC_WINDOW = 64
+
+    # Minimum size of a chunk of stream for parallel decompression
+    _MIN_CHUNK_SIZE = 1 << 16
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline Py_ssize_t _next_value(const int8_t[::1] raw,
+                                   Py_ssize_t pos,
+                                   Py_ssize_t stop,
+                                   int32_t *delta) nogil:
+    """Read the difference stored at position pos of the stream
+
+    :return: Position of the next value, or -1 if the stream is truncated
+    """
+    delta[0] = raw[pos]
+    if delta[0] != -128:
+        return pos + 1
+    if pos + 2 >= stop:
+        return -1
+    delta[0] = <int16_t> (<uint8_t> raw[pos + 1] |
+                          (<uint8_t> raw[pos + 2] << 8))
+    if delta[0] != -32768:
+        return pos + 3
+    if pos + 6 >= stop:
+        return -1
+    delta[0] = <int32_t> (<uint32_t> <uint8_t> raw[pos + 3] |
+                          (<uint32_t> <uint8_t> raw[pos + 4] << 8) |
+                          (<uint32_t> <uint8_t> raw[pos + 5] << 16) |
+                          (<uint32_t> <uint8_t> raw[pos + 6] << 24))
+    return pos + 7
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef Py_ssize_t _decompress(const int8_t[::1] raw,
+                            Py_ssize_t pos,
+                            Py_ssize_t end,
+                            Py_ssize_t stop,
+                            uint32_t current,
+                            Py_ssize_t index,
+                            int32_t[::1] output) nogil:
+    """Decompress values starting in raw[pos:end] into output[index:]
+
+    :param raw: The compressed stream
+    :param pos: Position of the first value to decompress
+    :param end: Values starting from end are not decompressed
+    :param stop: Size of the compressed stream
+    :param current: Value preceding the first value to decompress
+    :param index: Index in output of the first value to decompress
+    :param output: Array where to store decompressed values
+    :return: The index following the last decompressed value
+    """
+    cdef:
+        Py_ssize_t size = output.shape[0]
+        int32_t delta
+
+    while pos < end and index < size:
+        pos = _next_value(raw, pos, stop, &delta)
+        if pos < 0:
+            break  # Truncated stream
+        current += <uint32_t> delta
+        output[index] = <int32_t> current
+        index += 1
+    return index
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _scan_chunk(const int8_t[::1] raw,
+                      Py_ssize_t start,
+                      Py_ssize_t end,
+                      Py_ssize_t stop,
+                      Py_ssize_t[::1] counts,
+                      uint32_t[::1] sums,
+                      Py_ssize_t[::1] nexts) nogil:
+    """Pre-scan a chunk of the stream for all possible alignments of values
+
+    The chunk boundary can fall inside an exception, so the first value
+    of the chunk can start at any of the 7 first bytes.
+    For each of those offsets, this computes the number of values starting
+    in raw[start:end], the sum of their differences and the position of
+    the value following them.
+
+    Paths starting at different offsets synchronise after a few values:
+    the path starting at offset 0 is recorded over the first bytes of the
+    chunk so the other ones stop as soon as they join it.
+
+    :param raw: The compressed stream
+    :param start: Beginning of the chunk
+    :param end: End of the chunk
+    :param stop: Size of the compressed stream
+    :param counts: Number of values for each of the 7 offsets
+    :param sums: Sum of differences for each of the 7 offsets
+    :param nexts: Position of the next value for each of the 7 offsets
+    """
+    cdef:
+        Py_ssize_t window_counts[_SYNC_WINDOW]
+        uint32_t window_sums[_SYNC_WINDOW]
+        Py_ssize_t pos, next_pos, count, offset, i
+        uint32_t total
+        int32_t delta
+
+    for i in range(_SYNC_WINDOW):
+        window_counts[i] = -1
+
+    for offset in range(7):
+        pos = start + offset
+        count = 0
+        total = 0
+        while pos < end:
+            i = pos - start
+            if i < _SYNC_WINDOW:
+                if offset == 0:
+                    window_counts[i] = count
+                    window_sums[i] = total
+                elif window_counts[i] >= 0:
+                    # Joined the path starting at offset 0
+                    count += counts[0] - window_counts[i]
+                    total += sums[0] - window_sums[i]
+                    pos = nexts[0]
+                    break
+            next_pos = _next_value(raw, pos, stop, &delta)
+            if next_pos < 0:
+                pos = stop  # Truncated stream
+                break
+            total += <uint32_t> delta
+            count += 1
+            pos = next_pos
+        counts[offset] = count
+        sums[offset] = total
+        nexts[offset] = pos
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _decompress_chunks(const int8_t[::1] raw,
+                             Py_ssize_t chunk_size,
+                             int32_t[::1] output):
+    """Decompress a stream in parallel by chunks of chunk_size bytes
+
+    :param raw: The compressed stream
+    :param chunk_size: Size of the chunks, at least _SYNC_WINDOW
+    :param output: Array where to store decompressed values
+    """
+    cdef:
+        Py_ssize_t stop = raw.shape[0]
+        Py_ssize_t nb_chunks = (stop + chunk_size - 1) // chunk_size
+        Py_ssize_t chunk, offset, end
+        Py_ssize_t index = 0
+        uint32_t current = 0
+        Py_ssize_t[:, ::1] c_counts = numpy.zeros((nb_chunks, 7), dtype=numpy.intp)
+        uint32_t[:, ::1] c_sums = numpy.zeros((nb_chunks, 7), dtype=numpy.uint32)
+        Py_ssize_t[:, ::1] c_nexts = numpy.zeros((nb_chunks, 7), dtype=numpy.intp)
+        Py_ssize_t[::1] c_positions = numpy.zeros((nb_chunks,), dtype=numpy.intp)
+        Py_ssize_t[::1] c_indices = numpy.zeros((nb_chunks,), dtype=numpy.intp)
+        uint32_t[::1] c_currents = numpy.zeros((nb_chunks,), dtype=numpy.uint32)
+
+    # Pre-scan chunks in parallel
+    for chunk in prange(nb_chunks, nogil=True, schedule='static'):
+        _scan_chunk(raw,
+                    chunk * chunk_size,
+                    min(stop, (chunk + 1) * chunk_size),
+                    stop,
+                    c_counts[chunk],
+                    c_sums[chunk],
+                    c_nexts[chunk])
+
+    # Resolve alignment, first index and first value of each chunk
+    offset = 0
+    for chunk in range(nb_chunks):
+        end = min(stop, (chunk + 1) * chunk_size)
+        c_positions[chunk] = chunk * chunk_size + offset
+        c_indices[chunk] = index
+        c_currents[chunk] = current
+        if offset < 7:
+            index += c_counts[chunk, offset]
+            current += c_sums[chunk, offset]
+            offset = c_nexts[chunk, offset] - end
+        else:  # Stream ended in a previous chunk
+            offset -= chunk_size
+
+    # Decompress chunks in parallel
+    for chunk in prange(nb_chunks, nogil=True, schedule='static'):
+        _decompress(raw,
+                    c_positions[chunk],
+                    min(stop, (chunk + 1) * chunk_size),
+                    stop,
+                    c_currents[chunk],
+                    c_indices[chunk],
+                    output)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef Py_ssize_t _compress(const int32_t[::1] data, int8_t[::1] output) nogil:
+    """Compress data into output which must be at least 7 times larger
+
+    :return: The size of the compressed stream
+    """
+    cdef:
+        Py_ssize_t index
+        Py_ssize_t pos = 0
+        uint32_t previous = 0
+        int32_t delta
+
+    for index in range(data.shape[0]):
+        delta = <int32_t> (<uint32_t> data[index] - previous)
+        previous = <uint32_t> data[index]
+        if -128 < delta < 128:
+            output[pos] = <int8_t> delta
+            pos += 1
+        elif -32768 < delta < 32768:
+            output[pos] = -128
+            output[pos + 1] = <int8_t> (delta & 0xFF)
+            output[pos + 2] = <int8_t> ((delta >> 8) & 0xFF)
+            pos += 3
+        else:
+            output[pos] = -128
+            output[pos + 1] = 0
+            output[pos + 2] = -128
+            output[pos + 3] = <int8_t> (delta & 0xFF)
+            output[pos + 4] = <int8_t> ((delta >> 8) & 0xFF)
+            output[pos + 5] = <int8_t> ((delta >> 16) & 0xFF)
+            output[pos + 6] = <int8_t> ((delta >> 24) & 0xFF)
+            pos += 7
+    return pos
+
+
+def decompress(raw, size, nb_chunks=1):
+    """Decompress a CBF byte offset stream.
+
+    :param raw: The compressed stream as bytes or 1D array of int8
+    :param int size: Number of values to decompress
+    :param int nb_chunks:
+        Number of chunks of the stream to decompress in parallel.
+        Chunks are at least 64kB large.
+    :return: The decompressed values. Values missing from the stream are 0.
+    :rtype: numpy.ndarray of int32
+    """
+    cdef const int8_t[::1] c_raw = numpy.ascontiguousarray(
+        numpy.frombuffer(raw, dtype=numpy.int8)
+        if isinstance(raw, bytes) else raw, dtype=numpy.int8).ravel()
+    output = numpy.zeros((size,), dtype=numpy.int32)
+    cdef:
+        int32_t[::1] c_output = output
+        Py_ssize_t stop = c_raw.shape[0]
+        Py_ssize_t chunk_size = max(_MIN_CHUNK_SIZE,
+                                    (stop + nb_chunks - 1) // max(1, nb_chunks))
+    if chunk_size >= stop:
+        with nogil:
+            _decompress(c_raw, 0, stop, stop, 0, 0, c_output)
+    else:
+        _decompress_chunks(c_raw, chunk_size, c_output)
+    return output
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def decompress_many(raws, size):
+    """Decompress many CBF byte offset streams in parallel.
+
+    :param raws: Sequence of compressed streams as bytes or 1D arrays of int8
+    :param int size: Number of values to decompress per stream
+    :return: The decompressed values as a (len(raws), size) array.
+        Values missing from a stream are 0.
+    :rtype: numpy.ndarray of int32
+    """
+    streams = [numpy.frombuffer(raw, dtype=numpy.int8)
+               if isinstance(raw, bytes) else
+               numpy.asarray(raw, dtype=numpy.int8).ravel()
+               for raw in raws]
+    output = numpy.zeros((len(streams), size), dtype=numpy.int32)
+    if len(streams) == 0:
+        return output
+
+    offsets = numpy.zeros((len(streams) + 1,), dtype=numpy.intp)
+    numpy.cumsum([len(stream) for stream in streams], out=offsets[1:])
+    cdef:
+        const int8_t[::1] c_raw = numpy.ascontiguousarray(numpy.concatenate(streams))
+        const Py_ssize_t[::1] c_offsets = offsets
+        int32_t[:, ::1] c_output = output
+        Py_ssize_t index
+
+    for index in prange(c_output.shape[0], nogil=True, schedule='dynamic'):
+        _decompress(c_raw, c_offsets[index], c_offsets[index + 1],
+                    c_offsets[index + 1], 0, 0, c_output[index])
+    return output
+
+
+def compress(data):
+    """Compress data with CBF byte offset.
+
+    :param data: The data to compress, converted to int32
+    :return: The compressed stream
+    :rtype: numpy.ndarray of int8
+    """
+    cdef const int32_t[::1] c_data = numpy.ascontiguousarray(
+        data, dtype=numpy.int32).ravel()
+    output = numpy.empty((7 * c_data.shape[0],), dtype=numpy.int8)
+    cdef:
+        int8_t[::1] c_output = output
+        Py_ssize_t size
+    with nogil:
+        size = _compress(c_data, c_output)
+    return output[:size].copy()
@@ -0,0 +1,170 @@
+# coding: utf-8
+# /*##########################################################################
+#
+# Copyright (c) 2018 European Synchrotron Radiation Facility
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# ############################################################################*/
+"""
+This module provides a CPU class for CBF byte offset compression/decompression.
+
+It has the same API as :class:`silx.opencl.codec.byte_offset.ByteOffset`
+but works on numpy arrays and does not require OpenCL.
+It is also available as :mod:`silx.opencl.codec.byte_offset_cpu`.
+"""
+
+from __future__ import division
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/10/2018"
+
+
+import itertools
+import multiprocessing
+
+import numpy
+
+from . import _byte_offset
+
+
+class ByteOffset(object):
+    """Perform the byte offset compression/decompression on the CPU
+
+    OpenCL related arguments are accepted for compatibility with
+    :class:`silx.opencl.codec.byte_offset.ByteOffset` and ignored.
+
+    :param int raw_size: Not used, for compatibility
+    :param int dec_size:
+        Size of the decompression output array
+        (mandatory for decompression)
+    """
+
+    def __init__(self, raw_size=None, dec_size=None,
+                 ctx=None, devicetype="all",
+                 platformid=None, deviceid=None,
+                 block_size=None, profile=False):
+        self.raw_size = -1 if raw_size is None else int(raw_size)
+        self.dec_size = None if dec_size is None else int(dec_size)
+        if _byte_offset._COMPILED_WITH_OPENMP:
+            self._nb_threads = multiprocessing.cpu_count()
+        else:
+            self._nb_threads = 1
+
+    def decode(self, raw, as_float=False, out=None):
+        """Decompress a CBF byte offset stream
+
+        :param raw: The compressed data as a 1D numpy array of char or bytes
+        :param bool as_float: True to decompress as float32,
+                              False (default) to decompress as int32
+        :param numpy.ndarray out: Array in which to place the result.
+        :return: The decompressed image as a 1D numpy array.
+        :rtype: numpy.ndarray
+        """
+        assert self.dec_size is not None, \
+            "dec_size is a mandatory ByteOffset init argument for decompression"
+        data = _byte_offset.decompress(raw, self.dec_size, self._nb_threads)
+        if out is not None:
+            out[...] = data
+            return out
+        return data.astype(numpy.float32) if as_float else data
+
+    __call__ = decode
+
+    def decode_many(self, raws, as_float=False, callback=None, nb_slots=None):
+        """Decompress a stream of frames, several frames in parallel.
+
+        :param raws: Iterable of compressed frames, as 1D numpy arrays of char
+                     or bytes. It can be a generator reading files.
+        :param bool as_float: True to decompress as float32,
+                              False (default) to decompress as int32
+        :param callable callback:
+            Function called as callback(index, frame) with each decompressed
+            frame as a 1D numpy array, in order. If provided, frames are not
+            accumulated and None is returned.
+        :param int nb_slots:
+            Number of frames decompressed in parallel
+            (default: number of CPUs)
+        :return: The decompressed frames as a (nb_frames, dec_size) array
+        :rtype: Union[numpy.ndarray,None]
+        """
+        assert self.dec_size is not None, \
+            "dec_size is a mandatory ByteOffset init argument for decompression"
+        if nb_slots is None:
+            nb_slots = multiprocessing.cpu_count()
+        nb_slots = max(1, int(nb_slots))
+        dtype = numpy.float32 if as_float else numpy.int32
+
+        raws = iter(raws)
+        frames = []
+        index = 0
+        while True:
+            batch = list(itertools.islice(raws, nb_slots))
+            if len(batch) == 0:
+                break
+            data = _byte_offset.decompress_many(batch, self.dec_size)
+            if as_float:
+                data = data.astype(numpy.float32)
+            if callback is None:
+                frames.append(data)
+            else:
+                for frame in data:
+                    callback(index, frame)
+                    index += 1
+
+        if callback is not None:
+            return None
+        if len(frames) == 0:
+            return numpy.empty((0, self.dec_size), dtype=dtype)
+        return numpy.concatenate(frames)
+
+    def encode(self, data, out=None):
+        """Compress data to CBF.
+
+        :param numpy.ndarray data: The data to compress, converted to int32
+        :param numpy.ndarray out:
+            Array of int8 in which to store the result.
+            The array should be large enough to store the compressed data.
+        :return: The compressed data as a numpy array of int8.
+                 If out is provided, this is a view on its beginning.
+        :rtype: numpy.ndarray
+        :raises ValueError: if out array is not large enough
+        """
+        compressed = _byte_offset.compress(data)
+        if out is None:
+            return compressed
+
+        byte_count = len(compressed)
+        if out.size < byte_count:
+            raise ValueError(
+                "Provided output buffer is not large enough: "
+                "requires %d bytes, got %d" % (byte_count, out.size))
+        out = out.reshape(-1)[:byte_count]
+        out[:] = compressed
+        return out
+
+    def encode_to_bytes(self, data):
+        """Compresses data to CBF and returns compressed data as bytes.
+
+        :param numpy.ndarray data: The data to compress
+        :return: The compressed data
+        :rtype: bytes
+        """
+        return self.encode(data).tobytes()
@@ -0,0 +1,169 @@
+# coding: utf-8
+# /*##########################################################################
+#
+# Copyright (c) 2018 European Synchrotron Radiation Facility
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# ############################################################################*/
+"""Registry of codecs for compressed detector frames.
+
+Codecs are retrieved by name, which is case insensitive, and provide
+``decode(raw, shape, dtype)`` and ``encode(array)`` methods:
+
+.. code-block:: python
+
+    from silx.io.codec import registry
+
+    codec = registry.get_codec("x-CBF_BYTE_OFFSET")
+    image = codec.decode(raw, shape=(195, 487), dtype=numpy.int32)
+
+The codecs provided by this module run on the CPU and do not require OpenCL.
+This module is also available as :mod:`silx.opencl.codec.registry`.
+"""
+
+from __future__ import division
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/10/2018"
+
+
+import multiprocessing
+
+import numpy
+
+from . import _byte_offset
+
+
+class Codec(object):
+    """Base class of codecs"""
+
+    name = None
+    """Name of the codec"""
+
+    aliases = ()
+    """Other names of the codec, e.g., as found in file headers"""
+
+    def decode(self, raw, shape, dtype=numpy.int32):
+        """Decompress a frame
+
+        :param raw: The compressed data as bytes or numpy array of int8
+        :param List[int] shape: Shape of the frame
+        :param numpy.dtype dtype: Data type of the frame
+        :rtype: numpy.ndarray
+        """
+        raise NotImplementedError()
+
+    def encode(self, array):
+        """Compress a frame
+
+        :param numpy.ndarray array: The frame to compress
+        :rtype: bytes
+        """
+        raise NotImplementedError()
+
+
+class ByteOffsetCodec(Codec):
+    """CBF byte offset codec running on the CPU
+
+    A large stream is decompressed in parallel by chunks:
+    a pre-scan of each chunk resolves where values start and their
+    cumulative sum before the chunks are decompressed concurrently.
+
+    :param int nb_threads:
+        Number of chunks a stream is split into for decompression
+        (default: number of CPUs if compiled with OpenMP)
+    """
+
+    name = "byte_offset"
+    aliases = ("x-CBF_BYTE_OFFSET",)
+
+    def __init__(self, nb_threads=None):
+        if nb_threads is None:
+            if _byte_offset._COMPILED_WITH_OPENMP:
+                nb_threads = multiprocessing.cpu_count()
+            else:
+                nb_threads = 1
+        self.nb_threads = max(1, int(nb_threads))
+
+    def decode(self, raw, shape, dtype=numpy.int32):
+        size = int(numpy.prod(shape))
+        data = _byte_offset.decompress(raw, size, self.nb_threads)
+        return data.astype(dtype, copy=False).reshape(shape)
+
+    def encode(self, array):
+        """Compress a frame
+
+        Values are stored as 32 bits integers.
+
+        :param numpy.ndarray array: The frame to compress
+        :rtype: bytes
+        :raises ValueError:
+            if the data is not integer or has values out of int32 range
+        """
+        array = numpy.asarray(array)
+        if array.dtype.kind not in "iub":
+            raise ValueError(
+                "Byte offset only supports integer data, got %s" % array.dtype)
+        if array.size > 0 and not numpy.can_cast(array.dtype, numpy.int32):
+            info = numpy.iinfo(numpy.int32)
+            if array.min() < info.min or array.max() > info.max:
+                raise ValueError(
+                    "Byte offset only supports values in int32 range")
+        return _byte_offset.compress(array).tobytes()
+
+
+_CODECS = {}
+"""Registered codecs by lower case name"""
+
+
+def register_codec(codec):
+    """Register a codec with its name and aliases.
+
+    A codec registered previously with the same name is replaced.
+
+    :param Codec codec: The codec to register
+    """
+    for name in (codec.name,) + tuple(codec.aliases):
+        _CODECS[name.lower()] = codec
+
+
+def get_codec(name):
+    """Returns the codec registered with the given name.
+
+    :param str name: Name or alias of the codec (case insensitive)
+    :rtype: Codec
+    :raises ValueError: if no codec is registered with this name
+    """
+    try:
+        return _CODECS[name.lower()]
+    except KeyError:
+        raise ValueError("Unsupported codec: %s" % name)
+
+
+def codec_names():
+    """Returns the names and aliases of registered codecs
+
+    :rtype: List[str]
+    """
+    return sorted(_CODECS.keys())
+
+
+register_codec(ByteOffsetCodec())
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+#    Project: silx
+#             https://github.com/silx-kit/silx
+#
+#    Copyright (C) 2018  European Synchrotron Radiation Facility, Grenoble, France
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Test suite for the CPU byte offset compression and decompression
+"""
+
+from __future__ import division, print_function
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/10/2018"
+
+import unittest
+import numpy
+from silx.io.codec import byte_offset
+try:
+    import fabio
+except ImportError:
+    fabio = None
+
+
+class TestByteOffsetCPU(unittest.TestCase):
+    """Test the CPU byte offset codec"""
+
+    @staticmethod
+    def _create_test_data(shape, nexcept, lam=200):
+        """Create test image with exceptions of all sizes"""
+        size = numpy.prod(shape)
+        ref = numpy.random.poisson(lam, size).astype(numpy.int32)
+        exception_loc = numpy.random.randint(0, size, size=nexcept)
+        ref[exception_loc] = numpy.random.randint(
+            -2**31, 2**31 - 1, size=nexcept, dtype=numpy.int64)
+        ref[exception_loc[:nexcept // 2]] %= 30000
+        ref.shape = shape
+        return ref
+
+    def test_roundtrip(self):
+        """Test compression followed by decompression"""
+        ref = self._create_test_data((91, 97), nexcept=229)
+        bo = byte_offset.ByteOffset(dec_size=ref.size)
+
+        raw = bo.encode(ref)
+        self.assertEqual(raw.dtype, numpy.int8)
+        self.assertTrue(numpy.array_equal(bo.decode(raw), ref.ravel()))
+        self.assertTrue(numpy.array_equal(
+            bo.decode(raw.tobytes(), as_float=True),
+            ref.ravel().astype(numpy.float32)))
+
+        out = numpy.zeros(7 * ref.size, dtype=numpy.int8)
+        self.assertTrue(numpy.array_equal(bo.encode(ref, out), raw))
+        with self.assertRaises(ValueError):
+            bo.encode(ref, out[:10])
+
+    @unittest.skipIf(fabio is None, "fabio is missing")
+    def test_fabio(self):
+        """Test compatibility with fabio implementation"""
+        ref = self._create_test_data((91, 97), nexcept=229)
+        raw = fabio.compression.compByteOffset(ref)
+
+        bo = byte_offset.ByteOffset(dec_size=ref.size)
+        self.assertEqual(bo.encode_to_bytes(ref), raw)
+        self.assertTrue(numpy.array_equal(bo.decode(raw), ref.ravel()))
+
+    def test_decode_many(self):
+        """Test decompression of a stack of frames"""
+        refs = numpy.array([self._create_test_data((31, 17), nexcept)
+                            for nexcept in (0, 1, 20, 100, 5)])
+        bo = byte_offset.ByteOffset(dec_size=31 * 17)
+        raws = [bo.encode(ref) for ref in refs]
+
+        res = bo.decode_many(iter(raws), nb_slots=2)
+        self.assertTrue(numpy.array_equal(res, refs.reshape(len(refs), -1)))
+
+        frames = []
+        self.assertIsNone(bo.decode_many(
+            raws, callback=lambda index, frame: frames.append((index, frame))))
+        self.assertEqual([index for index, _ in frames], list(range(len(raws))))
+        self.assertTrue(numpy.array_equal([f for _, f in frames],
+                                          refs.reshape(len(refs), -1)))
+
+        self.assertEqual(bo.decode_many([]).shape, (0, 31 * 17))
+
+
+def suite():
+    test_suite = unittest.TestSuite()
+    loader = unittest.defaultTestLoader.loadTestsFromTestCase
+    test_suite.addTest(loader(TestByteOffsetCPU))
+    return test_suite
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest="suite")
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#
+#    Project: silx
+#             https://github.com/silx-kit/silx
+#
+#    Copyright (C) 2018  European Synchrotron Radiation Facility, Grenoble, France
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+Test suite for the codec registry
+"""
+
+from __future__ import division, print_function
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/10/2018"
+
+import unittest
+import numpy
+from silx.io.codec import registry, _byte_offset
+
+
+class TestRegistry(unittest.TestCase):
+    """Test the codec registry and its byte offset codec"""
+
+    def test_get_codec(self):
+        """Test retrieving codecs by name"""
+        codec = registry.get_codec("byte_offset")
+        self.assertIsInstance(codec, registry.ByteOffsetCodec)
+        self.assertIs(registry.get_codec("x-CBF_BYTE_OFFSET"), codec)
+        self.assertIs(registry.get_codec("X-CBF_byte_offset"), codec)
+        self.assertIn("byte_offset", registry.codec_names())
+        with self.assertRaises(ValueError):
+            registry.get_codec("not_a_codec")
+
+    def test_byte_offset(self):
+        """Test byte offset roundtrip"""
+        data = numpy.random.poisson(100, (31, 17)).astype(numpy.uint16)
+        data[0, :3] = 0, 60000, 200
+        codec = registry.get_codec("byte_offset")
+        raw = codec.encode(data)
+        self.assertIsInstance(raw, bytes)
+
+        result = codec.decode(raw, data.shape, data.dtype)
+        self.assertEqual(result.dtype, data.dtype)
+        self.assertTrue(numpy.array_equal(result, data))
+
+        with self.assertRaises(ValueError):
+            codec.encode(numpy.zeros((2, 2), dtype=numpy.float32))
+
+    def test_encode_range(self):
+        """Test encoding of data types larger than int32"""
+        codec = registry.get_codec("byte_offset")
+        for dtype in (numpy.uint32, numpy.int64, numpy.uint64):
+            data = numpy.arange(10, dtype=dtype)
+            raw = codec.encode(data)
+            self.assertTrue(numpy.array_equal(
+                codec.decode(raw, data.shape, dtype), data))
+
+            data[-1] = 2**31
+            with self.assertRaises(ValueError):
+                codec.encode(data)
+
+        data = numpy.array((0, -2**31 - 1), dtype=numpy.int64)
+        with self.assertRaises(ValueError):
+            codec.encode(data)
+
+    def test_chunks(self):
+        """Test decompression of a stream by chunks in parallel"""
+        data = numpy.random.poisson(100, 300000).astype(numpy.int64)
+        exceptions = numpy.random.randint(0, data.size, 10000)
+        data[exceptions[:5000]] = numpy.random.randint(
+            -2**31, 2**31 - 1, 5000, dtype=numpy.int64)
+        data[exceptions[5000:]] = numpy.random.randint(-30000, 30000, 5000)
+        data = data.astype(numpy.int32)
+        raw = _byte_offset.compress(data)
+
+        codec = registry.ByteOffsetCodec(nb_threads=4)
+        self.assertTrue(numpy.array_equal(
+            codec.decode(raw, data.shape), data))
+        # Truncated stream
+        self.assertTrue(numpy.array_equal(
+            codec.decode(raw[:-3], data.shape),
+            _byte_offset.decompress(raw[:-3], data.size)))
+
+
+def suite():
+    test_suite = unittest.TestSuite()
+    loader = unittest.defaultTestLoader.loadTestsFromTestCase
+    test_suite.addTest(loader(TestRegistry))
+    return test_suite
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest="suite")
@@ -38,6 +38,7 @@ import logging
 import numbers
 import os
 
+import fabio.cbfimage
 import fabio.file_series
 import numpy
 
@@ -275,6 +276,42 @@ class MeasurementGroup(commonh5.LazyLoadableGroup):
             self.add_node(dataset)
 
 
+def _is_cbf(file_name):
+    """Returns True if the file name is the one of a CBF file"""
+    return file_name.lower().endswith(".cbf")
+
+
+def _open_cbf(file_name):
+    """Open a CBF file, decompressing its frame with silx codecs.
+
+    It falls back to :func:`fabio.open` if the compression of the file is
+    not supported by :mod:`silx.io.codec.registry`.
+
+    :param str file_name: Name of the CBF file
+    :rtype: fabio.fabioimage.FabioImage
+    """
+    # Imported here to only load codecs when reading CBF files
+    from silx.io.codec import registry
+
+    image = fabio.cbfimage.CbfImage()
+    raw = image.read(file_name, only_raw=True)
+    header = image.header
+    try:
+        codec = registry.get_codec(header.get("conversions", ""))
+        shape = (int(header["X-Binary-Size-Second-Dimension"]),
+                 int(header["X-Binary-Size-Fastest-Dimension"]))
+    except (ValueError, KeyError):
+        _logger.debug("Unsupported CBF file %s, use fabio", file_name)
+        return fabio.open(file_name)
+    dtype = fabio.cbfimage.DATA_TYPES.get(
+        header.get("X-Binary-Element-Type"), numpy.int32)
+
+    image = fabio.cbfimage.CbfImage(
+        data=codec.decode(raw, shape, dtype), header=header)
+    image.filename = file_name
+    return image
+
+
 class FabioReader(object):
     """Class which read and cache data and metadata from a fabio image."""
 
@@ -314,7 +351,10 @@ class FabioReader(object):
         self.__must_be_closed = False
 
         if file_name is not None:
-            self.__fabio_file = fabio.open(file_name)
+            if _is_cbf(file_name):
+                self.__fabio_file = _open_cbf(file_name)
+            else:
+                self.__fabio_file = fabio.open(file_name)
             self.__must_be_closed = True
         elif fabio_image is not None:
             if isinstance(fabio_image, fabio.fabioimage.FabioImage):
@@ -363,6 +403,10 @@ class FabioReader(object):
         """
         if isinstance(self.__fabio_file, fabio.file_series.file_series):
             for file_number in range(len(self.__fabio_file)):
+                file_name = self.__fabio_file[file_number]
+                if _is_cbf(file_name):
+                    yield _open_cbf(file_name)
+                    continue
                 with self.__fabio_file.jump_image(file_number) as fabio_image:
                     # return the first frame only
                     assert(fabio_image.nframes == 1)
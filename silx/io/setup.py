@@ -67,6 +67,7 @@ def configuration(parent_package='', top_path=None):
     config = Configuration('io', parent_package, top_path)
     config.add_subpackage('test')
     config.add_subpackage('nxdata')
+    config.add_subpackage('codec')
 
     srcfiles = ['sfheader', 'sfinit', 'sflists', 'sfdata', 'sfindex',
                 'sflabel', 'sfmca', 'sftools', 'locale_management']
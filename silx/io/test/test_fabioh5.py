@@ -25,7 +25,7 @@
 
 __authors__ = ["V. Valls"]
 __license__ = "MIT"
-__date__ = "24/02/2018"
+__date__ = "18/10/2018"
 
 import os
 import logging
@@ -567,6 +567,45 @@ class TestFabioH5WithFileSeries(unittest.TestCase):
         self._testH5Image(h5_image)
 
 
+class TestFabioH5WithCbf(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        if fabio is None:
+            raise unittest.SkipTest("fabio is needed")
+        if h5py is None:
+            raise unittest.SkipTest("h5py is needed")
+
+        cls.tmp_directory = tempfile.mkdtemp()
+
+        cls.data = []
+        cls.cbf_filenames = []
+        for i in range(3):
+            filename = os.path.join(cls.tmp_directory, "test_%04d.cbf" % i)
+            cls.cbf_filenames.append(filename)
+            data = numpy.random.poisson(100, (19, 23)).astype(numpy.int32)
+            data[i, :3] = -10, 1000, 100000
+            cls.data.append(data)
+            fabio_image = fabio.cbfimage.CbfImage(data=data)
+            fabio_image.write(filename)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_directory)
+
+    def test_single_file(self):
+        h5_image = fabioh5.File(self.cbf_filenames[0])
+        dataset = h5_image["/scan_0/instrument/detector_0/data"]
+        self.assertEqual(dataset.dtype, numpy.int32)
+        numpy.testing.assert_array_equal(dataset[()], self.data[0])
+
+    def test_file_series(self):
+        h5_image = fabioh5.File(file_series=self.cbf_filenames)
+        dataset = h5_image["/scan_0/instrument/detector_0/data"]
+        self.assertEqual(dataset.shape, (3, 19, 23))
+        numpy.testing.assert_array_equal(dataset[()], numpy.array(self.data))
+
+
 def suite():
     loadTests = unittest.defaultTestLoader.loadTestsFromTestCase
     test_suite = unittest.TestSuite()
@@ -574,6 +613,7 @@ def suite():
     test_suite.addTest(loadTests(TestFabioH5MultiFrames))
     test_suite.addTest(loadTests(TestFabioH5WithEdf))
     test_suite.addTest(loadTests(TestFabioH5WithFileSeries))
+    test_suite.addTest(loadTests(TestFabioH5WithCbf))
     return test_suite
 
 
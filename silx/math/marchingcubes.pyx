@@ -26,16 +26,26 @@
 
 It provides a :class:`MarchingCubes` class allowing to build an isosurface
 from data provided as a 3D data set or slice by slice.
+
+It also provides :func:`stream_isosurface` to build an isosurface from a
+dataset which does not fit in memory (e.g., a h5py dataset) by streaming it
+slab by slab.
 """
 
 __authors__ = ["T. Vincent"]
 __license__ = "MIT"
-__date__ = "16/08/2017"
+__date__ = "18/10/2018"
+
 
+import multiprocessing
 
 import numpy
 cimport numpy as cnumpy
 cimport cython
+from libc.string cimport memcpy
+from libcpp.vector cimport vector as std_vector
+
+from silx.third_party.concurrent_futures import ThreadPoolExecutor
 
 cimport mc
 
@@ -103,19 +113,36 @@ cdef class MarchingCubes:
     >>> normals = mc.get_normals()  # Array of normals
     >>> triangle_indices = mc.get_indices()  # Array of indices of vertices
 
+    When compiled with OpenMP, :meth:`process` splits the data set in slabs
+    processed in parallel, the number of threads can be set with the
+    ``OMP_NUM_THREADS`` environment variable.
+
     :param data: 3D dataset of float32 or None
     :type data: numpy.ndarray of float32 of dimension 3
     :param float isolevel: The value for which to generate the isosurface
     :param bool invert_normals:
         True (default) for normals oriented in direction of gradient descent
     :param sampling: Sampling along each dimension (depth, height, width)
+    :param bool compute_normals:
+        True (default) to compute normals, False to skip it
+    :param dtype: Type of returned vertices and normals:
+        numpy.float32 (default) or numpy.float16
     """
     cdef mc.MarchingCubes[float, float] * c_mc  # Pointer to the C++ instance
+    cdef object _dtype
 
     def __cinit__(self, data=None, isolevel=None,
-                  invert_normals=True, sampling=(1, 1, 1)):
+                  invert_normals=True, sampling=(1, 1, 1),
+                  compute_normals=True, dtype=numpy.float32):
+        dtype = numpy.dtype(dtype)
+        if dtype not in (numpy.dtype(numpy.float32),
+                         numpy.dtype(numpy.float16)):
+            raise ValueError("Unsupported dtype: %s" % dtype)
+        self._dtype = dtype
+
         self.c_mc = new mc.MarchingCubes[float, float](isolevel)
         self.c_mc.invert_normals = bool(invert_normals)
+        self.c_mc.compute_normals = bool(compute_normals)
         self.c_mc.sampling[0] = sampling[0]
         self.c_mc.sampling[1] = sampling[1]
         self.c_mc.sampling[2] = sampling[2]
@@ -159,7 +186,8 @@ cdef class MarchingCubes:
         height = data.shape[1]
         width = data.shape[2]
 
-        self.c_mc.process(&c_data[0], depth, height, width)
+        with nogil:
+            self.c_mc.process(&c_data[0], depth, height, width)
 
     def process_slice(self, slice0, slice1):
         """Process a new slice to build the isosurface.
@@ -186,7 +214,8 @@ cdef class MarchingCubes:
         assert slice1.shape[0] == self.c_mc.height
         assert slice1.shape[1] == self.c_mc.width
 
-        self.c_mc.process_slice(&c_slice0[0], &c_slice1[0])
+        with nogil:
+            self.c_mc.process_slice(&c_slice0[0], &c_slice1[0])
 
     def finish_process(self):
         """Clear internal cache after processing slice by slice."""
@@ -225,22 +254,219 @@ cdef class MarchingCubes:
         """True to use gradient descent as normals."""
         return self.c_mc.invert_normals
 
+    @cython.embedsignature(False)
+    @property
+    def compute_normals(self):
+        """True if normals are computed."""
+        return self.c_mc.compute_normals
+
+    @cython.embedsignature(False)
+    @property
+    def dtype(self):
+        """The type of returned vertices and normals."""
+        return self._dtype
+
     def get_vertices(self):
         """Vertices currently computed (ndarray of dim NbVertices x 3)
 
         Order is dim0, dim1, dim2 (i.e., z, y, x if dim0 is depth).
         """
-        return numpy.array(self.c_mc.vertices).reshape(-1, 3)
+        return _vector_to_array(self.c_mc.vertices).reshape(-1, 3).astype(
+            self._dtype, copy=False)
 
     def get_normals(self):
         """Normals currently computed (ndarray of dim NbVertices x 3)
 
         Order is dim0, dim1, dim2 (i.e., z, y, x if dim0 is depth).
+        None if normals are not computed.
         """
-        return numpy.array(self.c_mc.normals).reshape(-1, 3)
+        if not self.c_mc.compute_normals:
+            return None
+        return _vector_to_array(self.c_mc.normals).reshape(-1, 3).astype(
+            self._dtype, copy=False)
 
     def get_indices(self):
         """Triangle indices currently computed (ndarray of dim NbTriangles x 3)
         """
-        return numpy.array(self.c_mc.indices,
-                           dtype=numpy.uint32).reshape(-1, 3)
+        cdef cnumpy.ndarray[cnumpy.uint32_t, ndim=1] array = numpy.empty(
+            (self.c_mc.indices.size(),), dtype=numpy.uint32)
+        if self.c_mc.indices.size() > 0:
+            memcpy(&array[0], self.c_mc.indices.data(),
+                   self.c_mc.indices.size() * sizeof(unsigned int))
+        return array.reshape(-1, 3)
+
+
+cdef _vector_to_array(std_vector[float] & vector):
+    """Copy a std::vector of float to a new numpy.ndarray of float32"""
+    cdef cnumpy.ndarray[cnumpy.float32_t, ndim=1] array = numpy.empty(
+        (vector.size(),), dtype=numpy.float32)
+    if vector.size() > 0:
+        memcpy(&array[0], vector.data(), vector.size() * sizeof(float))
+    return array
+
+
+def _edge_crossings(previous, current, isolevel):
+    """Returns the crossing edges of a slice in the order vertices are created
+
+    :param previous: Previous slice or None if current is the first slice
+    :param numpy.ndarray current: Slice to test
+    :param numpy.float32 isolevel: The iso-level
+    :return: Array of bool of shape (height, width, 3) telling for each
+        point if its forward edges along width, along height and its backward
+        edge along depth cross the isosurface
+    :rtype: numpy.ndarray
+    """
+    below = current <= isolevel
+    crossings = numpy.zeros(current.shape + (3,), dtype=numpy.bool_)
+    crossings[:, :-1, 0] = below[:, :-1] ^ below[:, 1:]
+    crossings[:-1, :, 1] = below[:-1] ^ below[1:]
+    if previous is not None:
+        crossings[:, :, 2] = below ^ (previous <= isolevel)
+    return crossings
+
+
+def _process_slab(dataset, indices, isolevel, invert_normals,
+                  sampling, last):
+    """Compute the isosurface of a slab of a 3D dataset.
+
+    :param dataset: 3D dataset supporting numpy-like indexing
+    :param indices: Indices along dim 0 of the slices of the slab
+    :param numpy.float32 isolevel: The iso-level
+    :param bool invert_normals: See :class:`MarchingCubes`
+    :param sampling: Sampling along height and width
+    :param bool last: True if this is the last slab of the dataset
+    :return: (vertices, normals, indices, number of vertices of the first
+        slice, indices of the vertices of the last slice or None)
+    """
+    mc = MarchingCubes(isolevel=isolevel, invert_normals=invert_normals)
+
+    def read(index):
+        return numpy.ascontiguousarray(
+            dataset[index, ::sampling[0], ::sampling[1]], dtype='=f4')
+
+    previous = None
+    current = read(indices[0])
+    # Vertices of the first slice are created first and in the same order
+    # as those of this slice in the previous slab
+    head = int(numpy.count_nonzero(
+        _edge_crossings(None, current, isolevel)))
+
+    for index in indices[1:]:
+        previous, current = current, read(index)
+        mc.process_slice(previous, current)
+    mc.finish_process()
+
+    vertices = mc.get_vertices()
+    tail = None
+    if not last:
+        # Retrieve vertices in the plane of the last slice, they are the
+        # first slice of the next slab
+        crossings = _edge_crossings(previous, current, isolevel).reshape(-1, 3)
+        order = numpy.cumsum(crossings.ravel()).reshape(-1, 3) - 1
+        order += len(vertices) - numpy.count_nonzero(crossings)
+        tail = order[:, :2][crossings[:, :2]]
+
+    return vertices, mc.get_normals(), mc.get_indices(), head, tail
+
+
+def stream_isosurface(dataset, isolevel, invert_normals=True,
+                      sampling=(1, 1, 1), slab_size=32, max_workers=None):
+    """Compute isosurface of a 3D dataset by streaming it slab by slab.
+
+    This allows to process datasets which do not fit in memory
+    (e.g., h5py or :mod:`silx.io.commonh5` datasets) as only the slices
+    being processed are read.
+    Slabs of ``slab_size`` slices are processed in parallel and their
+    meshes are welded on the slices they share.
+    The result is the same as processing the whole dataset at once with
+    :class:`MarchingCubes`.
+
+    >>> with h5py.File('volume.h5', 'r') as h5file:
+    ...     vertices, normals, indices = stream_isosurface(
+    ...         h5file['/data'], isolevel=1., sampling=(2, 2, 2))
+
+    :param dataset: 3D dataset supporting numpy-like indexing
+    :param float isolevel: The value for which to generate the isosurface
+    :param bool invert_normals:
+        True (default) for normals oriented in direction of gradient descent
+    :param sampling: Sampling along each dimension (depth, height, width).
+        Only sampled data is read from the dataset.
+    :param int slab_size: Number of (sampled) slices processed by each task
+    :param int max_workers: optional. Number of threads.
+        Default: number of CPUs.
+    :return: Vertices (float32 ndarray of dim NbVertices x 3) and normals
+        (float32 ndarray of dim NbVertices x 3) in the same order as the
+        dataset dimensions and triangle indices
+        (uint32 ndarray of dim NbTriangles x 3)
+    :rtype: List[numpy.ndarray]
+    """
+    if len(dataset.shape) != 3:
+        raise ValueError("dataset must be 3D")
+    if slab_size < 1:
+        raise ValueError("slab_size must be at least 1")
+    sampling = numpy.array(sampling, dtype=numpy.int64)
+    if sampling.shape != (3,) or numpy.any(sampling < 1):
+        raise ValueError("sampling must be 3 strictly positive integers")
+    isolevel = numpy.float32(isolevel)
+
+    slices = numpy.arange(0, dataset.shape[0], sampling[0])
+    starts = list(range(0, len(slices) - 1, slab_size))
+
+    if max_workers is None:
+        max_workers = multiprocessing.cpu_count()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for start in starts:
+            end = min(start + slab_size, len(slices) - 1)
+            futures.append(executor.submit(
+                _process_slab,
+                dataset,
+                slices[start:end + 1],
+                isolevel,
+                invert_normals,
+                sampling[1:],
+                end == len(slices) - 1))
+
+        # Weld slab meshes in order
+        all_vertices, all_normals, all_indices = [], [], []
+        nb_vertices = 0
+        shared = None
+        for start, future in zip(starts, futures):
+            vertices, normals, indices, head, tail = future.result()
+            if shared is None:
+                head = 0
+            elif len(shared) != head:
+                raise RuntimeError("Cannot weld isosurface slabs")
+
+            remap = numpy.arange(nb_vertices - head,
+                                 nb_vertices - head + len(vertices),
+                                 dtype=numpy.int64)
+            if head > 0:
+                remap[:head] = shared
+            shared = None if tail is None else remap[tail]
+
+            vertices = vertices[head:]
+            normals = normals[head:]
+            # Express vertices in dataset coordinates
+            vertices[:, 0] += start
+            if numpy.any(sampling != 1):
+                vertices *= sampling.astype(numpy.float32)
+                # Apply sampling scaling to normals as MarchingCubes does
+                normals /= sampling.astype(numpy.float32)
+                norms = numpy.linalg.norm(normals, axis=1)
+                norms[norms == 0] = 1
+                normals /= norms[:, numpy.newaxis]
+
+            all_vertices.append(vertices)
+            all_normals.append(normals)
+            all_indices.append(remap[indices].astype(numpy.uint32))
+            nb_vertices += len(vertices)
+
+    if len(all_vertices) == 0:
+        return (numpy.zeros((0, 3), dtype=numpy.float32),
+                numpy.zeros((0, 3), dtype=numpy.float32),
+                numpy.zeros((0, 3), dtype=numpy.uint32))
+
+    return (numpy.concatenate(all_vertices),
+            numpy.concatenate(all_normals),
+            numpy.concatenate(all_indices))
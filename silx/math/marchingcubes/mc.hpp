@@ -24,6 +24,7 @@
 #ifndef __mc_HPP__
 #define __mc_HPP__
 
+#include <algorithm>
 #include <iostream>
 #include <cmath>
 #include <map>
@@ -31,6 +32,10 @@
 #include <vector>
 #include <assert.h>
 
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
 
 extern const int MCTriangleTable[256][16];
 extern const unsigned int MCEdgeIndexToCoordOffsets[12][4];
@@ -39,6 +44,9 @@ extern const unsigned int MCEdgeIndexToCoordOffsets[12][4];
 #define HEIGHT_IDX 1
 #define WIDTH_IDX 2
 
+/* Minimum number of slices processed by a thread */
+#define MIN_SLAB_SIZE 8
+
 /** Class Marching cubes
  *
  * Implements the marching cube algorithm and provides an API to process
@@ -80,6 +88,10 @@ public:
     ~MarchingCubes();
 
     /** Process a 3D scalar field
+     *
+     * If compiled with OpenMP, the data set is split in slabs along
+     * the depth which are processed in parallel and merged afterwards.
+     * The result is the same as processing it slice by slice.
      *
      * @param data Pointer to the data set
      * @param depth The 1st dimension of the data set
@@ -156,9 +168,23 @@ public:
 
     FloatIn isolevel; /**< Iso level to use */
     bool invert_normals; /**< True to inverse gradient as normals */
+    bool compute_normals; /**< False to skip normals computation */
 
 private:
 
+    /** Process a 3D scalar field in parallel by slabs of slices
+     *
+     * Each slab is processed by its own MarchingCubes object and
+     * vertices shared by consecutive slabs are merged.
+     *
+     * @param data Pointer to the data set
+     * @param nb_slices The number of (sampled) slices minus 1 to process
+     * @param nb_slabs The number of slabs to use
+     */
+    void process_slabs(const FloatIn * data,
+                       const unsigned int nb_slices,
+                       const unsigned int nb_slabs);
+
     /** Start to build isosurface starting with first slice
      *
      * Bootstrap cache edge_indices
@@ -240,6 +266,7 @@ MarchingCubes<FloatIn, FloatOut>::MarchingCubes(const FloatIn level)
     this->width = 0;
     this->isolevel = level;
     this->invert_normals = true;
+    this->compute_normals = true;
     this->sampling[0] = 1;
     this->sampling[1] = 1;
     this->sampling[2] = 1;
@@ -291,11 +318,21 @@ MarchingCubes<FloatIn, FloatOut>::process(const FloatIn * data,
     this->reset();
     this->set_slice_size(height, width);
 
-    for (unsigned int index=0; index < nb_slices; index++) {
-        const FloatIn * slice0 = data + (index * size);
-        const FloatIn * slice1 = slice0 + size;
+    unsigned int nb_slabs = 1;
+#ifdef _OPENMP
+    nb_slabs = std::min((unsigned int) omp_get_max_threads(),
+                        nb_slices / MIN_SLAB_SIZE);
+#endif
 
-        this->process_slice(slice0, slice1);
+    if (nb_slabs > 1) {
+        this->process_slabs(data, nb_slices, nb_slabs);
+    } else {
+        for (unsigned int index=0; index < nb_slices; index++) {
+            const FloatIn * slice0 = data + (index * size);
+            const FloatIn * slice1 = slice0 + size;
+
+            this->process_slice(slice0, slice1);
+        }
     }
     this->finish_process();
 
@@ -303,6 +340,119 @@ MarchingCubes<FloatIn, FloatOut>::process(const FloatIn * data,
 }
 
 
+template <typename FloatIn, typename FloatOut>
+void
+MarchingCubes<FloatIn, FloatOut>::process_slabs(const FloatIn * data,
+                                                const unsigned int nb_slices,
+                                                const unsigned int nb_slabs)
+{
+    const unsigned int size = this->height * this->width * this->sampling[DEPTH_IDX];
+
+    std::vector<MarchingCubes<FloatIn, FloatOut> *> slabs(nb_slabs);
+    /* Edge to vertex index correspondance of the first slice of each slab */
+    std::vector<std::map<unsigned int, unsigned int> > first_edges(nb_slabs);
+    std::vector<char> failed(nb_slabs, 0);
+
+    #pragma omp parallel for schedule(static, 1)
+    for (int slab=0; slab < (int) nb_slabs; slab++) {
+        const unsigned int begin = (slab * nb_slices) / nb_slabs;
+        const unsigned int end = ((slab + 1) * nb_slices) / nb_slabs;
+
+        MarchingCubes<FloatIn, FloatOut> * mc = \
+            new MarchingCubes<FloatIn, FloatOut>(this->isolevel);
+        mc->invert_normals = this->invert_normals;
+        mc->compute_normals = this->compute_normals;
+        mc->sampling[0] = this->sampling[0];
+        mc->sampling[1] = this->sampling[1];
+        mc->sampling[2] = this->sampling[2];
+        mc->set_slice_size(this->height, this->width);
+        /* Use the depth of the whole data set for vertices and edge indices */
+        mc->depth = begin * this->sampling[DEPTH_IDX];
+
+        try {
+            mc->first_slice(data + (begin * size),
+                            data + ((begin + 1) * size));
+            first_edges[slab] = *(mc->edge_indices);
+
+            for (unsigned int index=begin; index < end; index++) {
+                const FloatIn * slice0 = data + (index * size);
+                const FloatIn * slice1 = slice0 + size;
+
+                mc->process_slice(slice0, slice1);
+            }
+        } catch (...) {
+            failed[slab] = 1;
+        }
+        slabs[slab] = mc;
+    }
+
+    /* Merge slabs, vertices of the first slice of a slab are shared with
+     * the last slice of the previous slab and are taken from the latter.
+     */
+    std::map<unsigned int, unsigned int> shared_edges;
+    bool error = false;
+    for (unsigned int slab=0; slab < nb_slabs; slab++) {
+        MarchingCubes<FloatIn, FloatOut> * mc = slabs[slab];
+
+        if (!error && !failed[slab]) {
+            const unsigned int offset = this->vertices.size() / 3;
+            const unsigned int nb_vertices = mc->vertices.size() / 3;
+            const unsigned int head = (slab == 0) ? 0 : first_edges[slab].size();
+
+            std::vector<unsigned int> remap(nb_vertices);
+            for (unsigned int index=head; index < nb_vertices; index++) {
+                remap[index] = offset + index - head;
+            }
+            if (slab > 0) {
+                std::map<unsigned int, unsigned int>::iterator it, found;
+                for (it = first_edges[slab].begin();
+                     it != first_edges[slab].end();
+                     it++) {
+                    found = shared_edges.find(it->first);
+                    if (found == shared_edges.end()) {
+                        error = true;
+                        break;
+                    }
+                    remap[it->second] = found->second;
+                }
+            }
+
+            this->vertices.insert(this->vertices.end(),
+                                  mc->vertices.begin() + 3 * head,
+                                  mc->vertices.end());
+            if (this->compute_normals) {
+                this->normals.insert(this->normals.end(),
+                                     mc->normals.begin() + 3 * head,
+                                     mc->normals.end());
+            }
+            for (unsigned int index=0; index < mc->indices.size(); index++) {
+                this->indices.push_back(remap[mc->indices[index]]);
+            }
+
+            /* Store vertices of the last slice in the merged result */
+            shared_edges.clear();
+            std::map<unsigned int, unsigned int>::iterator it;
+            for (it = mc->edge_indices->begin();
+                 it != mc->edge_indices->end();
+                 it++) {
+                shared_edges[it->first] = remap[it->second];
+            }
+        } else {
+            error = true;
+        }
+
+        mc->finish_process();
+        delete mc;
+    }
+
+    if (error) {
+        this->reset();
+        throw std::runtime_error(
+            "Internal error: cannot merge isosurface slabs.");
+    }
+}
+
+
 template <typename FloatIn, typename FloatOut>
 void
 MarchingCubes<FloatIn, FloatOut>::set_slice_size(const unsigned int height,
@@ -524,6 +674,10 @@ MarchingCubes<FloatIn, FloatOut>::process_edge(const FloatIn value0,
                 "Internal error: dimension > 3, never event.");
         }
 
+        if (!this->compute_normals) {
+            return;
+        }
+
         /* Store normal as (nz, ny, nx) */
         FloatOut nz, ny, nx;
         const FloatIn * slice0 = (previous != 0) ? previous : current;
@@ -32,11 +32,11 @@ cdef extern from "mc.hpp":
         void process(FloatIn * data,
                      unsigned int depth,
                      unsigned int height,
-                     unsigned int width) except +
+                     unsigned int width) nogil except +
         void set_slice_size(unsigned int height,
                             unsigned int width)
         void process_slice(FloatIn * slice0,
-                           FloatIn * slice1) except +
+                           FloatIn * slice1) nogil except +
         void finish_process()
         void reset()
 
@@ -46,6 +46,7 @@ cdef extern from "mc.hpp":
         unsigned int sampling[3]
         FloatIn isolevel
         bool invert_normals
+        bool compute_normals
         std_vector[FloatOut] vertices
         std_vector[FloatOut] normals
         std_vector[unsigned int] indices
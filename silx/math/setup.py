@@ -24,7 +24,7 @@
 
 __authors__ = ["D. Naudet"]
 __license__ = "MIT"
-__date__ = "27/03/2017"
+__date__ = "18/10/2018"
 
 import os.path
 
@@ -67,7 +67,9 @@ def configuration(parent_package='', top_path=None):
     config.add_extension('marchingcubes',
                          sources=mc_src,
                          include_dirs=['marchingcubes', numpy.get_include()],
-                         language='c++')
+                         language='c++',
+                         extra_link_args=['-fopenmp'],
+                         extra_compile_args=['-fopenmp'])
 
     # min/max
     config.add_extension('combo',
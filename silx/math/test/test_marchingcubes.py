@@ -27,7 +27,7 @@ from __future__ import division
 
 __authors__ = ["T. Vincent"]
 __license__ = "MIT"
-__date__ = "17/01/2018"
+__date__ = "18/10/2018"
 
 import unittest
 
@@ -35,6 +35,7 @@ import numpy
 
 from silx.utils.testutils import ParametricTestCase
 
+from silx.io import commonh5
 from silx.math import marchingcubes
 
 
@@ -173,6 +174,85 @@ class TestMarchingCubes(ParametricTestCase):
                                     result.get_indices(),
                                     atol=0., rtol=0.)
 
+    def test_process_slabs(self):
+        """Test process (parallel if available) against process_slice"""
+        isolevel = 12.
+        coords = numpy.mgrid[:81, :17, :23].astype(numpy.float32)
+        center = numpy.array((40, 8, 11), dtype=numpy.float32)
+        data = numpy.sqrt(numpy.sum(
+            (coords - center.reshape(3, 1, 1, 1))**2, axis=0))
+
+        for sampling in ((1, 1, 1), (2, 1, 3), (3, 2, 2)):
+            with self.subTest(sampling=sampling):
+                ref = marchingcubes.MarchingCubes(
+                    isolevel=isolevel, sampling=sampling)
+                for index in range(0, len(data) - sampling[0], sampling[0]):
+                    ref.process_slice(data[index], data[index + sampling[0]])
+                ref.finish_process()
+
+                result = marchingcubes.MarchingCubes(
+                    data, isolevel, sampling=sampling)
+
+                for ref_array, array in zip(ref, result):
+                    self.assertTrue(numpy.array_equal(ref_array, array))
+
+    def test_output_options(self):
+        """Test compute_normals and dtype options"""
+        data = numpy.zeros((3, 3, 3), dtype=numpy.float32)
+        data[1, 1, 1] = 1.
+
+        ref_vertices, ref_normals, ref_indices = \
+            marchingcubes.MarchingCubes(data, 0.5)
+
+        result = marchingcubes.MarchingCubes(
+            data, 0.5, compute_normals=False, dtype=numpy.float16)
+        self.assertFalse(result.compute_normals)
+        self.assertEqual(result.dtype, numpy.float16)
+
+        vertices, normals, indices = result
+        self.assertIsNone(normals)
+        self.assertEqual(vertices.dtype, numpy.float16)
+        self.assertAllClose(vertices, ref_vertices, atol=1e-3)
+        self.assertTrue(numpy.array_equal(indices, ref_indices))
+
+        with self.assertRaises(ValueError):
+            marchingcubes.MarchingCubes(data, 0.5, dtype=numpy.int32)
+
+    def test_stream_isosurface(self):
+        """Test slab streaming, comparing to processing the whole data"""
+        isolevel = 12.
+        coords = numpy.mgrid[:21, :17, :23].astype(numpy.float32)
+        center = numpy.array((10, 8, 11), dtype=numpy.float32)
+        data = numpy.sqrt(numpy.sum(
+            (coords - center.reshape(3, 1, 1, 1))**2, axis=0))
+
+        h5file = commonh5.File('test.h5', mode='w')
+        dataset = h5file.create_dataset('data', data=data)
+
+        for sampling in ((1, 1, 1), (2, 1, 3), (3, 2, 2)):
+            ref_vertices, ref_normals, ref_indices = \
+                marchingcubes.MarchingCubes(data, isolevel, sampling=sampling)
+
+            for slab_size in (1, 4, 100):
+                with self.subTest(sampling=sampling, slab_size=slab_size):
+                    vertices, normals, indices = \
+                        marchingcubes.stream_isosurface(
+                            dataset, isolevel, sampling=sampling,
+                            slab_size=slab_size, max_workers=2)
+
+                    self.assertEqual(vertices.dtype, numpy.float32)
+                    self.assertEqual(normals.dtype, numpy.float32)
+                    self.assertEqual(indices.dtype, numpy.uint32)
+                    self.assertAllClose(ref_vertices, vertices, atol=1e-5)
+                    self.assertAllClose(ref_normals, normals, atol=1e-5)
+                    self.assertTrue(numpy.array_equal(ref_indices, indices))
+
+        # No isosurface
+        vertices, normals, indices = marchingcubes.stream_isosurface(
+            dataset, 100.)
+        self.assertEqual(vertices.shape, (0, 3))
+        self.assertEqual(indices.shape, (0, 3))
+
 
 test_cases = (TestMarchingCubes,)
 
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+#
+#    Project: silx
+#             https://github.com/silx-kit/silx
+#
+#    Copyright (C) 2018 European Synchrotron Radiation Facility, Grenoble, France
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#  .
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#  .
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#  THE SOFTWARE.
+
+"""Auto-tuning of the work-group size of OpenCL kernels.
+
+The best work-group size of a kernel depends on the device, the driver and
+the size of the data. When auto-tuning is enabled, the first use of a kernel
+for a class of data shapes benchmarks candidate work-group sizes and the
+fastest one is kept.
+Results are stored per device in the cache directory of
+:mod:`silx.opencl.common` and reused by other processes, even if
+auto-tuning is disabled.
+
+Auto-tuning is disabled by default. It is enabled by setting the
+environment variable ``SILX_OPENCL_AUTOTUNE`` to ``1`` or with
+:func:`set_enabled`.
+"""
+
+from __future__ import absolute_import, print_function, division
+
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/10/2018"
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from timeit import default_timer
+
+from .common import pyopencl, _get_cache_directory
+from .common import _read_cache_file, _write_cache_file
+
+logger = logging.getLogger(__name__)
+
+
+_enabled = None
+"""Auto-tuning state set by :func:`set_enabled`, None to use the environment"""
+
+_results = {}
+"""Tuned work-group sizes by device: {device key: {kernel key: size}}"""
+
+_lock = threading.RLock()
+
+
+def is_enabled():
+    """Returns True if work-group sizes are benchmarked on first use
+
+    :rtype: bool
+    """
+    if _enabled is not None:
+        return _enabled
+    return os.environ.get("SILX_OPENCL_AUTOTUNE", "") in ("1", "True", "true")
+
+
+def set_enabled(enabled):
+    """Enable or disable auto-tuning
+
+    :param Union[bool,None] enabled:
+        None to use the SILX_OPENCL_AUTOTUNE environment variable
+    """
+    global _enabled
+    _enabled = None if enabled is None else bool(enabled)
+
+
+def _device_key(device):
+    """Returns a key identifying a device and its driver
+
+    :param pyopencl.Device device:
+    :rtype: str
+    """
+    platform = device.platform
+    items = [pyopencl.VERSION_TEXT, platform.name, platform.version,
+             device.name, device.version, device.driver_version]
+    return hashlib.sha1(json.dumps(items).encode("utf-8")).hexdigest()
+
+
+def _get_filename(device):
+    """Returns the file storing the results of a device, None if no cache
+
+    :param pyopencl.Device device:
+    :rtype: Union[str,None]
+    """
+    directory = _get_cache_directory()
+    if directory is None:
+        return None
+    return os.path.join(directory, "workgroups_%s.json" % _device_key(device))
+
+
+def _read_file(filename):
+    """Returns the results stored in a file, empty if not available
+
+    :param str filename:
+    :rtype: dict
+    """
+    if filename is None:
+        return {}
+    content = _read_cache_file(filename)
+    if content is None:
+        return {}
+    try:
+        results = json.loads(content)
+    except ValueError as error:
+        logger.debug("Cannot read work-group sizes %s: %s", filename, error)
+        return {}
+    return results if isinstance(results, dict) else {}
+
+
+def _get_results(device):
+    """Returns the results of a device, read from the cache on first access
+
+    :param pyopencl.Device device:
+    :rtype: dict
+    """
+    key = _device_key(device)
+    with _lock:
+        results = _results.get(key)
+        if results is None:
+            results = _results[key] = _read_file(_get_filename(device))
+        return results
+
+
+def _store(device, key, size):
+    """Store a tuned work-group size in process and on disk
+
+    :param pyopencl.Device device:
+    :param str key: Key of the kernel and shape class
+    :param size: Work-group size as a list or None
+    """
+    with _lock:
+        _get_results(device)[key] = size
+        filename = _get_filename(device)
+        if filename is None:
+            return
+        # Merge with results stored by other processes
+        results = _read_file(filename)
+        results[key] = size
+        _write_cache_file(filename,
+                          json.dumps(results, indent=1, sort_keys=True))
+
+
+def clear(device=None):
+    """Forget the tuned work-group sizes held in process
+
+    Results stored on disk are kept and read again on next use.
+
+    :param Union[pyopencl.Device,None] device: The device or None for all
+    """
+    with _lock:
+        if device is None:
+            _results.clear()
+        else:
+            _results.pop(_device_key(device), None)
+
+
+def shape_class(shape):
+    """Returns the class of a shape: each dimension rounded up to a power of 2
+
+    :param List[int] shape:
+    :rtype: tuple
+    """
+    return tuple(1 << max(int(dim) - 1, 0).bit_length() for dim in shape)
+
+
+def power_of_two_sizes(minimum, maximum):
+    """Returns the powers of 2 between minimum and maximum, both included
+
+    :param int minimum:
+    :param int maximum:
+    :rtype: List[int]
+    """
+    size = 1 << max(int(minimum) - 1, 0).bit_length()
+    sizes = []
+    while size <= maximum:
+        sizes.append(size)
+        size *= 2
+    return sizes
+
+
+def local_size_candidates(global_size, maximum, minimum=16):
+    """Returns work-group sizes dividing a global size.
+
+    Each dimension is a power of 2 and the number of work-items of a
+    work-group is a power of 2 between minimum and maximum.
+    None, to let the OpenCL driver choose, is always the first candidate.
+
+    :param List[int] global_size: The global size of the kernel
+    :param int maximum: Maximum number of work-items of a work-group
+    :param int minimum: Minimum number of work-items of a work-group
+    :rtype: list
+    """
+    sizes = [()]
+    for dim in global_size:
+        sizes = [size + (i,) for size in sizes
+                 for i in power_of_two_sizes(1, maximum) if int(dim) % i == 0]
+    candidates = [None]
+    for size in sizes:
+        count = 1
+        for i in size:
+            count *= i
+        if minimum <= count <= maximum:
+            candidates.append(size)
+    return candidates
+
+
+def _normalize(size):
+    """Returns a work-group size as a list, as stored in JSON, or None"""
+    if size is None:
+        return None
+    if isinstance(size, (tuple, list)):
+        return [int(i) for i in size]
+    return [int(size)]
+
+
+def _benchmark(run, size, nb_runs):
+    """Returns the best execution time of a work-group size in seconds"""
+    run(size).wait()  # Warm-up and validity check
+    best = None
+    for _ in range(nb_runs):
+        start = default_timer()
+        run(size).wait()
+        duration = default_timer() - start
+        if best is None or duration < best:
+            best = duration
+    return best
+
+
+def get_workgroup_size(device, name, shape, candidates, run, default=None, nb_runs=3):
+    """Returns the work-group size to use for a kernel and a data shape.
+
+    The tuned size is looked up for the class of the shape
+    (see :func:`shape_class`). If there is none and auto-tuning is enabled,
+    the candidates are benchmarked by calling ``run(size).wait()`` and the
+    fastest one is stored. Otherwise, default is returned.
+
+    run must have no side effect other than computing the same result,
+    as it is called several times per candidate.
+
+    :param pyopencl.Device device: Device running the kernel
+    :param str name: Name identifying the kernel and its parameters
+    :param List[int] shape: Shape of the data
+    :param candidates: Work-group sizes to try, as int, tuples or None
+                       (None lets the OpenCL driver choose)
+    :param callable run: Function enqueuing the kernel with a given
+                         work-group size and returning its event
+    :param default: Work-group size to use without tuning result
+    :param int nb_runs: Number of timed executions per candidate
+    :return: One of the candidates or default
+    """
+    key = "%s/%s" % (name, "x".join(str(dim) for dim in shape_class(shape)))
+    by_size = dict((json.dumps(_normalize(size)), size) for size in candidates)
+    results = _get_results(device)
+    with _lock:
+        stored = results.get(key, "")
+    if stored != "":
+        if json.dumps(stored) in by_size:
+            return by_size[json.dumps(stored)]
+        logger.debug("Ignore tuned work-group size %s of %s: not a candidate",
+                     stored, key)
+    if not is_enabled() or not candidates:
+        return default
+
+    best = default
+    best_duration = None
+    for size in candidates:
+        try:
+            duration = _benchmark(run, size, nb_runs)
+        except pyopencl.Error as error:
+            logger.debug("Work-group size %s of %s failed: %s", size, key, error)
+            continue
+        logger.debug("Work-group size %s of %s: %.3fms", size, key, 1e3 * duration)
+        if best_duration is None or duration < best_duration:
+            best, best_duration = size, duration
+    if best_duration is None:
+        logger.warning("No valid work-group size for %s", key)
+        return default
+    logger.info("Tuned work-group size of %s on %s: %s", key, device.name, best)
+    _store(device, key, _normalize(best))
+    return best
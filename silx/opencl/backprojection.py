@@ -29,13 +29,14 @@ from __future__ import absolute_import, print_function, with_statement, division
 
 __authors__ = ["A. Mirone, P. Paleo"]
 __license__ = "MIT"
-__date__ = "19/01/2018"
+__date__ = "18/10/2018"
 
 import logging
 import numpy
 
 from .common import pyopencl
-from .processing import EventDescription, OpenclProcessing, BufferDescription
+from .autotune import local_size_candidates
+from .processing import EventDescription, OpenclProcessing, BufferDescription, profiled
 from .utils import nextpower as nextpow2
 
 if pyopencl:
@@ -137,8 +138,9 @@ class Backprojection(OpenclProcessing):
                            clinfo
         :param deviceid: Integer with the device identifier, as given by clinfo
         :param profile: switch on profiling to be able to profile at the kernel
-                        level, store profiling elements (makes code slightly
-                        slower)
+                        level, store profiling elements (the command queue is
+                        always created with profiling enabled, this only keeps
+                        the events)
         """
         # OS X enforces a workgroup size of 1 when the kernel has
         # synchronization barriers if sys.platform.startswith('darwin'):
@@ -255,6 +257,18 @@ class Backprojection(OpenclProcessing):
             self.pyfft_plan = None
             # TODO: fall-back to fftw if present ?
 
+    def set_queue(self, queue):
+        """Enqueue the operations of this processing on another command queue
+
+        The FFT plan is rebuilt on the new queue.
+
+        :param pyopencl.CommandQueue queue: Queue on the context of this processing
+        """
+        OpenclProcessing.set_queue(self, queue)
+        if self.pyfft_plan is not None:
+            self.pyfft_plan = pyfft_Plan(self.fft_size, queue=self.queue,
+                                         wait_for_finish=True)
+
     def compute_filter(self):
         """
         Compute the filter for FBP
@@ -284,7 +298,6 @@ class Backprojection(OpenclProcessing):
     def cpy2d_to_slice(self, dst):
         ndrange = (int(self.slice_shape[1]), int(self.slice_shape[0]))  # pyopencl < 2015.2
         slice_shape_ocl = numpy.int32(ndrange)
-        wg = None
         kernel_args = (
             dst.data,
             self.cl_mem["_d_slice"],
@@ -294,7 +307,15 @@ class Backprojection(OpenclProcessing):
             numpy.int32((0, 0)),
             slice_shape_ocl
         )
-        return self.kernels.cpy2d(self.queue, ndrange, wg, *kernel_args)
+
+        def run(wg):
+            return self.kernels.cpy2d(self.queue, ndrange, wg, *kernel_args)
+        max_wg = min(self.ctx.devices[0].max_work_group_size,
+                     self.kernels.max_workgroup_size("cpy2d"))
+        wg = self.tune_workgroup_size("cpy2d", self.slice_shape,
+                                      local_size_candidates(ndrange, max_wg),
+                                      run)
+        return run(wg)
 
     def transfer_to_texture(self, sino):
         sino2 = sino
@@ -316,7 +337,7 @@ class Backprojection(OpenclProcessing):
                                        region=self.shape[::-1]
                                        )
             what = "transfer filtered sino H->D texture"
-        return EventDescription(what, ev)
+        return EventDescription(what, ev, sino2.nbytes)
 
     def transfer_device_to_texture(self, d_sino):
         if self.is_cpu:
@@ -338,55 +359,75 @@ class Backprojection(OpenclProcessing):
                                        region=self.shape[::-1]
                                        )
             what = "transfer filtered sino D->D texture"
-        return EventDescription(what, ev)
+        return EventDescription(what, ev, 4 * self.num_projs * self.num_bins)
 
+    def _enqueue_backprojection(self):
+        """Enqueue the backprojection kernel of the sinogram on the device.
+
+        The result is stored in the "_d_slice" buffer.
+
+        :return: The event of the kernel
+        """
+        # Prepare arguments for the kernel call
+        if self.is_cpu:
+            d_sino_ref = self.d_sino
+        else:
+            d_sino_ref = self.d_sino_tex
+        kernel_args = (
+            self.num_projs,  # num of projections (int32)
+            self.num_bins,  # num of bins (int32)
+            self.axis_pos,  # axis position (float32)
+            self.cl_mem["_d_slice"],  # d_slice (__global float32*)
+            d_sino_ref,  # d_sino (__read_only image2d_t or float*)
+            numpy.float32(0),  # gpu_offset_x (float32)
+            numpy.float32(0),  # gpu_offset_y (float32)
+            self.cl_mem["d_cos"],  # d_cos (__global float32*)
+            self.cl_mem["d_sin"],  # d_sin (__global float32*)
+            self.cl_mem["d_axes"],  # d_axis  (__global float32*)
+            self._get_local_mem()  # shared mem (__local float32*)
+        )
+        # Call the kernel
+        if self.is_cpu:
+            kernel_to_call = self.kernels.backproj_cpu_kernel
+        else:
+            kernel_to_call = self.kernels.backproj_kernel
+        return kernel_to_call(
+            self.queue,
+            self.ndrange,
+            self.wg,
+            *kernel_args
+        )
+
+    @profiled
     def backprojection(self, sino=None, dst=None):
         """Perform the backprojection on an input sinogram
 
-        :param sino: sinogram. If provided, it returns the plain backprojection.
+        :param sino: sinogram, as numpy.ndarray or as pyopencl.Array of
+                     float32 which stays on the device.
+                     If provided, it returns the plain backprojection.
         :param dst: destination (pyopencl.Array). If provided, the result will be written in this array.
         :return: backprojection of sinogram
         """
         events = []
         with self.sem:
 
-            if sino is not None:  # assuming numpy.ndarray
+            if isinstance(sino, parray.Array):
+                assert sino.dtype == numpy.float32, "sino must be float32"
+                assert sino.shape == self.shape, "sino must have the sinogram shape"
+                self.wait_for_array(sino)
+                event = self.transfer_device_to_texture(sino.data)
+                if event is not None:
+                    events.append(event)
+            elif sino is not None:  # assuming numpy.ndarray
                 events.append(self.transfer_to_texture(sino))
-            # Prepare arguments for the kernel call
-            if self.is_cpu:
-                d_sino_ref = self.d_sino
-            else:
-                d_sino_ref = self.d_sino_tex
-            kernel_args = (
-                self.num_projs,  # num of projections (int32)
-                self.num_bins,  # num of bins (int32)
-                self.axis_pos,  # axis position (float32)
-                self.cl_mem["_d_slice"],  # d_slice (__global float32*)
-                d_sino_ref,  # d_sino (__read_only image2d_t or float*)
-                numpy.float32(0),  # gpu_offset_x (float32)
-                numpy.float32(0),  # gpu_offset_y (float32)
-                self.cl_mem["d_cos"],  # d_cos (__global float32*)
-                self.cl_mem["d_sin"],  # d_sin (__global float32*)
-                self.cl_mem["d_axes"],  # d_axis  (__global float32*)
-                self._get_local_mem()  # shared mem (__local float32*)
-            )
-            # Call the kernel
-            if self.is_cpu:
-                kernel_to_call = self.kernels.backproj_cpu_kernel
-            else:
-                kernel_to_call = self.kernels.backproj_kernel
-            event_bpj = kernel_to_call(
-                self.queue,
-                self.ndrange,
-                self.wg,
-                *kernel_args
-            )
+            event_bpj = self._enqueue_backprojection()
             if dst is None:
                 self.slice[:] = 0
                 events.append(EventDescription("backprojection", event_bpj))
                 ev = pyopencl.enqueue_copy(self.queue, self.slice,
                                            self.cl_mem["_d_slice"])
-                events.append(EventDescription("copy D->H result", ev))
+                events.append(EventDescription("copy D->H result", ev,
+                                               self.slice.nbytes))
                 ev.wait()
                 res = numpy.copy(self.slice)
                 if self.dimrec_shape[0] > self.slice_shape[0] or self.dimrec_shape[1] > self.slice_shape[1]:
@@ -396,7 +437,8 @@ class Backprojection(OpenclProcessing):
                     res = res[:self.slice_shape[0], :self.slice_shape[1]]
             else:
                 ev = self.cpy2d_to_slice(dst)
-                events.append(EventDescription("copy D->D result", ev))
+                events.append(EventDescription("copy D->D result", ev,
+                                               dst.nbytes))
                 ev.wait()
                 res = dst
 
@@ -406,19 +448,93 @@ class Backprojection(OpenclProcessing):
 
         return res
 
+    def _filter_device(self, d_sino_z=None):
+        """Filter a zero-padded sinogram stored on the device and send it to
+        the texture. Must be called with the semaphore acquired.
+
+        :param d_sino_z: complex64 zero-padded sinogram, default: d_sino_z
+        :return: list of EventDescription
+        """
+        if d_sino_z is None:
+            d_sino_z = self.d_sino_z
+        events = []
+        # FFT (in-place)
+        self.pyfft_plan.execute(d_sino_z.data, batch=self.num_projs)
+
+        # Multiply (complex-wise) with the the filter
+        ev = self.kernels.mult(self.queue,
+                               tuple(int(i) for i in d_sino_z.shape[::-1]),
+                               None,
+                               d_sino_z.data,
+                               self.d_filter.data,
+                               numpy.int32(self.fft_size),
+                               self.num_projs
+                               )
+        events.append(EventDescription("complex 2D-1D multiplication", ev))
+        # Inverse FFT (in-place)
+        self.pyfft_plan.execute(d_sino_z.data, batch=self.num_projs, inverse=True)
+        # Copy the real part of d_sino_z[:, :self.num_bins] (complex64) to d_sino (float32)
+        ev = self.kernels.cpy2d_c2r(self.queue, self.shape[::-1], None,
+                                    self.d_sino,
+                                    d_sino_z.data,
+                                    self.num_bins,
+                                    self.num_projs,
+                                    numpy.int32(self.fft_size)
+                                    )
+        events.append(EventDescription("conversion from complex padded sinogram to sinogram", ev))
+        # debug
+#         ev.wait()
+#         h_sino = numpy.zeros(sino.shape, dtype=numpy.float32)
+#         ev = pyopencl.enqueue_copy(self.queue, h_sino, self.d_sino)
+#         ev.wait()
+#         numpy.save("/tmp/filtered_sinogram_%s.npy" % self.ctx.devices[0].platform.name.split()[0], h_sino)
+        event = self.transfer_device_to_texture(self.d_sino)
+        if event is not None:
+            events.append(event)
+        return events
+
     def filter_projections(self, sino, rescale=True):
         """
         Performs the FBP on a given sinogram.
 
-        :param sinogram: sinogram to (filter-)backproject
+        :param sinogram: sinogram to (filter-)backproject, as numpy.ndarray
+                         or as pyopencl.Array of float32. A pyopencl.Array
+                         is filtered on the device if pyfft is available,
+                         otherwise it is copied back to the host.
         :param rescale: if True (default), the sinogram is multiplied with
                         (pi/n_projs)
         """
         if sino.shape[0] != self.num_projs or sino.shape[1] != self.num_bins:
             raise ValueError("Expected sinogram with (projs, bins) = (%d, %d)" % (self.num_projs, self.num_bins))
+        events = []
+        if isinstance(sino, parray.Array):
+            if self.d_filter is None:
+                logger.debug("pyfft not available, filtering on the host")
+                self.wait_for_array(sino)
+                sino = sino.get(queue=self.queue)
+            else:
+                assert sino.dtype == numpy.float32, "sino must be float32"
+                scale = numpy.pi / self.num_projs if rescale else 1.
+                with self.sem:
+                    self.wait_for_array(sino)
+                    # Zero-pad (and rescale) the sinogram on the device
+                    ev = self.kernels.cpy2d_r2c(self.queue,
+                                                tuple(int(i) for i in self.d_sino_z.shape[::-1]),
+                                                None,
+                                                self.d_sino_z.data,
+                                                sino.data,
+                                                self.num_bins,
+                                                self.num_projs,
+                                                numpy.int32(self.fft_size),
+                                                numpy.float32(scale))
+                    events.append(EventDescription("zero-padding of sinogram", ev))
+                    events += self._filter_device()
+                if self.profile:
+                    self.events += events
+                return
+
         if rescale:
             sino = sino * numpy.pi / self.num_projs
-        events = []
         # if pyfft is available, all can be done on the device
         if self.d_filter is not None:
 
@@ -432,39 +548,9 @@ class Backprojection(OpenclProcessing):
             with self.sem:
                 # send to GPU
                 ev = pyopencl.enqueue_copy(self.queue, self.d_sino_z.data, sino_zeropadded)
-                events.append(EventDescription("Send sino H->D", ev))
-
-                # FFT (in-place)
-                self.pyfft_plan.execute(self.d_sino_z.data, batch=self.num_projs)
-
-                # Multiply (complex-wise) with the the filter
-                ev = self.kernels.mult(self.queue,
-                                       tuple(int(i) for i in self.d_sino_z.shape[::-1]),
-                                       None,
-                                       self.d_sino_z.data,
-                                       self.d_filter.data,
-                                       numpy.int32(self.fft_size),
-                                       self.num_projs
-                                       )
-                events.append(EventDescription("complex 2D-1D multiplication", ev))
-                # Inverse FFT (in-place)
-                self.pyfft_plan.execute(self.d_sino_z.data, batch=self.num_projs, inverse=True)
-                # Copy the real part of d_sino_z[:, :self.num_bins] (complex64) to d_sino (float32)
-                ev = self.kernels.cpy2d_c2r(self.queue, self.shape[::-1], None,
-                                            self.d_sino,
-                                            self.d_sino_z.data,
-                                            self.num_bins,
-                                            self.num_projs,
-                                            numpy.int32(self.fft_size)
-                                            )
-                events.append(EventDescription("conversion from complex padded sinogram to sinogram", ev))
-                # debug
-#                 ev.wait()
-#                 h_sino = numpy.zeros(sino.shape, dtype=numpy.float32)
-#                 ev = pyopencl.enqueue_copy(self.queue, h_sino, self.d_sino)
-#                 ev.wait()
-#                 numpy.save("/tmp/filtered_sinogram_%s.npy" % self.ctx.devices[0].platform.name.split()[0], h_sino)
-                events.append(self.transfer_device_to_texture(self.d_sino))
+                events.append(EventDescription("Send sino H->D", ev,
+                                               sino_zeropadded.nbytes))
+                events += self._filter_device()
             # ------
         else:  # no pyfft
             sino_filtered = fourier_filter(sino, filter_=self.filter, fft_size=self.fft_size)
@@ -473,16 +559,160 @@ class Backprojection(OpenclProcessing):
         if self.profile:
             self.events += events
 
-    def filtered_backprojection(self, sino):
+    @profiled
+    def filtered_backprojection(self, sino, dst=None):
         """
         Compute the filtered backprojection (FBP) on a sinogram.
 
-        :param sino: sinogram (`numpy.ndarray`) in the format (projections,
-                     bins)
+        :param sino: sinogram (`numpy.ndarray` or `pyopencl.array.Array`)
+                     in the format (projections, bins)
+        :param dst: destination (pyopencl.Array). If provided, the result
+                    will be written in this array.
         """
 
         self.filter_projections(sino)
-        res = self.backprojection()
+        res = self.backprojection(dst=dst)
         return res
 
+    def filtered_backprojection_stack(self, sinos, dst=None):
+        """
+        Compute the filtered backprojection (FBP) of a stack of sinograms.
+
+        The filter, angles and device buffers are shared by all slices.
+        The preparation of the next sinogram on the host (filtering, or
+        zero-padding when filtering on the device) is overlapped with the
+        processing of the current one on the device.
+
+        :param sinos: stack of sinograms in the format (slices, projections,
+                      bins) as a `numpy.ndarray` or any array-like supporting
+                      indexing along the first dimension (e.g.,
+                      `h5py.Dataset`)
+        :param dst: Optional array-like of shape (slices,) + slice_shape where
+                    to write the result (e.g., `numpy.ndarray` or
+                    `h5py.Dataset`).
+        :return: dst or a new `numpy.ndarray` if not provided
+        """
+        n_slices = sinos.shape[0]
+        if tuple(sinos.shape[1:]) != (self.num_projs, self.num_bins):
+            raise ValueError("Expected sinograms with (projs, bins) = (%d, %d)" % (self.num_projs, self.num_bins))
+        out_shape = (n_slices,) + tuple(self.slice_shape)
+        if dst is None:
+            dst = numpy.empty(out_shape, dtype=numpy.float32)
+        elif tuple(dst.shape) != out_shape:
+            raise ValueError("Expected destination of shape %s" % str(out_shape))
+
+        if self.d_filter is not None:
+            return self._filtered_backprojection_stack_device(sinos, dst)
+
+        height, width = self.slice_shape
+        # Double-buffering of results
+        results = [numpy.empty(self.dimrec_shape, dtype=numpy.float32),
+                   numpy.empty(self.dimrec_shape, dtype=numpy.float32)]
+        events = []
+        sino_filtered = None
+        with self.sem:
+            for index in range(n_slices):
+                if sino_filtered is None:
+                    sino_filtered = fourier_filter(
+                        sinos[index] * numpy.pi / self.num_projs,
+                        filter_=self.filter, fft_size=self.fft_size)
+                # Blocking: waits for the previous kernel
+                events.append(self.transfer_to_texture(sino_filtered))
+                events.append(EventDescription(
+                    "backprojection", self._enqueue_backprojection()))
+                ev = pyopencl.enqueue_copy(self.queue,
+                                           results[index % 2],
+                                           self.cl_mem["_d_slice"],
+                                           is_blocking=False)
+                events.append(EventDescription("copy D->H result", ev,
+                                               results[index % 2].nbytes))
+
+                if index > 0:
+                    # Previous result was copied before current transfer
+                    dst[index - 1] = results[(index - 1) % 2][:height, :width]
+
+                # Filter next sinogram while the device is working
+                if index + 1 < n_slices:
+                    sino_filtered = fourier_filter(
+                        sinos[index + 1] * numpy.pi / self.num_projs,
+                        filter_=self.filter, fft_size=self.fft_size)
+
+            if n_slices > 0:
+                ev.wait()
+                dst[n_slices - 1] = results[(n_slices - 1) % 2][:height, :width]
+
+        if self.profile:
+            self.events += events
+        return dst
+
+    def _filtered_backprojection_stack_device(self, sinos, dst):
+        """Filtered backprojection of a stack of sinograms, filtering on the
+        device.
+
+        Zero-padded sinograms are uploaded without blocking in alternating
+        device buffers and results are copied back asynchronously.
+        """
+        n_slices = sinos.shape[0]
+        height, width = self.slice_shape
+        if "d_sino_z2" not in self.cl_mem:
+            self.cl_mem["d_sino_z2"] = parray.zeros(self.queue,
+                                                    self.d_sino_z.shape,
+                                                    dtype=numpy.complex64)
+        d_sinos_z = [self.d_sino_z, self.cl_mem["d_sino_z2"]]
+        # Double-buffering of zero-padded sinograms and results
+        sinos_z = [numpy.zeros(self.d_sino_z.shape, dtype=numpy.complex64),
+                   numpy.zeros(self.d_sino_z.shape, dtype=numpy.complex64)]
+        uploads = [None, None]
+        results = [numpy.empty(self.dimrec_shape, dtype=numpy.float32),
+                   numpy.empty(self.dimrec_shape, dtype=numpy.float32)]
+        downloads = [None, None]
+        events = []
+
+        def upload(index):
+            slot = index % 2
+            if uploads[slot] is not None:
+                # Host buffer is still being sent
+                uploads[slot].wait()
+            sinos_z[slot][:, :self.num_bins] = sinos[index] * numpy.pi / self.num_projs
+            uploads[slot] = pyopencl.enqueue_copy(self.queue,
+                                                  d_sinos_z[slot].data,
+                                                  sinos_z[slot],
+                                                  is_blocking=False)
+            events.append(EventDescription("Send sino H->D", uploads[slot],
+                                           sinos_z[slot].nbytes))
+
+        with self.sem:
+            if n_slices > 0:
+                upload(0)
+            for index in range(n_slices):
+                slot = index % 2
+                events.extend(self._filter_device(d_sinos_z[slot]))
+                events.append(EventDescription(
+                    "backprojection", self._enqueue_backprojection()))
+                downloads[slot] = pyopencl.enqueue_copy(self.queue,
+                                                        results[slot],
+                                                        self.cl_mem["_d_slice"],
+                                                        is_blocking=False)
+                events.append(EventDescription("copy D->H result",
+                                               downloads[slot],
+                                               results[slot].nbytes))
+
+                # Prepare next sinogram while the device is working
+                if index + 1 < n_slices:
+                    upload(index + 1)
+
+                if index > 0:
+                    previous = (index - 1) % 2
+                    downloads[previous].wait()
+                    dst[index - 1] = results[previous][:height, :width]
+
+            if n_slices > 0:
+                last = (n_slices - 1) % 2
+                downloads[last].wait()
+                dst[n_slices - 1] = results[last][:height, :width]
+
+        if self.profile:
+            self.events += events
+        return dst
+
     __call__ = filtered_backprojection
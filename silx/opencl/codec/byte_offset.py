@@ -37,15 +37,16 @@ __authors__ = ["Jérôme Kieffer"]
 __contact__ = "jerome.kieffer@esrf.eu"
 __license__ = "MIT"
 __copyright__ = "European Synchrotron Radiation Facility, Grenoble, France"
-__date__ = "24/10/2017"
+__date__ = "18/10/2018"
 __status__ = "production"
 
 
+import collections
 import functools
 import os
 import numpy
 from ..common import ocl, pyopencl
-from ..processing import BufferDescription, EventDescription, OpenclProcessing
+from ..processing import BufferDescription, EventDescription, OpenclProcessing, profiled
 
 import logging
 logger = logging.getLogger(__name__)
@@ -143,6 +144,7 @@ class ByteOffset(OpenclProcessing):
                                          output_statement=output_statement)
         return knl
 
+    @profiled
     def decode(self, raw, as_float=False, out=None):
         """This function actually performs the decompression by calling the kernels
 
@@ -164,95 +166,220 @@ class ByteOffset(OpenclProcessing):
                 self.raw_size = int(len(raw))
                 self.padded_raw_size = (self.raw_size + wg - 1) & ~(wg - 1)
                 logger.info("increase raw buffer size to %s", self.padded_raw_size)
-                buffers = {
-                           "raw": pyopencl.array.empty(self.queue, self.padded_raw_size, dtype=numpy.int8),
-                           "mask": pyopencl.array.empty(self.queue, self.padded_raw_size, dtype=numpy.int32),
-                           "exceptions": pyopencl.array.empty(self.queue, self.padded_raw_size, dtype=numpy.int32),
-                           "values": pyopencl.array.empty(self.queue, self.padded_raw_size, dtype=numpy.int32),
-                          }
-                self.cl_mem.update(buffers)
-            else:
-                wg = self.block_size
+                self.cl_mem.update(self._allocate_raw_buffers(self.raw_size))
 
-            evt = pyopencl.enqueue_copy(self.queue, self.cl_mem["raw"].data,
-                                        raw,
-                                        is_blocking=False)
-            events.append(EventDescription("copy raw H -> D", evt))
-            evt = self.kernels.fill_int_mem(self.queue, (self.padded_raw_size,), (wg,),
-                                            self.cl_mem["mask"].data,
-                                            numpy.int32(self.padded_raw_size),
-                                            numpy.int32(0),
-                                            numpy.int32(0))
-            events.append(EventDescription("memset mask", evt))
-            evt = self.kernels.fill_int_mem(self.queue, (1,), (1,),
-                                            self.cl_mem["counter"].data,
-                                            numpy.int32(1),
-                                            numpy.int32(0),
-                                            numpy.int32(0))
-            events.append(EventDescription("memset counter", evt))
-            evt = self.kernels.mark_exceptions(self.queue, (self.padded_raw_size,), (wg,),
-                                               self.cl_mem["raw"].data,
-                                               len_raw,
-                                               numpy.int32(self.raw_size),
-                                               self.cl_mem["mask"].data,
-                                               self.cl_mem["values"].data,
-                                               self.cl_mem["counter"].data,
-                                               self.cl_mem["exceptions"].data)
-            events.append(EventDescription("mark exceptions", evt))
-            nb_exceptions = numpy.empty(1, dtype=numpy.int32)
-            evt = pyopencl.enqueue_copy(self.queue, nb_exceptions, self.cl_mem["counter"].data,
-                                        is_blocking=False)
-            events.append(EventDescription("copy counter D -> H", evt))
+            if out is None:
+                out = self.cl_mem["data_float" if as_float else "data_int"]
+            len_raw, nb_exceptions, evt = self._enqueue_mark_exceptions(
+                self.cl_mem, raw, events)
             evt.wait()
-            nbexc = int(nb_exceptions[0])
-            if nbexc == 0:
-                logger.info("nbexc %i", nbexc)
-            else:
-                evt = self.kernels.treat_exceptions(self.queue, (nbexc,), (1,),
-                                                    self.cl_mem["raw"].data,
-                                                    len_raw,
-                                                    self.cl_mem["mask"].data,
-                                                    self.cl_mem["exceptions"].data,
-                                                    self.cl_mem["values"].data
-                                                    )
-                events.append(EventDescription("treat_exceptions", evt))
-
-            #self.cl_mem["copy_values"] = self.cl_mem["values"].copy()
-            #self.cl_mem["copy_mask"] = self.cl_mem["mask"].copy()
-            evt = self.kernels.scan(self.cl_mem["values"],
-                                    self.cl_mem["mask"],
-                                    queue=self.queue,
-                                    size=int(len_raw),
-                                    wait_for=(evt,))
-            events.append(EventDescription("double scan", evt))
-            #evt.wait()
-            if out is not None:
-                if out.dtype == numpy.float32:
-                    copy_results = self.kernels.copy_result_float
-                else:
-                    copy_results = self.kernels.copy_result_int
-            else:
-                if as_float:
-                    out = self.cl_mem["data_float"]
-                    copy_results = self.kernels.copy_result_float
-                else:
-                    out = self.cl_mem["data_int"]
-                    copy_results = self.kernels.copy_result_int
-            evt = copy_results(self.queue, (self.padded_raw_size,), (wg,),
-                               self.cl_mem["values"].data,
-                               self.cl_mem["mask"].data,
-                               len_raw,
-                               self.dec_size,
-                               out.data
-                               )
-            events.append(EventDescription("copy_results", evt))
-            #evt.wait()
+            self._enqueue_decompress(
+                self.cl_mem, len_raw, int(nb_exceptions[0]), out, events)
             if self.profile:
                 self.events += events
         return out
 
     __call__ = decode
 
+    def _allocate_raw_buffers(self, raw_size):
+        """Allocate the device buffers used to decompress a stream
+
+        :param int raw_size: Size of the compressed stream
+        :return: dict of pyopencl arrays
+        """
+        wg = self.block_size
+        padded_raw_size = (int(raw_size) + wg - 1) & ~(wg - 1)
+        allocator = self.allocator
+        return {
+            "raw": pyopencl.array.empty(self.queue, padded_raw_size, dtype=numpy.int8,
+                                        allocator=allocator),
+            "mask": pyopencl.array.empty(self.queue, padded_raw_size, dtype=numpy.int32,
+                                         allocator=allocator),
+            "exceptions": pyopencl.array.empty(self.queue, padded_raw_size, dtype=numpy.int32,
+                                               allocator=allocator),
+            "values": pyopencl.array.empty(self.queue, padded_raw_size, dtype=numpy.int32,
+                                           allocator=allocator),
+        }
+
+    def _enqueue_mark_exceptions(self, mem, raw, events):
+        """Enqueue the transfer of the raw stream and the marking of exceptions
+
+        :param dict mem: Device buffers to use
+        :param numpy.ndarray raw: The compressed data as a 1D numpy array of char.
+        :param list events: List where to append EventDescription
+        :return: (size of raw, host array receiving the number of exceptions,
+                  event of the transfer of the number of exceptions)
+        """
+        wg = self.block_size
+        padded_raw_size = mem["raw"].size
+        len_raw = numpy.int32(len(raw))
+
+        evt = pyopencl.enqueue_copy(self.queue, mem["raw"].data,
+                                    raw,
+                                    is_blocking=False)
+        events.append(EventDescription("copy raw H -> D", evt, int(len_raw)))
+        evt = self.kernels.fill_int_mem(self.queue, (padded_raw_size,), (wg,),
+                                        mem["mask"].data,
+                                        numpy.int32(padded_raw_size),
+                                        numpy.int32(0),
+                                        numpy.int32(0))
+        events.append(EventDescription("memset mask", evt))
+        evt = self.kernels.fill_int_mem(self.queue, (1,), (1,),
+                                        mem["counter"].data,
+                                        numpy.int32(1),
+                                        numpy.int32(0),
+                                        numpy.int32(0))
+        events.append(EventDescription("memset counter", evt))
+        evt = self.kernels.mark_exceptions(self.queue, (padded_raw_size,), (wg,),
+                                           mem["raw"].data,
+                                           len_raw,
+                                           numpy.int32(padded_raw_size),
+                                           mem["mask"].data,
+                                           mem["values"].data,
+                                           mem["counter"].data,
+                                           mem["exceptions"].data)
+        events.append(EventDescription("mark exceptions", evt))
+        nb_exceptions = numpy.empty(1, dtype=numpy.int32)
+        evt = pyopencl.enqueue_copy(self.queue, nb_exceptions, mem["counter"].data,
+                                    is_blocking=False)
+        events.append(EventDescription("copy counter D -> H", evt,
+                                       nb_exceptions.nbytes))
+        return len_raw, nb_exceptions, evt
+
+    def _enqueue_decompress(self, mem, len_raw, nbexc, out, events):
+        """Enqueue the treatment of exceptions, the scan and the copy of results
+
+        :param dict mem: Device buffers used by :meth:`_enqueue_mark_exceptions`
+        :param numpy.int32 len_raw: Size of the compressed stream
+        :param int nbexc: Number of exceptions
+        :param pyopencl.array out: Array of int32 or float32 receiving the result
+        :param list events: List where to append EventDescription
+        :return: The event of the copy of the results
+        """
+        wg = self.block_size
+        if nbexc == 0:
+            logger.info("nbexc %i", nbexc)
+        else:
+            evt = self.kernels.treat_exceptions(self.queue, (nbexc,), (1,),
+                                                mem["raw"].data,
+                                                len_raw,
+                                                mem["mask"].data,
+                                                mem["exceptions"].data,
+                                                mem["values"].data
+                                                )
+            events.append(EventDescription("treat_exceptions", evt))
+
+        evt = self.kernels.scan(mem["values"],
+                                mem["mask"],
+                                queue=self.queue,
+                                size=int(len_raw))
+        events.append(EventDescription("double scan", evt))
+        if out.dtype == numpy.float32:
+            copy_results = self.kernels.copy_result_float
+        else:
+            copy_results = self.kernels.copy_result_int
+        evt = copy_results(self.queue, (mem["raw"].size,), (wg,),
+                           mem["values"].data,
+                           mem["mask"].data,
+                           len_raw,
+                           self.dec_size,
+                           out.data
+                           )
+        events.append(EventDescription("copy_results", evt,
+                                       self.dec_size * out.dtype.itemsize))
+        return evt
+
+    @profiled
+    def decode_many(self, raws, as_float=False, callback=None, nb_slots=2):
+        """Decompress a stream of frames, keeping several frames in flight.
+
+        Each of the nb_slots frames in flight has its own device buffers:
+        the transfer and the marking of exceptions of a frame are enqueued
+        before waiting for the previous one, and the results are copied
+        back to the host asynchronously while the next frames are read
+        from `raws`.
+
+        :param raws: Iterable of compressed frames, as 1D numpy arrays of char
+                     or bytes. It can be a generator reading files.
+        :param bool as_float: True to decompress as float32,
+                              False (default) to decompress as int32
+        :param callable callback:
+            Function called as callback(index, frame) with each decompressed
+            frame as a 1D numpy array, in order. If provided, frames are not
+            accumulated and None is returned.
+        :param int nb_slots: Number of frames in flight (at least 2)
+        :return: The decompressed frames as a (nb_frames, dec_size) array
+        :rtype: Union[numpy.ndarray,None]
+        """
+        assert self.dec_size is not None, \
+            "dec_size is a mandatory ByteOffset init argument for decompression"
+        nb_slots = max(2, int(nb_slots))
+        dtype = numpy.float32 if as_float else numpy.int32
+
+        events = []
+        frames = []
+        slots = [None] * nb_slots
+        marked = None  # Frame with exceptions being marked
+        pending = collections.deque()  # Frames with results being copied back
+
+        def finish():
+            index, frame, evt = pending.popleft()
+            evt.wait()
+            if callback is None:
+                frames.append(frame)
+            else:
+                callback(index, frame)
+
+        def decompress(index, mem, raw, len_raw, nb_exceptions, evt):
+            evt.wait()
+            self._enqueue_decompress(
+                mem, len_raw, int(nb_exceptions[0]), mem["out"], events)
+            frame = numpy.empty(self.dec_size, dtype=dtype)
+            evt = pyopencl.enqueue_copy(self.queue, frame, mem["out"].data,
+                                        is_blocking=False)
+            events.append(EventDescription("copy D->H result", evt, frame.nbytes))
+            pending.append((index, frame, evt))
+
+        with self.sem:
+            for index, raw in enumerate(raws):
+                if isinstance(raw, bytes):
+                    raw = numpy.frombuffer(raw, dtype=numpy.int8)
+                else:
+                    raw = numpy.ascontiguousarray(raw, dtype=numpy.int8).ravel()
+
+                # Release the slot from the frame which used it previously
+                while pending and pending[0][0] <= index - nb_slots:
+                    finish()
+
+                mem = slots[index % nb_slots]
+                if mem is None or mem["raw"].size < len(raw):
+                    mem = self._allocate_raw_buffers(len(raw))
+                    mem["counter"] = pyopencl.array.empty(
+                        self.queue, 1, dtype=numpy.int32)
+                    mem["out"] = pyopencl.array.empty(
+                        self.queue, self.dec_size, dtype=dtype)
+                    slots[index % nb_slots] = mem
+
+                stage = self._enqueue_mark_exceptions(mem, raw, events)
+                if marked is not None:
+                    decompress(*marked)
+                marked = (index, mem, raw) + stage
+
+            if marked is not None:
+                decompress(*marked)
+            while pending:
+                finish()
+
+            if self.profile:
+                self.events += events
+
+        if callback is not None:
+            return None
+        if len(frames) == 0:
+            return numpy.empty((0, self.dec_size), dtype=dtype)
+        return numpy.stack(frames)
+
+
     def _init_compression_scan(self):
         """Initialize CBF compression scan kernels"""
         preamble = """
@@ -325,6 +452,7 @@ class ByteOffset(OpenclProcessing):
                                          output_statement=output_statement)
         return knl
 
+    @profiled
     def encode(self, data, out=None):
         """Compress data to CBF.
 
@@ -357,12 +485,14 @@ class ByteOffset(OpenclProcessing):
                     self.cl_mem.update({
                         "data_input": pyopencl.array.empty(self.queue,
                                                            data.size,
-                                                           dtype=numpy.int32)})
+                                                           dtype=numpy.int32,
+                                                           allocator=self.allocator)})
                 d_data = self.cl_mem["data_input"]
 
                 evt = pyopencl.enqueue_copy(
                     self.queue, d_data.data, data, is_blocking=False)
-                events.append(EventDescription("copy data H -> D", evt))
+                events.append(EventDescription("copy data H -> D", evt,
+                                               data.nbytes))
 
             # Make sure compressed array exists and is large enough
             compressed_size = d_data.size * 7
@@ -372,7 +502,8 @@ class ByteOffset(OpenclProcessing):
                 self.cl_mem.update({
                     "compressed": pyopencl.array.empty(self.queue,
                                                        compressed_size,
-                                                       dtype=numpy.int8)})
+                                                       dtype=numpy.int8,
+                                                       allocator=self.allocator)})
             d_compressed = self.cl_mem["compressed"]
             d_size = self.cl_mem["counter"]  # Shared with decompression
 
@@ -407,7 +538,8 @@ class ByteOffset(OpenclProcessing):
                 evt = pyopencl.enqueue_copy_buffer(
                     self.queue, d_compressed.data, out.data, byte_count=byte_count)
                 events.append(
-                    EventDescription("copy D -> D: internal -> out", evt))
+                    EventDescription("copy D -> D: internal -> out", evt,
+                                     byte_count))
 
             if self.profile:
                 self.events += events
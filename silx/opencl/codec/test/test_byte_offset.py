@@ -37,7 +37,7 @@ __authors__ = ["Jérôme Kieffer"]
 __contact__ = "jerome.kieffer@esrf.eu"
 __license__ = "MIT"
 __copyright__ = "2013 European Synchrotron Radiation Facility, Grenoble, France"
-__date__ = "10/11/2017"
+__date__ = "18/10/2018"
 
 import sys
 import time
@@ -159,6 +159,29 @@ class TestByteOffset(unittest.TestCase):
                          1000.0 * (t1 - t0),
                          1000.0 * (t2 - t1))
 
+    def test_decode_many(self):
+        """Test the pipelined decompression of a stack of frames"""
+        shape = (91, 97)
+        size = numpy.prod(shape)
+        refs, raws = zip(*[self._create_test_data(shape=shape, nexcept=nexcept)
+                           for nexcept in (0, 229, 11, 1000, 3)])
+        refs = numpy.array([ref.ravel() for ref in refs])
+
+        bo = byte_offset.ByteOffset(dec_size=size, profile=True)
+        res = bo.decode_many(iter(raws))
+        self.assertEqual(res.dtype, numpy.int32)
+        self.assertTrue(numpy.array_equal(res, refs))
+
+        res = bo.decode_many(raws, as_float=True, nb_slots=3)
+        self.assertEqual(res.dtype, numpy.float32)
+        self.assertTrue(numpy.array_equal(res, refs))
+
+        frames = []
+        self.assertIsNone(bo.decode_many(
+            raws, callback=lambda index, frame: frames.append((index, frame))))
+        self.assertEqual([index for index, _ in frames], list(range(len(raws))))
+        self.assertTrue(numpy.array_equal([f for _, f in frames], refs))
+
     def test_encode(self):
         """Test byte offset compression"""
         ref, raw = self._create_test_data(shape=(2713, 2719), nexcept=2729)
@@ -309,6 +332,7 @@ def suite():
     test_suite = unittest.TestSuite()
     test_suite.addTest(TestByteOffset("test_decompress"))
     test_suite.addTest(TestByteOffset("test_many_decompress"))
+    test_suite.addTest(TestByteOffset("test_decode_many"))
     test_suite.addTest(TestByteOffset("test_encode"))
     test_suite.addTest(TestByteOffset("test_encode_to_array"))
     test_suite.addTest(TestByteOffset("test_encode_to_bytes"))
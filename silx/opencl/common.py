@@ -34,13 +34,16 @@ __author__ = "Jerome Kieffer"
 __contact__ = "Jerome.Kieffer@ESRF.eu"
 __license__ = "MIT"
 __copyright__ = "2012-2017 European Synchrotron Radiation Facility, Grenoble, France"
-__date__ = "16/10/2017"
+__date__ = "18/10/2018"
 __status__ = "stable"
 __all__ = ["ocl", "pyopencl", "mf", "release_cl_buffers", "allocate_cl_buffers",
            "measure_workgroup_size", "kernel_workgroup_size"]
 
 import os
+import hashlib
+import json
 import logging
+import stat
 
 import numpy
 
@@ -276,59 +279,334 @@ def _is_nvidia_gpu(vendor, devtype):
     return (vendor == "NVIDIA Corporation") and (devtype == "GPU")
 
 
+def _get_cache_directory(default=True):
+    """Returns the directory where silx.opencl caches data across processes.
+
+    The directory is set by the environment variable SILX_OPENCL_CACHE.
+    If it is not set, the per-user directory ``silx/opencl`` in
+    XDG_CACHE_HOME (default: ``~/.cache``) is used, or in LOCALAPPDATA
+    on Windows.
+    Setting SILX_OPENCL_CACHE to an empty string, "0" or "False" disables
+    the cache.
+
+    :param bool default:
+        False to disable the cache when SILX_OPENCL_CACHE is not set
+    :return: Path of the directory or None if caching is disabled
+    :rtype: Union[str,None]
+    """
+    path = os.environ.get("SILX_OPENCL_CACHE")
+    if path is None:
+        if not default:
+            return None
+        if os.name == "nt":
+            root = os.environ.get("LOCALAPPDATA")
+        else:
+            root = os.environ.get("XDG_CACHE_HOME")
+            if not root:
+                root = os.path.join(os.path.expanduser("~"), ".cache")
+        if not root or not os.path.isabs(root):  # No home directory available
+            return None
+        path = os.path.join(root, "silx", "opencl")
+    elif path in ["", "0", "False"]:
+        return None
+    return path
+
+
+def _is_private(path):
+    """Returns True if path is owned by the current user and is not
+    writable by group or others.
+
+    On systems without user ids (Windows), it only checks that path exists.
+
+    :param str path:
+    :rtype: bool
+    """
+    try:
+        path_stat = os.lstat(path)
+    except OSError:
+        return False
+    if not hasattr(os, "getuid"):
+        return True
+    if stat.S_ISLNK(path_stat.st_mode):
+        return False
+    return (path_stat.st_uid == os.getuid() and
+            not path_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH))
+
+
+def _is_private_cache_path(path):
+    """Returns True if a path in the cache directory and all the directories
+    containing it down to the cache directory are private
+    (see :func:`_is_private`).
+
+    Files in a cache directory another user can write to must not be used:
+    they can contain program binaries run by OpenCL drivers.
+
+    :param str path: Path of a file or directory in the cache directory
+    :rtype: bool
+    """
+    directory = _get_cache_directory()
+    if directory is None:
+        return False
+    directory = os.path.abspath(directory)
+    path = os.path.abspath(path)
+    if path != directory and not path.startswith(directory + os.sep):
+        return False
+    paths = [path]
+    while paths[-1] != directory:
+        paths.append(os.path.dirname(paths[-1]))
+    for path in paths:
+        if not _is_private(path):
+            logger.warning("Ignore OpenCL cache %s: not owned by the user or "
+                           "writable by others", path)
+            return False
+    return True
+
+
+def _read_cache_file(filename, binary=False):
+    """Returns the content of a file of the cache directory.
+
+    :param str filename: Path of the file in the cache directory
+    :param bool binary: True to read bytes, False to read text
+    :return: The content or None if not available or not private
+    :rtype: Union[str,bytes,None]
+    """
+    if not os.path.exists(filename) or not _is_private_cache_path(filename):
+        return None
+    try:
+        with open(filename, "rb" if binary else "r") as f:
+            return f.read()
+    except (IOError, OSError) as error:
+        logger.debug("Cannot read OpenCL cache file %s: %s", filename, error)
+        return None
+
+
+def _replace_file(src, dst):
+    """Rename src to dst, replacing dst if it exists
+
+    :param str src:
+    :param str dst:
+    """
+    if hasattr(os, "replace"):
+        os.replace(src, dst)
+    else:  # Python 2
+        try:
+            os.rename(src, dst)
+        except OSError:
+            if not os.path.exists(dst):
+                raise
+            os.remove(dst)  # Windows does not replace existing files
+            os.rename(src, dst)
+
+
+def _write_cache_file(filename, data):
+    """Store data in a file of the cache directory.
+
+    Directories are created with permissions restricted to the user.
+    Nothing is written if they are not private (see :func:`_is_private`).
+
+    :param str filename: Path of the file in the cache directory
+    :param Union[str,bytes] data: The content of the file
+    :return: True if the file was written
+    :rtype: bool
+    """
+    directory = os.path.dirname(filename)
+    tmp_filename = "%s.%d" % (filename, os.getpid())
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        if not _is_private_cache_path(directory):
+            return False
+        # Write to a temporary file first for concurrent processes
+        fd = os.open(tmp_filename,
+                     os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0),
+                     0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data if isinstance(data, bytes) else data.encode("utf-8"))
+        _replace_file(tmp_filename, filename)
+    except (IOError, OSError) as error:
+        logger.debug("Cannot write OpenCL cache file %s: %s", filename, error)
+        return False
+    return True
+
+
+def _icd_fingerprint():
+    """Returns a key identifying the installed OpenCL drivers.
+
+    The key is built from the pyopencl version, the environment variables
+    controlling the ICD loader and the visible devices, the ICD files and
+    the size and modification time of the driver libraries they reference.
+
+    :return: A hash of the configuration or None if no ICD file was found
+        (e.g., on Windows and macOS where drivers are not listed in files)
+    :rtype: Union[str,None]
+    """
+    env_keys = ("OCL_ICD_VENDORS", "OPENCL_VENDOR_PATH", "OCL_ICD_FILENAMES", "GPU",
+                # Drivers only exposing some devices
+                "CUDA_VISIBLE_DEVICES", "ROCR_VISIBLE_DEVICES", "HIP_VISIBLE_DEVICES",
+                "GPU_DEVICE_ORDINAL", "POCL_DEVICES", "ZE_AFFINITY_MASK")
+    items = [pyopencl.VERSION_TEXT, os.path.dirname(pyopencl.__file__)]
+    items += [os.environ.get(key) for key in env_keys]
+
+    vendors = os.environ.get("OCL_ICD_VENDORS", "/etc/OpenCL/vendors")
+    if os.path.isdir(vendors):
+        icd_files = sorted(os.path.join(vendors, name)
+                           for name in os.listdir(vendors)
+                           if name.endswith(".icd"))
+    elif os.path.isfile(vendors):
+        icd_files = [vendors]
+    else:
+        icd_files = []
+    libraries = [path for path in os.environ.get("OCL_ICD_FILENAMES", "").split(os.pathsep) if path]
+
+    for icd_file in icd_files:
+        try:
+            with open(icd_file) as f:
+                library = f.read().strip()
+        except (IOError, OSError):
+            continue
+        items.append((icd_file, library))
+        if not os.path.isabs(library):
+            library = os.path.join(os.path.dirname(icd_file), library)
+        libraries.append(library)
+    if not libraries:
+        return None
+
+    for library in libraries:
+        try:
+            stat = os.stat(library)
+        except OSError:
+            items.append((library, None))
+        else:
+            items.append((library, stat.st_size, stat.st_mtime))
+    return hashlib.sha1(json.dumps(items).encode("utf-8")).hexdigest()
+
+
+def _describe_platforms():
+    """Enumerate the OpenCL platforms and devices with pyopencl.
+
+    This loads all the OpenCL drivers and probes all devices.
+
+    :return: List of platform descriptions as dict with the arguments of
+        :class:`Platform` and the list of device descriptions as dict with
+        the arguments of :class:`Device` in "devices".
+    :rtype: List[dict]
+    """
+    platforms = []
+    for idx, platform in enumerate(pyopencl.get_platforms()):
+        pypl = dict(name=platform.name, vendor=platform.vendor.strip(),
+                    version=platform.version, extensions=platform.extensions,
+                    idx=idx, devices=[])
+        for idd, device in enumerate(platform.get_devices()):
+            ####################################################
+            # Nvidia does not report int64 atomics (we are using) ...
+            # this is a hack around as any nvidia GPU with double-precision supports int64 atomics
+            ####################################################
+            extensions = device.extensions
+            if (pypl["vendor"] == "NVIDIA Corporation") and ('cl_khr_fp64' in extensions):
+                extensions += ' cl_khr_int64_base_atomics cl_khr_int64_extended_atomics'
+            try:
+                devtype = pyopencl.device_type.to_string(device.type).upper()
+            except ValueError:
+                # pocl does not describe itself as a CPU !
+                devtype = "CPU"
+            if len(devtype) > 3:
+                devtype = devtype[:3]
+            if _is_nvidia_gpu(pypl["vendor"], devtype) and "compute_capability_major_nv" in dir(device):
+                comput_cap = device.compute_capability_major_nv, device.compute_capability_minor_nv
+                flop_core = NVIDIA_FLOP_PER_CORE.get(comput_cap, min(NVIDIA_FLOP_PER_CORE.values()))
+            elif (pypl["vendor"] == "Advanced Micro Devices, Inc.") and (devtype == "GPU"):
+                flop_core = AMD_FLOP_PER_CORE
+            elif devtype == "CPU":
+                flop_core = FLOP_PER_CORE.get(devtype, 1)
+            else:
+                flop_core = 1
+            workgroup = device.max_work_group_size
+            if (devtype == "CPU") and (pypl["vendor"] == "Apple"):
+                logger.warning("For Apple's OpenCL on CPU: Measuring actual valid max_work_goup_size.")
+                workgroup = _measure_workgroup_size(device, fast=True)
+            if (devtype == "GPU") and os.environ.get("GPU") == "False":
+                # Environment variable to disable GPU devices
+                continue
+            pypl["devices"].append(dict(
+                name=device.name, dtype=devtype, version=device.version,
+                driver_version=device.driver_version, extensions=extensions,
+                memory=device.global_mem_size, available=bool(device.available),
+                cores=device.max_compute_units, frequency=device.max_clock_frequency,
+                flop_core=flop_core, idx=idd, workgroup=workgroup))
+        platforms.append(pypl)
+    return platforms
+
+
+def _get_platform_descriptions():
+    """Returns the description of the OpenCL platforms and devices.
+
+    If the environment variable SILX_OPENCL_CACHE sets a cache directory
+    (see :func:`_get_cache_directory`), the description is read from the disk
+    cache if it is available for the current driver configuration
+    (see :func:`_icd_fingerprint`), so that OpenCL drivers are not loaded.
+    Otherwise, platforms are enumerated and the result is stored in the cache.
+
+    :rtype: List[dict]
+    """
+    directory = _get_cache_directory(default=False)
+    fingerprint = _icd_fingerprint() if directory is not None else None
+    if fingerprint is None:
+        return _describe_platforms()
+
+    filename = os.path.join(directory, "platforms_%s.json" % fingerprint)
+    content = _read_cache_file(filename)
+    if content is not None:
+        try:
+            return json.loads(content)
+        except ValueError as error:
+            logger.debug("Cannot read OpenCL platforms cache %s: %s", filename, error)
+
+    platforms = _describe_platforms()
+    _write_cache_file(filename, json.dumps(platforms))
+    return platforms
+
+
 class OpenCL(object):
     """
     Simple class that wraps the structure ocl_tools_extended.h
 
     This is a static class.
     ocl should be the only instance and shared among all python modules.
+
+    Platforms and devices are described on first access and cached in the
+    process and, optionally, on disk (see :func:`_get_platform_descriptions`).
+
+    An instance evaluates to False if no device is available.
     """
 
-    platforms = []
-    nb_devices = 0
     context_cache = {}  # key: 2-tuple of int, value: context
-    if pyopencl:
-        platform = device = pypl = devtype = extensions = pydev = None
-        for idx, platform in enumerate(pyopencl.get_platforms()):
-            pypl = Platform(platform.name, platform.vendor, platform.version, platform.extensions, idx)
-            for idd, device in enumerate(platform.get_devices()):
-                ####################################################
-                # Nvidia does not report int64 atomics (we are using) ...
-                # this is a hack around as any nvidia GPU with double-precision supports int64 atomics
-                ####################################################
-                extensions = device.extensions
-                if (pypl.vendor == "NVIDIA Corporation") and ('cl_khr_fp64' in extensions):
-                                extensions += ' cl_khr_int64_base_atomics cl_khr_int64_extended_atomics'
-                try:
-                    devtype = pyopencl.device_type.to_string(device.type).upper()
-                except ValueError:
-                    # pocl does not describe itself as a CPU !
-                    devtype = "CPU"
-                if len(devtype) > 3:
-                    devtype = devtype[:3]
-                if _is_nvidia_gpu(pypl.vendor, devtype) and "compute_capability_major_nv" in dir(device):
-                    comput_cap = device.compute_capability_major_nv, device.compute_capability_minor_nv
-                    flop_core = NVIDIA_FLOP_PER_CORE.get(comput_cap, min(NVIDIA_FLOP_PER_CORE.values()))
-                elif (pypl.vendor == "Advanced Micro Devices, Inc.") and (devtype == "GPU"):
-                    flop_core = AMD_FLOP_PER_CORE
-                elif devtype == "CPU":
-                    flop_core = FLOP_PER_CORE.get(devtype, 1)
-                else:
-                    flop_core = 1
-                workgroup = device.max_work_group_size
-                if (devtype == "CPU") and (pypl.vendor == "Apple"):
-                    logger.warning("For Apple's OpenCL on CPU: Measuring actual valid max_work_goup_size.")
-                    workgroup = _measure_workgroup_size(device, fast=True)
-                if (devtype == "GPU") and os.environ.get("GPU") == "False":
-                    # Environment variable to disable GPU devices
-                    continue
-                pydev = Device(device.name, devtype, device.version, device.driver_version, extensions,
-                               device.global_mem_size, bool(device.available), device.max_compute_units,
-                               device.max_clock_frequency, flop_core, idd, workgroup)
-                pypl.add_device(pydev)
-                nb_devices += 1
-            platforms.append(pypl)
-        del platform, device, pypl, devtype, extensions, pydev
+    _platforms = None
+
+    @property
+    def platforms(self):
+        """List of available :class:`Platform`"""
+        if OpenCL._platforms is None:
+            platforms = []
+            if pyopencl:
+                for description in _get_platform_descriptions():
+                    description = dict(description)
+                    devices = description.pop("devices")
+                    platform = Platform(**description)
+                    for device in devices:
+                        platform.add_device(Device(**device))
+                    platforms.append(platform)
+            OpenCL._platforms = platforms
+        return OpenCL._platforms
+
+    @property
+    def nb_devices(self):
+        """Number of available devices"""
+        return sum(len(platform.devices) for platform in self.platforms)
+
+    def __bool__(self):
+        return self.nb_devices > 0
+
+    __nonzero__ = __bool__  # Python 2
 
     def __repr__(self):
         out = ["OpenCL devices:"]
@@ -459,8 +737,8 @@ class OpenCL(object):
 
 if pyopencl:
     ocl = OpenCL()
-    if ocl.nb_devices == 0:
-        ocl = None
+    # Platforms are described on first use: use "if ocl:" to check that
+    # a device is available
 else:
     ocl = None
 
@@ -537,7 +815,7 @@ def measure_workgroup_size(device):
 
     if device is "all", returns a dict with all devices with their ids as keys.
     """
-    if (ocl is None) or (device is None):
+    if (not ocl) or (device is None):
         return None
 
     if isinstance(device, tuple) and (len(device) == 2):
@@ -33,7 +33,7 @@ from __future__ import absolute_import, print_function, with_statement, division
 
 __author__ = "Jerome Kieffer"
 __license__ = "MIT"
-__date__ = "12/02/2018"
+__date__ = "18/10/2018"
 __copyright__ = "2012-2017, ESRF, Grenoble"
 __contact__ = "jerome.kieffer@esrf.fr"
 
@@ -44,7 +44,8 @@ from collections import OrderedDict
 from math import floor, ceil, sqrt, log
 
 from .common import pyopencl, kernel_workgroup_size
-from .processing import EventDescription, OpenclProcessing, BufferDescription
+from .autotune import local_size_candidates, power_of_two_sizes
+from .processing import EventDescription, OpenclProcessing, BufferDescription, profiled
 
 if pyopencl:
     mf = pyopencl.mem_flags
@@ -77,7 +78,8 @@ class ImageProcessing(OpenclProcessing):
                             out come of the compilation
         :param memory: minimum memory available on device
         :param profile: switch on profiling to be able to profile at the kernel
-                         level, store profiling elements (makes code slightly slower)
+                         level, store profiling elements (the command queue is always created
+                         with profiling enabled, this only keeps the events)
         """
         OpenclProcessing.__init__(self, ctx=ctx, devicetype=devicetype,
                                   platformid=platformid, deviceid=deviceid,
@@ -151,7 +153,8 @@ class ImageProcessing(OpenclProcessing):
             if out_dtype != numpy.float32 and out_size:
                 name = "%s_%s_d" % (numpy.dtype(out_dtype), out_size)
                 if name not in self.cl_mem:
-                    output_array = self.cl_mem[name] = pyopencl.array.empty(self.queue, (out_size,), out_dtype)
+                    output_array = self.cl_mem[name] = pyopencl.array.empty(self.queue, (out_size,), out_dtype,
+                                                                             allocator=self.allocator)
                 else:
                     output_array = self.cl_mem[name]
             else:
@@ -160,29 +163,32 @@ class ImageProcessing(OpenclProcessing):
         if img is None:
             input_array = self.cl_mem["image1_d"]
         if isinstance(img, pyopencl.array.Array):
+            self.wait_for_array(img)
             if copy:
                 evt = pyopencl.enqueue_copy(self.queue, self.cl_mem["image1_d"].data, img.data)
                 input_array = self.cl_mem["image1_d"]
-                events.append(EventDescription("copy D->D", evt))
+                events.append(EventDescription("copy D->D", evt, img.nbytes))
             else:
-                img.finish()
                 input_array = img
                 evt = None
         else:
             # assume this is numpy
             if img.dtype.itemsize > 4:
                 logger.warning("Casting to float32 on CPU")
-                evt = pyopencl.enqueue_copy(self.queue, self.cl_mem["image1_d"].data, numpy.ascontiguousarray(img, numpy.float32))
+                data = numpy.ascontiguousarray(img, numpy.float32)
+                evt = pyopencl.enqueue_copy(self.queue, self.cl_mem["image1_d"].data, data)
                 input_array = self.cl_mem["image1_d"]
-                events.append(EventDescription("cast+copy H->D", evt))
+                events.append(EventDescription("cast+copy H->D", evt, data.nbytes))
             else:
-                evt = pyopencl.enqueue_copy(self.queue, self.cl_mem["image1_d"].data, numpy.ascontiguousarray(img))
+                data = numpy.ascontiguousarray(img)
+                evt = pyopencl.enqueue_copy(self.queue, self.cl_mem["image1_d"].data, data)
                 input_array = self.cl_mem["image1_d"]
-                events.append(EventDescription("copy H->D", evt))
+                events.append(EventDescription("copy H->D", evt, data.nbytes))
         if self.profile:
             self.events += events
         return input_array, output_array
 
+    @profiled
     def to_float(self, img, copy=True, out=None):
         """ Takes any array and convert it to a float array for ease of processing.
         
@@ -198,7 +204,7 @@ class ImageProcessing(OpenclProcessing):
             if (img.dtype.itemsize > 4) or (img.dtype == numpy.float32):
                 # copy device -> device, already there as float32
                 ev = pyopencl.enqueue_copy(self.queue, output_array.data, input_array.data)
-                events.append(EventDescription("copy D->D", ev))
+                events.append(EventDescription("copy D->D", ev, input_array.nbytes))
             else:
                 # Cast to float:
                 name = self.converter[img.dtype]
@@ -218,6 +224,7 @@ class ImageProcessing(OpenclProcessing):
             output_array.finish()
             return output_array
 
+    @profiled
     def normalize(self, img, mini=0.0, maxi=1.0, copy=True, out=None):
         """Scale the intensity of the image so that the minimum is 0 and the
         maximum is 1.0 (or any value suggested).
@@ -261,11 +268,23 @@ class ImageProcessing(OpenclProcessing):
                 events += [EventDescription("max_min_stage1", k1),
                            EventDescription("max_min_stage2", k2)]
 
-            evt = self.kernels.normalize_image(self.queue, (self.shape[1], self.shape[0]), None,
-                                               input_array.data, output_array.data,
-                                               numpy.int32(self.shape[1]), numpy.int32(self.shape[0]),
-                                               self.cl_mem["max_min_d"].data,
-                                               numpy.float32(mini), numpy.float32(maxi))
+            global_size = (self.shape[1], self.shape[0])
+
+            def run(wg):
+                return self.kernels.normalize_image(self.queue, global_size, wg,
+                                                    input_array.data, output_array.data,
+                                                    numpy.int32(self.shape[1]), numpy.int32(self.shape[0]),
+                                                    self.cl_mem["max_min_d"].data,
+                                                    numpy.float32(mini), numpy.float32(maxi))
+            if input_array.data == output_array.data:
+                wg = None  # In-place: cannot run several times for tuning
+            else:
+                max_wg = min(self.ctx.devices[0].max_work_group_size,
+                             self.kernels.max_workgroup_size("normalize_image"))
+                wg = self.tune_workgroup_size("normalize_image", self.shape,
+                                              local_size_candidates(global_size, max_wg),
+                                              run)
+            evt = run(wg)
             events.append(EventDescription("normalize", evt))
         if self.profile:
             self.events += events
@@ -277,6 +296,7 @@ class ImageProcessing(OpenclProcessing):
             output_array.finish()
             return output_array
 
+    @profiled
     def histogram(self, img=None, nbins=255, range=None,
                   log_scale=False, copy=True, out=None):
         """Compute the histogram of a set of data.
@@ -341,13 +361,15 @@ class ImageProcessing(OpenclProcessing):
             tmp_size = nb_engines * nbins
             name = "tmp_int32_%s_d" % (tmp_size)
             if name not in self.cl_mem:
-                tmp_array = self.cl_mem[name] = pyopencl.array.empty(self.queue, (tmp_size,), numpy.int32)
+                tmp_array = self.cl_mem[name] = pyopencl.array.empty(self.queue, (tmp_size,), numpy.int32,
+                                                                     allocator=self.allocator)
             else:
                 tmp_array = self.cl_mem[name]
 
             edge_name = "tmp_float32_%s_d" % (nbins + 1)
             if edge_name not in self.cl_mem:
-                edges_array = self.cl_mem[edge_name] = pyopencl.array.empty(self.queue, (nbins + 1,), numpy.float32)
+                edges_array = self.cl_mem[edge_name] = pyopencl.array.empty(self.queue, (nbins + 1,), numpy.float32,
+                                                                            allocator=self.allocator)
             else:
                 edges_array = self.cl_mem[edge_name]
 
@@ -359,21 +381,26 @@ class ImageProcessing(OpenclProcessing):
             else:
                 map_operation = numpy.int32(0)
             kernel = self.kernels.get_kernel("histogram")
-            wg = min(device.max_work_group_size,
-                     1 << (int(ceil(log(nbins, 2)))),
-                     self.kernels.max_workgroup_size(kernel))
-            evt = kernel(self.queue, (wg * nb_engines,), (wg,),
-                         input_array.data,
-                         numpy.int32(input_array.size),
-                         mini,
-                         maxi,
-                         map_operation,
-                         output_array.data,
-                         edges_array.data,
-                         numpy.int32(nbins),
-                         tmp_array.data,
-                         self.cl_mem["cnt_d"].data,
-                         shared)
+            max_wg = min(device.max_work_group_size,
+                         self.kernels.max_workgroup_size(kernel))
+            wg = min(max_wg, 1 << (int(ceil(log(nbins, 2)))))
+
+            def run(wg):
+                return kernel(self.queue, (wg * nb_engines,), (wg,),
+                              input_array.data,
+                              numpy.int32(input_array.size),
+                              mini,
+                              maxi,
+                              map_operation,
+                              output_array.data,
+                              edges_array.data,
+                              numpy.int32(nbins),
+                              tmp_array.data,
+                              self.cl_mem["cnt_d"].data,
+                              shared)
+            wg = self.tune_workgroup_size("histogram_%d" % nbins, (input_array.size,),
+                                          power_of_two_sizes(1, max_wg), run, default=wg)
+            evt = run(wg)
             events.append(EventDescription("histogram", evt))
 
         if self.profile:
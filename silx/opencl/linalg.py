@@ -29,12 +29,12 @@ from __future__ import absolute_import, print_function, with_statement, division
 
 __authors__ = ["P. Paleo"]
 __license__ = "MIT"
-__date__ = "10/08/2017"
+__date__ = "18/10/2018"
 
 import numpy as np
 
 from .common import pyopencl
-from .processing import EventDescription, OpenclProcessing
+from .processing import EventDescription, OpenclProcessing, profiled
 
 import pyopencl.array as parray
 cl = pyopencl
@@ -56,15 +56,18 @@ class LinAlg(OpenclProcessing):
         :param platformid: integer with the platform_identifier, as given by clinfo
         :param deviceid: Integer with the device identifier, as given by clinfo
         :param profile: switch on profiling to be able to profile at the kernel level,
-                        store profiling elements (makes code slightly slower)
+                        store profiling elements (the command queue is always created
+                        with profiling enabled, this only keeps the events)
 
         """
         OpenclProcessing.__init__(self, ctx=ctx, devicetype=devicetype,
                                   platformid=platformid, deviceid=deviceid,
                                   profile=profile)
 
-        self.d_gradient = parray.zeros(self.queue, shape, np.complex64)
-        self.d_image = parray.zeros(self.queue, shape, np.float32)
+        self.d_gradient = parray.zeros(self.queue, shape, np.complex64,
+                                       allocator=self.allocator)
+        self.d_image = parray.zeros(self.queue, shape, np.float32,
+                                    allocator=self.allocator)
         self.add_to_cl_mem({
             "d_gradient": self.d_gradient,
             "d_image": self.d_image
@@ -108,10 +111,11 @@ class LinAlg(OpenclProcessing):
             src_ref = src
         else:  # assuming numpy.ndarray
             evt = cl.enqueue_copy(self.queue, default_src_ref, src)
-            self.events.append(EventDescription("copy H->D", evt))
+            self.events.append(EventDescription("copy H->D", evt, src.nbytes))
             src_ref = default_src_ref
         return src_ref, dst_ref
 
+    @profiled
     def gradient(self, image, dst=None, return_to_host=False):
         """
         Compute the spatial gradient of an image.
@@ -155,7 +159,8 @@ class LinAlg(OpenclProcessing):
                 res_tmp = self.d_gradient.get()
             else:
                 res_tmp = np.zeros(self.shape, dtype=np.complex64)
-                cl.enqueue_copy(self.queue, res_tmp, grad_ref)
+                evt = cl.enqueue_copy(self.queue, res_tmp, grad_ref)
+                self.events.append(EventDescription("copy D->H", evt, res_tmp.nbytes))
             res = np.zeros((2,) + self.shape, dtype=np.float32)
             res[0] = np.copy(res_tmp.real)
             res[1] = np.copy(res_tmp.imag)
@@ -163,6 +168,7 @@ class LinAlg(OpenclProcessing):
         else:
             return dst
 
+    @profiled
     def divergence(self, gradient, dst=None, return_to_host=False):
         """
         Compute the spatial divergence of an image.
@@ -212,7 +218,8 @@ class LinAlg(OpenclProcessing):
                 res = self.d_image.get()
             else:
                 res = np.zeros(self.shape, dtype=np.float32)
-                cl.enqueue_copy(self.queue, res, img_ref)
+                evt = cl.enqueue_copy(self.queue, res, img_ref)
+                self.events.append(EventDescription("copy D->H", evt, res.nbytes))
             return res
         else:
             return dst
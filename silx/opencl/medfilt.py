@@ -36,7 +36,7 @@ from __future__ import absolute_import, print_function, with_statement, division
 
 __author__ = "Jerome Kieffer"
 __license__ = "MIT"
-__date__ = "12/09/2017"
+__date__ = "18/10/2018"
 __copyright__ = "2012-2017, ESRF, Grenoble"
 __contact__ = "jerome.kieffer@esrf.fr"
 
@@ -45,9 +45,11 @@ import numpy
 from collections import OrderedDict
 
 from .common import pyopencl, kernel_workgroup_size
-from .processing import EventDescription, OpenclProcessing, BufferDescription
+from .autotune import power_of_two_sizes
+from .processing import EventDescription, OpenclProcessing, BufferDescription, profiled
 
 if pyopencl:
+    import pyopencl.array
     mf = pyopencl.mem_flags
 else:
     raise ImportError("pyopencl is not installed")
@@ -84,7 +86,8 @@ class MedianFilter2D(OpenclProcessing):
         :param deviceid: Integer with the device identifier, as given by clinfo
         :param block_size: preferred workgroup size, may vary depending on the outpcome of the compilation
         :param profile: switch on profiling to be able to profile at the kernel level,
-                        store profiling elements (makes code slightly slower)
+                        store profiling elements (the command queue is always created
+                        with profiling enabled, this only keeps the events)
         """
         OpenclProcessing.__init__(self, ctx=ctx, devicetype=devicetype,
                                   platformid=platformid, deviceid=deviceid,
@@ -121,20 +124,37 @@ class MedianFilter2D(OpenclProcessing):
     def send_buffer(self, data, dest):
         """Send a numpy array to the device, including the cast on the device if possible
 
-        :param data: numpy array with data
+        :param data: numpy array or pyopencl array with data.
+                     pyopencl arrays are copied on the device.
         :param dest: name of the buffer as registered in the class
         """
 
         dest_type = numpy.dtype([i.dtype for i in self.buffers if i.name == dest][0])
         events = []
-        if (data.dtype == dest_type) or (data.dtype.itemsize > dest_type.itemsize):
-            copy_image = pyopencl.enqueue_copy(self.queue, self.cl_mem[dest], numpy.ascontiguousarray(data, dest_type))
-            events.append(EventDescription("copy H->D %s" % dest, copy_image))
+        if isinstance(data, pyopencl.array.Array):
+            self.wait_for_array(data)
+            if data.dtype == dest_type:
+                copy_image = pyopencl.enqueue_copy(self.queue, self.cl_mem[dest], data.data,
+                                                   byte_count=data.nbytes)
+                events.append(EventDescription("copy D->D %s" % dest, copy_image, data.nbytes))
+            elif data.dtype.type in self.mapping:
+                copy_image = pyopencl.enqueue_copy(self.queue, self.cl_mem["image_raw"], data.data,
+                                                   byte_count=data.nbytes)
+                kernel = getattr(self.program, self.mapping[data.dtype.type])
+                cast_to_float = kernel(self.queue, (self.size,), None, self.cl_mem["image_raw"], self.cl_mem[dest])
+                events += [EventDescription("copy D->D %s" % dest, copy_image, data.nbytes), EventDescription("cast to float", cast_to_float)]
+            else:
+                raise ValueError("Unsupported dtype for device array: %s" % data.dtype)
+        elif (data.dtype == dest_type) or (data.dtype.itemsize > dest_type.itemsize):
+            data = numpy.ascontiguousarray(data, dest_type)
+            copy_image = pyopencl.enqueue_copy(self.queue, self.cl_mem[dest], data)
+            events.append(EventDescription("copy H->D %s" % dest, copy_image, data.nbytes))
         else:
-            copy_image = pyopencl.enqueue_copy(self.queue, self.cl_mem["image_raw"], numpy.ascontiguousarray(data))
+            data = numpy.ascontiguousarray(data)
+            copy_image = pyopencl.enqueue_copy(self.queue, self.cl_mem["image_raw"], data)
             kernel = getattr(self.program, self.mapping[data.dtype.type])
             cast_to_float = kernel(self.queue, (self.size,), None, self.cl_mem["image_raw"], self.cl_mem[dest])
-            events += [EventDescription("copy H->D %s" % dest, copy_image), EventDescription("cast to float", cast_to_float)]
+            events += [EventDescription("copy H->D %s" % dest, copy_image, data.nbytes), EventDescription("cast to float", cast_to_float)]
         if self.profile:
             self.events += events
 
@@ -154,12 +174,32 @@ class MedianFilter2D(OpenclProcessing):
             wg = 1 << (int(needed_threads).bit_length())
         return wg
 
-    def medfilt2d(self, image, kernel_size=None):
+    def _tune_wg(self, kernel_size, shape, run):
+        """Returns the workgroup size to use, auto-tuned if enabled.
+
+        Larger workgroups than the one of :meth:`calc_wg` sort more padding
+        values and give the same result.
+
+        :param kernel_size: 2-tuple of int, shape of the median window
+        :param shape: shape of the images
+        :param callable run: function running the kernel for a workgroup size
+        :return: workgroup size for the first dimension
+        """
+        wg = self.calc_wg(kernel_size)
+        amws = kernel_workgroup_size(self.program, "medfilt2d")
+        candidates = power_of_two_sizes(wg, min(4 * wg, amws))
+        return self.tune_workgroup_size("medfilt2d_%dx%d" % tuple(kernel_size),
+                                        shape, candidates, run, default=wg)
+
+    @profiled
+    def medfilt2d(self, image, kernel_size=None, out=None):
         """Actually apply the median filtering on the image
 
-        :param image: numpy array with the image
+        :param image: numpy array or pyopencl array with the image
         :param kernel_size: 2-tuple if
-        :return: median-filtered  2D image
+        :param out: pyopencl array of float32 where to store the result.
+                    If provided, the result is not copied back to the host.
+        :return: median-filtered  2D image, as numpy array or out
 
 
         Nota: for window size 1x1 -> 7x7     up to 49  /  64 elements in   8 threads, 8elt/th
@@ -185,8 +225,6 @@ class MedianFilter2D(OpenclProcessing):
         if wg > amws:
             raise RuntimeError("Workgroup size is too big for medfilt2d: %s>%s" % (wg, amws))
 
-        localmem = self._get_local_mem(wg)
-
         assert image.ndim == 2, "Treat only 2D images"
         assert image.shape[0] <= self.shape[0], "height is OK"
         assert image.shape[1] <= self.shape[1], "width is OK"
@@ -195,27 +233,183 @@ class MedianFilter2D(OpenclProcessing):
             self.send_buffer(image, "image")
 
             kwargs = self.cl_kernel_args["medfilt2d"]
-            kwargs["local"] = localmem
             kwargs["khs1"] = kernel_half_size[0]
             kwargs["khs2"] = kernel_half_size[1]
             kwargs["height"] = numpy.int32(image.shape[0])
             kwargs["width"] = numpy.int32(image.shape[1])
 #             for k, v in kwargs.items():
 #                 print("%s: %s (%s)" % (k, v, type(v)))
-            mf2d = self.kernels.medfilt2d(self.queue,
-                                          (wg, image.shape[1]),
-                                          (wg, 1), *list(kwargs.values()))
+
+            def run(wg):
+                kwargs["local"] = self._get_local_mem(wg)
+                return self.kernels.medfilt2d(self.queue,
+                                              (wg, image.shape[1]),
+                                              (wg, 1), *list(kwargs.values()))
+            wg = self._tune_wg(kernel_size, image.shape, run)
+            mf2d = run(wg)
             events.append(EventDescription("median filter 2d", mf2d))
 
-            result = numpy.empty(image.shape, numpy.float32)
-            ev = pyopencl.enqueue_copy(self.queue, result, self.cl_mem["result"])
-            events.append(EventDescription("copy D->H result", ev))
+            if out is not None:
+                assert out.dtype == numpy.float32, "out must be float32"
+                assert out.size == image.size, "out must have the size of image"
+                result = out
+                ev = pyopencl.enqueue_copy(self.queue, result.data, self.cl_mem["result"],
+                                           byte_count=result.nbytes)
+                events.append(EventDescription("copy D->D result", ev, result.nbytes))
+            else:
+                result = numpy.empty(image.shape, numpy.float32)
+                ev = pyopencl.enqueue_copy(self.queue, result, self.cl_mem["result"])
+                events.append(EventDescription("copy D->H result", ev, result.nbytes))
             ev.wait()
         if self.profile:
             self.events += events
         return result
     __call__ = medfilt2d
 
+    def _get_stack_buffers(self, nb_pixels, raw_nbytes):
+        """Returns device buffers for a batch of frames, enlarged if needed
+
+        :param int nb_pixels: Number of pixels of the batch
+        :param int raw_nbytes: Size of the batch before the cast to float
+        :return: raw, image and result arrays
+        """
+        for name, size, dtype in (("stack_raw", raw_nbytes, numpy.int8),
+                                  ("stack", nb_pixels, numpy.float32),
+                                  ("stack_result", nb_pixels, numpy.float32)):
+            if self.cl_mem.get(name) is None or self.cl_mem[name].size < size:
+                logger.info("increase %s buffer size to %s", name, size)
+                self.cl_mem[name] = pyopencl.array.empty(
+                    self.queue, max(size, 1), dtype, allocator=self.allocator)
+        return self.cl_mem["stack_raw"], self.cl_mem["stack"], self.cl_mem["stack_result"]
+
+    @profiled
+    def medfilt2d_stack(self, stack, kernel_size=None, out=None, batch_size=None):
+        """Apply the median filtering on each image of a stack
+
+        Frames are processed by batches: each batch is uploaded at once,
+        cast to float on the device for integer types (8, 16 and 32 bits)
+        and filtered by a single kernel launch. The host only waits for the
+        last download.
+
+        :param stack: numpy array or pyopencl array of shape (N, height, width)
+        :param kernel_size: 2-tuple of odd values, default: the one of the
+                            constructor
+        :param out: pyopencl array of float32 of shape (N, height, width)
+                    where to store the result.
+                    If provided, the result is not copied back to the host.
+        :param int batch_size: Number of frames processed at once,
+                               default: as many as possible
+        :return: median-filtered stack, as numpy array of float32 or out
+        """
+        events = []
+        if kernel_size is None:
+            kernel_size = self.kernel_size
+        else:
+            kernel_size = self.calc_kernel_size(kernel_size)
+        kernel_half_size = kernel_size // numpy.int32(2)
+        wg = self.calc_wg(kernel_size)
+        amws = kernel_workgroup_size(self.program, "medfilt2d")
+        if wg > amws:
+            raise RuntimeError("Workgroup size is too big for medfilt2d: %s>%s" % (wg, amws))
+
+        if stack.ndim != 3:
+            raise ValueError("Expect a 3D stack of images, got %d dimensions" % stack.ndim)
+        nb_frames, height, width = stack.shape
+        if height > self.shape[0] or width > self.shape[1]:
+            raise ValueError("Images are larger than the filter shape: %s > %s" %
+                             (stack.shape[1:], tuple(self.shape)))
+        frame_size = height * width
+
+        on_device = isinstance(stack, pyopencl.array.Array)
+        if on_device:
+            if stack.dtype != numpy.float32 and stack.dtype.type not in self.mapping:
+                raise ValueError("Unsupported dtype for device array: %s" % stack.dtype)
+            if not stack.flags.c_contiguous:
+                raise ValueError("Device array must be C-contiguous")
+            self.wait_for_array(stack)
+        elif stack.dtype != numpy.float32 and stack.dtype.type not in self.mapping:
+            # Other types are converted on the host
+            stack = numpy.ascontiguousarray(stack, numpy.float32)
+        else:
+            stack = numpy.ascontiguousarray(stack)
+
+        if out is not None:
+            if out.dtype != numpy.float32:
+                raise ValueError("out must be float32")
+            if out.shape != stack.shape:
+                raise ValueError("out must have the shape of stack")
+            result = out
+        else:
+            result = numpy.empty(stack.shape, numpy.float32)
+
+        # Limit the size of batches to the device memory and int indexing
+        itemsize = stack.dtype.itemsize
+        max_frames = min(self.device.memory // (4 * (itemsize + 8) * frame_size),
+                         numpy.iinfo(numpy.int32).max // frame_size)
+        if batch_size is not None:
+            max_frames = min(max_frames, int(batch_size))
+        batch_size = int(max(1, min(max_frames, nb_frames)))
+
+        with self.sem:
+            d_raw, d_image, d_result = self._get_stack_buffers(
+                batch_size * frame_size, batch_size * frame_size * itemsize)
+            kwargs = OrderedDict(self.cl_kernel_args["medfilt2d"])
+            kwargs["image"] = d_image.data
+            kwargs["result"] = d_result.data
+            kwargs["khs1"] = kernel_half_size[0]
+            kwargs["khs2"] = kernel_half_size[1]
+            kwargs["height"] = numpy.int32(height)
+            kwargs["width"] = numpy.int32(width)
+            if stack.dtype != numpy.float32:
+                cast_kernel = getattr(self.program,
+                                      self.mapping[stack.dtype.type] + "_stack")
+
+            ev = None
+            for start in range(0, nb_frames, batch_size):
+                stop = min(start + batch_size, nb_frames)
+                nb_pixels = (stop - start) * frame_size
+                nbytes = nb_pixels * itemsize
+                dest = d_image if stack.dtype == numpy.float32 else d_raw
+                if on_device:
+                    evt = pyopencl.enqueue_copy(self.queue, dest.data, stack.data,
+                                                byte_count=nbytes,
+                                                src_offset=stack.offset + start * frame_size * itemsize)
+                    events.append(EventDescription("copy D->D stack", evt, nbytes))
+                else:
+                    evt = pyopencl.enqueue_copy(self.queue, dest.data, stack[start:stop],
+                                                is_blocking=False)
+                    events.append(EventDescription("copy H->D stack", evt, nbytes))
+                if stack.dtype != numpy.float32:
+                    evt = cast_kernel(self.queue, (nb_pixels,), None,
+                                      d_raw.data, d_image.data, numpy.int32(nb_pixels))
+                    events.append(EventDescription("cast to float", evt))
+
+                def run(wg):
+                    kwargs["local"] = self._get_local_mem(wg)
+                    return self.kernels.medfilt2d(self.queue,
+                                                  (wg, width, stop - start),
+                                                  (wg, 1, 1), *list(kwargs.values()))
+                if start == 0:
+                    wg = self._tune_wg(kernel_size, (height, width), run)
+                evt = run(wg)
+                events.append(EventDescription("median filter 2d stack", evt))
+
+                nbytes = nb_pixels * 4
+                if out is not None:
+                    ev = pyopencl.enqueue_copy(self.queue, result.data, d_result.data,
+                                               byte_count=nbytes,
+                                               dest_offset=result.offset + start * frame_size * 4)
+                    events.append(EventDescription("copy D->D result", ev, nbytes))
+                else:
+                    ev = pyopencl.enqueue_copy(self.queue, result[start:stop], d_result.data,
+                                               is_blocking=False)
+                    events.append(EventDescription("copy D->H result", ev, nbytes))
+            if ev is not None:
+                ev.wait()
+        if self.profile:
+            self.events += events
+        return result
+
     @staticmethod
     def calc_kernel_size(kernel_size):
         """format the kernel size to be a 2-length numpy array of int32
@@ -266,4 +460,25 @@ class _MedFilt2d(object):
             cls.median_filter = MedianFilter2D(new_shape, kernel_size, ctx=ctx)
         return cls.median_filter.medfilt2d(image, kernel_size=kernel_size)
 
+    @classmethod
+    def medfilt2d_stack(cls, stack, kernel_size=3):
+        """Median filter each image of a 3-dimensional array.
+
+        :param stack: A 3-dimensional input array of shape (N, height, width)
+        :param kernel_size: A scalar or a list of length 2, giving the size of the
+                            median filter window in each dimension.
+        :return: An array of float32 of the same shape as the input containing
+                 the median filtered images.
+        """
+        stack = numpy.asarray(stack)
+        shape = numpy.array(stack.shape[1:])
+        if cls.median_filter is None:
+            cls.median_filter = MedianFilter2D(stack.shape[1:], kernel_size)
+        elif (numpy.array(cls.median_filter.shape) < shape).any():
+            new_shape = numpy.maximum(numpy.array(cls.median_filter.shape), shape)
+            ctx = cls.median_filter.ctx
+            cls.median_filter = MedianFilter2D(new_shape, kernel_size, ctx=ctx)
+        return cls.median_filter.medfilt2d_stack(stack, kernel_size=kernel_size)
+
 medfilt2d = _MedFilt2d.medfilt2d
+medfilt2d_stack = _MedFilt2d.medfilt2d_stack
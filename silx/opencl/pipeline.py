@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+#
+#    Project: silx
+#             https://github.com/silx-kit/silx
+#
+#    Copyright (C) 2018 European Synchrotron Radiation Facility, Grenoble, France
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#  .
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#  .
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+#  THE SOFTWARE.
+
+"""Chain OpenCL processing on one device, keeping data on the device.
+
+Each stage of a :class:`Pipeline` is an :class:`OpenclProcessing` created on
+the context of the pipeline and enqueuing its operations on the command
+queue of the pipeline. Stages exchange `pyopencl.array.Array`, so
+only the input of the first stage is sent to the device and only the
+result of the last one is copied back to the host.
+Stages are ordered by the in-order queue, without synchronisation by the
+host between them:
+
+.. code-block:: python
+
+    from silx.opencl.pipeline import Pipeline
+
+    pipeline = Pipeline(devicetype="gpu")
+    pipeline.add_byte_offset(shape=(195, 487))
+    pipeline.add_normalize()
+    pipeline.add_medfilt2d(kernel_size=3)
+    images = [pipeline(raw) for raw in raws]
+"""
+
+from __future__ import absolute_import, print_function, with_statement, division
+
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/10/2018"
+
+import logging
+from collections import namedtuple
+
+import numpy
+
+from .common import ocl, pyopencl
+from .backprojection import Backprojection
+from .codec.byte_offset import ByteOffset
+from .image import ImageProcessing
+from .medfilt import MedianFilter2D
+
+if pyopencl:
+    import pyopencl.array
+else:
+    raise ImportError("pyopencl is not installed")
+logger = logging.getLogger(__name__)
+
+
+Stage = namedtuple("Stage", ["name", "processor", "function", "shape"])
+"""Description of a stage of a :class:`Pipeline`"""
+
+
+class Pipeline(object):
+    """Chain of OpenCL processing running on one device
+
+    :param ctx: actual working context, left to None for automatic
+                initialization from device type or platformid/deviceid
+    :param devicetype: type of device, can be "CPU", "GPU", "ACC" or "ALL"
+    :param platformid: integer with the platform_identifier, as given by clinfo
+    :param deviceid: Integer with the device identifier, as given by clinfo
+    :param profile: switch on profiling of all stages
+    """
+
+    def __init__(self, ctx=None, devicetype="all", platformid=None,
+                 deviceid=None, profile=False):
+        if ctx is None:
+            ctx = ocl.create_context(devicetype=devicetype,
+                                     platformid=platformid, deviceid=deviceid)
+        self.ctx = ctx
+        self.profile = profile
+        # Shared by all stages, with profiling enabled as OpenclProcessing
+        self.queue = pyopencl.CommandQueue(
+            ctx, properties=pyopencl.command_queue_properties.PROFILING_ENABLE)
+        self.stages = []
+
+    @property
+    def shape(self):
+        """Shape of the output of the pipeline, None if it has no stage"""
+        return self.stages[-1].shape if self.stages else None
+
+    def _input_shape(self, shape):
+        """Returns the shape of the input of a new stage"""
+        if shape is None:
+            shape = self.shape
+        if shape is None:
+            raise ValueError("shape is required for the first stage")
+        return tuple(shape)
+
+    def add_stage(self, name, processor, function, shape):
+        """Append a stage to the pipeline
+
+        The processor is switched to the command queue of the pipeline.
+
+        :param str name: Name of the stage
+        :param OpenclProcessing processor: Processing running the stage
+        :param callable function:
+            Function processing the output of the previous stage and
+            returning a `pyopencl.array.Array`
+        :param shape: Shape of the output of the stage
+        :return: self to allow chaining
+        """
+        processor.set_queue(self.queue)
+        self.stages.append(Stage(name, processor, function, tuple(shape)))
+        return self
+
+    def add_byte_offset(self, shape):
+        """Append a CBF byte offset decompression stage
+
+        Its input is a compressed frame as a numpy array of char.
+
+        :param shape: Shape of the decompressed frames
+        :return: self to allow chaining
+        """
+        shape = tuple(shape)
+        processor = ByteOffset(dec_size=int(numpy.prod(shape)), ctx=self.ctx,
+                               profile=self.profile)
+        out = pyopencl.array.empty(self.queue, shape, numpy.float32)
+
+        def function(raw):
+            processor.decode(raw, out=out)
+            return out
+        return self.add_stage("byte_offset", processor, function, shape)
+
+    def add_normalize(self, mini=0.0, maxi=1.0, shape=None):
+        """Append a stage scaling intensities between mini and maxi
+
+        :param float mini: Expected minimum value
+        :param float maxi: Expected maximum value
+        :param shape: Shape of the input, default: output of previous stage
+        :return: self to allow chaining
+        """
+        shape = self._input_shape(shape)
+        processor = ImageProcessing(shape=shape, ctx=self.ctx,
+                                    profile=self.profile)
+        out = pyopencl.array.empty(self.queue, shape, numpy.float32)
+
+        def function(image):
+            return processor.normalize(image, mini, maxi, copy=False, out=out)
+        return self.add_stage("normalize", processor, function, shape)
+
+    def add_medfilt2d(self, kernel_size=3, shape=None):
+        """Append a 2D median filter stage
+
+        :param kernel_size: Size of the median window, int or 2-tuple of odd values
+        :param shape: Shape of the input, default: output of previous stage
+        :return: self to allow chaining
+        """
+        shape = self._input_shape(shape)
+        processor = MedianFilter2D(shape, kernel_size, ctx=self.ctx,
+                                   profile=self.profile)
+        out = pyopencl.array.empty(self.queue, shape, numpy.float32)
+
+        def function(image):
+            return processor.medfilt2d(image, out=out)
+        return self.add_stage("medfilt2d", processor, function, shape)
+
+    def _add_backprojection(self, name, filtered, shape, kwargs):
+        """Append a filtered or plain backprojection stage"""
+        shape = self._input_shape(shape)
+        processor = Backprojection(shape, ctx=self.ctx, profile=self.profile,
+                                   **kwargs)
+        out = pyopencl.array.empty(self.queue, processor.slice_shape,
+                                   numpy.float32)
+
+        if filtered:
+            def function(sinogram):
+                return processor.filtered_backprojection(sinogram, dst=out)
+        else:
+            def function(sinogram):
+                return processor.backprojection(sinogram, dst=out)
+        return self.add_stage(name, processor, function,
+                              processor.slice_shape)
+
+    def add_filtered_backprojection(self, shape=None, **kwargs):
+        """Append a filtered backprojection (FBP) stage
+
+        The sinogram is filtered on the device if pyfft is available,
+        otherwise it is copied back to the host to be filtered.
+
+        :param shape: Shape of the sinogram, default: output of previous stage
+        :param kwargs: Other arguments of :class:`Backprojection`
+        :return: self to allow chaining
+        """
+        return self._add_backprojection(
+            "filtered_backprojection", True, shape, kwargs)
+
+    def add_backprojection(self, shape=None, **kwargs):
+        """Append a plain backprojection stage
+
+        The sinogram is not filtered, use it for already filtered sinograms.
+        See :meth:`add_filtered_backprojection` for the FBP.
+
+        :param shape: Shape of the sinogram, default: output of previous stage
+        :param kwargs: Other arguments of :class:`Backprojection`
+        :return: self to allow chaining
+        """
+        return self._add_backprojection("backprojection", False, shape, kwargs)
+
+    def process(self, data):
+        """Run all stages, keeping the result on the device.
+
+        The returned array is reused by the next call.
+
+        :param data: Input of the first stage, numpy or pyopencl array
+        :rtype: pyopencl.array.Array
+        """
+        if not self.stages:
+            raise ValueError("Pipeline has no stage")
+        if isinstance(data, pyopencl.array.Array) and data.queue is not self.queue:
+            # Produced on another queue
+            data.finish()
+            if data.queue is not None:
+                data.queue.finish()
+        for stage in self.stages:
+            data = stage.function(data)
+        self.queue.finish()
+        return data
+
+    def __call__(self, data):
+        """Run all stages and copy the result back to the host.
+
+        :param data: Input of the first stage, numpy or pyopencl array
+        :rtype: numpy.ndarray
+        """
+        return self.process(data).get()
+
+    def log_profile(self):
+        """Log profiling information of all stages"""
+        out = []
+        for stage in self.stages:
+            out += stage.processor.log_profile()
+        return out
+
+    def reset_log(self):
+        """Resets the profiling timers of all stages"""
+        for stage in self.stages:
+            stage.processor.reset_log()
@@ -41,26 +41,150 @@ __author__ = "Jerome Kieffer"
 __contact__ = "Jerome.Kieffer@ESRF.eu"
 __license__ = "MIT"
 __copyright__ = "European Synchrotron Radiation Facility, Grenoble, France"
-__date__ = "27/02/2018"
+__date__ = "18/10/2018"
 __status__ = "stable"
 
 
 import os
 import logging
 import gc
+import shlex
+import contextlib
+import functools
+import hashlib
+import json
 from collections import namedtuple
+from timeit import default_timer
 import numpy
 import threading
-from .common import ocl, pyopencl, release_cl_buffers, kernel_workgroup_size
+import weakref
+from .common import ocl, pyopencl, kernel_workgroup_size
+from .common import _get_cache_directory, _read_cache_file, _write_cache_file
 from .utils import concatenate_cl_kernel
+from . import autotune
 
 
 BufferDescription = namedtuple("BufferDescription", ["name", "size", "dtype", "flags"])
-EventDescription = namedtuple("EventDescription", ["name", "event"])
+EventDescription = namedtuple("EventDescription", ["name", "event", "nbytes"])
+EventDescription.__new__.__defaults__ = (None,)  # nbytes is optional
+SpanDescription = namedtuple("SpanDescription", ["name", "start", "end", "thread"])
 
 logger = logging.getLogger(__name__)
 
 
+_programs_cache = weakref.WeakKeyDictionary()
+"""Process-wide cache of built programs: {context: {key: pyopencl.Program}}"""
+
+_programs_lock = threading.Lock()
+"""Lock protecting _programs_cache, not held while building programs"""
+
+
+def _include_directories(options):
+    """Returns the directories given with -I in compile options
+
+    :param str options: Compile options
+    :rtype: List[str]
+    """
+    directories = []
+    args = shlex.split(options)
+    for index, arg in enumerate(args):
+        if arg == "-I":
+            if index + 1 < len(args):
+                directories.append(args[index + 1])
+        elif arg.startswith("-I"):
+            directories.append(arg[2:])
+    return directories
+
+
+def _include_files_digest(options):
+    """Returns a hash of the content of the files in include directories
+
+    :param str options: Compile options
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+    for directory in _include_directories(options):
+        for root, dirnames, filenames in os.walk(directory):
+            dirnames.sort()
+            for name in sorted(filenames):
+                filename = os.path.join(root, name)
+                digest.update(filename.encode("utf-8"))
+                try:
+                    with open(filename, "rb") as f:
+                        digest.update(f.read())
+                except (IOError, OSError):
+                    pass
+    return digest.hexdigest()
+
+
+def _program_key(ctx, source, options):
+    """Returns a key identifying a program built for the devices of a context
+
+    The key includes the content of the files in include directories,
+    so that editing a header invalidates the cached programs.
+
+    :param pyopencl.Context ctx: OpenCL context
+    :param str source: Source code of the program
+    :param str options: Compile options
+    :rtype: str
+    """
+    items = [pyopencl.VERSION_TEXT, source, options]
+    if "-I" in options:
+        items.append(_include_files_digest(options))
+    for device in ctx.devices:
+        platform = device.platform
+        items += [platform.name, platform.version,
+                  device.name, device.version, device.driver_version]
+    return hashlib.sha1(json.dumps(items).encode("utf-8")).hexdigest()
+
+
+def _build_program(ctx, source, options=""):
+    """Build an OpenCL program, reusing already built ones.
+
+    Programs are cached in the process as long as their context is alive and,
+    for single device contexts, program binaries are stored in the cache
+    directory of :mod:`silx.opencl.common` to be reused by other processes.
+
+    :param pyopencl.Context ctx: OpenCL context
+    :param str source: Source code of the program
+    :param str options: Compile options
+    :rtype: pyopencl.Program
+    """
+    key = _program_key(ctx, source, options)
+    with _programs_lock:
+        program = _programs_cache.get(ctx, {}).get(key)
+    if program is not None:
+        return program
+
+    filename = None
+    directory = _get_cache_directory()
+    if directory is not None and len(ctx.devices) == 1:
+        filename = os.path.join(directory, "programs", key + ".bin")
+        binary = _read_cache_file(filename, binary=True)
+        if binary is not None:
+            try:
+                program = pyopencl.Program(ctx, ctx.devices, [binary])
+                program = program.build(options=options)
+            except pyopencl.Error as error:
+                logger.debug("Cannot load program binary %s: %s", filename, error)
+                program = None
+
+    if program is None:
+        program = pyopencl.Program(ctx, source).build(options=options)
+        if filename is not None:
+            try:
+                binary = program.get_info(pyopencl.program_info.BINARIES)[0]
+            except pyopencl.Error as error:
+                logger.debug("Cannot get program binary: %s", error)
+            else:
+                _write_cache_file(filename, bytes(binary))
+
+    with _programs_lock:
+        # Keep the program built first by concurrent threads
+        programs = _programs_cache.setdefault(ctx, {})
+        return programs.setdefault(key, program)
+
+
 class KernelContainer(object):
     """Those object holds a copy of all kernels accessible as attributes"""
 
@@ -93,6 +217,231 @@ class KernelContainer(object):
         return kernel_workgroup_size(self._program, kernel)
 
 
+class BufferPool(object):
+    """Pool of OpenCL buffers of a context, shared by OpenclProcessing.
+
+    Freed buffers are kept and reused for later allocations instead of being
+    released. Requested sizes are rounded up to a size class: there are 4
+    classes per power of 2, so a buffer can be reused for a slightly
+    different shape at the cost of up to 25% more memory.
+
+    Buffers lost without being freed are not reused but released by the
+    garbage collector as usual.
+
+    A pool can be used as allocator of :class:`pyopencl.array.Array`.
+
+    :param pyopencl.Context ctx: Context of the buffers
+    :param int max_held:
+        Maximum number of bytes of freed buffers kept for reuse.
+        None (default) for no limit.
+    """
+
+    def __init__(self, ctx, max_held=None):
+        self._ctx = weakref.ref(ctx)  # Pools are stored by context
+        self.max_held = max_held
+        self._lock = threading.Lock()
+        self._held = {}  # {(flags, size): [buffers]}
+        self._active = {}  # {id(buffer): weakref to buffer}
+        self._stats = {"allocations": 0, "reuses": 0, "releases": 0,
+                       "active_bytes": 0, "held_bytes": 0,
+                       "high_water_bytes": 0}
+
+    @property
+    def ctx(self):
+        """Context of the buffers, None if it was garbage collected"""
+        return self._ctx()
+
+    @staticmethod
+    def size_class(nbytes):
+        """Returns the size of buffers used to store nbytes
+
+        :param int nbytes: Requested size in bytes
+        :rtype: int
+        """
+        nbytes = max(int(nbytes), 1)
+        if nbytes <= 256:
+            return 256
+        step = 1 << ((nbytes - 1).bit_length() - 3)
+        return (nbytes + step - 1) // step * step
+
+    def _update_high_water(self):
+        """Update the high-water mark statistics. Not locked"""
+        total = self._stats["active_bytes"] + self._stats["held_bytes"]
+        if total > self._stats["high_water_bytes"]:
+            self._stats["high_water_bytes"] = total
+
+    def _forget(self, ident, size):
+        """Callback of garbage collected active buffers"""
+        with self._lock:
+            if self._active.pop(ident, None) is not None:
+                self._stats["active_bytes"] -= size
+
+    def allocate(self, nbytes, flags=None):
+        """Returns a buffer of at least nbytes bytes
+
+        :param int nbytes: Requested size in bytes
+        :param flags: pyopencl.mem_flags of the buffer (default: READ_WRITE)
+        :rtype: pyopencl.Buffer
+        """
+        if flags is None:
+            flags = pyopencl.mem_flags.READ_WRITE
+        size = self.size_class(nbytes)
+        with self._lock:
+            buffers = self._held.get((flags, size))
+            if buffers:
+                buf = buffers.pop()
+                self._stats["held_bytes"] -= size
+                self._stats["reuses"] += 1
+            else:
+                buf = None
+
+        if buf is None:
+            ctx = self.ctx
+            if ctx is None:
+                raise RuntimeError("The context of the buffer pool was released")
+            try:
+                buf = pyopencl.Buffer(ctx, flags, size)
+            except pyopencl.MemoryError:
+                # Release held buffers and retry
+                self.clear()
+                buf = pyopencl.Buffer(ctx, flags, size)
+            with self._lock:
+                self._stats["allocations"] += 1
+
+        ident = id(buf)
+        callback = functools.partial(
+            lambda ident, size, _ref: self._forget(ident, size), ident, size)
+        with self._lock:
+            self._active[ident] = weakref.ref(buf, callback)
+            self._stats["active_bytes"] += size
+            self._update_high_water()
+        return buf
+
+    def __call__(self, nbytes):
+        """Allocator interface of pyopencl: see :meth:`allocate`"""
+        return self.allocate(nbytes)
+
+    def owns(self, buf):
+        """Returns True if the buffer was allocated by this pool and is in use
+
+        :param pyopencl.Buffer buf:
+        """
+        with self._lock:
+            ref = self._active.get(id(buf))
+        return ref is not None and ref() is buf
+
+    def free(self, buf):
+        """Give a buffer back to the pool.
+
+        :param pyopencl.Buffer buf: Buffer returned by :meth:`allocate`
+        :return: False if the buffer does not belong to the pool
+        :rtype: bool
+        """
+        if not self.owns(buf):
+            return False
+        key = buf.flags, buf.size
+        with self._lock:
+            del self._active[id(buf)]
+            self._stats["active_bytes"] -= buf.size
+            hold = (self.max_held is None or
+                    self._stats["held_bytes"] + buf.size <= self.max_held)
+            if hold:
+                self._held.setdefault(key, []).append(buf)
+                self._stats["held_bytes"] += buf.size
+            else:
+                self._stats["releases"] += 1
+        if not hold:
+            buf.release()
+        return True
+
+    def clear(self):
+        """Release all buffers held for reuse"""
+        with self._lock:
+            held, self._held = self._held, {}
+            for buffers in held.values():
+                self._stats["releases"] += len(buffers)
+            self._stats["held_bytes"] = 0
+        for buffers in held.values():
+            for buf in buffers:
+                buf.release()
+
+    @property
+    def stats(self):
+        """Statistics of the pool as a dict:
+
+        - allocations: Number of buffers allocated on the device
+        - reuses: Number of allocations served by held buffers
+        - releases: Number of buffers released by the pool
+        - active_bytes: Size of buffers in use
+        - held_bytes: Size of buffers held for reuse
+        - high_water_bytes: Maximum of active_bytes + held_bytes
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+_buffer_pools = weakref.WeakKeyDictionary()
+"""Buffer pools by context, released with their context: {context: BufferPool}"""
+
+_buffer_pools_lock = threading.Lock()
+
+
+def enable_buffer_pool(ctx, max_held=None):
+    """Share a pool of buffers between OpenclProcessing using a context.
+
+    Buffers allocated by :meth:`OpenclProcessing.allocate_buffers` and
+    through :attr:`OpenclProcessing.allocator` are then taken from the pool,
+    and returned to it by :meth:`OpenclProcessing.free_buffers`.
+
+    :param pyopencl.Context ctx: The context
+    :param int max_held: Maximum number of bytes kept for reuse, None for
+                         no limit. It updates the limit of an existing pool.
+    :rtype: BufferPool
+    """
+    with _buffer_pools_lock:
+        pool = _buffer_pools.get(ctx)
+        if pool is None:
+            pool = _buffer_pools[ctx] = BufferPool(ctx, max_held)
+        else:
+            pool.max_held = max_held
+    return pool
+
+
+def disable_buffer_pool(ctx):
+    """Stop sharing a pool of buffers for a context and release held buffers
+
+    :param pyopencl.Context ctx: The context
+    """
+    with _buffer_pools_lock:
+        pool = _buffer_pools.pop(ctx, None)
+    if pool is not None:
+        pool.clear()
+
+
+def get_buffer_pool(ctx):
+    """Returns the pool of buffers of a context or None if not enabled
+
+    :param pyopencl.Context ctx: The context
+    :rtype: Union[BufferPool,None]
+    """
+    with _buffer_pools_lock:
+        return _buffer_pools.get(ctx)
+
+
+def profiled(method):
+    """Decorator recording the host wall-time of a method of
+    :class:`OpenclProcessing` when profiling is enabled.
+
+    See :meth:`OpenclProcessing.profile_span`.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        name = "%s.%s" % (self.__class__.__name__, method.__name__)
+        with self.profile_span(name):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class OpenclProcessing(object):
     """Abstract class for different types of OpenCL processing.
 
@@ -121,11 +470,15 @@ class OpenclProcessing(object):
                             out come of the compilation
         :param memory: minimum memory available on device
         :param profile: switch on profiling to be able to profile at the kernel
-                         level, store profiling elements (makes code slightly slower)
+                         level, store profiling elements (the command queue is always created
+                         with profiling enabled, this only keeps the events)
         """
         self.sem = threading.Semaphore()
+        # Separate lock so that profiling can be recorded while holding sem
+        self._profile_lock = threading.Lock()
         self.profile = None
         self.events = []  # List with of EventDescription, kept for profiling
+        self.spans = []  # List of SpanDescription, kept for profiling
         self.cl_mem = {}  # dict with all buffer allocated
         self.cl_program = None  # The actual OpenCL program
         self.cl_kernel_args = {}  # dict with all kernel arguments
@@ -196,25 +549,45 @@ class OpenclProcessing(object):
                                   % (ualloc, self.device.memory))
 
             # do the allocation
+            pool = self.allocator
             try:
                 if use_array:
                     for buf in buffers:
-                        mem[buf.name] = pyopencl.array.empty(self.queue, buf.size, buf.dtype)
+                        mem[buf.name] = pyopencl.array.empty(self.queue, buf.size, buf.dtype,
+                                                             allocator=pool)
                 else:
                     for buf in buffers:
                         size = numpy.dtype(buf.dtype).itemsize * numpy.prod(buf.size)
-                        mem[buf.name] = pyopencl.Buffer(self.ctx, buf.flags, int(size))
+                        if pool is None:
+                            mem[buf.name] = pyopencl.Buffer(self.ctx, buf.flags, int(size))
+                        else:
+                            mem[buf.name] = pool.allocate(int(size), buf.flags)
             except pyopencl.MemoryError as error:
-                release_cl_buffers(mem)
+                for buf in mem.values():
+                    self._release_buffer(buf)
                 raise MemoryError(error)
 
         self.cl_mem.update(mem)
 
+    @property
+    def allocator(self):
+        """Buffer pool of the context, or None if not enabled.
+
+        It can be used as allocator of arrays added with :meth:`add_to_cl_mem`:
+        ``pyopencl.array.empty(self.queue, shape, dtype, allocator=self.allocator)``
+
+        :rtype: Union[BufferPool,None]
+        """
+        return get_buffer_pool(self.ctx)
+
     def add_to_cl_mem(self, parrays):
         """
         Add pyopencl.array, which are allocated by pyopencl, to self.cl_mem.
         This should be used before calling allocate_buffers().
 
+        Arrays allocated with :attr:`allocator` are given back to the buffer
+        pool by :meth:`free_buffers`.
+
         :param parrays: a dictionary of `pyopencl.array.Array` or `pyopencl.Buffer`
         """
         mem = self.cl_mem
@@ -222,26 +595,66 @@ class OpenclProcessing(object):
             mem[name] = parr
         self.cl_mem.update(mem)
 
+    def wait_for_array(self, array):
+        """Wait for the operations producing a device array on another queue.
+
+        Operations enqueued on :attr:`queue` are ordered by the queue and
+        are not waited for.
+
+        :param pyopencl.array.Array array: Array used as input
+        """
+        if array.queue is not self.queue:
+            array.finish()
+            if array.queue is not None:
+                array.queue.finish()
+
     def check_workgroup_size(self, kernel_name):
         "Calculate the maximum workgroup size from given kernel after compilation"
         return self.kernels.max_workgroup_size(kernel_name)
 
+    def tune_workgroup_size(self, name, shape, candidates, run, default=None):
+        """Returns the work-group size to use for a kernel and a data shape
+
+        The choice is read from the auto-tuning results of the device or,
+        if auto-tuning is enabled, measured by running the kernel with each
+        candidate. See :func:`silx.opencl.autotune.get_workgroup_size`.
+
+        :param str name: Name identifying the kernel and its parameters
+        :param shape: Shape of the data
+        :param candidates: Work-group sizes to try
+        :param callable run: Function enqueuing the kernel with a given
+                             work-group size and returning its event
+        :param default: Work-group size to use without tuning result
+        """
+        return autotune.get_workgroup_size(self.ctx.devices[0], name, shape,
+                                           candidates, run, default)
+
+    def _release_buffer(self, buf):
+        """Release a buffer or array, giving it back to the buffer pool if any
+
+        :param Union[pyopencl.Buffer,pyopencl.array.Array] buf:
+        """
+        if isinstance(buf, pyopencl.array.Array):
+            if buf.base_data is None:  # Empty array
+                return
+            pool = self.allocator
+            if pool is None or not pool.free(buf.base_data):
+                buf.data.release()
+        else:
+            pool = self.allocator
+            if pool is None or not pool.free(buf):
+                buf.release()
+
     def free_buffers(self):
         """free all device.memory allocated on the device
         """
         with self.sem:
             for key, buf in list(self.cl_mem.items()):
                 if buf is not None:
-                    if isinstance(buf, pyopencl.array.Array):
-                        try:
-                            buf.data.release()
-                        except pyopencl.LogicError:
-                            logger.error("Error while freeing buffer %s", key)
-                    else:
-                        try:
-                            buf.release()
-                        except pyopencl.LogicError:
-                            logger.error("Error while freeing buffer %s", key)
+                    try:
+                        self._release_buffer(buf)
+                    except pyopencl.LogicError:
+                        logger.error("Error while freeing buffer %s", key)
                     self.cl_mem[key] = None
 
     def compile_kernels(self, kernel_files=None, compile_options=None):
@@ -250,6 +663,9 @@ class OpenclProcessing(object):
         :param kernel_files: list of path to the kernel
             (by default use the one declared in the class)
         :param compile_options: string of compile options
+
+        Programs are built once per context, source and compile options,
+        and their binaries are cached on disk across processes.
         """
         # concatenate all needed source files into a single openCL module
         kernel_files = kernel_files or self.kernel_files
@@ -258,7 +674,7 @@ class OpenclProcessing(object):
         compile_options = compile_options or ""
         logger.info("Compiling file %s with options %s", kernel_files, compile_options)
         try:
-            self.program = pyopencl.Program(self.ctx, kernel_src).build(options=compile_options)
+            self.program = _build_program(self.ctx, kernel_src, compile_options)
         except (pyopencl.MemoryError, pyopencl.LogicError) as error:
             raise MemoryError(error)
         else:
@@ -276,18 +692,181 @@ class OpenclProcessing(object):
         """Switch On/Off the profiling flag of the command queue to allow debugging
 
         :param value: set to True to enable profiling, or to False to disable it.
-                      Without profiling, the processing is marginally faster
 
-        Profiling information can then be retrieved with the 'log_profile' method
+        The command queue is created with profiling enabled and is kept when
+        switching profiling on and off, so that pending operations stay
+        ordered.
+
+        Profiling information can then be retrieved with the 'log_profile',
+        'profile_stats' and 'export_chrome_trace' methods
         """
-        if bool(value) != self.profile:
-            with self.sem:
-                self.profile = bool(value)
-                if self.profile:
-                    self.queue = pyopencl.CommandQueue(self.ctx,
-                        properties=pyopencl.command_queue_properties.PROFILING_ENABLE)
-                else:
-                    self.queue = pyopencl.CommandQueue(self.ctx)
+        with self.sem:
+            self.profile = bool(value)
+            if self.queue is None or not (
+                    self.queue.properties &
+                    pyopencl.command_queue_properties.PROFILING_ENABLE):
+                self.queue = pyopencl.CommandQueue(self.ctx,
+                    properties=pyopencl.command_queue_properties.PROFILING_ENABLE)
+
+    def set_queue(self, queue):
+        """Enqueue the operations of this processing on another command queue
+
+        Pending operations on the current queue are completed first.
+        The device arrays of :attr:`cl_mem` are switched to the new queue.
+
+        :param pyopencl.CommandQueue queue: Queue on the context of this processing
+        """
+        with self.sem:
+            if self.queue is not None:
+                self.queue.finish()
+            self.queue = queue
+            for mem in self.cl_mem.values():
+                if isinstance(mem, pyopencl.array.Array):
+                    mem.queue = queue
+
+    @contextlib.contextmanager
+    def profiling(self, reset=True):
+        """Context manager enabling profiling for a block of code.
+
+        .. code-block:: python
+
+            with processing.profiling():
+                processing.backprojection(sino)
+            processing.export_chrome_trace("trace.json")
+
+        :param bool reset: True (default) to clear previous profiling information
+        """
+        previous = self.profile
+        if reset:
+            self.reset_log()
+        self.set_profiling(True)
+        try:
+            yield self
+        finally:
+            self.set_profiling(previous)
+
+    def profile_add(self, event, desc, nbytes=None):
+        """Record an OpenCL event if profiling is enabled
+
+        :param pyopencl.Event event: Event to record
+        :param str desc: Name of the operation
+        :param int nbytes: Number of bytes transferred by the operation if any
+        """
+        if self.profile:
+            with self._profile_lock:
+                self.events.append(EventDescription(desc, event, nbytes))
+
+    @contextlib.contextmanager
+    def profile_span(self, name):
+        """Context manager recording the host wall-time of a block of code
+        if profiling is enabled.
+
+        :param str name: Name of the span
+        """
+        if not self.profile:
+            yield
+            return
+        start = default_timer()
+        try:
+            yield
+        finally:
+            span = SpanDescription(name, start, default_timer(),
+                                   threading.current_thread().ident)
+            with self._profile_lock:
+                self.spans.append(span)
+
+    def _profiled_events(self):
+        """Returns the recorded events with their profiling information
+
+        :return: List of (name, queued, start, end, nbytes) with times in
+            nanoseconds of the device clock.
+            Events without available profiling information are skipped.
+        """
+        result = []
+        for event in self.events:
+            if not ("__len__" in dir(event) and len(event) >= 2):
+                continue
+            try:
+                profile = event[1].profile
+                times = profile.queued, profile.start, profile.end
+            except (pyopencl.Error, AttributeError) as error:
+                logger.debug("No profiling information for %s: %s", event[0], error)
+                continue
+            nbytes = event[2] if len(event) >= 3 else None
+            result.append((event[0],) + times + (nbytes,))
+        return result
+
+    def profile_stats(self):
+        """Returns statistics of the recorded OpenCL operations aggregated by name
+
+        :return: dict {name: dict of statistics} with statistics:
+            "count", "total", "min", "max" execution times in milliseconds,
+            "bytes" transferred and effective "bandwidth" in GB/s
+            (None if the number of bytes is not known)
+        :rtype: dict
+        """
+        stats = {}
+        for name, _queued, start, end, nbytes in self._profiled_events():
+            duration = 1e-6 * (end - start)
+            if name not in stats:
+                stats[name] = {"count": 0, "total": 0.0,
+                               "min": duration, "max": duration,
+                               "bytes": None, "bandwidth": None}
+            stat = stats[name]
+            stat["count"] += 1
+            stat["total"] += duration
+            stat["min"] = min(stat["min"], duration)
+            stat["max"] = max(stat["max"], duration)
+            if nbytes is not None:
+                stat["bytes"] = (stat["bytes"] or 0) + nbytes
+
+        for stat in stats.values():
+            if stat["bytes"] is not None and stat["total"] > 0:
+                stat["bandwidth"] = stat["bytes"] / (stat["total"] * 1e6)
+        return stats
+
+    def export_chrome_trace(self, filename=None):
+        """Export the recorded events and spans as Chrome trace events.
+
+        The result can be loaded in chrome://tracing or Perfetto.
+        Device events are aligned on the host clock using a marker
+        enqueued during the export.
+
+        :param str filename: Optional JSON file where to save the trace
+        :return: The trace as a dict
+        :rtype: dict
+        """
+        # Offset between device clock (ns) and host clock (s)
+        marker = pyopencl.enqueue_marker(self.queue)
+        marker.wait()
+        offset = default_timer() * 1e9 - marker.profile.end
+
+        device = self.ctx.devices[0]
+        trace = [{"name": "process_name", "ph": "M", "pid": 0,
+                  "args": {"name": "Host %s" % self.__class__.__name__}},
+                 {"name": "process_name", "ph": "M", "pid": 1,
+                  "args": {"name": "OpenCL %s" % device.name.strip()}}]
+
+        for span in self.spans:
+            trace.append({"name": span.name, "cat": "host", "ph": "X",
+                          "ts": span.start * 1e6,
+                          "dur": (span.end - span.start) * 1e6,
+                          "pid": 0, "tid": span.thread})
+
+        for name, queued, start, end, nbytes in self._profiled_events():
+            args = {"queued_us": 1e-3 * (start - queued)}
+            if nbytes is not None:
+                args["bytes"] = nbytes
+            trace.append({"name": name, "cat": "device", "ph": "X",
+                          "ts": 1e-3 * (start + offset),
+                          "dur": 1e-3 * (end - start),
+                          "pid": 1, "tid": 0, "args": args})
+
+        result = {"traceEvents": trace, "displayTimeUnit": "ms"}
+        if filename is not None:
+            with open(filename, "w") as f:
+                json.dump(result, f)
+        return result
 
     def log_profile(self):
         """If we are in profiling mode, prints out all timing for every single OpenCL call
@@ -310,8 +889,9 @@ class OpenclProcessing(object):
         """
         Resets the profiling timers
         """
-        with self.sem:
+        with self._profile_lock:
             self.events = []
+            self.spans = []
 
 # This should be implemented by concrete class
 #     def __copy__(self):
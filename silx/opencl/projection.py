@@ -29,13 +29,13 @@ from __future__ import absolute_import, print_function, with_statement, division
 
 __authors__ = ["A. Mirone, P. Paleo"]
 __license__ = "MIT"
-__date__ = "28/02/2018"
+__date__ = "18/10/2018"
 
 import logging
 import numpy as np
 
 from .common import pyopencl
-from .processing import EventDescription, OpenclProcessing, BufferDescription
+from .processing import EventDescription, OpenclProcessing, BufferDescription, profiled
 from .backprojection import _sizeof, _idivup
 
 if pyopencl:
@@ -80,8 +80,9 @@ class Projection(OpenclProcessing):
                            clinfo
         :param deviceid: Integer with the device identifier, as given by clinfo
         :param profile: switch on profiling to be able to profile at the kernel
-                        level, store profiling elements (makes code slightly
-                        slower)
+                        level, store profiling elements (the command queue is
+                        always created with profiling enabled, this only keeps
+                        the events)
         """
         # OS X enforces a workgroup size of 1 when the kernel has synchronization barriers
         # if sys.platform.startswith('darwin'): # assuming no discrete GPU
@@ -144,7 +145,8 @@ class Projection(OpenclProcessing):
         self.add_to_cl_mem(
             {
                 "d_axis_corrections": parray.zeros(self.queue,
-                                                   self.nprojs, np.float32)
+                                                   self.nprojs, np.float32,
+                                                   allocator=self.allocator)
             }
         )
         self._tmp_extended_img = np.zeros((self.shape[0] + 2, self.shape[1] + 2),
@@ -193,7 +195,8 @@ class Projection(OpenclProcessing):
         pyopencl.enqueue_copy(self.queue, self.cl_mem["d_angles"], angles2)
 
     def allocate_slice(self):
-            self.add_to_cl_mem({"d_slice": parray.zeros(self.queue, (self.shape[1] + 2, self.shape[1] + 2), np.float32)})
+            self.add_to_cl_mem({"d_slice": parray.zeros(self.queue, (self.shape[1] + 2, self.shape[1] + 2), np.float32,
+                                                           allocator=self.allocator)})
 
     def allocate_textures(self):
         self.d_image_tex = pyopencl.Image(
@@ -340,6 +343,7 @@ class Projection(OpenclProcessing):
         )
         return self.kernels.cpy2d(self.queue, ndrange, wg, *kernel_args)
 
+    @profiled
     def projection(self, image=None, dst=None):
         """Perform the projection on an input image
 
@@ -403,12 +407,14 @@ class Projection(OpenclProcessing):
             if dst is None:
                 self._ex_sino[:] = 0
                 ev = pyopencl.enqueue_copy(self.queue, self._ex_sino, self._d_sino)
-                events.append(EventDescription("copy D->H result", ev))
+                events.append(EventDescription("copy D->H result", ev,
+                                               self._ex_sino.nbytes))
                 ev.wait()
                 res = np.copy(self._ex_sino[:self.nprojs, :self.dwidth])
             else:
                 ev = self.cpy2d_to_sino(dst)
-                events.append(EventDescription("copy D->D result", ev))
+                events.append(EventDescription("copy D->D result", ev,
+                                               dst.nbytes))
                 ev.wait()
                 res = dst
         # /with self.sem
@@ -29,16 +29,18 @@ from __future__ import absolute_import, print_function, with_statement, division
 
 __authors__ = ["P. Paleo"]
 __license__ = "MIT"
-__date__ = "19/09/2017"
+__date__ = "18/10/2018"
 
 import logging
+from collections import namedtuple
 import numpy as np
 
 from .common import pyopencl
-from .processing import OpenclProcessing
+from .processing import OpenclProcessing, profiled
 from .backprojection import Backprojection
 from .projection import Projection
 from .linalg import LinAlg
+from ..image.tomography import ordered_subsets
 
 import pyopencl.array as parray
 from pyopencl.elementwise import ElementwiseKernel
@@ -47,6 +49,12 @@ logger = logging.getLogger(__name__)
 cl = pyopencl
 
 
+Subset = namedtuple("Subset", ["indices", "projector", "backprojector",
+                               "d_data", "d_sino"])
+"""Projections of an ordered subset with their projector, backprojector,
+sinogram data and temporary sinogram"""
+
+
 class ReconstructionAlgorithm(OpenclProcessing):
     """
     A parent class for all iterative tomographic reconstruction algorithms
@@ -65,12 +73,15 @@ class ReconstructionAlgorithm(OpenclProcessing):
     :param platformid: integer with the platform_identifier, as given by clinfo
     :param deviceid: Integer with the device identifier, as given by clinfo
     :param profile: switch on profiling to be able to profile at the kernel level,
-                    store profiling elements (makes code slightly slower)
+                    store profiling elements (the command queue is always created
+                    with profiling enabled, this only keeps the events)
+    :param int n_subsets: Optional, number of ordered subsets of projections
+                          used by each iteration. Default is 1 (no subsets).
     """
 
     def __init__(self, sino_shape, slice_shape=None, axis_position=None, angles=None,
                  ctx=None, devicetype="all", platformid=None, deviceid=None,
-                 profile=False
+                 profile=False, n_subsets=1
                  ):
         OpenclProcessing.__init__(self, ctx=ctx, devicetype=devicetype,
                                   platformid=platformid, deviceid=deviceid,
@@ -98,33 +109,133 @@ class ReconstructionAlgorithm(OpenclProcessing):
         self.sino_shape = sino_shape
         self.is_cpu = self.backprojector.is_cpu
         # Arrays
-        self.d_data = parray.zeros(self.queue, sino_shape, dtype=np.float32)
+        self.d_data = parray.zeros(self.queue, sino_shape, dtype=np.float32,
+                                   allocator=self.allocator)
         self.d_sino = parray.zeros_like(self.d_data)
         self.d_x = parray.zeros(self.queue,
                                 self.backprojector.slice_shape,
-                                dtype=np.float32)
+                                dtype=np.float32,
+                                allocator=self.allocator)
         self.d_x_old = parray.zeros_like(self.d_x)
+        self.d_x_prev = parray.zeros_like(self.d_x)
 
         self.add_to_cl_mem({
             "d_data": self.d_data,
             "d_sino": self.d_sino,
             "d_x": self.d_x,
             "d_x_old": self.d_x_old,
+            "d_x_prev": self.d_x_prev,
         })
 
-    def proj(self, d_slice, d_sino):
+        self.convergence = []
+        """Relative update of the slice at each iteration of the last run"""
+
+        # Ordered subsets
+        self.n_subsets = int(n_subsets)
+        if self.n_subsets == 1:
+            self.subsets = [Subset(np.arange(sino_shape[0]), self.projector,
+                                   self.backprojector, self.d_data, self.d_sino)]
+        else:
+            self.subsets = []
+            for i, indices in enumerate(ordered_subsets(sino_shape[0], self.n_subsets)):
+                angles = np.asarray(self.backprojector.angles)[indices]
+                subset_shape = (len(indices), sino_shape[1])
+                backprojector = Backprojection(
+                    subset_shape,
+                    slice_shape=self.backprojector.slice_shape,
+                    axis_position=axis_position,
+                    angles=angles,
+                    ctx=self.ctx,
+                    profile=profile
+                )
+                projector = Projection(
+                    self.backprojector.slice_shape,
+                    angles,
+                    axis_position=axis_position,
+                    detector_width=self.backprojector.num_bins,
+                    normalize=False,
+                    ctx=self.ctx,
+                    profile=profile
+                )
+                d_data = parray.zeros(self.queue, subset_shape, dtype=np.float32,
+                                      allocator=self.allocator)
+                d_sino = parray.zeros_like(d_data)
+                self.add_to_cl_mem({
+                    "d_data_%d" % i: d_data,
+                    "d_sino_%d" % i: d_sino,
+                })
+                self.subsets.append(
+                    Subset(indices, projector, backprojector, d_data, d_sino))
+
+    def proj(self, d_slice, d_sino, projector=None):
         """
         Project d_slice to d_sino
+
+        :param projector: Projector of a subset, default: all projections
         """
-        self.projector.transfer_device_to_texture(d_slice.data)  #.wait()
-        self.projector.projection(dst=d_sino)
+        if projector is None:
+            projector = self.projector
+        projector.transfer_device_to_texture(d_slice.data)  #.wait()
+        projector.projection(dst=d_sino)
 
-    def backproj(self, d_sino, d_slice):
+    def backproj(self, d_sino, d_slice, backprojector=None):
         """
         Backproject d_sino to d_slice
+
+        :param backprojector: Backprojector of a subset, default: all projections
+        """
+        if backprojector is None:
+            backprojector = self.backprojector
+        backprojector.transfer_device_to_texture(d_sino.data)  #.wait()
+        backprojector.backprojection(dst=d_slice)
+
+    def set_data(self, data):
+        """
+        Transfer the sinogram to reconstruct, and its subsets, to the device
+        """
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        cl.enqueue_copy(self.queue, self.d_data.data, data)
+        if self.n_subsets > 1:
+            for subset in self.subsets:
+                cl.enqueue_copy(self.queue, subset.d_data.data,
+                                np.ascontiguousarray(data[subset.indices]))
+
+    def init_slice(self, x0=None, warm_start=False):
         """
-        self.backprojector.transfer_device_to_texture(d_sino.data)  #.wait()
-        self.backprojector.backprojection(dst=d_slice)
+        Initialize the slice before iterating.
+
+        :param x0: Optional, initial slice
+        :param bool warm_start: If True and x0 is None, start from the result
+                                of the previous run, e.g., an adjacent slice.
+                                Otherwise, start from zero.
+        """
+        if x0 is not None:
+            if isinstance(x0, parray.Array):
+                self.d_x[:] = x0[:]
+            else:
+                cl.enqueue_copy(self.queue, self.d_x.data,
+                                np.ascontiguousarray(x0, dtype=np.float32))
+        elif not warm_start:
+            self.d_x.fill(0)
+        self.convergence = []
+
+    def check_convergence(self, tol=None):
+        """
+        Record the relative update of the slice since the last call and
+        returns True if it is below tol.
+
+        The previous slice is read from d_x_prev, which is then updated.
+
+        :param float tol: Optional, tolerance on the relative update
+        :rtype: bool
+        """
+        self.d_x_prev -= self.d_x
+        norm = np.sqrt(parray.dot(self.d_x, self.d_x).get())
+        update = np.sqrt(parray.dot(self.d_x_prev, self.d_x_prev).get())
+        update = update / norm if norm > 0 else (0. if update == 0 else np.inf)
+        self.convergence.append(float(update))
+        self.d_x_prev[:] = self.d_x[:]
+        return tol is not None and update < tol
 
 
 class SIRT(ReconstructionAlgorithm):
@@ -145,7 +256,10 @@ class SIRT(ReconstructionAlgorithm):
     :param platformid: integer with the platform_identifier, as given by clinfo
     :param deviceid: Integer with the device identifier, as given by clinfo
     :param profile: switch on profiling to be able to profile at the kernel level,
-                    store profiling elements (makes code slightly slower)
+                    store profiling elements (the command queue is always created
+                    with profiling enabled, this only keeps the events)
+    :param int n_subsets: Optional, number of ordered subsets of projections
+                          used by each iteration. Default is 1 (no subsets).
 
     .. warning:: This is a beta version of the SIRT algorithm. Reconstruction
             fails for at least on CPU (Xeon E3-1245 v5) using the AMD opencl
@@ -154,72 +268,96 @@ class SIRT(ReconstructionAlgorithm):
 
     def __init__(self, sino_shape, slice_shape=None, axis_position=None, angles=None,
                  ctx=None, devicetype="all", platformid=None, deviceid=None,
-                 profile=False
+                 profile=False, n_subsets=1
                  ):
 
         ReconstructionAlgorithm.__init__(self, sino_shape, slice_shape=slice_shape,
                                          axis_position=axis_position, angles=angles,
                                          ctx=ctx, devicetype=devicetype, platformid=platformid,
-                                         deviceid=deviceid, profile=profile)
+                                         deviceid=deviceid, profile=profile,
+                                         n_subsets=n_subsets)
         self.compute_preconditioners()
 
+    @profiled
     def compute_preconditioners(self):
         """
         Create a diagonal preconditioner for the projection and backprojection
         operator.
         Each term of the diagonal is the sum of the projector/backprojector
         along rows [1], i.e the projection/backprojection of an array of ones.
+        With ordered subsets, preconditioners are computed for each subset
+        as in OS-SART.
 
         [1] Jens Gregor and Thomas Benson,
             Computational Analysis and Improvement of SIRT,
             IEEE transactions on medical imaging, vol. 27, no. 7,  2008
         """
 
-        # r_{i,i} = 1/(sum_j a_{i,j})
         slice_ones = np.ones(self.backprojector.slice_shape, dtype=np.float32)
-        R = 1./self.projector.projection(slice_ones)  # could be all done on GPU, but I want extra checks
-        R[np.logical_not(np.isfinite(R))] = 1.  # In the case where the rotation axis is excentred
-        self.d_R = parray.to_device(self.queue, R)
-        # c_{j,j} = 1/(sum_i a_{i,j})
-        sino_ones = np.ones(self.sino_shape, dtype=np.float32)
-        C = 1./self.backprojector.backprojection(sino_ones)
-        C[np.logical_not(np.isfinite(C))] = 1.  # In the case where the rotation axis is excentred
-        self.d_C = parray.to_device(self.queue, C)
-
-        self.add_to_cl_mem({
-            "d_R": self.d_R,
-            "d_C": self.d_C
-        })
+        self.subset_preconditioners = []
+        for i, subset in enumerate(self.subsets):
+            # r_{i,i} = 1/(sum_j a_{i,j})
+            R = 1./subset.projector.projection(slice_ones)  # could be all done on GPU, but I want extra checks
+            R[np.logical_not(np.isfinite(R))] = 1.  # In the case where the rotation axis is excentred
+            d_R = parray.to_device(self.queue, R)
+            # c_{j,j} = 1/(sum_i a_{i,j})
+            sino_ones = np.ones(subset.d_data.shape, dtype=np.float32)
+            C = 1./subset.backprojector.backprojection(sino_ones)
+            C[np.logical_not(np.isfinite(C))] = 1.  # In the case where the rotation axis is excentred
+            d_C = parray.to_device(self.queue, C)
+            self.subset_preconditioners.append((d_R, d_C))
+            suffix = "" if self.n_subsets == 1 else "_%d" % i
+            self.add_to_cl_mem({
+                "d_R" + suffix: d_R,
+                "d_C" + suffix: d_C
+            })
+        if self.n_subsets == 1:
+            self.d_R, self.d_C = self.subset_preconditioners[0]
 
     # TODO: compute and possibly return the residual
-    def run(self, data, n_it):
+    @profiled
+    def run(self, data, n_it, x0=None, warm_start=False, tol=None):
         """
         Run n_it iterations of the SIRT algorithm.
+
+        With ordered subsets (OS-SIRT), each iteration updates the slice
+        once per subset.
+
+        :param data: The sinogram
+        :param int n_it: Maximum number of iterations
+        :param x0: Optional, initial slice
+        :param bool warm_start: If True and x0 is None, start from the result
+                                of the previous run. Default: start from zero.
+        :param float tol: Optional, stop when the relative update of the slice
+                          during an iteration is below tol.
+                          Updates are stored in :attr:`convergence`.
         """
-        cl.enqueue_copy(self.queue, self.d_data.data, np.ascontiguousarray(data.astype(np.float32)))
+        self.set_data(data)
+        self.init_slice(x0, warm_start)
 
         d_x_old = self.d_x_old
         d_x = self.d_x
-        d_R = self.d_R
-        d_C = self.d_C
-        d_sino = self.d_sino
-        d_x *= 0
+        self.d_x_prev[:] = d_x[:]
 
         for k in range(n_it):
-            d_x_old[:] = d_x[:]
-            # x{k+1} = x{k} - C A^T R (A x{k} - b)
-            self.proj(d_x, d_sino)
-            d_sino -= self.d_data
-            d_sino *= d_R
-            if self.is_cpu:
-                # This sync is necessary when using CPU, while it is not for GPU
-                d_sino.finish()
-            self.backproj(d_sino, d_x)
-            d_x *= -d_C
-            d_x += d_x_old
-            if self.is_cpu:
-                # This sync is necessary when using CPU, while it is not for GPU
-                d_x.finish()
+            for subset, (d_R, d_C) in zip(self.subsets, self.subset_preconditioners):
+                d_sino = subset.d_sino
+                d_x_old[:] = d_x[:]
+                # x{k+1} = x{k} - C A^T R (A x{k} - b)
+                self.proj(d_x, d_sino, subset.projector)
+                d_sino -= subset.d_data
+                d_sino *= d_R
+                if self.is_cpu:
+                    # This sync is necessary when using CPU, while it is not for GPU
+                    d_sino.finish()
+                self.backproj(d_sino, d_x, subset.backprojector)
+                d_x *= -d_C
+                d_x += d_x_old
+                if self.is_cpu:
+                    # This sync is necessary when using CPU, while it is not for GPU
+                    d_x.finish()
+            if self.check_convergence(tol):
+                break
 
         return d_x
 
@@ -231,6 +369,15 @@ class TV(ReconstructionAlgorithm):
     A class for reconstruction with Total Variation regularization using the
     Chambolle-Pock TV reconstruction algorithm.
 
+    With ordered subsets, the stochastic primal-dual hybrid gradient
+    algorithm [3] is used: each iteration updates the dual variable of
+    every subset in turn.
+
+    [3] A. Chambolle, M. J. Ehrhardt, P. Richtarik, C.-B. Schonlieb,
+        Stochastic primal-dual hybrid gradient algorithm with arbitrary
+        sampling and imaging applications,
+        SIAM Journal on Optimization, vol. 28, no. 4, 2018
+
     :param sino_shape: shape of the sinogram. The sinogram is in the format
                        (n_b, n_a) where n_b is the number of detector bins and
                        n_a is the number of angles.
@@ -246,7 +393,10 @@ class TV(ReconstructionAlgorithm):
     :param platformid: integer with the platform_identifier, as given by clinfo
     :param deviceid: Integer with the device identifier, as given by clinfo
     :param profile: switch on profiling to be able to profile at the kernel
-                    level, store profiling elements (makes code slightly slower)
+                    level, store profiling elements (the command queue is always created
+                    with profiling enabled, this only keeps the events)
+    :param int n_subsets: Optional, number of ordered subsets of projections
+                          used by each iteration. Default is 1 (no subsets).
 
     .. warning:: This is a beta version of the Chambolle-Pock TV algorithm.
             Reconstruction fails for at least on CPU (Xeon E3-1245 v5) using
@@ -255,12 +405,13 @@ class TV(ReconstructionAlgorithm):
 
     def __init__(self, sino_shape, slice_shape=None, axis_position=None, angles=None,
                  ctx=None, devicetype="all", platformid=None, deviceid=None,
-                 profile=False
+                 profile=False, n_subsets=1
                  ):
         ReconstructionAlgorithm.__init__(self, sino_shape, slice_shape=slice_shape,
                                          axis_position=axis_position, angles=angles,
                                          ctx=ctx, devicetype=devicetype, platformid=platformid,
-                                         deviceid=deviceid, profile=profile)
+                                         deviceid=deviceid, profile=profile,
+                                         n_subsets=n_subsets)
         self.compute_preconditioners()
 
         # Create a LinAlg instance
@@ -285,9 +436,24 @@ class TV(ReconstructionAlgorithm):
             "d_q": self.d_q,
             "d_tmp": self.d_tmp,
         })
+        if self.n_subsets > 1:
+            self.subset_q = []
+            for i, subset in enumerate(self.subsets):
+                d_q = parray.zeros_like(subset.d_data)
+                self.subset_q.append(d_q)
+                self.add_to_cl_mem({"d_q_%d" % i: d_q})
+            self.d_p_old = parray.zeros_like(self.d_p)
+            self.d_z = parray.zeros_like(self.d_x)
+            self.d_zbar = parray.zeros_like(self.d_x)
+            self.add_to_cl_mem({
+                "d_p_old": self.d_p_old,
+                "d_z": self.d_z,
+                "d_zbar": self.d_zbar,
+            })
 
         self.theta = 1.0
 
+    @profiled
     def compute_preconditioners(self):
         """
         Create a diagonal preconditioner for the projection and backprojection
@@ -300,34 +466,66 @@ class TV(ReconstructionAlgorithm):
             Diagonal preconditioning for first order primal-dual algorithms in
             convex optimization,
             International Conference on Computer Vision, 2011
+
+        With ordered subsets, "Sigma" is computed per subset and "Tau" is
+        scaled by the number of subsets [3].
         """
 
         # Compute the diagonal preconditioner "Sigma"
         slice_ones = np.ones(self.backprojector.slice_shape, dtype=np.float32)
-        Sigma_k = 1./self.projector.projection(slice_ones)
-        Sigma_k[np.logical_not(np.isfinite(Sigma_k))] = 1.
-        self.d_Sigma_k = parray.to_device(self.queue, Sigma_k)
-        self.d_Sigma_kp1 = self.d_Sigma_k + 1  # TODO: memory vs computation
+        self.subset_Sigma = []
+        C = None
+        for i, subset in enumerate(self.subsets):
+            Sigma_k = 1./subset.projector.projection(slice_ones)
+            Sigma_k[np.logical_not(np.isfinite(Sigma_k))] = 1.
+            d_Sigma_k = parray.to_device(self.queue, Sigma_k)
+            d_Sigma_kp1 = d_Sigma_k + 1  # TODO: memory vs computation
+            self.subset_Sigma.append((d_Sigma_k, d_Sigma_kp1))
+            suffix = "" if self.n_subsets == 1 else "_%d" % i
+            self.add_to_cl_mem({
+                "d_Sigma_k" + suffix: d_Sigma_k,
+                "d_Sigma_kp1" + suffix: d_Sigma_kp1,
+            })
+            sino_ones = np.ones(subset.d_data.shape, dtype=np.float32)
+            C_s = subset.backprojector.backprojection(sino_ones)
+            C = C_s if C is None else np.maximum(C, C_s)
+        self.d_Sigma_k, self.d_Sigma_kp1 = self.subset_Sigma[0]
         self.Sigma_grad = 1/2.0  # For discrete gradient, sum|D_i,j| = 2 along lines or cols
 
         # Compute the diagonal preconditioner "Tau"
-        sino_ones = np.ones(self.sino_shape, dtype=np.float32)
-        C = self.backprojector.backprojection(sino_ones)
-        Tau = 1./(C + 2.)
-        self.d_Tau = parray.to_device(self.queue, Tau)
+        Tau = 1./(self.n_subsets * C + 2.)
+        self.d_Tau = parray.to_device(self.queue, Tau.astype(np.float32))
 
         self.add_to_cl_mem({
-            "d_Sigma_k": self.d_Sigma_k,
-            "d_Sigma_kp1": self.d_Sigma_kp1,
             "d_Tau": self.d_Tau
         })
 
-    def run(self, data, n_it, Lambda, pos_constraint=False):
+    @profiled
+    def run(self, data, n_it, Lambda, pos_constraint=False,
+            x0=None, warm_start=False, tol=None):
         """
         Run n_it iterations of the TV-regularized reconstruction,
         with the regularization parameter Lambda.
+
+        :param data: The sinogram
+        :param int n_it: Maximum number of iterations
+        :param float Lambda: Regularization parameter
+        :param bool pos_constraint: True to enforce positivity of the slice
+        :param x0: Optional, initial slice
+        :param bool warm_start: If True and x0 is None, start from the result
+                                of the previous run. Default: start from zero.
+                                Dual variables are always reset.
+        :param float tol: Optional, stop when the relative update of the slice
+                          during an iteration is below tol.
+                          Updates are stored in :attr:`convergence`.
         """
-        cl.enqueue_copy(self.queue, self.d_data.data, np.ascontiguousarray(data.astype(np.float32)))
+        self.set_data(data)
+        self.init_slice(x0, warm_start)
+        self.d_x_prev[:] = self.d_x[:]
+        self.d_p.fill(0)
+
+        if self.n_subsets > 1:
+            return self._run_subsets(n_it, Lambda, pos_constraint, tol)
 
         d_x = self.d_x
         d_x_old = self.d_x_old
@@ -337,9 +535,7 @@ class TV(ReconstructionAlgorithm):
         d_q = self.d_q
         d_g = self.d_g
 
-        d_x *= 0
-        d_p *= 0
-        d_q *= 0
+        d_q.fill(0)
 
         for k in range(0, n_it):
             # Update primal variables
@@ -376,6 +572,74 @@ class TV(ReconstructionAlgorithm):
             d_sino *= self.d_Sigma_k
             d_q += d_sino
             d_q /= self.d_Sigma_kp1
+
+            if self.check_convergence(tol):
+                break
+        return d_x
+
+    def _run_subsets(self, n_it, Lambda, pos_constraint, tol):
+        """Run iterations of the stochastic primal-dual hybrid gradient,
+        visiting subsets in order.
+
+        The gradient dual variable is updated with every subset.
+        z = Kadj(y) is kept up to date and zbar is its extrapolation.
+        """
+        d_x = self.d_x
+        d_tmp = self.d_tmp
+        d_p = self.d_p
+        d_p_old = self.d_p_old
+        d_g = self.d_g
+        d_z = self.d_z
+        d_zbar = self.d_zbar
+        d_gradient = self.linalg.cl_mem["d_gradient"]
+
+        d_z.fill(0)
+        d_zbar.fill(0)
+        for d_q in self.subset_q:
+            d_q.fill(0)
+
+        for k in range(0, n_it):
+            for subset, d_q, (d_Sigma_k, d_Sigma_kp1) in zip(
+                    self.subsets, self.subset_q, self.subset_Sigma):
+                #~ x = x - Tau*zbar
+                d_zbar *= self.d_Tau
+                d_x -= d_zbar
+                if pos_constraint:
+                    self.elwise_clamp(d_x)
+
+                #~ p = proj_linf(p + Sigma_grad*gradient(x), Lambda)
+                d_p_old[:] = d_p[:]
+                self.linalg.gradient(d_x)
+                d_gradient *= self.Sigma_grad
+                d_p += d_gradient
+                self.elwise_proj_linf(d_p, Lambda)
+                d_p_old -= d_p
+                self.linalg.divergence(d_p_old)  # d_g = -div(p_new - p_old)
+
+                #~ q_s = (q_s + Sigma_s*(K_s(x) - data_s))/(1.0 + Sigma_s)
+                d_sino = subset.d_sino
+                self.proj(d_x, d_sino, subset.projector)
+                d_sino -= subset.d_data
+                d_sino *= d_Sigma_k
+                d_sino += d_q
+                d_sino /= d_Sigma_kp1
+                # Keep the update of q_s to backproject it
+                d_sino -= d_q
+                d_q += d_sino
+                if self.is_cpu:
+                    # This sync is necessary when using CPU, while it is not for GPU
+                    d_sino.finish()
+                self.backproj(d_sino, d_tmp, subset.backprojector)
+
+                #~ z = z + Kadj_s(dq) + dzg, zbar = z + n*Kadj_s(dq) + dzg
+                d_z += d_tmp
+                d_z += d_g
+                d_zbar[:] = d_z[:]
+                d_tmp *= self.n_subsets
+                d_zbar += d_tmp
+                d_zbar += d_g
+            if self.check_convergence(tol):
+                break
         return d_x
 
     __call__ = run
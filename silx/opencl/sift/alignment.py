@@ -37,7 +37,7 @@ __authors__ = ["Jérôme Kieffer", "Pierre Paleo"]
 __contact__ = "jerome.kieffer@esrf.eu"
 __license__ = "MIT"
 __copyright__ = "European Synchrotron Radiation Facility, Grenoble, France"
-__date__ = "09/02/2018"
+__date__ = "18/10/2018"
 __status__ = "production"
 
 import os
@@ -46,7 +46,7 @@ from threading import Semaphore
 import numpy
 
 from ..common import ocl, pyopencl, kernel_workgroup_size
-from ..processing import OpenclProcessing
+from ..processing import EventDescription, OpenclProcessing, profiled
 from ..utils import calc_size, get_opencl_code
 from .utils import matching_correction
 import logging
@@ -212,6 +212,7 @@ class LinearAlign(OpenclProcessing):
         """
         self.program = None
 
+    @profiled
     def align(self, img, shift_only=False, return_all=False, double_check=False, relative=False, orsa=False):
         """
         Align image on reference image
@@ -229,7 +230,7 @@ class LinearAlign(OpenclProcessing):
         with self.sem:
             cpy = pyopencl.enqueue_copy(self.queue, self.cl_mem["input"].data, data)
             if self.profile:
-                self.events.append(("Copy H->D", cpy))
+                self.events.append(EventDescription("Copy H->D", cpy, data.nbytes))
             cpy.wait()
             kp = self.sift.keypoints(self.cl_mem["input"])
 #            print("ref %s img %s" % (self.cl_mem["ref_kp_gpu"].shape, kp.shape))
@@ -310,7 +311,8 @@ class LinearAlign(OpenclProcessing):
             cpy1 = pyopencl.enqueue_copy(self.queue, self.cl_mem["matrix"].data, matrix)
             cpy2 = pyopencl.enqueue_copy(self.queue, self.cl_mem["offset"].data, offset)
             if self.profile:
-                self.events += [("Copy matrix", cpy1), ("Copy offset", cpy2)]
+                self.events += [EventDescription("Copy matrix", cpy1, matrix.nbytes),
+                                EventDescription("Copy offset", cpy2, offset.nbytes)]
 
             if self.RGB:
                 shape = (4, self.shape[1], self.shape[0])
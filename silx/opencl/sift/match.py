@@ -39,7 +39,7 @@ __authors__ = ["Jérôme Kieffer", "Pierre Paleo"]
 __contact__ = "jerome.kieffer@esrf.eu"
 __license__ = "MIT"
 __copyright__ = "European Synchrotron Radiation Facility, Grenoble, France"
-__date__ = "17/01/2018"
+__date__ = "18/10/2018"
 __status__ = "production"
 
 
@@ -48,7 +48,7 @@ import numpy
 from .param import par
 from ..common import pyopencl, kernel_workgroup_size
 from .utils import calc_size
-from ..processing import OpenclProcessing, BufferDescription
+from ..processing import EventDescription, OpenclProcessing, BufferDescription, profiled
 logger = logging.getLogger(__name__)
 if not pyopencl:
     logger.warning("No PyOpenCL, no sift")
@@ -122,6 +122,7 @@ class MatchPlan(OpenclProcessing):
         for name, kernel in self.kernels.get_kernels().items():
             self.kernel_size[name] = kernel_workgroup_size(self.program, kernel)
 
+    @profiled
     def match(self, nkp1, nkp2, raw_results=False):
         """Calculate the matching of 2 keypoint list
 
@@ -149,7 +150,7 @@ class MatchPlan(OpenclProcessing):
                 self._reset_buffer1()
                 evt1 = pyopencl.enqueue_copy(self.queue, kpt1_gpu.data, nkp1)
                 if self.profile:
-                    self.events.append(("copy H->D KP_1", evt1))
+                    self.events.append(EventDescription("copy H->D KP_1", evt1, nkp1.nbytes))
 
             if isinstance(nkp2, pyopencl.array.Array):
                 kpt2_gpu = nkp2
@@ -161,7 +162,7 @@ class MatchPlan(OpenclProcessing):
                 self._reset_buffer2()
                 evt2 = pyopencl.enqueue_copy(self.queue, kpt2_gpu.data, nkp2)
                 if self.profile:
-                    self.events.append(("copy H->D KP_2", evt2))
+                    self.events.append(EventDescription("copy H->D KP_2", evt2, nkp2.nbytes))
 
             if min(kpt1_gpu.size, kpt2_gpu.size) > self.cl_mem["match"].shape[0]:
                 self.kpsize = min(kpt1_gpu.size, kpt2_gpu.size)
@@ -184,8 +185,8 @@ class MatchPlan(OpenclProcessing):
             match = numpy.empty(shape=(size, 2), dtype=numpy.int32)
             if size > 0:
                 cpyD2H = pyopencl.enqueue_copy(self.queue, match, self.cl_mem["match"].data)
-            if self.profile:
-                self.events.append(("copy D->H match", cpyD2H))
+                if self.profile:
+                    self.events.append(EventDescription("copy D->H match", cpyD2H, match.nbytes))
             if raw_results:
                 result = match
             else:
@@ -54,7 +54,7 @@ __authors__ = ["Jérôme Kieffer", "Pierre Paleo"]
 __contact__ = "jerome.kieffer@esrf.eu"
 __license__ = "MIT"
 __copyright__ = "European Synchrotron Radiation Facility, Grenoble, France"
-__date__ = "17/01/2018"
+__date__ = "18/10/2018"
 __status__ = "production"
 
 import os
@@ -67,7 +67,7 @@ from collections import OrderedDict
 from .param import par
 from silx.opencl import ocl, pyopencl, kernel_workgroup_size
 from silx.opencl.utils import get_opencl_code, nextpower
-from ..processing import OpenclProcessing, BufferDescription
+from ..processing import EventDescription, OpenclProcessing, BufferDescription, profiled
 from .utils import calc_size, kernel_size
 logger = logging.getLogger(__name__)
 
@@ -398,6 +398,7 @@ class SiftPlan(OpenclProcessing):
             self.procsize.append(calc_size(shape[-1::-1], wg))
             shape = tuple(i // 2 for i in shape)
 
+    @profiled
     def keypoints(self, image, mask=None):
         """Calculates the keypoints of the image
 
@@ -425,21 +426,21 @@ class SiftPlan(OpenclProcessing):
                 else:
                     evt = pyopencl.enqueue_copy(self.queue, self.cl_mem["scale_0"].data, image)
                 if self.profile:
-                    self.events.append(("copy H->D", evt))
+                    self.events.append(EventDescription("copy H->D", evt, image.nbytes))
             elif self.dtype == numpy.float64:
                 # A preprocessing kernel double_to_float exists, but is commented (RUNS ONLY ON GPU WITH FP64)
                 # TODO: benchmark this kernel vs the current pure CPU format conversion with numpy.float32
                 #       and uncomment it if it proves faster (dubious, because of data transfer bottleneck)
                 evt = pyopencl.enqueue_copy(self.queue, self.cl_mem["scale_0"].data, image.astype(numpy.float32))
                 if self.profile:
-                    self.events.append(("copy H->D", evt))
+                    self.events.append(EventDescription("copy H->D", evt, 4 * image.size))
             elif (len(image.shape) == 3) and (image.dtype == numpy.uint8) and (self.RGB):
                 if isinstance(image, pyopencl.array.Array):
                     evt = pyopencl.enqueue_copy(self.queue, self.cl_mem["raw"].data, image.data)
                 else:
                     evt = pyopencl.enqueue_copy(self.queue, self.cl_mem["raw"].data, image)
                 if self.profile:
-                    self.events.append(("copy H->D", evt))
+                    self.events.append(EventDescription("copy H->D", evt, image.nbytes))
 
                 evt = self.kernels.get_kernel("rgb_to_float")(self.queue, self.procsize[0], self.wgsize[0],
                                                        self.cl_mem["raw"].data, self.cl_mem["scale_0"].data,
@@ -451,7 +452,7 @@ class SiftPlan(OpenclProcessing):
                 program = self.kernels.get_kernel(self.converter[self.dtype])
                 evt = pyopencl.enqueue_copy(self.queue, self.cl_mem["raw"].data, image)
                 if self.profile:
-                    self.events.append(("copy H->D", evt))
+                    self.events.append(EventDescription("copy H->D", evt, image.nbytes))
                 evt = program(self.queue, self.procsize[0], self.wgsize[0],
                               self.cl_mem["raw"].data, self.cl_mem["scale_0"].data, *self.scales[0])
                 if self.profile:
@@ -626,7 +627,7 @@ class SiftPlan(OpenclProcessing):
                                                              numpy.float32(self._init_sigma),  # float InitSigma,
                                                              *self.scales[octave])  # int width, int height)
             if self.profile:
-                self.events += [("get cnt", cp_evt),
+                self.events += [EventDescription("get cnt", cp_evt, self.cnt.nbytes),
                                 ("interp_keypoint %s %s" % (octave, scale), evt)
                                 ]
 
@@ -717,12 +718,12 @@ class SiftPlan(OpenclProcessing):
                         break
                 if self.profile:
                     self.events += [("%s %s %s" % (orientation_name, octave, scale), evt),
-                                    ("copy cnt D->H", evt_cp),
+                                    EventDescription("copy cnt D->H", evt_cp, self.cnt.nbytes),
                                     ("%s %s %s" % (descriptor_name, octave, scale), evt2)]
             evt_cp = pyopencl.enqueue_copy(self.queue, self.cnt, self.cl_mem["cnt"].data)
             last_start = self.cnt[0]
             if self.profile:
-                self.events.append(("copy cnt D->H", evt_cp))
+                self.events.append(EventDescription("copy cnt D->H", evt_cp, self.cnt.nbytes))
 
         ########################################################################
         # Rescale all images to populate all octaves
@@ -742,8 +743,8 @@ class SiftPlan(OpenclProcessing):
             evt = pyopencl.enqueue_copy(self.queue, results, self.cl_mem["Kp_1"].data)
             evt2 = pyopencl.enqueue_copy(self.queue, descriptors, self.cl_mem["descriptors"].data)
             if self.profile:
-                self.events += [("copy D->H", evt),
-                                ("copy D->H", evt2)]
+                self.events += [EventDescription("copy D->H", evt, results.nbytes),
+                                EventDescription("copy D->H", evt2, descriptors.nbytes)]
         return results, descriptors
 
     def _compact(self, start=numpy.int32(0)):
@@ -776,10 +777,10 @@ class SiftPlan(OpenclProcessing):
 #        self.cl_mem["Kp_2"].fill(-1, self.queue)
         mem_evt = self.kernels.get_kernel("memset_float")(self.queue, calc_size((4 * self.kpsize,), wgsize), wgsize, self.cl_mem["Kp_2"].data, numpy.float32(-1), numpy.int32(4 * self.kpsize))
         if self.profile:
-            self.events += [("copy cnt D->H", cp0_evt),
-                            ("copy cnt H->D", cp1_evt),
+            self.events += [EventDescription("copy cnt D->H", cp0_evt, self.cnt.nbytes),
+                            EventDescription("copy cnt H->D", cp1_evt, self.cnt.nbytes),
                             ("compact", evt),
-                            ("copy cnt D->H", cp2_evt),
+                            EventDescription("copy cnt D->H", cp2_evt, self.cnt.nbytes),
                             ("memset 2", mem_evt)
                             ]
         return self.cnt[0]
@@ -94,7 +94,7 @@ class TestConvol(unittest.TestCase):
         cls.queue = None
 
     def setUp(self):
-        if scipy and ocl is None:
+        if scipy and not ocl:
             return
 
         if hasattr(scipy.misc, "ascent"):
@@ -153,7 +153,7 @@ class TestConvol(unittest.TestCase):
                 logger.info("Global execution time: CPU %.3fms, GPU: %.3fms." % (1000.0 * (t2 - t1), 1000.0 * (t1 - t0)))
                 logger.info("Horizontal convolution took %.3fms" % (1e-6 * (k1.profile.end - k1.profile.start)))
 
-    @unittest.skipIf(scipy and ocl is None, "scipy or opencl not available")
+    @unittest.skipIf(scipy and not ocl, "scipy or opencl not available")
     def test_convol_vert(self):
         """
         tests the convolution kernel
@@ -24,7 +24,7 @@
 
 __authors__ = ["J. Kieffer"]
 __license__ = "MIT"
-__date__ = "17/10/2017"
+__date__ = "18/10/2018"
 
 import os
 import unittest
@@ -36,6 +36,10 @@ from . import test_linalg
 from . import test_array_utils
 from ..codec import test as test_codec
 from . import test_image
+from . import test_common
+from . import test_processing
+from . import test_pipeline
+from . import test_autotune
 
 def suite():
     test_suite = unittest.TestSuite()
@@ -47,6 +51,10 @@ def suite():
     test_suite.addTests(test_array_utils.suite())
     test_suite.addTests(test_codec.suite())
     test_suite.addTests(test_image.suite())
+    test_suite.addTests(test_common.suite())
+    test_suite.addTests(test_processing.suite())
+    test_suite.addTests(test_pipeline.suite())
+    test_suite.addTests(test_autotune.suite())
     # Allow to remove sift from the project
     test_base_dir = os.path.dirname(__file__)
     sift_dir = os.path.join(test_base_dir, "..", "sift")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# coding: utf-8
+# /*##########################################################################
+#
+# Copyright (c) 2018 European Synchrotron Radiation Facility
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# ###########################################################################*/
+"""Test of the work-group size auto-tuning"""
+
+from __future__ import division, print_function
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/10/2018"
+
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from ..common import ocl
+if ocl:
+    import pyopencl
+from .. import autotune
+
+
+class _Event(object):
+    """Completed event"""
+
+    def wait(self):
+        pass
+
+
+class TestShapes(unittest.TestCase):
+    """Test helpers computing shapes and candidates"""
+
+    def test_shape_class(self):
+        self.assertEqual(autotune.shape_class((1, 3, 512, 513)), (1, 4, 512, 1024))
+
+    def test_power_of_two_sizes(self):
+        self.assertEqual(autotune.power_of_two_sizes(1, 8), [1, 2, 4, 8])
+        self.assertEqual(autotune.power_of_two_sizes(5, 64), [8, 16, 32, 64])
+        self.assertEqual(autotune.power_of_two_sizes(16, 8), [])
+
+    def test_local_size_candidates(self):
+        candidates = autotune.local_size_candidates((48, 6), 64)
+        self.assertIs(candidates[0], None)
+        self.assertIn((16, 2), candidates)
+        self.assertIn((8, 2), candidates)
+        for size in candidates[1:]:
+            self.assertEqual(48 % size[0], 0)
+            self.assertEqual(6 % size[1], 0)
+            self.assertTrue(16 <= size[0] * size[1] <= 64)
+
+
+@unittest.skipUnless(ocl, "OpenCL is not available")
+class TestGetWorkgroupSize(unittest.TestCase):
+    """Test the tuning and the persistence of work-group sizes"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self._env = os.environ.get("SILX_OPENCL_CACHE")
+        os.environ["SILX_OPENCL_CACHE"] = self.tmpdir
+        autotune.clear()
+        self.device = ocl.create_context().devices[0]
+        self.calls = []
+
+    def tearDown(self):
+        autotune.set_enabled(None)
+        autotune.clear()
+        if self._env is None:
+            os.environ.pop("SILX_OPENCL_CACHE", None)
+        else:
+            os.environ["SILX_OPENCL_CACHE"] = self._env
+        shutil.rmtree(self.tmpdir)
+        self.device = None
+
+    def run_kernel(self, size):
+        """Fake kernel: 4 is the fastest size and 16 is invalid"""
+        self.calls.append(size)
+        if size == 16:
+            raise pyopencl.LogicError("invalid work group size")
+        time.sleep(0.001 if size == 4 else 0.01)
+        return _Event()
+
+    def get(self, shape=(100, 100), candidates=(2, 4, 8, 16)):
+        return autotune.get_workgroup_size(
+            self.device, "test", shape, candidates, self.run_kernel, default=1)
+
+    def test_disabled(self):
+        """Test that nothing is measured when auto-tuning is disabled"""
+        autotune.set_enabled(False)
+        self.assertEqual(self.get(), 1)
+        self.assertEqual(self.calls, [])
+
+    def test_tuning(self):
+        """Test the choice of the fastest size and its persistence"""
+        autotune.set_enabled(True)
+        self.assertEqual(self.get(), 4)
+        self.assertEqual(sorted(set(self.calls)), [2, 4, 8, 16])
+
+        # Reuse results in process and for shapes of the same class
+        self.calls = []
+        self.assertEqual(self.get(shape=(128, 65)), 4)
+        self.assertEqual(self.calls, [])
+
+        # Reuse results stored on disk when auto-tuning is disabled
+        autotune.clear()
+        autotune.set_enabled(False)
+        self.assertEqual(self.get(), 4)
+        self.assertEqual(self.calls, [])
+
+        # Stored size is ignored if it is no longer a candidate
+        self.assertEqual(self.get(candidates=(2, 8)), 1)
+
+        # Other shape classes are tuned separately
+        autotune.set_enabled(True)
+        self.assertEqual(self.get(shape=(1000, 100)), 4)
+        self.assertNotEqual(self.calls, [])
+
+        # The existing file is updated with both results
+        autotune.clear()
+        self.assertEqual(len(autotune._get_results(self.device)), 2)
+
+    def test_no_valid_size(self):
+        """Test that default is returned if all candidates fail"""
+        autotune.set_enabled(True)
+        self.assertEqual(self.get(candidates=(16,)), 1)
+
+
+def suite():
+    testSuite = unittest.TestSuite()
+    testSuite.addTest(TestShapes("test_shape_class"))
+    testSuite.addTest(TestShapes("test_power_of_two_sizes"))
+    testSuite.addTest(TestShapes("test_local_size_candidates"))
+    testSuite.addTest(TestGetWorkgroupSize("test_disabled"))
+    testSuite.addTest(TestGetWorkgroupSize("test_tuning"))
+    testSuite.addTest(TestGetWorkgroupSize("test_no_valid_size"))
+    return testSuite
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest="suite")
@@ -30,7 +30,7 @@ from __future__ import division, print_function
 __authors__ = ["Pierre paleo"]
 __license__ = "MIT"
 __copyright__ = "2013-2017 European Synchrotron Radiation Facility, Grenoble, France"
-__date__ = "19/01/2018"
+__date__ = "18/10/2018"
 
 
 import time
@@ -43,6 +43,7 @@ except ImportError:
     mako = None
 from ..common import ocl
 if ocl:
+    import pyopencl
     from .. import backprojection
 from silx.test.utils import utilstest
 
@@ -83,7 +84,7 @@ def clip_circle(img, center=None, radius=None):
 class TestFBP(unittest.TestCase):
 
     def setUp(self):
-        if ocl is None:
+        if not ocl:
             return
         # ~ if sys.platform.startswith('darwin'):
             # ~ self.skipTest("Backprojection is not implemented on CPU for OS X yet")
@@ -155,9 +156,48 @@ class TestFBP(unittest.TestCase):
             self.assertTrue(errmax < 1.e-6, "Max error is too high")
 
 
+@unittest.skipUnless(ocl and mako, "PyOpenCl is missing")
+class TestFBPStack(unittest.TestCase):
+    """Test the filtered backprojection of a stack of sinograms"""
+
+    def setUp(self):
+        self.sinos = numpy.random.random((3, 90, 64)).astype(numpy.float32)
+        try:
+            self.fbp = backprojection.Backprojection(self.sinos.shape[1:],
+                                                     slice_shape=(60, 50))
+        except pyopencl.Error as error:
+            self.skipTest("OpenCL backprojection is not supported on this platform: %s" % error)
+        if self.fbp.compiletime_workgroup_size < 16 * 16:
+            self.skipTest("Current implementation of OpenCL backprojection is not supported on this platform yet")
+
+    def tearDown(self):
+        self.sinos = None
+        self.fbp = None
+
+    def test_stack(self):
+        """Test that a stack gives the same result as each slice"""
+        expected = numpy.array([self.fbp.filtered_backprojection(sino)
+                                for sino in self.sinos])
+
+        res = self.fbp.filtered_backprojection_stack(self.sinos)
+        self.assertEqual(res.shape, (3, 60, 50))
+        self.assertTrue(numpy.allclose(res, expected, atol=1e-6))
+
+        dst = numpy.zeros((3, 60, 50), dtype=numpy.float64)
+        res = self.fbp.filtered_backprojection_stack(self.sinos, dst=dst)
+        self.assertIs(res, dst)
+        self.assertTrue(numpy.allclose(dst, expected, atol=1e-6))
+
+        with self.assertRaises(ValueError):
+            self.fbp.filtered_backprojection_stack(self.sinos[:, :10])
+        with self.assertRaises(ValueError):
+            self.fbp.filtered_backprojection_stack(self.sinos, dst=dst[:2])
+
+
 def suite():
     testSuite = unittest.TestSuite()
     testSuite.addTest(TestFBP("test_fbp"))
+    testSuite.addTest(TestFBPStack("test_stack"))
     return testSuite
 
 
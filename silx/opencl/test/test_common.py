@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# coding: utf-8
+# /*##########################################################################
+#
+# Copyright (c) 2018 European Synchrotron Radiation Facility
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# ###########################################################################*/
+"""Test of the discovery of OpenCL platforms in the common module"""
+
+from __future__ import division, print_function
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/10/2018"
+
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from .. import common
+
+
+class TestPlatformsCache(unittest.TestCase):
+    """Test the cache of OpenCL platforms description"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self._env = os.environ.get("SILX_OPENCL_CACHE")
+        os.environ["SILX_OPENCL_CACHE"] = self.tmpdir
+
+    def tearDown(self):
+        if self._env is None:
+            os.environ.pop("SILX_OPENCL_CACHE", None)
+        else:
+            os.environ["SILX_OPENCL_CACHE"] = self._env
+        shutil.rmtree(self.tmpdir)
+
+    def test_cache_directory(self):
+        """Test the cache directory defined by environment variable"""
+        self.assertEqual(common._get_cache_directory(), self.tmpdir)
+        self.assertEqual(common._get_cache_directory(default=False), self.tmpdir)
+        for value in ("", "0", "False"):
+            os.environ["SILX_OPENCL_CACHE"] = value
+            self.assertIsNone(common._get_cache_directory())
+        del os.environ["SILX_OPENCL_CACHE"]
+        self.assertIsNotNone(common._get_cache_directory())
+        self.assertIsNone(common._get_cache_directory(default=False))
+        if os.name != "nt":
+            xdg_cache_home = os.environ.get("XDG_CACHE_HOME")
+            os.environ["XDG_CACHE_HOME"] = self.tmpdir
+            try:
+                self.assertEqual(common._get_cache_directory(),
+                                 os.path.join(self.tmpdir, "silx", "opencl"))
+            finally:
+                if xdg_cache_home is None:
+                    del os.environ["XDG_CACHE_HOME"]
+                else:
+                    os.environ["XDG_CACHE_HOME"] = xdg_cache_home
+
+    def test_private_cache(self):
+        """Test that cache files writable by others are not used"""
+        filename = os.path.join(self.tmpdir, "sub", "data.json")
+        self.assertTrue(common._write_cache_file(filename, "content"))
+        self.assertEqual(common._read_cache_file(filename), "content")
+        self.assertEqual(common._read_cache_file(filename, binary=True), b"content")
+        if os.name != "nt":
+            self.assertEqual(stat.S_IMODE(os.stat(filename).st_mode), 0o600)
+            self.assertEqual(
+                stat.S_IMODE(os.stat(os.path.dirname(filename)).st_mode), 0o700)
+
+            # File writable by others
+            os.chmod(filename, 0o666)
+            self.assertIsNone(common._read_cache_file(filename))
+            os.chmod(filename, 0o600)
+            self.assertEqual(common._read_cache_file(filename), "content")
+
+            # Directory writable by others
+            os.chmod(self.tmpdir, 0o777)
+            try:
+                self.assertIsNone(common._read_cache_file(filename))
+                self.assertFalse(common._write_cache_file(filename, "other"))
+            finally:
+                os.chmod(self.tmpdir, 0o700)
+
+        # Files out of the cache directory
+        self.assertIsNone(common._read_cache_file(__file__))
+
+    @unittest.skipIf(common.pyopencl is None, "pyopencl is not available")
+    def test_platforms_cache(self):
+        """Test that platforms are described from the cache"""
+        if common._icd_fingerprint() is None:
+            self.skipTest("No ICD file to build a cache key")
+
+        calls = []
+        describe_platforms = common._describe_platforms
+
+        def counter():
+            calls.append(None)
+            return describe_platforms()
+
+        common._describe_platforms = counter
+        try:
+            first = common._get_platform_descriptions()
+            second = common._get_platform_descriptions()
+        finally:
+            common._describe_platforms = describe_platforms
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(first, second)
+        self.assertEqual(len(os.listdir(self.tmpdir)), 1)
+
+        # Platforms created from the description
+        if common.ocl:
+            self.assertEqual(len(common.ocl.platforms), len(first))
+            self.assertEqual(common.ocl.nb_devices,
+                             sum(len(p["devices"]) for p in first))
+
+        # Changing visible devices does not use the same cache
+        key = common._icd_fingerprint()
+        cuda_visible_devices = os.environ.get("CUDA_VISIBLE_DEVICES")
+        os.environ["CUDA_VISIBLE_DEVICES"] = "silx-test"
+        try:
+            self.assertNotEqual(common._icd_fingerprint(), key)
+        finally:
+            if cuda_visible_devices is None:
+                del os.environ["CUDA_VISIBLE_DEVICES"]
+            else:
+                os.environ["CUDA_VISIBLE_DEVICES"] = cuda_visible_devices
+
+    @unittest.skipIf(common.pyopencl is None, "pyopencl is not available")
+    def test_lazy_platforms(self):
+        """Test that platforms are described on first use"""
+        calls = []
+        get_platform_descriptions = common._get_platform_descriptions
+
+        def counter():
+            calls.append(None)
+            return get_platform_descriptions()
+
+        platforms = common.OpenCL._platforms
+        common.OpenCL._platforms = None
+        common._get_platform_descriptions = counter
+        try:
+            ocl = common.OpenCL()
+            self.assertEqual(len(calls), 0)
+            self.assertEqual(bool(ocl), ocl.nb_devices > 0)
+            ocl.select_device()
+            self.assertEqual(len(calls), 1)
+        finally:
+            common._get_platform_descriptions = get_platform_descriptions
+            common.OpenCL._platforms = platforms
+
+
+def suite():
+    testSuite = unittest.TestSuite()
+    testSuite.addTest(TestPlatformsCache("test_cache_directory"))
+    testSuite.addTest(TestPlatformsCache("test_private_cache"))
+    testSuite.addTest(TestPlatformsCache("test_platforms_cache"))
+    testSuite.addTest(TestPlatformsCache("test_lazy_platforms"))
+    return testSuite
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest="suite")
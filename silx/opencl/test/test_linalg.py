@@ -92,7 +92,7 @@ def divergence(grad):
 class TestLinAlg(unittest.TestCase):
 
     def setUp(self):
-        if ocl is None:
+        if not ocl:
             return
         self.getfiles()
         self.la = linalg.LinAlg(self.image.shape)
@@ -35,7 +35,7 @@ __authors__ = ["Jérôme Kieffer"]
 __contact__ = "jerome.kieffer@esrf.eu"
 __license__ = "MIT"
 __copyright__ = "2013-2017 European Synchrotron Radiation Facility, Grenoble, France"
-__date__ = "15/03/2017"
+__date__ = "18/10/2018"
 
 
 import sys
@@ -76,7 +76,7 @@ except:
 class TestMedianFilter(unittest.TestCase):
 
     def setUp(self):
-        if ocl is None:
+        if not ocl:
             return
         self.data = ascent().astype(numpy.float32)
         self.medianfilter = medfilt.MedianFilter2D(self.data.shape, devicetype="gpu")
@@ -114,6 +114,37 @@ class TestMedianFilter(unittest.TestCase):
             logger.info("test_medfilt: size: %s error %s, t_ref: %.3fs, t_ocl: %.3fs" % r)
             self.assert_(r.error == 0, 'Results are correct')
 
+    @unittest.skipUnless(ocl and mako, "pyopencl is missing")
+    def test_medfilt2d_stack(self):
+        """
+        tests the median filter of a stack of images
+        """
+        stack = (numpy.random.random((5, 37, 53)) * 1000).astype(numpy.uint16)
+        try:
+            ref = numpy.array([self.medianfilter.medfilt2d(frame.astype(numpy.float32), 5)
+                               for frame in stack])
+        except RuntimeError as msg:
+            logger.error(msg)
+            self.skipTest("Workgroup size too big")
+
+        for dtype, batch_size in ((numpy.float32, None),
+                                  (numpy.uint16, 2),
+                                  (numpy.int32, None),
+                                  (numpy.float64, None)):
+            got = self.medianfilter.medfilt2d_stack(stack.astype(dtype), 5,
+                                                    batch_size=batch_size)
+            self.assertEqual(got.dtype, numpy.float32)
+            self.assertTrue(numpy.array_equal(got, ref), "dtype %s" % dtype)
+
+        queue = self.medianfilter.queue
+        d_stack = pyopencl.array.to_device(queue, stack)
+        out = pyopencl.array.empty(queue, stack.shape, numpy.float32)
+        got = self.medianfilter.medfilt2d_stack(d_stack, 5, out=out, batch_size=3)
+        self.assertIs(got, out)
+        self.assertTrue(numpy.array_equal(got.get(), ref))
+
+        self.assertRaises(ValueError, self.medianfilter.medfilt2d_stack, stack[0])
+
     def benchmark(self, limit=36):
         "Run some benchmarking"
         try:
@@ -162,6 +193,7 @@ class TestMedianFilter(unittest.TestCase):
 def suite():
     testSuite = unittest.TestSuite()
     testSuite.addTest(TestMedianFilter("test_medfilt"))
+    testSuite.addTest(TestMedianFilter("test_medfilt2d_stack"))
     return testSuite
 
 
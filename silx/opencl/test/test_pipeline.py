@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# coding: utf-8
+# /*##########################################################################
+#
+# Copyright (c) 2018 European Synchrotron Radiation Facility
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# ###########################################################################*/
+"""Test of the pipeline module"""
+
+from __future__ import division, print_function
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/10/2018"
+
+
+import unittest
+
+import numpy
+try:
+    import mako
+except ImportError:
+    mako = None
+
+from ..common import ocl
+if ocl:
+    import pyopencl
+    import pyopencl.array
+    from .. import pipeline
+    from ..backprojection import Backprojection
+from silx.io.codec import _byte_offset
+from silx.math.medianfilter import medfilt2d
+
+
+@unittest.skipUnless(ocl, "OpenCL is not available")
+class TestPipeline(unittest.TestCase):
+    """Test chaining of OpenCL processing on the device"""
+
+    def setUp(self):
+        self.image = numpy.random.poisson(100, (64, 48)).astype(numpy.int32)
+        image = self.image.astype(numpy.float32)
+        self.normalized = (image - image.min()) / (image.max() - image.min())
+
+    def test_empty(self):
+        """Test that an empty pipeline raises an error"""
+        with self.assertRaises(ValueError):
+            pipeline.Pipeline().add_normalize()
+        with self.assertRaises(ValueError):
+            pipeline.Pipeline().process(self.image)
+
+    def test_decode_normalize_medfilt(self):
+        """Test decompression, normalization and median filter"""
+        raw = _byte_offset.compress(self.image)
+        pipe = pipeline.Pipeline()
+        pipe.add_byte_offset(self.image.shape)
+        pipe.add_normalize(0., 1.)
+        pipe.add_medfilt2d(kernel_size=3)
+        self.assertEqual(pipe.shape, self.image.shape)
+        for stage in pipe.stages:
+            self.assertIs(stage.processor.queue, pipe.queue)
+
+        result = pipe.process(raw)
+        self.assertIsInstance(result, pyopencl.array.Array)
+        self.assertEqual(result.shape, self.image.shape)
+
+        expected = medfilt2d(self.normalized, 3, mode="nearest")
+        self.assertTrue(numpy.allclose(pipe(raw), expected, atol=1e-6))
+
+    def test_device_input(self):
+        """Test a pipeline fed with a device array"""
+        pipe = pipeline.Pipeline().add_normalize(0., 1., shape=self.image.shape)
+        d_image = pyopencl.array.to_device(
+            pipe.queue, self.image.astype(numpy.float32))
+        self.assertTrue(numpy.allclose(pipe(d_image), self.normalized, atol=1e-6))
+
+        # Input produced on another queue
+        queue = pyopencl.CommandQueue(pipe.ctx)
+        d_image = pyopencl.array.to_device(
+            queue, self.image.astype(numpy.float32))
+        d_image *= 2  # Normalization does not depend on the scale
+        self.assertTrue(numpy.allclose(pipe(d_image), self.normalized, atol=1e-6))
+
+    @unittest.skipUnless(mako, "mako is missing")
+    def test_backprojection(self):
+        """Test filtered and plain backprojection stages"""
+        sino = numpy.random.random((90, 64)).astype(numpy.float32)
+        try:
+            processor = Backprojection(sino.shape)
+        except pyopencl.Error as error:
+            self.skipTest("OpenCL backprojection is not supported on this platform: %s" % error)
+        if processor.compiletime_workgroup_size < 16 * 16:
+            self.skipTest("OpenCL backprojection is not supported on this platform")
+        sino_normalized = (sino - sino.min()) / (sino.max() - sino.min())
+
+        pipe = pipeline.Pipeline().add_normalize(0., 1., shape=sino.shape)
+        pipe.add_filtered_backprojection()
+        self.assertEqual(pipe.shape, processor.slice_shape)
+        for stage in pipe.stages:
+            self.assertIs(stage.processor.queue, pipe.queue)
+        expected = processor.filtered_backprojection(sino_normalized)
+        self.assertTrue(numpy.allclose(pipe(sino), expected, atol=1e-4))
+
+        pipe = pipeline.Pipeline().add_backprojection(shape=sino.shape)
+        expected = processor.backprojection(sino)
+        self.assertTrue(numpy.allclose(pipe(sino), expected, atol=1e-4))
+
+
+def suite():
+    testSuite = unittest.TestSuite()
+    testSuite.addTest(TestPipeline("test_empty"))
+    testSuite.addTest(TestPipeline("test_decode_normalize_medfilt"))
+    testSuite.addTest(TestPipeline("test_device_input"))
+    testSuite.addTest(TestPipeline("test_backprojection"))
+    return testSuite
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest="suite")
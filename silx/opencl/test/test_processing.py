@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+# coding: utf-8
+# /*##########################################################################
+#
+# Copyright (c) 2018 European Synchrotron Radiation Facility
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# ###########################################################################*/
+"""Test of the processing module"""
+
+from __future__ import division, print_function
+
+__authors__ = ["T. Vincent"]
+__license__ = "MIT"
+__date__ = "18/10/2018"
+
+
+import gc
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import weakref
+
+import numpy
+
+from ..common import ocl
+if ocl:
+    import pyopencl
+from .. import processing
+from ..utils import get_opencl_code
+
+
+@unittest.skipUnless(ocl, "OpenCL is not available")
+class TestProgramCache(unittest.TestCase):
+    """Test the cache of built OpenCL programs"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self._env = os.environ.get("SILX_OPENCL_CACHE")
+        os.environ["SILX_OPENCL_CACHE"] = self.tmpdir
+        self.ctx = ocl.create_context()
+        self.source = get_opencl_code("addition")
+
+    def tearDown(self):
+        if self._env is None:
+            os.environ.pop("SILX_OPENCL_CACHE", None)
+        else:
+            os.environ["SILX_OPENCL_CACHE"] = self._env
+        shutil.rmtree(self.tmpdir)
+        self.ctx = None
+
+    def test_build_program(self):
+        """Test that programs are reused in process and across processes"""
+        options = "-D TEST_PROGRAM_CACHE"
+        program = processing._build_program(self.ctx, self.source, options)
+        self.assertIs(processing._build_program(self.ctx, self.source, options),
+                      program)
+        self.assertIsNot(processing._build_program(self.ctx, self.source, ""),
+                         program)
+
+        # Binary stored on disk
+        self.assertEqual(len(os.listdir(os.path.join(self.tmpdir, "programs"))), 2)
+
+        # Simulate a new process: the program is loaded from the binary
+        key = processing._program_key(self.ctx, self.source, options)
+        del processing._programs_cache[self.ctx][key]
+        loaded = processing._build_program(self.ctx, self.source, options)
+        self.assertIsNot(loaded, program)
+        self.assertEqual(
+            sorted(kernel.function_name for kernel in loaded.all_kernels()),
+            sorted(kernel.function_name for kernel in program.all_kernels()))
+
+    def test_include_files(self):
+        """Test that editing an included file changes the program key"""
+        include_dir = os.path.join(self.tmpdir, "include")
+        os.makedirs(include_dir)
+        header = os.path.join(include_dir, "header.h")
+        with open(header, "w") as f:
+            f.write("#define VALUE 1\n")
+        options = "-I %s" % include_dir
+        key = processing._program_key(self.ctx, self.source, options)
+        self.assertEqual(
+            processing._program_key(self.ctx, self.source, options), key)
+        with open(header, "w") as f:
+            f.write("#define VALUE 2\n")
+        self.assertNotEqual(
+            processing._program_key(self.ctx, self.source, options), key)
+        self.assertEqual(
+            processing._include_directories("-D A -I%s -I /b" % include_dir),
+            [include_dir, "/b"])
+
+
+@unittest.skipUnless(ocl, "OpenCL is not available")
+class TestProfiling(unittest.TestCase):
+    """Test the profiling of OpenclProcessing"""
+
+    class Copy(processing.OpenclProcessing):
+        """Minimalistic processing copying data to and from the device"""
+
+        @processing.profiled
+        def roundtrip(self, data):
+            # Events are recorded while holding sem, like actual processings
+            with self.sem:
+                d_data = pyopencl.Buffer(self.ctx, pyopencl.mem_flags.READ_WRITE,
+                                         data.nbytes)
+                result = numpy.empty_like(data)
+                evt = pyopencl.enqueue_copy(self.queue, d_data, data)
+                self.profile_add(evt, "copy H->D", data.nbytes)
+                evt = pyopencl.enqueue_copy(self.queue, result, d_data)
+                self.profile_add(evt, "copy D->H", result.nbytes)
+                evt.wait()
+            return result
+
+    def setUp(self):
+        self.processing = self.Copy()
+        self.data = numpy.arange(1024, dtype=numpy.float32)
+
+    def tearDown(self):
+        self.processing = None
+
+    def test_disabled(self):
+        """Test that nothing is recorded when profiling is disabled"""
+        self.processing.roundtrip(self.data)
+        self.assertEqual(self.processing.events, [])
+        self.assertEqual(self.processing.spans, [])
+        self.assertEqual(self.processing.profile_stats(), {})
+
+    def test_profile_stats(self):
+        """Test statistics aggregated per operation"""
+        queue = self.processing.queue
+        with self.processing.profiling():
+            for _ in range(3):
+                self.processing.roundtrip(self.data)
+        self.assertFalse(self.processing.profile)
+        self.assertIs(self.processing.queue, queue)
+
+        stats = self.processing.profile_stats()
+        self.assertEqual(sorted(stats.keys()), ["copy D->H", "copy H->D"])
+        for stat in stats.values():
+            self.assertEqual(stat["count"], 3)
+            self.assertEqual(stat["bytes"], 3 * self.data.nbytes)
+            self.assertLessEqual(stat["min"], stat["max"])
+            self.assertGreaterEqual(stat["total"], 0)
+        self.assertEqual(len(self.processing.spans), 3)
+        self.assertEqual(self.processing.spans[0].name, "Copy.roundtrip")
+
+    def test_chrome_trace(self):
+        """Test the export to Chrome trace event format"""
+        with self.processing.profiling():
+            self.processing.roundtrip(self.data)
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, "trace.json")
+            trace = self.processing.export_chrome_trace(filename)
+            with open(filename) as f:
+                self.assertEqual(json.load(f), trace)
+        finally:
+            shutil.rmtree(tmpdir)
+
+        events = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+        self.assertEqual(sorted(e["name"] for e in events),
+                         ["Copy.roundtrip", "copy D->H", "copy H->D"])
+        for event in events:
+            self.assertGreaterEqual(event["dur"], 0)
+
+
+@unittest.skipUnless(ocl, "OpenCL is not available")
+class TestBufferPool(unittest.TestCase):
+    """Test the buffer pool shared by OpenclProcessing"""
+
+    def setUp(self):
+        self.ctx = ocl.create_context()
+        self.pool = processing.enable_buffer_pool(self.ctx)
+        self.buffers = [
+            processing.BufferDescription("data", 1000, numpy.float32, None),
+            processing.BufferDescription("count", 10, numpy.int32, None),
+        ]
+
+    def tearDown(self):
+        processing.disable_buffer_pool(self.ctx)
+        self.pool = None
+        self.ctx = None
+
+    def test_size_class(self):
+        """Test the rounding of sizes"""
+        size_class = processing.BufferPool.size_class
+        self.assertEqual(size_class(1), 256)
+        self.assertEqual(size_class(256), 256)
+        self.assertEqual(size_class(257), 320)
+        self.assertEqual(size_class(1024), 1024)
+        self.assertEqual(size_class(1025), 1280)
+        for nbytes in (300, 4000, 123456, 10 ** 7):
+            size = size_class(nbytes)
+            self.assertGreaterEqual(size, nbytes)
+            self.assertLessEqual(size, 1.25 * nbytes)
+
+    def test_reuse(self):
+        """Test reuse of buffers across OpenclProcessing instances"""
+        for use_array in (False, True):
+            before = self.pool.stats
+            first = processing.OpenclProcessing(ctx=self.ctx)
+            self.assertIs(first.allocator, self.pool)
+            first.allocate_buffers(self.buffers, use_array=use_array)
+            first.free_buffers()
+            stats = self.pool.stats
+            self.assertEqual(stats["active_bytes"], 0)
+            self.assertGreater(stats["held_bytes"], 0)
+
+            second = processing.OpenclProcessing(ctx=self.ctx)
+            second.allocate_buffers(self.buffers, use_array=use_array)
+            stats = self.pool.stats
+            self.assertEqual(stats["allocations"] - before["allocations"], 2)
+            self.assertEqual(stats["reuses"] - before["reuses"], 2)
+            self.assertEqual(stats["held_bytes"], 0)
+            if use_array:
+                data = numpy.arange(1000, dtype=numpy.float32)
+                second.cl_mem["data"].set(data)
+                self.assertTrue(numpy.array_equal(second.cl_mem["data"].get(), data))
+            second.free_buffers()
+            self.pool.clear()
+
+    def test_max_held(self):
+        """Test the limit on the memory held by the pool"""
+        self.pool.max_held = 1024
+        buf1 = self.pool.allocate(1024)
+        buf2 = self.pool.allocate(1024)
+        self.assertTrue(self.pool.owns(buf1))
+        self.assertEqual(self.pool.stats["high_water_bytes"], 2048)
+        self.assertTrue(self.pool.free(buf1))
+        self.assertTrue(self.pool.free(buf2))
+        self.assertFalse(self.pool.free(buf2))
+        stats = self.pool.stats
+        self.assertEqual(stats["held_bytes"], 1024)
+        self.assertEqual(stats["releases"], 1)
+        self.assertEqual(stats["active_bytes"], 0)
+
+        other = pyopencl.Buffer(self.ctx, pyopencl.mem_flags.READ_WRITE, 16)
+        self.assertFalse(self.pool.owns(other))
+        self.assertFalse(self.pool.free(other))
+
+    def test_lost_buffer(self):
+        """Test that buffers dropped without free are not accounted"""
+        buf = self.pool.allocate(2048)
+        self.assertEqual(self.pool.stats["active_bytes"], 2048)
+        del buf
+        self.assertEqual(self.pool.stats["active_bytes"], 0)
+
+    def test_released_context(self):
+        """Test that pools do not keep their context alive"""
+        ctx = pyopencl.Context(self.ctx.devices)
+        pool = processing.enable_buffer_pool(ctx)
+        processor = processing.OpenclProcessing(ctx=ctx)
+        processor.allocate_buffers(self.buffers)
+        processor.free_buffers()
+        self.assertGreater(pool.stats["held_bytes"], 0)
+        pool_ref = weakref.ref(pool)
+        del ctx, pool, processor
+        gc.collect()
+        self.assertIsNone(pool_ref())
+
+
+def suite():
+    testSuite = unittest.TestSuite()
+    testSuite.addTest(TestProgramCache("test_build_program"))
+    testSuite.addTest(TestProgramCache("test_include_files"))
+    testSuite.addTest(TestProfiling("test_disabled"))
+    testSuite.addTest(TestProfiling("test_profile_stats"))
+    testSuite.addTest(TestProfiling("test_chrome_trace"))
+    testSuite.addTest(TestBufferPool("test_size_class"))
+    testSuite.addTest(TestBufferPool("test_reuse"))
+    testSuite.addTest(TestBufferPool("test_max_held"))
+    testSuite.addTest(TestBufferPool("test_lost_buffer"))
+    testSuite.addTest(TestBufferPool("test_released_context"))
+    return testSuite
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest="suite")
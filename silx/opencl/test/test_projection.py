@@ -53,7 +53,7 @@ logger = logging.getLogger(__name__)
 class TestProj(unittest.TestCase):
 
     def setUp(self):
-        if ocl is None:
+        if not ocl:
             return
         # ~ if sys.platform.startswith('darwin'):
             # ~ self.skipTest("Projection is not implemented on CPU for OS X yet")
@@ -45,6 +45,25 @@ kernel void mult(   global float2* d_sino,
       }
 }
 
+// copy the scaled real array to the zero-padded complex array
+kernel void cpy2d_r2c(
+                      global float2* d_sino_complex,
+                      global float* d_sino,
+                      int num_bins,
+                      int num_projs,
+                      int fft_size,
+                      float scale)
+{
+    int gid0 = get_global_id(0);
+    int gid1 = get_global_id(1);
+    if (gid0 < fft_size && gid1 < num_projs) {
+        float value = 0.0f;
+        if (gid0 < num_bins)
+            value = scale * d_sino[gid1*num_bins+gid0];
+        d_sino_complex[gid1*fft_size+gid0] = (float2)(value, 0.0f);
+    }
+}
+
 // copy only the real part of the valid data to the real array
 kernel void cpy2d_c2r(
                       global float* d_sino,
@@ -54,6 +54,9 @@
  * The additionnal need for shared memory will be kfs2 floats and a float8 as register.
  *
  * Theoritically, it should be possible to handle up to windows-size 83x83
+ *
+ * dim2 = frame index when filtering a stack of images stored contiguously,
+ * each of height x width. Use a 2D NDRange for a single image.
  */
 __kernel void medfilt2d(__global float *image,  // input image
                         __global float *result, // output array
@@ -67,6 +70,11 @@ __kernel void medfilt2d(__global float *image,  // input image
     int wg = get_local_size(0);
     int x = get_global_id(1);
 
+    // Move to the frame of the stack
+    size_t frame_offset = get_global_id(2) * (size_t) height * width;
+    image += frame_offset;
+    result += frame_offset;
+
     if (x < width)
     {
         union
@@ -139,3 +147,24 @@ __kernel void medfilt2d(__global float *image,  // input image
     }
 }
 
+
+/*
+ * Cast a stack of images to float, the size is given at runtime
+ * (the kernels of preprocess.cl are limited to NIMAGE elements).
+ */
+#define CAST_TO_FLOAT(name, type)                                       \
+__kernel void name(__global type *array_int,                            \
+                   __global float *array_float,                         \
+                   int size)                                            \
+{                                                                       \
+    int i = get_global_id(0);                                           \
+    if (i < size)                                                       \
+        array_float[i] = (float) array_int[i];                          \
+}
+
+CAST_TO_FLOAT(s8_to_float_stack, char)
+CAST_TO_FLOAT(u8_to_float_stack, uchar)
+CAST_TO_FLOAT(s16_to_float_stack, short)
+CAST_TO_FLOAT(u16_to_float_stack, ushort)
+CAST_TO_FLOAT(s32_to_float_stack, int)
+CAST_TO_FLOAT(u32_to_float_stack, uint)